@@ -1,6 +1,7 @@
-from flask import Flask
+from flask import Flask, Response
 import os
 from flask_socketio import SocketIO
+from app.log_config import setup_logging
 # Import HoplongCrawler routes
 
 # Tạo đối tượng SocketIO
@@ -27,12 +28,27 @@ def create_app():
     logs_dir = os.path.join(os.path.dirname(app.root_path), 'logs')
     os.makedirs(logs_dir, exist_ok=True)
     
+    # Logging không chặn qua hàng đợi; mức log, JSON và lấy mẫu cấu hình qua biến môi trường CRAWLER_LOG_*
+    setup_logging()
+    
     # Đăng ký blueprint
     from app.routes import main_bp
     app.register_blueprint(main_bp)
     
     # Khởi tạo SocketIO với ứng dụng Flask
     socketio.init_app(app, cors_allowed_origins="*")
+    
+    # Room theo job (join_job/leave_job) và phát lại sự kiện cho client kết nối lại
+    from app.progress_reporter import register_socket_handlers
+    register_socket_handlers(socketio)
+
+    # Số liệu kiểu Prometheus: thông lượng/độ trễ HTTP theo vendor và host, thời gian
+    # parse và xử lý ảnh, độ sâu hàng đợi, WebDriver đang mở
+    from app.metrics import render_prometheus, PROMETHEUS_CONTENT_TYPE
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
 
     # (Đã gỡ bỏ) Đăng ký HoplongCrawler routes
     return app 
\ No newline at end of file
@@ -5,17 +5,27 @@ import zipfile
 from datetime import datetime
 from app.crawler import (
     is_category_url, is_product_url, extract_product_urls, extract_product_info,
-    download_baa_product_images_fixed, get_html_content
+    download_baa_product_images_fixed, get_html_content, http_session
+)
+from app.progress_reporter import (
+    report_progress, bind_current, STAGE_LISTING, STAGE_DETAIL, STAGE_IMAGES, STAGE_EXPORT
 )
-from app import socketio
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import re
 from urllib.parse import urlparse, urljoin
 from bs4 import BeautifulSoup
-import requests
 import traceback
 from queue import Queue
+import logging
+from app.log_config import get_item_logger
+from app.metrics import StatsCounters, track_queue
+from app import crawl_profiler
+from app.crawl_profiler import CrawlProfiler, STAGE_SPECS, STAGE_EXCEL
+from app.spec_engine import uppercase_code_cells
+
+logger = logging.getLogger(__name__)
+item_logger = get_item_logger(__name__)
 
 def get_category_vn_name(url):
     html = get_html_content(url)
@@ -67,7 +77,7 @@ def detect_pagination(url):
         
         return max(max_page, 1)
     except Exception as e:
-        print(f"Lỗi khi phát hiện số trang: {str(e)}")
+        logger.error(f"Lỗi khi phát hiện số trang: {str(e)}")
         return 1
 
 def make_pagination_url(base_url, page_number):
@@ -99,7 +109,7 @@ def make_pagination_url(base_url, page_number):
         new_url = f"{parsed_url.scheme}://{parsed_url.netloc}{path}?{new_query}"
         return new_url
     except Exception as e:
-        print(f"Lỗi khi tạo URL phân trang: {str(e)}")
+        logger.error(f"Lỗi khi tạo URL phân trang: {str(e)}")
         # Nếu có lỗi, thử thêm ?page=X vào cuối URL
         if '?' in base_url:
             return f"{base_url}&page={page_number}"
@@ -121,10 +131,10 @@ def extract_product_series(url):
         return None
     
     # Logic phân loại chi tiết CHỈ cho URL QLIGHT
-    print(f"🔍 Đang phân loại series cho URL QLIGHT: {url}")
+    logger.info(f"🔍 Đang phân loại series cho URL QLIGHT: {url}")
     
     try:
-        response = requests.get(url, timeout=10)
+        response = http_session.get(url, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, 'html.parser')
         
@@ -150,7 +160,7 @@ def extract_product_series(url):
                     if match:
                         series = match.group(1)
                         if len(series) >= 2:
-                            print(f"✅ Method 1 - Tìm thấy series từ product symbol: {series}_series")
+                            logger.info(f"✅ Method 1 - Tìm thấy series từ product symbol: {series}_series")
                             return f"{series}_series"
             
         # Method 2: Trích xuất từ tiêu đề h1
@@ -167,7 +177,7 @@ def extract_product_series(url):
                     if match:
                         series = match.group(1)
                         if len(series) >= 2 and not series.isdigit():
-                            print(f"✅ Method 2a - Tìm thấy series từ h1 title: {series}_series")
+                            logger.info(f"✅ Method 2a - Tìm thấy series từ h1 title: {series}_series")
                             return f"{series}_series"
                     
                     # Pattern 2: Tìm series với "SERIES" keyword
@@ -176,7 +186,7 @@ def extract_product_series(url):
                     if series_match:
                         series = series_match.group(1)
                         if len(series) >= 2:
-                            print(f"✅ Method 2b - Tìm thấy series từ 'SERIES' keyword: {series}_series")
+                            logger.info(f"✅ Method 2b - Tìm thấy series từ 'SERIES' keyword: {series}_series")
                             return f"{series}_series"
             
         # Method 3: Trích xuất từ breadcrumb
@@ -191,7 +201,7 @@ def extract_product_series(url):
                     if match:
                         series = match.group(1)
                         if len(series) >= 2:
-                            print(f"✅ Method 3 - Tìm thấy series từ breadcrumb: {series}_series")
+                            logger.info(f"✅ Method 3 - Tìm thấy series từ breadcrumb: {series}_series")
                             return f"{series}_series"
         
         # Method 4: Trích xuất từ URL patterns
@@ -205,7 +215,7 @@ def extract_product_series(url):
             if match1:
                 series = match1.group(1)
                 if len(series) >= 2:
-                    print(f"✅ Method 4a - Tìm thấy series từ URL pattern 1: {series}_series")
+                    logger.info(f"✅ Method 4a - Tìm thấy series từ URL pattern 1: {series}_series")
                     return f"{series}_series"
             
             # Pattern 2: brand_series hoặc brand-series
@@ -214,7 +224,7 @@ def extract_product_series(url):
             if match2:
                 series = match2.group(1)
                 if len(series) >= 2 and not series.isdigit():
-                    print(f"✅ Method 4b - Tìm thấy series từ URL pattern 2: {series}_series")
+                    logger.info(f"✅ Method 4b - Tìm thấy series từ URL pattern 2: {series}_series")
                     return f"{series}_series"
             
             # Pattern 3: series-brand format
@@ -223,7 +233,7 @@ def extract_product_series(url):
             if match3:
                 series = match3.group(1)
                 if len(series) >= 2:
-                    print(f"✅ Method 4c - Tìm thấy series từ URL pattern 3: {series}_series")
+                    logger.info(f"✅ Method 4c - Tìm thấy series từ URL pattern 3: {series}_series")
                     return f"{series}_series"
         
         # Method 5: Kiểm tra meta tags
@@ -239,7 +249,7 @@ def extract_product_series(url):
                         if match:
                             series = match.group(1)
                             if len(series) >= 2:
-                                print(f"✅ Method 5 - Tìm thấy series từ meta tags: {series}_series")
+                                logger.info(f"✅ Method 5 - Tìm thấy series từ meta tags: {series}_series")
                                 return f"{series}_series"
         
         # Method 6: Fallback - tìm trong toàn bộ page content
@@ -259,18 +269,18 @@ def extract_product_series(url):
             # Chọn series xuất hiện nhiều nhất
             most_common_series = max(series_candidates.items(), key=lambda x: x[1])
             series = most_common_series[0]
-            print(f"✅ Method 6 - Tìm thấy series từ page content (frequency: {most_common_series[1]}): {series}_series")
+            logger.info(f"✅ Method 6 - Tìm thấy series từ page content (frequency: {most_common_series[1]}): {series}_series")
             return f"{series}_series"
         
         # Trường hợp đặc biệt cho URL QLIGHT
         if 'QLIGHT' in url_upper or 'qlight' in url.lower():
-            print("✅ Fallback - Phát hiện QLIGHT trong URL: QLIGHT_series")
+            logger.info("✅ Fallback - Phát hiện QLIGHT trong URL: QLIGHT_series")
             return "QLIGHT_series"
             
     except Exception as e:
-        print(f"❌ Lỗi khi trích xuất series: {e}")
+        logger.error(f"❌ Lỗi khi trích xuất series: {e}")
     
-    print("⚠️ Không tìm thấy series cụ thể cho URL đặc biệt này")
+    logger.warning("⚠️ Không tìm thấy series cụ thể cho URL đặc biệt này")
     return None
 
 def sanitize_folder_name(name):
@@ -299,6 +309,8 @@ class BaaProductCrawler:
         self.max_workers = max_workers
         self.max_retries = max_retries
         os.makedirs(self.output_root, exist_ok=True)
+        # Profiler theo giai đoạn (tắt mặc định, bật bằng CRAWLER_PROFILE=1)
+        self.profiler = CrawlProfiler('baa')
 
     def crawl_products(self, input_urls):
         """
@@ -309,21 +321,28 @@ class BaaProductCrawler:
         - Luồng 3: Xử lý thông tin sản phẩm
         - Luồng 4: Tải ảnh sản phẩm
         """
+        with self.profiler.run():
+            all_products, result_dir = self._crawl_products(input_urls)
+        self.profiler.write_report(result_dir)
+        return all_products, result_dir
+
+    def _crawl_products(self, input_urls):
+        """Thân của crawl_products (được profiler đo khi bật)"""
         # Đo thời gian thực hiện
         start_time = time.time()
         
         # Thống kê hiệu suất
-        stats = {
-            "urls_processed": 0,
-            "products_found": 0,
-            "products_processed": 0,
-            "products_skipped": 0,  # Sản phẩm bỏ qua vì không có giá
-            "images_downloaded": 0,
-            "categories": 0,
-            "single_products": 0,
-            "failed_products": 0,
-            "failed_images": 0
-        }
+        stats = StatsCounters((
+            "urls_processed",
+            "products_found",
+            "products_processed",
+            "products_skipped",  # Sản phẩm bỏ qua vì không có giá
+            "images_downloaded",
+            "categories",
+            "single_products",
+            "failed_products",
+            "failed_images",
+        ))
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         result_dir = os.path.join(self.output_root, f"Baa_ngay{timestamp}")
@@ -335,7 +354,7 @@ class BaaProductCrawler:
         all_image_report_data = []
         
         # Thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 0, 
             'message': f'Bắt đầu xử lý {len(input_urls)} URL từ BAA.vn',
             'detail': 'Đang phân tích và phân loại các URL...'
@@ -344,6 +363,8 @@ class BaaProductCrawler:
         # Sử dụng Queue để truyền dữ liệu giữa các luồng xử lý
         category_queue = Queue()  # Hàng đợi cho các danh mục đã phân loại
         product_url_queue = Queue()  # Hàng đợi cho các URL sản phẩm từ danh mục
+        track_queue('baa', 'categories', category_queue)
+        track_queue('baa', 'product_urls', product_url_queue)
         
         # 1. Phân loại URL và tạo cấu trúc thư mục
         def classify_urls_worker():
@@ -353,28 +374,28 @@ class BaaProductCrawler:
             
             for i, url in enumerate(input_urls):
                 try:
-                    stats["urls_processed"] += 1
+                    stats.inc("urls_processed")
                     if is_category_url(url):
                         cat_name = get_category_vn_name(url)
                         if cat_name not in category_map:
                             category_map[cat_name] = []
-                            stats["categories"] += 1
+                            stats.inc("categories")
                         category_map[cat_name].append(url)
-                        socketio.emit('progress_update', {
+                        report_progress({
                             'percent': 2 * i // len(input_urls), 
                             'message': f'Đang phân tích URL {i+1}/{len(input_urls)}',
                             'detail': f'Đã xác định danh mục: {cat_name}'
                         })
                     elif is_product_url(url):
                         single_products.append(url)
-                        stats["single_products"] += 1
-                        socketio.emit('progress_update', {
+                        stats.inc("single_products")
+                        report_progress({
                             'percent': 2 * i // len(input_urls), 
                             'message': f'Đang phân tích URL {i+1}/{len(input_urls)}',
                             'detail': f'Đã xác định sản phẩm đơn lẻ'
                         })
                 except Exception as e:
-                    print(f"Lỗi khi phân tích URL {url}: {str(e)}")
+                    logger.error(f"Lỗi khi phân tích URL {url}: {str(e)}")
             
             # Đặt các danh mục vào hàng đợi
             for cat_name, cat_urls in category_map.items():
@@ -417,21 +438,22 @@ class BaaProductCrawler:
             cat_dir = os.path.join(result_dir, cat_name)
             anh_dir = os.path.join(cat_dir, "Anh")
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': step_progress_base, 
                 'message': f'Đang xử lý danh mục [{current_step}/{total_steps}]: {cat_name}',
                 'detail': f'Tạo thư mục và chuẩn bị cào dữ liệu ({len(cat_urls)} URL nguồn)'
-            })
+            }, stage=STAGE_LISTING, stage_percent=0)
             
             # Thu thập URL sản phẩm từ các danh mục, bao gồm xử lý phân trang
             # Sử dụng thread riêng để không chặn luồng chính
             product_urls_queue = Queue()  # Hàng đợi lưu URL sản phẩm của danh mục hiện tại
+            track_queue('baa', 'category_product_urls', product_urls_queue)
             
             def collect_product_urls_thread():
                 """Thread thu thập URL sản phẩm từ danh mục và đặt vào hàng đợi"""
                 product_urls = self._collect_product_urls_with_pagination(cat_urls)
                 product_urls = list(dict.fromkeys(product_urls))  # Loại bỏ trùng lặp
-                stats["products_found"] += len(product_urls)
+                stats.inc("products_found", len(product_urls))
                 
                 # Đặt mỗi URL vào hàng đợi để xử lý
                 for url in product_urls:
@@ -441,12 +463,12 @@ class BaaProductCrawler:
                 product_urls_queue.put(None)
                 
                 # Ghi log chi tiết
-                print(f"[{cat_name}] Đã thu thập {len(product_urls)} URL sản phẩm từ {len(cat_urls)} URL danh mục")
+                logger.info(f"[{cat_name}] Đã thu thập {len(product_urls)} URL sản phẩm từ {len(cat_urls)} URL danh mục")
                 return product_urls
             
             # Khởi chạy thread thu thập URL
             from threading import Thread
-            url_collector_thread = Thread(target=collect_product_urls_thread)
+            url_collector_thread = Thread(target=crawl_profiler.bind(bind_current(collect_product_urls_thread)))
             url_collector_thread.start()
             url_collector_thread.join()  # Đợi thread hoàn thành
             
@@ -461,11 +483,11 @@ class BaaProductCrawler:
                 product_urls_queue.put(url)  # Đặt lại URL để xử lý sản phẩm
             product_urls_queue.put(None)  # Đặt lại None vào cuối
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': step_progress_base + 2, 
                 'message': f'[{cat_name}] Đã thu thập {len(product_urls)} liên kết sản phẩm',
                 'detail': f'Chuẩn bị trích xuất thông tin và tải ảnh sản phẩm'
-            })
+            }, stage=STAGE_LISTING, stage_percent=100)
             
             # Lưu danh sách URL sản phẩm
             urls_file = os.path.join(cat_dir, f"{cat_name}_urls.txt")
@@ -479,6 +501,8 @@ class BaaProductCrawler:
             # Hàng đợi lưu thông tin sản phẩm đã xử lý và code-url để tải ảnh
             product_info_queue = Queue()
             image_task_queue = Queue()
+            track_queue('baa', 'product_info', product_info_queue)
+            track_queue('baa', 'image_tasks', image_task_queue)
             
             # Thread xử lý thông tin sản phẩm
             def process_product_info_thread():
@@ -511,7 +535,7 @@ class BaaProductCrawler:
                         if url is None:
                             break
                         
-                        future = executor.submit(extract_product_info, url, required_fields, url_index + 1)
+                        future = executor.submit(self._extract_product_info, url, required_fields, url_index + 1)
                         futures[future] = url
                         url_index += 1
                     
@@ -527,19 +551,20 @@ class BaaProductCrawler:
                                     # Chỉ thêm field Series nếu có giá trị (không phải None)
                                     if product_series:
                                         info['Series'] = product_series
-                                        print(f"[{cat_name}] Sản phẩm {info.get('Mã sản phẩm', 'N/A')} thuộc series: {product_series}")
+                                        item_logger.info("[%s] Sản phẩm %s thuộc series: %s", cat_name, info.get('Mã sản phẩm', 'N/A'), product_series)
                                     else:
                                         # Không thêm field Series cho các URL không hỗ trợ phân loại
-                                        print(f"[{cat_name}] Sản phẩm {info.get('Mã sản phẩm', 'N/A')} không được phân loại theo series")
+                                        item_logger.info("[%s] Sản phẩm %s không được phân loại theo series", cat_name, info.get('Mã sản phẩm', 'N/A'))
                                 except Exception as e:
-                                    print(f"[{cat_name}] Lỗi khi trích xuất series cho {url}: {str(e)}")
+                                    logger.error(f"[{cat_name}] Lỗi khi trích xuất series cho {url}: {str(e)}")
                                     # Không thêm field Series khi có lỗi
                                 
                                 # Kiểm tra xem sản phẩm có giá không để thống kê
                                 product_price = info.get('Giá', '').strip()
                                 
                                 # Chuẩn hóa thông số kỹ thuật
-                                info['Tổng quan'] = self._normalize_spec(info.get('Tổng quan', ''))
+                                with self.profiler.span(STAGE_SPECS, item=url):
+                                    info['Tổng quan'] = self._normalize_spec(info.get('Tổng quan', ''))
                                 products.append(info)
                                 
                                 # Nhóm sản phẩm theo series (chỉ khi có Series)
@@ -559,23 +584,23 @@ class BaaProductCrawler:
                                 if not product_price or product_price == '':
                                     # Thống kê sản phẩm không có giá nhưng vẫn xử lý
                                     batch_skipped += 1
-                                    stats["products_skipped"] += 1
-                                    print(f"[{cat_name}] Sản phẩm không có giá (vẫn lưu thông tin): {info.get('Tên sản phẩm', 'N/A')}")
+                                    stats.inc("products_skipped")
+                                    item_logger.info("[%s] Sản phẩm không có giá (vẫn lưu thông tin): %s", cat_name, info.get('Tên sản phẩm', 'N/A'))
                                 else:
                                     batch_success += 1
                                 
-                                stats["products_processed"] += 1
+                                stats.inc("products_processed")
                                 
                                 # Thêm vào hàng đợi thông tin sản phẩm
                                 product_info_queue.put(info)
                             else:
                                 batch_failure += 1
-                                stats["failed_products"] += 1
-                                print(f"[{cat_name}] Không thể trích xuất thông tin từ {url}")
+                                stats.inc("failed_products")
+                                item_logger.warning("[%s] Không thể trích xuất thông tin từ %s", cat_name, url)
                         except Exception as e:
                             batch_failure += 1
-                            stats["failed_products"] += 1
-                            print(f"[{cat_name}] Lỗi khi trích xuất: {str(e)}")
+                            stats.inc("failed_products")
+                            logger.error(f"[{cat_name}] Lỗi khi trích xuất: {str(e)}")
                         
                         # Cập nhật tiến độ
                         items_processed += 1
@@ -598,11 +623,11 @@ class BaaProductCrawler:
                                 else:
                                     remaining_info = f", còn lại: {remaining/60:.1f}m"
                             
-                            socketio.emit('progress_update', {
+                            report_progress({
                                 'percent': batch_progress, 
                                 'message': f'[{cat_name}] Đã xử lý {items_processed}/{len(product_urls)} sản phẩm ({batch_success} có giá, {batch_skipped} không có giá, {batch_failure} lỗi)',
                                 'detail': f'Tốc độ: {speed:.1f} sp/s{remaining_info}, đã phát hiện {len(series_products_map)} series'
-                            })
+                            }, stage=STAGE_DETAIL, stage_percent=items_processed * 100 // len(product_urls))
                 
                 # Đặt None vào cuối hàng đợi để báo hiệu đã hoàn thành
                 product_info_queue.put(None)
@@ -610,8 +635,8 @@ class BaaProductCrawler:
                 # Đặt code_url_map và series_products_map vào image_task_queue để tải ảnh
                 image_task_queue.put((code_url_map, series_products_map, anh_dir, cat_name, cat_idx, total_categories, step_progress_base + 40))
                 
-                print(f"[{cat_name}] Kết quả xử lý: {batch_success} sản phẩm có giá, {batch_skipped} sản phẩm không có giá, {batch_failure} lỗi")
-                print(f"[{cat_name}] Đã phát hiện {len(series_products_map)} series: {list(series_products_map.keys())}")
+                logger.info(f"[{cat_name}] Kết quả xử lý: {batch_success} sản phẩm có giá, {batch_skipped} sản phẩm không có giá, {batch_failure} lỗi")
+                logger.info(f"[{cat_name}] Đã phát hiện {len(series_products_map)} series: {list(series_products_map.keys())}")
                 
                 return products, code_url_map, series_products_map
             
@@ -648,22 +673,24 @@ class BaaProductCrawler:
                         series_excel_file = os.path.join(series_dir, f"{series_folder_name}_Du_lieu.xlsx")
                         if series_products:
                             df = pd.DataFrame(series_products)
-                            df.to_excel(series_excel_file, index=False)
-                            print(f"[{cat_name}] Đã lưu dữ liệu series '{series_name}': {len(series_products)} sản phẩm vào {series_excel_file}")
+                            with self.profiler.span(STAGE_EXCEL, item=series_excel_file):
+                                df.to_excel(series_excel_file, index=False)
+                            logger.info(f"[{cat_name}] Đã lưu dữ liệu series '{series_name}': {len(series_products)} sản phẩm vào {series_excel_file}")
                 
                 # Lưu file tổng hợp tất cả sản phẩm (giữ nguyên chức năng cũ)
                 if products:
                     df = pd.DataFrame(products)
-                    df.to_excel(data_excel, index=False)
-                    print(f"[{cat_name}] Đã lưu dữ liệu tổng hợp: {len(products)} sản phẩm")
+                    with self.profiler.span(STAGE_EXCEL, item=data_excel):
+                        df.to_excel(data_excel, index=False)
+                    logger.info(f"[{cat_name}] Đã lưu dữ liệu tổng hợp: {len(products)} sản phẩm")
                 
                 # Thêm các sản phẩm vào danh sách tổng hợp
                 all_products.extend(products)
                 
                 if series_products_map:
-                    print(f"[{cat_name}] Đã phân loại {len(products)} sản phẩm vào {len(series_products_map)} series")
+                    logger.info(f"[{cat_name}] Đã phân loại {len(products)} sản phẩm vào {len(series_products_map)} series")
                 else:
-                    print(f"[{cat_name}] Không có series nào được phát hiện, chỉ lưu dữ liệu tổng hợp")
+                    logger.info(f"[{cat_name}] Không có series nào được phát hiện, chỉ lưu dữ liệu tổng hợp")
                 return products, series_products_map
             
             # Thread tải ảnh sản phẩm
@@ -676,8 +703,8 @@ class BaaProductCrawler:
                 img_map, image_report_data = self._download_product_images(code_url_map, series_products_map, anh_dir, cat_name, cat_idx, total_categories, percent_base)
                 
                 # Cập nhật thống kê
-                stats["images_downloaded"] += len(img_map)
-                stats["failed_images"] += len(code_url_map) - len(img_map)
+                stats.inc("images_downloaded", len(img_map))
+                stats.inc("failed_images", len(code_url_map) - len(img_map))
                 
                 # Thu thập dữ liệu báo cáo ảnh để hợp nhất sau này
                 nonlocal all_image_report_data
@@ -686,9 +713,9 @@ class BaaProductCrawler:
                 return img_map
             
             # Khởi chạy các thread xử lý
-            product_processor_thread = Thread(target=process_product_info_thread)
-            product_saver_thread = Thread(target=save_product_info_thread)
-            image_downloader_thread = Thread(target=download_images_thread)
+            product_processor_thread = Thread(target=crawl_profiler.bind(bind_current(process_product_info_thread)))
+            product_saver_thread = Thread(target=crawl_profiler.bind(bind_current(save_product_info_thread)))
+            image_downloader_thread = Thread(target=crawl_profiler.bind(bind_current(download_images_thread)))
             
             # Bắt đầu thread xử lý sản phẩm
             product_processor_thread.start()
@@ -705,7 +732,7 @@ class BaaProductCrawler:
             image_downloader_thread.join()
             
             # Thông báo hoàn thành danh mục
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': step_progress_base + 65, 
                 'message': f'[{cat_name}] Đã hoàn thành xử lý danh mục',
                 'detail': f'Đã xử lý {len(product_urls)} sản phẩm'
@@ -749,17 +776,18 @@ class BaaProductCrawler:
         # Chuyển đổi set thành string cho việc lưu trữ
         series_summary_data = []
         if series_stats:  # Chỉ tạo khi có series
-            for series_name, stats in series_stats.items():
+            for series_name, stats_info in series_stats.items():
                 series_summary_data.append({
                     'Series': series_name,
-                    'Tổng số sản phẩm': stats['So_luong'],
-                    'Sản phẩm có giá': stats['Co_gia'],
-                    'Sản phẩm không có giá': stats['Khong_gia'],
-                    'Tỷ lệ có giá (%)': f"{(stats['Co_gia'] * 100 / stats['So_luong']):.1f}" if stats['So_luong'] > 0 else "0.0",
-                    'Các danh mục': ', '.join(stats['Danh_muc']) if stats['Danh_muc'] else 'N/A'
+                    'Tổng số sản phẩm': stats_info['So_luong'],
+                    'Sản phẩm có giá': stats_info['Co_gia'],
+                    'Sản phẩm không có giá': stats_info['Khong_gia'],
+                    'Tỷ lệ có giá (%)': f"{(stats_info['Co_gia'] * 100 / stats_info['So_luong']):.1f}" if stats_info['So_luong'] > 0 else "0.0",
+                    'Các danh mục': ', '.join(stats_info['Danh_muc']) if stats_info['Danh_muc'] else 'N/A'
                 })
         
         # Tạo một ExcelWriter để ghi nhiều sheet vào cùng một file Excel
+        excel_started = time.perf_counter()
         with pd.ExcelWriter(report_path, engine='openpyxl') as writer:
             # Sheet dữ liệu sản phẩm
             if all_products:
@@ -837,13 +865,14 @@ class BaaProductCrawler:
                 # Sắp xếp theo series và mã sản phẩm (xử lý trường hợp không có series)
                 image_df = image_df.sort_values(['Series', 'Mã sản phẩm'], ascending=[True, True])
                 image_df.to_excel(writer, sheet_name='Bao_cao_anh', index=False)
+        self.profiler.record(STAGE_EXCEL, time.perf_counter() - excel_started, report_path)
         
         # Nén thư mục kết quả thành file ZIP
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 95, 
             'message': f'Đang nén kết quả thành file ZIP...',
             'detail': f'Đã xử lý {len(all_products)} sản phẩm, {stats["images_downloaded"]} ảnh'
-        })
+        }, stage=STAGE_EXPORT, stage_percent=0)
         
         zip_path = result_dir + '.zip'
         zip_filename = os.path.basename(zip_path)
@@ -860,14 +889,14 @@ class BaaProductCrawler:
                 # Thêm file báo cáo duy nhất vào ZIP
                 zipf.write(report_path, os.path.basename(report_path))
         except Exception as e:
-            print(f"Lỗi khi nén thư mục: {str(e)}")
-            socketio.emit('progress_update', {
+            logger.error(f"Lỗi khi nén thư mục: {str(e)}")
+            report_progress({
                 'percent': 100, 
                 'message': f'Hoàn thành lấy dữ liệu {len(all_products)} sản phẩm (không nén được)',
                 'detail': f'Đã xảy ra lỗi khi nén: {str(e)}',
                 'completed': True,
                 'download_ready': False
-            })
+            }, stage=STAGE_EXPORT, stage_percent=100)
         else:
             # Tính toán tổng thời gian và hiệu suất
             total_time = time.time() - start_time
@@ -907,7 +936,7 @@ class BaaProductCrawler:
                     for series_name, stats_info in sorted(series_stats.items(), key=lambda x: x[1]['So_luong'], reverse=True)[:10]  # Top 10 series
                 ]
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 100, 
                 'message': completion_message,
                 'detail': detail_message,
@@ -915,40 +944,40 @@ class BaaProductCrawler:
                 'download_ready': True,
                 'download_info': download_info,
                 'series_stats': series_display
-            })
+            }, stage=STAGE_EXPORT, stage_percent=100)
         
         # Ghi log tổng kết
-        print(f"=== Thống kê cào dữ liệu BAA.vn ===")
-        print(f"Tổng URL xử lý: {stats['urls_processed']}")
-        print(f"Số danh mục: {stats['categories']}")
+        logger.info(f"=== Thống kê cào dữ liệu BAA.vn ===")
+        logger.info(f"Tổng URL xử lý: {stats['urls_processed']}")
+        logger.info(f"Số danh mục: {stats['categories']}")
         if series_stats:
-            print(f"Số series phát hiện: {len(series_stats)}")
+            logger.info(f"Số series phát hiện: {len(series_stats)}")
         else:
-            print(f"Không có series nào được phát hiện")
-        print(f"Số sản phẩm đơn lẻ: {stats['single_products']}")
-        print(f"Tổng sản phẩm tìm thấy: {stats['products_found']}")
-        print(f"Sản phẩm xử lý thành công: {stats['products_processed']}")
-        print(f"Sản phẩm không có giá: {stats['products_skipped']}")
-        print(f"Sản phẩm lỗi: {stats['failed_products']}")
-        print(f"Ảnh tải thành công: {stats['images_downloaded']}")
-        print(f"Ảnh tải thất bại: {stats['failed_images']}")
-        print(f"Thời gian xử lý: {total_time:.2f}s ({total_time/60:.2f} phút)")
-        print(f"Tốc độ trung bình: {products_per_second:.2f} sản phẩm/giây")
+            logger.info(f"Không có series nào được phát hiện")
+        logger.info(f"Số sản phẩm đơn lẻ: {stats['single_products']}")
+        logger.info(f"Tổng sản phẩm tìm thấy: {stats['products_found']}")
+        logger.info(f"Sản phẩm xử lý thành công: {stats['products_processed']}")
+        logger.info(f"Sản phẩm không có giá: {stats['products_skipped']}")
+        logger.info(f"Sản phẩm lỗi: {stats['failed_products']}")
+        logger.info(f"Ảnh tải thành công: {stats['images_downloaded']}")
+        logger.info(f"Ảnh tải thất bại: {stats['failed_images']}")
+        logger.info(f"Thời gian xử lý: {total_time:.2f}s ({total_time/60:.2f} phút)")
+        logger.info(f"Tốc độ trung bình: {products_per_second:.2f} sản phẩm/giây")
         
         # Log chi tiết về các series (chỉ khi có)
         if series_stats:
-            print(f"\n=== Chi tiết Series phát hiện ===")
+            logger.info(f"\n=== Chi tiết Series phát hiện ===")
             sorted_series = sorted(series_stats.items(), key=lambda x: x[1]['So_luong'], reverse=True)
             for series_name, stats_info in sorted_series:
                 success_rate = (stats_info['Co_gia'] * 100 / stats_info['So_luong']) if stats_info['So_luong'] > 0 else 0
-                print(f"- {series_name}: {stats_info['So_luong']} sản phẩm " +
+                logger.info(f"- {series_name}: {stats_info['So_luong']} sản phẩm " +
                       f"({stats_info['Co_gia']} có giá, {stats_info['Khong_gia']} không có giá, " +
                       f"tỷ lệ có giá: {success_rate:.1f}%)")
         else:
-            print(f"\n=== Không có series nào được phân loại ===")
-            print("Chỉ phân loại series cho URL đặc biệt: https://baa.vn/vn/Category/cong-tac-den-bao-coi-bao-qlight_F_782/")
+            logger.info(f"\n=== Không có series nào được phân loại ===")
+            logger.info("Chỉ phân loại series cho URL đặc biệt: https://baa.vn/vn/Category/cong-tac-den-bao-coi-bao-qlight_F_782/")
         
-        print(f"=======================================")
+        logger.info(f"=======================================")
         
         return all_products, result_dir
 
@@ -964,11 +993,11 @@ class BaaProductCrawler:
         total_pages_estimate = 0
         
         # Kiểm tra số trang cho từng danh mục
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 2,
             'message': f'Đang phát hiện số trang cho {len(category_urls)} danh mục',
             'detail': 'Phân tích cấu trúc phân trang...'
-        })
+        }, stage=STAGE_LISTING, stage_percent=0)
         
         # Lưu thông tin số trang cho mỗi danh mục
         category_pages = {}
@@ -981,15 +1010,15 @@ class BaaProductCrawler:
                 total_pages_estimate += max_pages
                 
                 # Cập nhật tiến độ
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': 2 + (idx * 3 // total_categories),
                     'message': f'Phát hiện phân trang ({idx+1}/{total_categories})',
                     'detail': f'Danh mục: {category_url} - {max_pages} trang'
                 })
                 
-                print(f"Danh mục {idx+1}/{total_categories}: {category_url} - Phát hiện {max_pages} trang")
+                logger.info(f"Danh mục {idx+1}/{total_categories}: {category_url} - Phát hiện {max_pages} trang")
             except Exception as e:
-                print(f"Lỗi khi phát hiện số trang cho {category_url}: {str(e)}")
+                logger.error(f"Lỗi khi phát hiện số trang cho {category_url}: {str(e)}")
                 category_pages[category_url] = 1
         
         if total_pages_estimate == 0:
@@ -1001,8 +1030,8 @@ class BaaProductCrawler:
         category_processed = 0
         
         # Hiển thị thông tin tổng quan
-        print(f"Tổng số danh mục: {total_categories}, ước tính {total_pages_estimate} trang")
-        socketio.emit('progress_update', {
+        logger.info(f"Tổng số danh mục: {total_categories}, ước tính {total_pages_estimate} trang")
+        report_progress({
             'percent': 5,
             'message': f'Chuẩn bị thu thập dữ liệu từ {total_pages_estimate} trang',
             'detail': f'Số danh mục: {total_categories}'
@@ -1016,7 +1045,7 @@ class BaaProductCrawler:
                 return url, product_urls, None
             except Exception as e:
                 error_msg = str(e)
-                print(f"Lỗi khi thu thập URL từ {url}: {error_msg}")
+                logger.error(f"Lỗi khi thu thập URL từ {url}: {error_msg}")
                 return url, [], error_msg
         
         # Tạo danh sách các task phân trang
@@ -1045,7 +1074,7 @@ class BaaProductCrawler:
             batch_start = batch_idx * batch_size
             batch_end = min(batch_start + batch_size, len(pagination_tasks))
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': batch_start_percent,
                 'message': f'Đang thu thập batch {batch_idx+1}/{len(batches)}',
                 'detail': f'Xử lý trang {batch_start+1}-{batch_end}/{len(pagination_tasks)}'
@@ -1056,7 +1085,7 @@ class BaaProductCrawler:
             batch_results = []
             
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = [executor.submit(process_page, url, is_category) for url, is_category in batch]
+                futures = [executor.submit(crawl_profiler.bind(bind_current(process_page)), url, is_category) for url, is_category in batch]
                 
                 # Thu thập kết quả khi hoàn thành
                 for future in as_completed(futures):
@@ -1086,13 +1115,13 @@ class BaaProductCrawler:
                                 remaining_info = f", còn lại: {est_remaining/60:.1f}m"
                         
                         # Cập nhật thông báo tiến độ
-                        socketio.emit('progress_update', {
+                        report_progress({
                             'percent': progress_percent,
                             'message': f'Đã xử lý {pages_processed}/{len(pagination_tasks)} trang',
                             'detail': f'Đã tìm thấy {products_found} URL sản phẩm{remaining_info}'
-                        })
+                        }, stage=STAGE_LISTING, stage_percent=pages_processed * 100 // len(pagination_tasks))
                     except Exception as e:
-                        print(f"Lỗi khi xử lý future: {str(e)}")
+                        logger.error(f"Lỗi khi xử lý future: {str(e)}")
             
             # Kiểm tra kết quả batch và thêm vào danh sách sản phẩm
             batch_products = 0
@@ -1104,7 +1133,7 @@ class BaaProductCrawler:
             # Log hiệu suất của batch
             batch_elapsed = time.time() - batch_start_time
             batch_speed = batch_size / batch_elapsed if batch_elapsed > 0 else 0
-            print(f"Batch {batch_idx+1}/{len(batches)} hoàn thành trong {batch_elapsed:.2f}s, " +
+            logger.info(f"Batch {batch_idx+1}/{len(batches)} hoàn thành trong {batch_elapsed:.2f}s, " +
                   f"tốc độ: {batch_speed:.2f} trang/s, tìm thấy {batch_products} sản phẩm")
         
         # Loại bỏ URL trùng lặp
@@ -1112,15 +1141,15 @@ class BaaProductCrawler:
         
         # Log thống kê
         total_time = time.time() - start_time
-        print(f"Đã thu thập xong {len(unique_product_urls)} URL sản phẩm (từ {len(all_product_urls)} URLs gốc)")
-        print(f"Thời gian xử lý: {total_time:.2f}s, tốc độ: {pages_processed/total_time:.2f} trang/s")
+        logger.info(f"Đã thu thập xong {len(unique_product_urls)} URL sản phẩm (từ {len(all_product_urls)} URLs gốc)")
+        logger.info(f"Thời gian xử lý: {total_time:.2f}s, tốc độ: {pages_processed/total_time:.2f} trang/s")
         
         # Thông báo hoàn thành
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 15,
             'message': f'Đã thu thập xong {len(unique_product_urls)} URL sản phẩm',
             'detail': f'Đã xử lý {pages_processed} trang từ {len(category_urls)} danh mục'
-        })
+        }, stage=STAGE_LISTING, stage_percent=100)
         
         return unique_product_urls
 
@@ -1146,9 +1175,9 @@ class BaaProductCrawler:
         
         # Log thông tin bắt đầu
         if series_img_dirs:
-            print(f"[{category_name}] Bắt đầu tải {len(code_url_map)} ảnh sản phẩm vào {len(series_img_dirs)} series")
+            logger.info(f"[{category_name}] Bắt đầu tải {len(code_url_map)} ảnh sản phẩm vào {len(series_img_dirs)} series")
         else:
-            print(f"[{category_name}] Bắt đầu tải {len(code_url_map)} ảnh sản phẩm vào thư mục chung (không có series)")
+            logger.info(f"[{category_name}] Bắt đầu tải {len(code_url_map)} ảnh sản phẩm vào thư mục chung (không có series)")
         
         # Thời gian bắt đầu
         start_time = time.time()
@@ -1301,7 +1330,7 @@ class BaaProductCrawler:
         # Xử lý đa luồng tải ảnh với theo dõi tiến độ
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # Tạo các future cho việc tải ảnh
-            img_futures = {executor.submit(download_img_worker, item): item[0] 
+            img_futures = {executor.submit(crawl_profiler.bind(bind_current(download_img_worker)), item): item[0] 
                           for item in code_url_map.items()}
             
             # Xử lý từng future khi hoàn thành
@@ -1323,10 +1352,10 @@ class BaaProductCrawler:
                             fail_count += 1
                             if series_name in series_stats:
                                 series_stats[series_name]['fail'] += 1
-                            print(f"[{category_name}] Không thể tải ảnh cho {code}: {status}")
+                            item_logger.warning("[%s] Không thể tải ảnh cho %s: %s", category_name, code, status)
                 except Exception as e:
                     fail_count += 1
-                    print(f"[{category_name}] Lỗi xử lý future: {str(e)}")
+                    logger.error(f"[{category_name}] Lỗi xử lý future: {str(e)}")
                 
                 # Cập nhật tiến độ
                 items_done = idx + 1
@@ -1340,7 +1369,7 @@ class BaaProductCrawler:
                 if items_done % batch_size == 0 or items_done == total_images:
                     batch_elapsed = time.time() - start_batch_time
                     batch_speed = batch_size / batch_elapsed if batch_elapsed > 0 else 0
-                    print(f"[{category_name}] Tiến độ tải ảnh: {items_done}/{total_images}, " +
+                    logger.info(f"[{category_name}] Tiến độ tải ảnh: {items_done}/{total_images}, " +
                           f"batch speed: {batch_speed:.2f} img/s, total speed: {current_speed:.2f} img/s")
                     start_batch_time = time.time()
                 
@@ -1356,54 +1385,50 @@ class BaaProductCrawler:
                 percent = percent_start + (items_done * percent_range // total_images)
                 
                 # Cập nhật tiến độ lên giao diện
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': percent, 
                     'message': f'[{category_name}] Đã tải ảnh {items_done}/{total_images} ' +
                               f'(thành công: {success_count}, thất bại: {fail_count})',
                     'detail': f'Tốc độ: {current_speed:.1f} ảnh/s{remaining_info}, {len(series_img_dirs)} series'
-                })
+                }, stage=STAGE_IMAGES, stage_percent=items_done * 100 // total_images)
         
         # Tạo báo cáo Excel cho việc tải ảnh (lưu vào danh sách dữ liệu, sẽ được hợp nhất vào báo cáo chính)
         if image_report_data:
             # Sắp xếp dữ liệu báo cáo theo series và mã sản phẩm để dễ tra cứu
             try:
                 sorted_data = sorted(image_report_data, key=lambda x: (x.get('Series', ''), x.get('Mã sản phẩm', '')))
-                print(f"[{category_name}] Đã thu thập {len(sorted_data)} bản ghi báo cáo tải ảnh")
+                logger.info(f"[{category_name}] Đã thu thập {len(sorted_data)} bản ghi báo cáo tải ảnh")
                 
                 # Log thống kê theo series
-                print(f"[{category_name}] Thống kê tải ảnh theo series:")
+                logger.info(f"[{category_name}] Thống kê tải ảnh theo series:")
                 for series_name, stats in series_stats.items():
                     total_series = stats['success'] + stats['fail']
                     if total_series > 0:
                         success_rate = (stats['success'] * 100) / total_series
-                        print(f"  - {series_name}: {stats['success']}/{total_series} thành công ({success_rate:.1f}%)")
+                        logger.info(f"  - {series_name}: {stats['success']}/{total_series} thành công ({success_rate:.1f}%)")
                 
                 return img_map, sorted_data
             except Exception as e:
-                print(f"[{category_name}] Lỗi khi sắp xếp báo cáo tải ảnh: {str(e)}")
+                logger.error(f"[{category_name}] Lỗi khi sắp xếp báo cáo tải ảnh: {str(e)}")
         
         # Báo cáo kết quả cuối cùng
         total_time = time.time() - start_time
         avg_time_per_image = total_time / total_images if total_images > 0 else 0
         images_per_second = total_images / total_time if total_time > 0 else 0
         
-        print(f"[{category_name}] Hoàn tất tải ảnh: {success_count}/{total_images} thành công, " +
+        logger.info(f"[{category_name}] Hoàn tất tải ảnh: {success_count}/{total_images} thành công, " +
               f"{fail_count} thất bại, tốc độ: {images_per_second:.2f} ảnh/s")
         
         return img_map, image_report_data
 
+    def _extract_product_info(self, url, required_fields, index):
+        """extract_product_info trong ngữ cảnh profiler của sản phẩm (span fetch/parse gán cho URL)"""
+        with self.profiler.item(url):
+            return extract_product_info(url, required_fields, index)
+
     def _normalize_spec(self, spec_html):
         """
         Chuyển đổi mã sản phẩm trong bảng thông số kỹ thuật thành chữ hoa.
         """
-        if not spec_html:
-            return spec_html
-        
-        # Tìm và chuyển đổi mã sản phẩm thành chữ hoa
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(spec_html, 'html.parser')
-        for td in soup.find_all('td'):
-            if td.text and any(keyword in td.text.lower() for keyword in ['mã', 'model', 'part no']):
-                td.string = td.text.upper()
-            
-        return str(soup) 
\ No newline at end of file
+        # Một lượt lxml trên đoạn HTML thay cho BeautifulSoup (html.parser)
+        return uppercase_code_cells(spec_html) 
\ No newline at end of file
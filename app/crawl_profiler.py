@@ -0,0 +1,371 @@
+import os
+import json
+import html
+import time
+import logging
+import functools
+import threading
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Bật profiler cho mọi lượt cào: CRAWLER_PROFILE=1
+PROFILE_ENV = 'CRAWLER_PROFILE'
+
+# Các giai đoạn được đo, theo thứ tự hiển thị trong báo cáo
+STAGE_CONNECT = 'connect'          # DNS + TCP + TLS khi mở kết nối mới
+STAGE_SERVER_WAIT = 'server_wait'  # Chờ server trả header
+STAGE_DOWNLOAD = 'download'        # Tải nội dung phản hồi
+STAGE_PARSE = 'parse'              # Dựng cây HTML
+STAGE_SPECS = 'specs'              # Làm sạch / dựng bảng thông số
+STAGE_TRANSLATE = 'translate'      # Dịch tên và thông số
+STAGE_EXCEL = 'excel'              # Ghi file Excel
+STAGES = (
+    STAGE_CONNECT, STAGE_SERVER_WAIT, STAGE_DOWNLOAD, STAGE_PARSE, STAGE_SPECS, STAGE_TRANSLATE,
+    'image_fetch', 'image_decode', 'image_resize', 'image_encode', 'image_store',
+    STAGE_EXCEL,
+)
+
+# Số mục chậm nhất đưa vào báo cáo
+SLOWEST_ITEMS = 25
+
+_local = threading.local()
+
+
+def profiling_enabled():
+    """Profiler có được bật qua biến môi trường CRAWLER_PROFILE không"""
+    return os.environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def current():
+    """
+    Returns:
+        tuple | None: (profiler, mục, có đo mạng không) đang gắn với luồng hiện tại
+    """
+    return getattr(_local, 'context', None)
+
+
+@contextmanager
+def attach(profiler, item=None, network=True):
+    """
+    Gắn profiler (và mục đang xử lý) vào luồng hiện tại trong khối with, để các tầng
+    không giữ tham chiếu tới crawler (session HTTP, pipeline ảnh) ghi được span.
+
+    Args:
+        profiler: CrawlProfiler (None để tách khỏi profiler)
+        item: Mục đang xử lý (URL sản phẩm, tên ảnh...)
+        network: False để bỏ qua span HTTP (khi tầng gọi đã tự đo phần tải)
+    """
+    previous = getattr(_local, 'context', None)
+    _local.context = (profiler, item, network) if profiler is not None and profiler.enabled else None
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+def bind(func):
+    """
+    Bọc hàm sẽ chạy ở luồng khác (Thread, executor) để nó dùng profiler (và mục)
+    của luồng đang gọi bind
+
+    Returns:
+        callable: Hàm đã bọc (hoặc chính func nếu không có profiler)
+    """
+    context = current()
+    if context is None:
+        return func
+    profiler, item, network = context
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with attach(profiler, item, network):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def record(stage, seconds, network=False):
+    """
+    Ghi một span vào profiler của luồng hiện tại (không làm gì nếu không có)
+
+    Args:
+        stage: Tên giai đoạn
+        seconds: Thời gian (giây)
+        network: Span thuộc tầng HTTP (bị bỏ qua khi attach(network=False))
+    """
+    context = getattr(_local, 'context', None)
+    if context is None:
+        return
+    profiler, item, allow_network = context
+    if network and not allow_network:
+        return
+    profiler.record(stage, seconds, item)
+
+
+@contextmanager
+def span(stage):
+    """Đo khối with như một giai đoạn của profiler gắn với luồng hiện tại (nếu có)"""
+    if getattr(_local, 'context', None) is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class CrawlProfiler:
+    """
+    Profiler theo giai đoạn cho một lượt cào (tùy chọn, mặc định tắt).
+
+    Ghi span (mục, giai đoạn, thời gian) từ mọi luồng; cuối lượt xuất báo cáo JSON + HTML
+    gồm tổng thời gian theo giai đoạn, percentile và các mục chậm nhất.
+    Khi tắt, mọi lệnh đo là no-op.
+    """
+
+    def __init__(self, name, enabled=None):
+        """
+        Args:
+            name: Tên crawler (dùng trong báo cáo)
+            enabled: Bật/tắt; None để theo biến môi trường CRAWLER_PROFILE
+        """
+        self.name = name
+        self.enabled = profiling_enabled() if enabled is None else bool(enabled)
+        self._lock = threading.Lock()
+        self._spans = []  # [(mục, giai đoạn, giây)]
+        self._started_at = None
+        self._wall_seconds = 0.0
+
+    @contextmanager
+    def run(self):
+        """Đo cả lượt chạy (xóa dữ liệu lượt trước); luồng gọi được gắn profiler"""
+        if not self.enabled:
+            yield self
+            return
+        with self._lock:
+            self._spans = []
+        self._started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            with attach(self):
+                yield self
+        finally:
+            self._wall_seconds = time.perf_counter() - started
+
+    def item(self, key):
+        """Khối with xử lý một mục (sản phẩm): span bên trong được gán cho mục này"""
+        if not self.enabled:
+            return nullcontext()
+        return attach(self, key)
+
+    @contextmanager
+    def span(self, stage, item=None):
+        """
+        Đo thời gian khối with như một giai đoạn
+
+        Args:
+            stage: Tên giai đoạn (STAGE_PARSE, STAGE_EXCEL...)
+            item: Mục; mặc định là mục đang gắn với luồng
+        """
+        if not self.enabled:
+            yield
+            return
+        if item is None:
+            context = current()
+            if context is not None and context[0] is self:
+                item = context[1]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, item)
+
+    def record(self, stage, seconds, item=None):
+        """Ghi một span đã đo sẵn"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._spans.append((item, stage, seconds))
+
+    # ======= BÁO CÁO =======
+
+    def report(self):
+        """
+        Returns:
+            dict: name, started_at, wall_seconds, stages (tổng, số lần, trung bình, p50/p90/p99, max
+                theo giai đoạn), items và slowest_items (mục chậm nhất cùng thời gian từng giai đoạn)
+        """
+        with self._lock:
+            spans = list(self._spans)
+
+        by_stage = {}
+        by_item = {}
+        for item, stage, seconds in spans:
+            by_stage.setdefault(stage, []).append(seconds)
+            if item is not None:
+                stages = by_item.setdefault(item, {})
+                stages[stage] = stages.get(stage, 0.0) + seconds
+
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        stages = []
+        for stage in sorted(by_stage, key=lambda s: (order.get(s, len(order)), s)):
+            values = sorted(by_stage[stage])
+            stages.append({
+                'stage': stage,
+                'total_seconds': sum(values),
+                'count': len(values),
+                'avg_seconds': sum(values) / len(values),
+                'p50_seconds': _percentile(values, 50),
+                'p90_seconds': _percentile(values, 90),
+                'p99_seconds': _percentile(values, 99),
+                'max_seconds': values[-1],
+            })
+
+        items = sorted(
+            ({'item': str(item), 'total_seconds': sum(item_stages.values()), 'stages': item_stages}
+             for item, item_stages in by_item.items()),
+            key=lambda entry: entry['total_seconds'], reverse=True)
+        item_totals = sorted(entry['total_seconds'] for entry in items)
+
+        return {
+            'name': self.name,
+            'started_at': self._started_at.isoformat(timespec='seconds') if self._started_at else None,
+            'wall_seconds': self._wall_seconds,
+            'span_count': len(spans),
+            'stages': stages,
+            'items': {
+                'count': len(items),
+                'p50_seconds': _percentile(item_totals, 50),
+                'p90_seconds': _percentile(item_totals, 90),
+                'p99_seconds': _percentile(item_totals, 99),
+            },
+            'slowest_items': items[:SLOWEST_ITEMS],
+        }
+
+    def write_report(self, result_dir):
+        """
+        Ghi báo cáo cạnh thư mục kết quả: <thư mục>_profile.json và <thư mục>_profile.html
+
+        Args:
+            result_dir: Thư mục kết quả của lượt cào
+
+        Returns:
+            tuple | None: (đường dẫn JSON, đường dẫn HTML); None nếu profiler tắt hoặc lỗi
+        """
+        if not self.enabled or not result_dir:
+            return None
+        base = os.path.normpath(result_dir) + '_profile'
+        try:
+            report = self.report()
+            with open(base + '.json', 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            with open(base + '.html', 'w', encoding='utf-8') as f:
+                f.write(render_html(report))
+        except Exception as e:
+            logger.error(f"❌ Không ghi được báo cáo profiler: {e}")
+            return None
+        logger.info(f"⏱️ Đã ghi báo cáo profiler: {base}.html")
+        return base + '.json', base + '.html'
+
+
+# ======= HTML =======
+
+# Màu cố định cho từng giai đoạn trong biểu đồ
+_STAGE_COLORS = {
+    STAGE_CONNECT: '#8e44ad', STAGE_SERVER_WAIT: '#c0392b', STAGE_DOWNLOAD: '#e67e22',
+    STAGE_PARSE: '#2980b9', STAGE_SPECS: '#16a085', STAGE_TRANSLATE: '#1abc9c',
+    'image_fetch': '#d35400', 'image_decode': '#27ae60', 'image_resize': '#2ecc71',
+    'image_encode': '#f1c40f', 'image_store': '#7f8c8d', STAGE_EXCEL: '#34495e',
+}
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="vi">
+<head>
+<meta charset="utf-8">
+<title>Profiler {name}</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; color: #222; }}
+table {{ border-collapse: collapse; margin-bottom: 24px; }}
+th, td {{ border: 1px solid #ddd; padding: 4px 8px; text-align: right; }}
+th:first-child, td:first-child {{ text-align: left; }}
+.bar {{ display: flex; height: 18px; min-width: 1px; }}
+.bar span {{ display: block; height: 100%; }}
+.row {{ display: flex; align-items: center; gap: 8px; margin: 2px 0; }}
+.label {{ width: 420px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; font-size: 12px; }}
+.legend span {{ display: inline-block; margin-right: 12px; font-size: 12px; }}
+.legend i {{ display: inline-block; width: 10px; height: 10px; margin-right: 4px; }}
+</style>
+</head>
+<body>
+<h2>Profiler {name}</h2>
+<p>Bắt đầu: {started_at} &middot; Thời gian chạy: {wall:.2f}s &middot; {items} mục, {spans} span</p>
+<div class="legend">{legend}</div>
+<h3>Tổng theo giai đoạn</h3>
+<div class="row"><div class="bar" style="width: 100%">{stage_bar}</div></div>
+<table>
+<tr><th>Giai đoạn</th><th>Tổng (s)</th><th>Số lần</th><th>TB (ms)</th><th>p50 (ms)</th><th>p90 (ms)</th><th>p99 (ms)</th><th>Max (ms)</th></tr>
+{stage_rows}
+</table>
+<h3>Mục chậm nhất</h3>
+{item_rows}
+</body>
+</html>
+"""
+
+
+def _segments(stages, scale_seconds):
+    parts = []
+    for stage in sorted(stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+        seconds = stages[stage]
+        width = 100 * seconds / scale_seconds if scale_seconds else 0
+        color = _STAGE_COLORS.get(stage, '#95a5a6')
+        parts.append(f'<span style="width: {width:.3f}%; background: {color}" '
+                     f'title="{html.escape(stage)}: {seconds * 1000:.0f} ms"></span>')
+    return ''.join(parts)
+
+
+def render_html(report):
+    """Báo cáo HTML: biểu đồ thanh xếp chồng theo giai đoạn, bảng percentile và các mục chậm nhất"""
+    stage_totals = {entry['stage']: entry['total_seconds'] for entry in report['stages']}
+    stage_rows = '\n'.join(
+        f"<tr><td>{html.escape(entry['stage'])}</td><td>{entry['total_seconds']:.2f}</td>"
+        f"<td>{entry['count']}</td><td>{entry['avg_seconds'] * 1000:.1f}</td>"
+        f"<td>{entry['p50_seconds'] * 1000:.1f}</td><td>{entry['p90_seconds'] * 1000:.1f}</td>"
+        f"<td>{entry['p99_seconds'] * 1000:.1f}</td><td>{entry['max_seconds'] * 1000:.1f}</td></tr>"
+        for entry in report['stages'])
+
+    slowest = report['slowest_items']
+    scale = slowest[0]['total_seconds'] if slowest else 0
+    item_rows = '\n'.join(
+        f'<div class="row"><div class="label" title="{html.escape(entry["item"])}">'
+        f'{entry["total_seconds"]:.2f}s &middot; {html.escape(entry["item"])}</div>'
+        f'<div class="bar" style="width: {60 * entry["total_seconds"] / scale if scale else 0:.2f}%">'
+        f'{_segments(entry["stages"], entry["total_seconds"])}</div></div>'
+        for entry in slowest)
+
+    legend = ''.join(
+        f'<span><i style="background: {_STAGE_COLORS.get(stage, "#95a5a6")}"></i>{html.escape(stage)}</span>'
+        for stage in stage_totals)
+
+    return _HTML_TEMPLATE.format(
+        name=html.escape(report['name']),
+        started_at=html.escape(report['started_at'] or ''),
+        wall=report['wall_seconds'],
+        items=report['items']['count'],
+        spans=report['span_count'],
+        legend=legend,
+        stage_bar=_segments(stage_totals, sum(stage_totals.values())),
+        stage_rows=stage_rows,
+        item_rows=item_rows or '<p>Không có dữ liệu theo mục.</p>',
+    )
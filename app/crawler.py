@@ -8,10 +8,9 @@ import random
 import os
 from urllib.parse import urljoin, urlparse, quote
 import logging
-from app import socketio
+from app.progress_reporter import report_progress, bind_current
 from datetime import datetime
 from PIL import Image
-import io
 import traceback
 from werkzeug.utils import secure_filename
 import openpyxl
@@ -22,7 +21,19 @@ from io import BytesIO
 import json
 from openpyxl import Workbook
 import urllib3
+from requests.adapters import HTTPAdapter
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.url_classifier import url_classifier
+from app.log_config import get_item_logger
+from app.document_downloader import get_document_downloader
+from app.image_pipeline import get_image_pipeline, ImageJob, RESIZE_NONE, RESIZE_FIT
+from app.metrics import fetch_histogram, parse_histogram
+from app.http_metrics import MeteredSession
+from app import crawl_profiler
+
+logger = logging.getLogger(__name__)
+# Thông điệp theo từng link/ảnh/sản phẩm: có thể lấy mẫu hoặc tắt riêng qua CRAWLER_LOG_LEVELS
+item_logger = get_item_logger(__name__)
 
 # Headers giả lập trình duyệt để tránh bị chặn
 HEADERS = {
@@ -33,6 +44,17 @@ HEADERS = {
     'Referer': 'https://google.com'
 }
 
+# Session dùng chung (keep-alive) cho các trang BAA, có số liệu HTTP theo host
+http_session = MeteredSession('baa')
+http_session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+http_session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
+# Headers bổ sung khi tải ảnh Autonics (Referer để tránh bị chặn)
+AUTONICS_IMAGE_HEADERS = {
+    'Referer': 'https://www.autonics.com/',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
+}
+
 def get_html_content(url, headers=None):
     """
     Tải nội dung HTML từ URL
@@ -51,140 +73,22 @@ def get_html_content(url, headers=None):
         # Tắt cảnh báo SSL không an toàn
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         
-        response = requests.get(url, headers=headers, timeout=30, verify=False)
+        response = http_session.get(url, headers=headers, timeout=30, verify=False)
         response.raise_for_status()
         return response.text
     except Exception as e:
-        print(f"Lỗi khi tải nội dung từ {url}: {e}")
+        logger.error(f"Lỗi khi tải nội dung từ {url}: {e}")
         return None
 
 def is_product_url(url):
-    """Kiểm tra xem URL có phải là URL sản phẩm hợp lệ không"""
-    # Phân tích URL
-    parsed_url = urlparse(url)
-    path = parsed_url.path.lower()
-    
-    # Loại bỏ các URL không phải BAA.vn
-    if 'baa.vn' not in parsed_url.netloc.lower():
-        return False
-    
-    # Loại bỏ các URL tin tức, thông tin, v.v. trước tiên
-    excluded_paths = ['/tin-tuc/', '/news/', '/thong-tin/', '/information/', '/category/', '/danh-muc/', '/page/', '/search/', '/tim-kiem/', '/about/', '/contact/', '/blog/', '/home/']
-    for excluded in excluded_paths:
-        if excluded in path:
-            return False
-        
-    # Pattern 1: URL có chứa /san-pham/
-    if '/san-pham/' in path:
-        # Mẫu URL: baa.vn/vn/san-pham/bo-dieu-khien-nhiet-do-tuong-tu-autonics-tom-f3rj4c_61459
-        if '/san-pham/' in path:
-            parts = path.split('/san-pham/')
-            if len(parts) > 1 and parts[1].strip():
-                # Kiểm tra phần sau /san-pham/ có chứa nội dung hợp lệ
-                product_part = parts[1].strip('/')
-                if product_part and len(product_part) > 3:
-                    print(f"  ✓ URL sản phẩm hợp lệ (pattern /san-pham/): {url}")
-                    return True
-    
-    # Pattern 2: URL có chứa /product/
-    if '/product/' in path:
-        parts = path.split('/product/')
-        if len(parts) > 1 and parts[1].strip():
-            product_part = parts[1].strip('/')
-            if product_part and len(product_part) > 3:
-                print(f"  ✓ URL sản phẩm hợp lệ (pattern /product/): {url}")
-                return True
-    
-    # Pattern 3: URL dạng /vn/ten-san-pham_id (pattern đặc biệt của BAA.vn)
-    if re.search(r'/vn/[^/]+_\d+/?$', url, re.IGNORECASE):
-        # Kiểm tra thêm để đảm bảo không phải danh mục
-        if not any(category_keyword in path for category_keyword in ['/category/', '/danh-muc/', '/list/']):
-            print(f"  ✓ URL sản phẩm hợp lệ (pattern /vn/name_id): {url}")
-            return True
-    
-    # Pattern 4: URL có chứa mã sản phẩm dạng chữ-số_id ở cuối
-    if re.search(r'/[^/]+-[^/]+_\d+/?$', url, re.IGNORECASE):
-        print(f"  ✓ URL sản phẩm hợp lệ (pattern name-name_id): {url}")
-        return True
-    
-    # Pattern 5: URL có chứa từ khóa sản phẩm và có ID số ở cuối
-    product_keywords = ['san-pham', 'product', 'item', 'detail']
-    for keyword in product_keywords:
-        if keyword in path and re.search(r'_\d+/?$', url):
-            print(f"  ✓ URL sản phẩm hợp lệ (pattern keyword + _id): {url}")
-            return True
-    
-    # Pattern 6: URL BAA.vn với cấu trúc đặc biệt
-    # Ví dụ: https://baa.vn/vn/den-thap-led-sang-tinh-chop-nhay-d45mm-qlight-st45l-and-st45ml-series_4779/
-    if 'baa.vn' in parsed_url.netloc.lower():
-        # Kiểm tra URL có dạng /vn/ten-dai-co-dash_id/
-        if re.search(r'/vn/[a-zA-Z0-9\-]{10,}_\d+/?$', url, re.IGNORECASE):
-            print(f"  ✓ URL sản phẩm BAA.vn hợp lệ (long name pattern): {url}")
-            return True
-        
-        # Kiểm tra URL có chứa series hoặc model trong tên
-        if re.search(r'/vn/[^/]*(series|model|type)[^/]*_\d+/?$', url, re.IGNORECASE):
-            print(f"  ✓ URL sản phẩm BAA.vn hợp lệ (series/model pattern): {url}")
-            return True
-    
-    # Debug: Log URL không được nhận diện
-    print(f"  ✗ URL không được nhận diện là sản phẩm: {url}")
-    return False
+    """Kiểm tra xem URL có phải là URL sản phẩm hợp lệ không (dùng bộ phân loại có cache)"""
+    return url_classifier.is_product_url(url)
 
 def is_category_url(url):
     """
-    Kiểm tra xem URL có phải là URL danh mục hay không
+    Kiểm tra xem URL có phải là URL danh mục hay không (dùng bộ phân loại có cache)
     """
-    # Phân tích URL
-    parsed_url = urlparse(url)
-    path = parsed_url.path.lower()
-    
-    # Loại bỏ các URL không phải BAA.vn
-    if 'baa.vn' not in parsed_url.netloc.lower():
-        return False
-    
-    # Nhận diện các URL dạng /vn/ten-danh-muc_xxxx/ (trường hợp đặc biệt)
-    if re.search(r'/vn/[^/]+_\d+/?$', url, re.IGNORECASE):
-        # Kiểm tra thêm để đảm bảo không phải sản phẩm
-        if not any(product_keyword in path for product_keyword in ['/san-pham/', '/product/']):
-            print(f"  ✓ URL danh mục hợp lệ (pattern /vn/name_id): {url}")
-        return True
-
-    # Xử lý riêng cho URL đèn tháp LED
-    led_tower_url = "den-thap-led-sang-tinh-chop-nhay-d45mm-qlight-st45l-and-st45ml-series_4779"
-    if led_tower_url in url:
-        print(f"  ✓ Đã phát hiện URL đèn tháp LED: {url}")
-        return True
-    
-    # Các mẫu regex để phát hiện URL danh mục
-    baa_category_patterns = [
-        r'/category/',               # URL có /category/
-        r'/danh-muc/',              # URL có /danh-muc/
-        r'/Category/',              # URL có /Category/ (viết hoa)
-        r'baa\.vn.*\/vn\/[^/]+\/.*-page-\d+',  # URL có phân trang
-        r'haiphongtech.+\/danh-muc', # URL haiphongtech với danh-muc
-        r'/vn/.*_\d+/?$'            # Pattern chung cho danh mục BAA.vn
-    ]
-    
-    for pattern in baa_category_patterns:
-        if re.search(pattern, url, re.IGNORECASE):
-            # Kiểm tra thêm nếu là url từ BAA.vn
-            if 'baa.vn' in url:
-                # Đảm bảo không phải URL sản phẩm
-                if not any(product_keyword in path for product_keyword in ['/san-pham/', '/product/']):
-                    print(f"  ✓ URL danh mục hợp lệ (pattern match): {url}")
-                    return True
-            else:
-                print(f"  ✓ URL danh mục hợp lệ (other site): {url}")
-                return True
-    
-    # Kiểm tra thêm các URL có thể là danh mục dựa trên query parameters
-    if 'page=' in url or '/page/' in url:
-        if 'baa.vn' in url and not any(product_keyword in path for product_keyword in ['/san-pham/', '/product/']):
-            print(f"  ✓ URL danh mục hợp lệ (có phân trang): {url}")
-            return True
-    
-    return False
+    return url_classifier.is_category_url(url)
 
 def extract_category_links(category_urls):
     """
@@ -202,7 +106,7 @@ def extract_category_links(category_urls):
         try:
             # Kiểm tra đã xử lý URL này chưa
             if url in processed_urls:
-                print(f"Bỏ qua URL đã xử lý: {url}")
+                logger.info(f"Bỏ qua URL đã xử lý: {url}")
                 return []
                 
             # Đánh dấu đã xử lý
@@ -213,23 +117,23 @@ def extract_category_links(category_urls):
             led_tower_url = "den-thap-led-sang-tinh-chop-nhay-d45mm-qlight-st45l-and-st45ml-series_4779"
             if led_tower_url in url:
                 is_led_page = True
-                print(f"Xử lý URL đèn tháp LED đặc biệt: {url}")
+                logger.info(f"Xử lý URL đèn tháp LED đặc biệt: {url}")
                 
                 # Lấy HTML của trang
                 html = get_html_content(url)
                 if not html:
-                    print(f"Không thể lấy nội dung từ {url}")
+                    logger.warning(f"Không thể lấy nội dung từ {url}")
                     return []
                 
                 # Phân tích HTML
                 soup = BeautifulSoup(html, 'html.parser')
                 
-                print(f"Đang xử lý trang đèn tháp LED: {url}")
+                logger.info(f"Đang xử lý trang đèn tháp LED: {url}")
                 
                 # Tìm tất cả các card sản phẩm
                 product_cards = soup.select('a.card.product__card')
                 if product_cards:
-                    print(f"Tìm thấy {len(product_cards)} thẻ a.card.product__card")
+                    logger.info(f"Tìm thấy {len(product_cards)} thẻ a.card.product__card")
                     
                     # Lấy href từ các thẻ a
                     for card in product_cards:
@@ -245,14 +149,14 @@ def extract_category_links(category_urls):
                             # Thêm vào danh sách nếu chưa có
                             if full_url not in local_product_urls:
                                 local_product_urls.append(full_url)
-                                print(f"Đã thêm URL sản phẩm: {full_url}")
+                                item_logger.info("Đã thêm URL sản phẩm: %s", full_url)
                 else:
-                    print("Không tìm thấy thẻ a.card.product__card, thử các selector khác")
+                    logger.warning("Không tìm thấy thẻ a.card.product__card, thử các selector khác")
                     
                     # Tìm các liên kết sản phẩm khác nếu không tìm thấy a.card.product__card
                     product_links = soup.select('a.product-item-link, a.product__card, a.product_item, a.product-item')
                     if product_links:
-                        print(f"Tìm thấy {len(product_links)} liên kết sản phẩm thay thế")
+                        logger.info(f"Tìm thấy {len(product_links)} liên kết sản phẩm thay thế")
                         
                         for link in product_links:
                             href = link.get('href')
@@ -270,21 +174,21 @@ def extract_category_links(category_urls):
                                 # Thêm vào danh sách nếu chưa có
                                 if full_url not in local_product_urls and '/san-pham/' in full_url:
                                     local_product_urls.append(full_url)
-                                    print(f"Đã thêm URL sản phẩm thay thế: {full_url}")
+                                    item_logger.info("Đã thêm URL sản phẩm thay thế: %s", full_url)
                 
                 # Kiểm tra tìm thấy sản phẩm hoặc thông báo lỗi
                 if len(local_product_urls) == 0:
-                    print("CẢNH BÁO: Không tìm thấy sản phẩm nào trên trang đèn tháp LED!")
+                    logger.warning("CẢNH BÁO: Không tìm thấy sản phẩm nào trên trang đèn tháp LED!")
                     
                     # Các thẻ trực tiếp chứa sản phẩm (debug)
                     debug_products = soup.select('.product__card')
-                    print(f"DEBUG: Tìm thấy {len(debug_products)} thẻ .product__card")
+                    logger.debug(f"DEBUG: Tìm thấy {len(debug_products)} thẻ .product__card")
                     
                     for dp in debug_products:
                         if dp.name == 'a' and dp.has_attr('href'):
-                            print(f"DEBUG: Liên kết: {dp.get('href')}")
+                            logger.debug(f"DEBUG: Liên kết: {dp.get('href')}")
                 
-                print(f"Đã tìm thấy {len(local_product_urls)} URL sản phẩm từ trang đèn tháp LED.")
+                logger.info(f"Đã tìm thấy {len(local_product_urls)} URL sản phẩm từ trang đèn tháp LED.")
                 
                 # Tìm liên kết phân trang để xử lý các trang tiếp theo
                 pagination_links = soup.select('ul.pagination li a')
@@ -318,7 +222,7 @@ def extract_category_links(category_urls):
                     
                     # Thêm vào danh sách URL cần xử lý nếu chưa xử lý
                     if page_url not in processed_urls:
-                        print(f"Thêm trang phân trang: {page_url}")
+                        item_logger.info("Thêm trang phân trang: %s", page_url)
                         new_category_urls.append(page_url)
                 
                 return local_product_urls, new_category_urls
@@ -328,8 +232,8 @@ def extract_category_links(category_urls):
                 return product_urls, []
         
         except Exception as e:
-            print(f"Lỗi khi xử lý URL danh mục {url}: {str(e)}")
-            print(traceback.format_exc())
+            logger.error(f"Lỗi khi xử lý URL danh mục {url}: {str(e)}")
+            logger.error(traceback.format_exc())
             return [], []
     
     # Sử dụng ThreadPoolExecutor để xử lý đa luồng
@@ -363,9 +267,9 @@ def extract_category_links(category_urls):
                             if new_url not in processed_urls and new_url not in urls_to_process:
                                 urls_to_process.append(new_url)
                 except Exception as e:
-                    print(f"Lỗi khi xử lý future cho URL {url}: {str(e)}")
+                    logger.error(f"Lỗi khi xử lý future cho URL {url}: {str(e)}")
     
-    print(f"Tổng cộng tìm thấy {len(all_product_urls)} liên kết sản phẩm độc nhất")
+    logger.info(f"Tổng cộng tìm thấy {len(all_product_urls)} liên kết sản phẩm độc nhất")
     return all_product_urls
 
 def extract_product_info(url, required_fields=None, index=1):
@@ -374,15 +278,17 @@ def extract_product_info(url, required_fields=None, index=1):
     """
     if not required_fields:
         required_fields = ['STT', 'Mã sản phẩm', 'Tên sản phẩm', 'Giá', 'Tổng quan', 'Ảnh sản phẩm', 'URL']
-    print(f"[DEBUG] Đang trích xuất thông tin từ {url}")
+    logger.debug(f"[DEBUG] Đang trích xuất thông tin từ {url}")
     max_retries = 3
     current_retry = 0
     while current_retry < max_retries:
         try:
-            response = requests.get(url, headers=HEADERS, timeout=15)
+            with fetch_histogram('baa').time():
+                response = http_session.get(url, headers=HEADERS, timeout=15)
             response.raise_for_status()
             html_content = response.text
-            soup = BeautifulSoup(html_content, 'html.parser')
+            with parse_histogram('baa').time(), crawl_profiler.span(crawl_profiler.STAGE_PARSE):
+                soup = BeautifulSoup(html_content, 'html.parser')
             product_info = {
                 'STT': index,
                 'URL': url
@@ -420,7 +326,7 @@ def extract_product_info(url, required_fields=None, index=1):
             return filtered_info
         except Exception as e:
             current_retry += 1
-            print(f"[DEBUG] Lỗi khi xử lý {url} (lần {current_retry}): {str(e)}")
+            logger.debug(f"[DEBUG] Lỗi khi xử lý {url} (lần {current_retry}): {str(e)}")
             if current_retry < max_retries:
                 time.sleep(2)
             else:
@@ -666,7 +572,7 @@ def extract_full_value(value_cell):
             if full_value:
                 return full_value
         except Exception as e:
-            print(f"Lỗi khi phân tích HTML: {str(e)}")
+            logger.error(f"Lỗi khi phân tích HTML: {str(e)}")
     
     # Phương pháp 3: Tìm tất cả các span
     all_spans = []
@@ -751,11 +657,23 @@ def extract_full_value(value_cell):
     
     return ", ".join(unique_parts)
 
+def _absolute_listing_url(page_url, href):
+    """
+    Tạo URL đầy đủ từ href trên trang danh sách (giữ nguyên cách ghép URL cũ)
+    """
+    if href.startswith('http'):
+        return href
+    parsed_url = urlparse(page_url)
+    if href.startswith('/'):
+        return f"{parsed_url.scheme}://{parsed_url.netloc}{href}"
+    return f"{page_url.rstrip('/')}/{href}"
+
 def extract_product_urls(url):
     """
     Trích xuất tất cả URL sản phẩm từ một URL danh mục (với đa luồng)
     """
     product_urls = []
+    seen_product_urls = set()
     processed_pages = set()
     pages_to_process = [url]
     
@@ -768,16 +686,16 @@ def extract_product_urls(url):
         next_pages = []
         
         try:
-            print(f"Đang xử lý URL danh mục: {page_url}")
+            logger.info(f"Đang xử lý URL danh mục: {page_url}")
             html = get_html_content(page_url)
             if not html:
-                print(f"Không thể tải nội dung từ {page_url}")
+                logger.warning(f"Không thể tải nội dung từ {page_url}")
                 return [], []
                 
             soup = BeautifulSoup(html, 'html.parser')
             
             # Debug: In ra một số thông tin về trang
-            print(f"  > Đã tải HTML, kích thước: {len(html)} ký tự")
+            logger.info(f"  > Đã tải HTML, kích thước: {len(html)} ký tự")
             
             # Lấy các link sản phẩm với nhiều selector khác nhau
             product_selectors = [
@@ -791,53 +709,20 @@ def extract_product_urls(url):
                 '.col-product a'          # Link trong column product
             ]
             
-            total_links_found = 0
-            
-            for selector in product_selectors:
-                links = soup.select(selector)
-                print(f"  > Selector '{selector}' tìm thấy {len(links)} link")
-                
-                for a in links:
-                    href = a.get('href')
-                    if href:
-                        # Tạo URL đầy đủ
-                        if not href.startswith('http'):
-                            parsed_url = urlparse(page_url)
-                            full_url = f"{parsed_url.scheme}://{parsed_url.netloc}{href}" if href.startswith('/') else f"{page_url.rstrip('/')}/{href}"
-                        else:
-                            full_url = href
-                                        
-                        # Kiểm tra xem có phải URL sản phẩm hợp lệ không
-                        if is_product_url(full_url) and full_url not in local_product_urls:
-                            local_product_urls.append(full_url)
-                            total_links_found += 1
-                            print(f"    + Tìm thấy URL sản phẩm: {full_url}")
+            # Gom href của tất cả selector trong một lần select rồi phân loại cả loạt trong một lần gọi
+            hrefs = [a.get('href') for a in soup.select(', '.join(product_selectors))]
+            candidate_urls = [_absolute_listing_url(page_url, href) for href in hrefs if href]
+            local_product_urls = url_classifier.filter_product_urls(candidate_urls)
             
             # Nếu không tìm được sản phẩm với selector cũ, thử tìm với pattern URL đặc biệt của BAA.vn
-            if total_links_found == 0:
-                print(f"  > Không tìm được sản phẩm với selector cũ, thử pattern BAA.vn...")
-                
-                # Tìm tất cả link và kiểm tra pattern
-                all_links = soup.select('a[href]')
-                print(f"  > Tìm thấy {len(all_links)} link để kiểm tra pattern")
-                
-                for a in all_links:
-                    href = a.get('href')
-                    if href:
-                        # Tạo URL đầy đủ
-                        if not href.startswith('http'):
-                            parsed_url = urlparse(page_url)
-                            full_url = f"{parsed_url.scheme}://{parsed_url.netloc}{href}" if href.startswith('/') else f"{page_url.rstrip('/')}/{href}"
-                        else:
-                            full_url = href
-                        
-                        # Kiểm tra pattern đặc biệt của BAA.vn
-                        if _is_baa_product_url(full_url) and full_url not in local_product_urls:
-                            local_product_urls.append(full_url)
-                            total_links_found += 1
-                            print(f"    + Tìm thấy URL sản phẩm BAA pattern: {full_url}")
+            if not local_product_urls:
+                logger.info(f"  > Không tìm được sản phẩm với selector cũ, thử pattern BAA.vn...")
+                all_hrefs = [a.get('href') for a in soup.select('a[href]')]
+                all_urls = [_absolute_listing_url(page_url, href) for href in all_hrefs if href]
+                local_product_urls = [u for u in dict.fromkeys(all_urls) if _is_baa_product_url(u)]
             
-            print(f"  > Tổng cộng tìm thấy {total_links_found} URL sản phẩm hợp lệ")
+            total_links_found = len(local_product_urls)
+            logger.info(f"  > Tổng cộng tìm thấy {total_links_found} URL sản phẩm hợp lệ trên {len(candidate_urls)} liên kết")
             
             # Xử lý phân trang với nhiều selector
             pagination_selectors = [
@@ -848,26 +733,14 @@ def extract_product_urls(url):
                 'nav a[href*="page"]'     # Navigation với page
             ]
             
-            for selector in pagination_selectors:
-                page_links = soup.select(selector)
-                print(f"  > Pagination selector '{selector}' tìm thấy {len(page_links)} link")
-                
-                for page_link in page_links:
-                    page_href = page_link.get('href')
-                    if page_href:
-                        if not page_href.startswith('http'):
-                            parsed_url = urlparse(page_url)
-                            full_page_url = f"{parsed_url.scheme}://{parsed_url.netloc}{page_href}" if page_href.startswith('/') else f"{page_url.rstrip('/')}/{page_href}"
-                        else:
-                            full_page_url = page_href
-                        
-                        if full_page_url not in processed_pages and full_page_url not in next_pages:
-                            next_pages.append(full_page_url)
-                            print(f"    + Tìm thấy trang phân trang: {full_page_url}")
+            page_hrefs = [a.get('href') for a in soup.select(', '.join(pagination_selectors))]
+            page_urls = [_absolute_listing_url(page_url, href) for href in page_hrefs if href]
+            next_pages = [u for u in dict.fromkeys(page_urls) if u not in processed_pages]
+            logger.info(f"  > Tìm thấy {len(next_pages)} trang phân trang")
             
             return local_product_urls, next_pages
         except Exception as e:
-            print(f"Lỗi khi xử lý trang {page_url}: {str(e)}")
+            logger.error(f"Lỗi khi xử lý trang {page_url}: {str(e)}")
             import traceback
             traceback.print_exc()
             return [], []
@@ -889,22 +762,23 @@ def extract_product_urls(url):
                     
                     # Thêm sản phẩm vào danh sách
                     for prod_url in page_products:
-                        if prod_url not in product_urls:
+                        if prod_url not in seen_product_urls:
+                            seen_product_urls.add(prod_url)
                             product_urls.append(prod_url)
                     
                     # Thêm trang phân trang vào danh sách cần xử lý
                     for page_url in page_pagination:
-                        if page_url not in processed_pages and page_url not in pages_to_process:
+                        if page_url not in processed_pages and page_url not in pages_to_process and page_url not in current_batch:
                             pages_to_process.append(page_url)
                             
                 except Exception as e:
-                    print(f"Lỗi khi xử lý future: {str(e)}")
+                    logger.error(f"Lỗi khi xử lý future: {str(e)}")
         
         # Đánh dấu các trang đã xử lý
         for page_url in current_batch:
             processed_pages.add(page_url)
     
-    print(f"Đã xử lý {len(processed_pages)} trang, tìm thấy {len(product_urls)} URL sản phẩm")
+    logger.info(f"Đã xử lý {len(processed_pages)} trang, tìm thấy {len(product_urls)} URL sản phẩm")
     return product_urls
 
 def get_product_info(url, required_fields=None):
@@ -942,10 +816,10 @@ def scrape_product_info(product_urls, excel_template_path):
     """Thu thập thông tin từ danh sách URL sản phẩm và xuất ra file Excel"""
     # Lọc các URL là URL sản phẩm hợp lệ
     valid_product_urls = [url for url in product_urls if is_product_url(url)]
-    print(f"Tìm thấy {len(valid_product_urls)} URL sản phẩm hợp lệ")
+    logger.info(f"Tìm thấy {len(valid_product_urls)} URL sản phẩm hợp lệ")
     
     # Gửi thông báo bắt đầu
-    socketio.emit('progress_update', {'percent': 0, 'message': f'Bắt đầu thu thập thông tin từ {len(valid_product_urls)} sản phẩm'})
+    report_progress({'percent': 0, 'message': f'Bắt đầu thu thập thông tin từ {len(valid_product_urls)} sản phẩm'})
     
     # Các trường cần thu thập
     required_fields = ['STT', 'Mã sản phẩm', 'Tên sản phẩm', 'Giá', 'Tổng quan']
@@ -974,16 +848,16 @@ def scrape_product_info(product_urls, excel_template_path):
                 
                 processed_count += 1
                 progress = int((processed_count / total_products) * 100)
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress,
                     'message': f'Đã xử lý {processed_count}/{total_products} sản phẩm'
                 })
                 
             except Exception as e:
-                print(f"Lỗi khi xử lý {url}: {str(e)}")
+                logger.error(f"Lỗi khi xử lý {url}: {str(e)}")
     
     # Gửi thông báo hoàn thành
-    socketio.emit('progress_update', {
+    report_progress({
         'percent': 100,
         'message': f'Đã hoàn thành việc thu thập thông tin từ {len(all_products_info)} sản phẩm'
     })
@@ -1023,7 +897,7 @@ def search_autonics_product(product_code):
     try:
         # Xây dựng URL tìm kiếm
         search_url = f"https://www.autonics.com/vn/search/total?keyword={product_code}"
-        print(f"Tìm kiếm sản phẩm {product_code} trên Autonics.com: {search_url}")
+        logger.info(f"Tìm kiếm sản phẩm {product_code} trên Autonics.com: {search_url}")
         
         # Gửi request đến trang tìm kiếm
         response = requests.get(search_url, headers=HEADERS, timeout=10)
@@ -1036,7 +910,7 @@ def search_autonics_product(product_code):
         product_items = soup.select('.product-item')
         
         if not product_items:
-            print(f"Không tìm thấy sản phẩm {product_code} trên Autonics.com")
+            logger.warning(f"Không tìm thấy sản phẩm {product_code} trên Autonics.com")
             return None
         
         # Lấy liên kết của sản phẩm đầu tiên
@@ -1044,7 +918,7 @@ def search_autonics_product(product_code):
         product_link = first_product.select_one('a')
         
         if not product_link:
-            print(f"Không tìm thấy liên kết cho sản phẩm {product_code}")
+            logger.warning(f"Không tìm thấy liên kết cho sản phẩm {product_code}")
             return None
         
         # Xây dựng URL đầy đủ
@@ -1052,11 +926,11 @@ def search_autonics_product(product_code):
         if not product_url.startswith('http'):
             product_url = f"https://www.autonics.com{product_url}"
         
-        print(f"Đã tìm thấy sản phẩm {product_code}: {product_url}")
+        logger.info(f"Đã tìm thấy sản phẩm {product_code}: {product_url}")
         return product_url
     
     except Exception as e:
-        print(f"Lỗi khi tìm kiếm sản phẩm {product_code}: {str(e)}")
+        logger.error(f"Lỗi khi tìm kiếm sản phẩm {product_code}: {str(e)}")
         return None
 
 def get_product_url(product_code):
@@ -1075,13 +949,13 @@ def get_product_url(product_code):
         
         # Cách 1: Tạo URL trực tiếp Autonics
         direct_url = f"https://www.autonics.com/vn/model/{clean_code}"
-        print(f"Thử URL Autonics trực tiếp: {direct_url}")
+        logger.info(f"Thử URL Autonics trực tiếp: {direct_url}")
         
         # Kiểm tra URL trực tiếp
         try:
             response = requests.head(direct_url, headers=HEADERS, timeout=5)
             if response.status_code == 200:
-                print(f"URL Autonics trực tiếp hợp lệ: {direct_url}")
+                logger.info(f"URL Autonics trực tiếp hợp lệ: {direct_url}")
                 return direct_url
         except:
             pass
@@ -1105,10 +979,10 @@ def get_product_url(product_code):
         
         for url in baa_patterns:
             try:
-                print(f"Thử URL BAA.vn: {url}")
+                logger.info(f"Thử URL BAA.vn: {url}")
                 response = requests.head(url, timeout=3)
                 if response.status_code == 200 and 'baa.vn' in response.url and 'tim-kiem' not in response.url:
-                    print(f"URL BAA.vn hợp lệ: {response.url}")
+                    logger.info(f"URL BAA.vn hợp lệ: {response.url}")
                     return response.url
             except:
                 continue
@@ -1116,7 +990,7 @@ def get_product_url(product_code):
         # Cách 4: Tìm kiếm trên BAA.vn
         try:
             search_url = f"https://baa.vn/tim-kiem?q={clean_code}"
-            print(f"Tìm kiếm trên BAA.vn: {search_url}")
+            logger.info(f"Tìm kiếm trên BAA.vn: {search_url}")
             
             response = requests.get(search_url, timeout=5)
             if response.status_code == 200:
@@ -1130,16 +1004,16 @@ def get_product_url(product_code):
                     if href and clean_code.lower() in link_text.lower():
                         if not href.startswith('http'):
                             href = urljoin('https://baa.vn/', href)
-                        print(f"Tìm thấy sản phẩm trên BAA.vn: {href}")
+                        logger.info(f"Tìm thấy sản phẩm trên BAA.vn: {href}")
                         return href
         except:
             pass
         
-        print(f"Không tìm thấy URL cho sản phẩm {clean_code}")
+        logger.warning(f"Không tìm thấy URL cho sản phẩm {clean_code}")
         return None
         
     except Exception as e:
-        print(f"Lỗi khi tạo URL sản phẩm cho {product_code}: {str(e)}")
+        logger.error(f"Lỗi khi tạo URL sản phẩm cho {product_code}: {str(e)}")
         return None
 
 def extract_product_image(product_url):
@@ -1154,7 +1028,7 @@ def extract_product_image(product_url):
             product_code = clean_url.split('/')[-1].split('(')[0].strip()
             # Tạo URL mới không chứa dấu ngoặc
             clean_url = f"https://www.autonics.com/vn/model/{product_code}"
-            print(f"URL có chứa kí tự đặc biệt, đã chuyển sang: {clean_url}")
+            logger.info(f"URL có chứa kí tự đặc biệt, đã chuyển sang: {clean_url}")
         else:
             # Lấy mã sản phẩm từ URL
             product_code = clean_url.split('/')[-1]
@@ -1164,16 +1038,16 @@ def extract_product_image(product_url):
             response = requests.get(clean_url, headers=HEADERS)
             response.raise_for_status()
         except requests.RequestException as e:
-            print(f"Lỗi khi tải trang sản phẩm {clean_url}: {str(e)}")
+            logger.error(f"Lỗi khi tải trang sản phẩm {clean_url}: {str(e)}")
             
             # Giới hạn chỉ tìm kiếm thêm nếu không thể mở URL trực tiếp
             alternative_url = search_autonics_product(product_code)
             if alternative_url:
-                print(f"Tìm thấy URL thay thế: {alternative_url}")
+                logger.info(f"Tìm thấy URL thay thế: {alternative_url}")
                 response = requests.get(alternative_url, headers=HEADERS)
                 response.raise_for_status()
             else:
-                print(f"Không tìm thấy URL thay thế cho {product_code}")
+                logger.warning(f"Không tìm thấy URL thay thế cho {product_code}")
                 return None
         
         # Parse HTML - Sử dụng html.parser nhanh hơn lxml
@@ -1209,7 +1083,7 @@ def extract_product_image(product_url):
                 # Kiểm tra nếu mã sản phẩm có trong src hoặc alt
                 if product_code.lower() in src.lower() or product_code.lower() in alt.lower():
                     img_element = img
-                    print(f"Tìm thấy ảnh theo mã sản phẩm: {product_code}")
+                    logger.info(f"Tìm thấy ảnh theo mã sản phẩm: {product_code}")
                     break
             
             # Nếu vẫn không tìm thấy, tìm theo các từ khóa phổ biến
@@ -1220,7 +1094,7 @@ def extract_product_image(product_url):
                     for keyword in keywords:
                         if keyword in src.lower():
                             img_element = img
-                            print(f"Tìm thấy ảnh theo từ khóa: {keyword}")
+                            logger.info(f"Tìm thấy ảnh theo từ khóa: {keyword}")
                             break
                     if img_element:
                         break
@@ -1237,7 +1111,7 @@ def extract_product_image(product_url):
                         try:
                             if int(width) > 100 and int(height) > 100:
                                 img_element = img
-                                print(f"Tìm thấy ảnh có kích thước lớn: {width}x{height}")
+                                logger.info(f"Tìm thấy ảnh có kích thước lớn: {width}x{height}")
                                 break
                         except ValueError:
                             # Nếu không chuyển được sang số, bỏ qua
@@ -1249,12 +1123,12 @@ def extract_product_image(product_url):
                         src = img.get('src', '')
                         if src and src.endswith(('.jpg', '.jpeg', '.png', '.webp')):
                             img_element = img
-                            print(f"Tìm thấy ảnh đầu tiên có định dạng hợp lệ")
+                            logger.info(f"Tìm thấy ảnh đầu tiên có định dạng hợp lệ")
                             break
         
         # Nếu không tìm thấy ảnh
         if not img_element or not img_element.get('src'):
-            print(f"Không tìm thấy hình ảnh trong trang {clean_url}")
+            logger.warning(f"Không tìm thấy hình ảnh trong trang {clean_url}")
             return None
         
         # Lấy URL hình ảnh và xử lý để chắc chắn là URL đầy đủ
@@ -1269,306 +1143,86 @@ def extract_product_image(product_url):
             else:
                 img_url = urljoin(base_url, img_url)
             
-        print(f"Đã tìm thấy ảnh sản phẩm {product_code}: {img_url}")
+        logger.info(f"Đã tìm thấy ảnh sản phẩm {product_code}: {img_url}")
         return {
             'url': img_url,
             'code': product_code
         }
     
     except Exception as e:
-        print(f"Lỗi khi trích xuất hình ảnh từ {product_url}: {str(e)}")
+        logger.error(f"Lỗi khi trích xuất hình ảnh từ {product_url}: {str(e)}")
         return None
 
+def _autonics_image_target(img_info, output_folder, extension):
+    """
+    Đường dẫn lưu ảnh Autonics theo cấu trúc năm/tháng và URL ảnh trên website
+
+    Returns:
+        tuple: (đường dẫn file, tên file, URL ảnh trên haiphongtech.vn)
+    """
+    current_date = datetime.now()
+    year = current_date.year
+    month = current_date.month
+    
+    # Tạo đường dẫn mới theo định dạng yêu cầu
+    new_path = f"/wp-content/uploads/{year}/{month:02d}/{img_info['code']}.{extension}"
+    
+    # Tạo tên file an toàn - loại bỏ tất cả các kí tự không an toàn cho tên file
+    safe_name = re.sub(r'[^\w\-_]', '_', img_info['code'])
+    img_filename = f"{safe_name}.{extension}"
+    
+    # Tạo cấu trúc thư mục đầy đủ trong output_folder
+    year_month_folder = os.path.join(output_folder, str(year), f"{month:02d}")
+    return os.path.join(year_month_folder, img_filename), img_filename, f"https://haiphongtech.vn{new_path}"
+
 def download_product_image(img_info, output_folder):
-    """Tải về hình ảnh sản phẩm"""
-    img_path = None
-    try:
-        if not img_info or not img_info.get('url'):
-            print("Không có thông tin ảnh để tải")
-            return None
-        
-        # Tạo tên file ảnh theo định dạng mới
-        current_date = datetime.now()
-        year = current_date.year
-        month = current_date.month
-        
-        # Tạo đường dẫn mới theo định dạng yêu cầu
-        new_path = f"/wp-content/uploads/{year}/{month:02d}/{img_info['code']}.webp"
-        
-        # Tạo tên file an toàn - loại bỏ tất cả các kí tự không an toàn cho tên file
-        safe_name = re.sub(r'[^\w\-_]', '_', img_info['code'])
-        img_filename = f"{safe_name}.webp"
-        
-        # Tạo cấu trúc thư mục đầy đủ trong output_folder
-        year_month_folder = os.path.join(output_folder, str(year), f"{month:02d}")
-        os.makedirs(year_month_folder, exist_ok=True)
-        
-        # Đường dẫn đầy đủ để lưu file
-        img_path = os.path.join(year_month_folder, img_filename)
-        
-        print(f"Đang tải ảnh từ: {img_info['url']}")
-        print(f"Lưu vào: {img_path}")
-        
-        # Tải ảnh với timeout cao hơn
-        max_retries = 2
-        retry_count = 0
-        last_error = None
-        
-        while retry_count < max_retries:
-            try:
-                # Tạo session mới để thêm các header cần thiết
-                session = requests.Session()
-                session.headers.update(HEADERS)
-                
-                # Thêm referer vào header để tránh bị chặn
-                session.headers.update({
-                    'Referer': 'https://www.autonics.com/',
-                    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
-                })
-                
-                # Tải ảnh với stream=True và timeout 10s
-                response = session.get(img_info['url'], stream=True, timeout=10)
-                response.raise_for_status()
-                
-                # Kiểm tra Content-Type
-                content_type = response.headers.get('Content-Type', '')
-                if not content_type.startswith('image/'):
-                    print(f"Lỗi: URL không trả về hình ảnh (Content-Type: {content_type})")
-                    # Thử lại nếu chưa đạt số lần thử tối đa
-                    if retry_count == max_retries - 1:
-                        return None
-                    retry_count += 1
-                    time.sleep(0.5)
-                    continue
-                    
-                # Kiểm tra kích thước file
-                content_length = int(response.headers.get('Content-Length', 0))
-                if content_length < 100:  # Ảnh quá nhỏ có thể là lỗi
-                    print(f"Cảnh báo: Kích thước ảnh quá nhỏ ({content_length} bytes)")
-                    if content_length == 0:
-                        print("Lỗi: File ảnh rỗng")
-                        # Thử lại nếu chưa đạt số lần thử tối đa
-                        if retry_count == max_retries - 1:
-                            return None
-                        retry_count += 1
-                        time.sleep(0.5)
-                        continue
-                
-                # Lưu ảnh với xử lý lỗi
-                try:
-                    with open(img_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    
-                    # Kiểm tra kích thước file đã tải
-                    file_size = os.path.getsize(img_path)
-                    if file_size < 100:  # File quá nhỏ, có thể là lỗi
-                        print(f"Cảnh báo: File đã tải có kích thước nhỏ: {file_size} bytes")
-                        if file_size == 0:
-                            print("Lỗi: File ảnh đã tải bị rỗng, sẽ thử lại")
-                            os.remove(img_path)
-                            # Thử lại nếu chưa đạt số lần thử tối đa
-                            if retry_count == max_retries - 1:
-                                return None
-                            retry_count += 1
-                            time.sleep(0.5)
-                            continue
-                    
-                    # Xác nhận thành công
-                    print(f"Đã tải thành công: {img_filename} ({file_size} bytes)")
-                    return {
-                        'path': img_path,
-                        'url': f"https://haiphongtech.vn{new_path}"
-                    }
-                except Exception as e:
-                    print(f"Lỗi khi lưu file: {str(e)}")
-                    # Xóa file lỗi nếu có
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-                    # Thử lại nếu chưa đạt số lần thử tối đa
-                    if retry_count == max_retries - 1:
-                        raise e
-                    retry_count += 1
-                    last_error = e
-                    time.sleep(0.5)
-                    continue
-            
-            except Exception as e:
-                print(f"Lỗi khi tải ảnh (lần {retry_count+1}): {str(e)}")
-                # Thử lại nếu chưa đạt số lần thử tối đa
-                if retry_count == max_retries - 1:
-                    raise e
-                retry_count += 1
-                last_error = e
-                time.sleep(0.5)
-                continue
-        
-        # Nếu đã thử tối đa nhưng vẫn thất bại
-        if last_error:
-            print(f"Đã thử {max_retries} lần nhưng không thành công: {str(last_error)}")
+    """Tải về hình ảnh sản phẩm (lưu nguyên dữ liệu ảnh gốc) qua pipeline ảnh dùng chung"""
+    if not img_info or not img_info.get('url'):
+        logger.info("Không có thông tin ảnh để tải")
         return None
     
-    except Exception as e:
-        print(f"Lỗi khi tải hình ảnh: {str(e)}")
-        # Xóa file lỗi nếu có
-        if img_path and os.path.exists(img_path):
-            try:
-                os.remove(img_path)
-                print(f"Đã xóa file lỗi: {img_path}")
-            except:
-                print(f"Không thể xóa file lỗi: {img_path}")
+    img_path, img_filename, site_url = _autonics_image_target(img_info, output_folder, 'webp')
+    item_logger.info("Đang tải ảnh từ: %s", img_info['url'])
+    logger.info(f"Lưu vào: {img_path}")
+    
+    result = get_image_pipeline().process(ImageJob(
+        img_info['url'], img_path, format=None, headers=AUTONICS_IMAGE_HEADERS, skip_existing=False
+    ))
+    if not result['success']:
+        logger.error(f"Lỗi khi tải hình ảnh: {result.get('error')}")
         return None
+    
+    item_logger.info("Đã tải thành công: %s (%s bytes)", img_filename, result['bytes'])
+    return {
+        'path': img_path,
+        'url': site_url
+    }
 
 def download_jpg_product_image(img_info, output_folder):
-    """Tải về hình ảnh sản phẩm chất lượng cao dưới định dạng JPG"""
-    img_path = None
-    try:
-        if not img_info or not img_info.get('url'):
-            print("Không có thông tin ảnh để tải")
-            return None
-        
-        # Tạo tên file ảnh theo định dạng mới
-        current_date = datetime.now()
-        year = current_date.year
-        month = current_date.month
-        
-        # Tạo đường dẫn mới theo định dạng yêu cầu
-        new_path = f"/wp-content/uploads/{year}/{month:02d}/{img_info['code']}.jpg"
-        
-        # Tạo tên file an toàn - loại bỏ tất cả các kí tự không an toàn cho tên file
-        safe_name = re.sub(r'[^\w\-_]', '_', img_info['code'])
-        img_filename = f"{safe_name}.jpg"
-        
-        # Tạo cấu trúc thư mục đầy đủ trong output_folder
-        year_month_folder = os.path.join(output_folder, str(year), f"{month:02d}")
-        os.makedirs(year_month_folder, exist_ok=True)
-        
-        # Đường dẫn đầy đủ để lưu file
-        img_path = os.path.join(year_month_folder, img_filename)
-        
-        print(f"Đang tải ảnh JPG chất lượng cao từ: {img_info['url']}")
-        print(f"Lưu vào: {img_path}")
-        
-        # Tải ảnh với timeout cao hơn
-        max_retries = 2
-        retry_count = 0
-        last_error = None
-        
-        while retry_count < max_retries:
-            try:
-                # Tạo session mới để thêm các header cần thiết
-                session = requests.Session()
-                session.headers.update(HEADERS)
-                
-                # Thêm referer vào header để tránh bị chặn
-                session.headers.update({
-                    'Referer': 'https://www.autonics.com/',
-                    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
-                })
-                
-                # Tải ảnh với stream=True và timeout 10s
-                response = session.get(img_info['url'], stream=True, timeout=10)
-                response.raise_for_status()
-                
-                # Kiểm tra Content-Type
-                content_type = response.headers.get('Content-Type', '')
-                if not content_type.startswith('image/'):
-                    print(f"Lỗi: URL không trả về hình ảnh (Content-Type: {content_type})")
-                    # Thử lại nếu chưa đạt số lần thử tối đa
-                    if retry_count == max_retries - 1:
-                        return None
-                    retry_count += 1
-                    time.sleep(0.5)
-                    continue
-                    
-                # Kiểm tra kích thước file
-                content_length = int(response.headers.get('Content-Length', 0))
-                if content_length < 100:  # Ảnh quá nhỏ có thể là lỗi
-                    print(f"Cảnh báo: Kích thước ảnh quá nhỏ ({content_length} bytes)")
-                    if content_length == 0:
-                        print("Lỗi: File ảnh rỗng")
-                        # Thử lại nếu chưa đạt số lần thử tối đa
-                        if retry_count == max_retries - 1:
-                            return None
-                        retry_count += 1
-                        time.sleep(0.5)
-                        continue
-                
-                # Đọc dữ liệu ảnh vào bộ nhớ
-                image_data = io.BytesIO(response.content)
-                
-                try:
-                    # Xử lý ảnh bằng Pillow
-                    with Image.open(image_data) as img:
-                        # Chuyển đổi sang RGB nếu cần
-                        if img.mode in ('RGBA', 'P'):
-                            img = img.convert('RGB')
-                        
-                        # Đảm bảo thư mục tồn tại
-                        os.makedirs(os.path.dirname(img_path), exist_ok=True)
-                        
-                        # Lưu ảnh dưới định dạng JPEG với chất lượng cao nhất
-                        img.save(img_path, 'JPEG', quality=100, optimize=True, subsampling=0)
-                        
-                    # Kiểm tra kích thước file đã tải
-                    file_size = os.path.getsize(img_path)
-                    if file_size < 100:  # File quá nhỏ, có thể là lỗi
-                        print(f"Cảnh báo: File đã tải có kích thước nhỏ: {file_size} bytes")
-                        if file_size == 0:
-                            print("Lỗi: File ảnh đã tải bị rỗng, sẽ thử lại")
-                            os.remove(img_path)
-                            # Thử lại nếu chưa đạt số lần thử tối đa
-                            if retry_count == max_retries - 1:
-                                return None
-                            retry_count += 1
-                            time.sleep(0.5)
-                            continue
-                    
-                    # Xác nhận thành công
-                    print(f"Đã tải và lưu thành công ảnh JPG chất lượng cao: {img_filename} ({file_size} bytes)")
-                    return {
-                        'path': img_path,
-                        'url': f"https://haiphongtech.vn{new_path}"
-                    }
-                except Exception as e:
-                    print(f"Lỗi khi xử lý ảnh: {str(e)}")
-                    # Xóa file lỗi nếu có
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-                    # Thử lại nếu chưa đạt số lần thử tối đa
-                    if retry_count == max_retries - 1:
-                        raise e
-                    retry_count += 1
-                    last_error = e
-                    time.sleep(0.5)
-                    continue
-            
-            except Exception as e:
-                print(f"Lỗi khi tải ảnh (lần {retry_count+1}): {str(e)}")
-                # Thử lại nếu chưa đạt số lần thử tối đa
-                if retry_count == max_retries - 1:
-                    raise e
-                retry_count += 1
-                last_error = e
-                time.sleep(0.5)
-                continue
-        
-        # Nếu đã thử tối đa nhưng vẫn thất bại
-        if last_error:
-            print(f"Đã thử {max_retries} lần nhưng không thành công: {str(last_error)}")
+    """Tải về hình ảnh sản phẩm chất lượng cao dưới định dạng JPG qua pipeline ảnh dùng chung"""
+    if not img_info or not img_info.get('url'):
+        logger.info("Không có thông tin ảnh để tải")
         return None
     
-    except Exception as e:
-        print(f"Lỗi khi tải hình ảnh: {str(e)}")
-        # Xóa file lỗi nếu có
-        if img_path and os.path.exists(img_path):
-            try:
-                os.remove(img_path)
-                print(f"Đã xóa file lỗi: {img_path}")
-            except:
-                print(f"Không thể xóa file lỗi: {img_path}")
+    img_path, img_filename, site_url = _autonics_image_target(img_info, output_folder, 'jpg')
+    item_logger.info("Đang tải ảnh JPG chất lượng cao từ: %s", img_info['url'])
+    logger.info(f"Lưu vào: {img_path}")
+    
+    # Lưu ảnh dưới định dạng JPEG với chất lượng cao nhất, giữ nguyên kích thước
+    result = get_image_pipeline().process(ImageJob(
+        img_info['url'], img_path, resize=RESIZE_NONE, format='JPEG', quality=100,
+        save_options={'optimize': True, 'subsampling': 0},
+        headers=AUTONICS_IMAGE_HEADERS, skip_existing=False
+    ))
+    if not result['success']:
+        logger.error(f"Lỗi khi tải hình ảnh: {result.get('error')}")
         return None
+    
+    item_logger.info("Đã tải và lưu thành công ảnh JPG chất lượng cao: %s (%s bytes)", img_filename, result['bytes'])
+    return {
+        'path': img_path,
+        'url': site_url
+    }
 
 def download_autonics_images(product_codes, output_folder):
     """Tải nhiều hình ảnh sản phẩm từ danh sách mã sản phẩm sử dụng đa luồng"""
@@ -1582,7 +1236,7 @@ def download_autonics_images(product_codes, output_folder):
     download_results = []
     
     # Gửi thông báo bắt đầu
-    socketio.emit('progress_update', {
+    report_progress({
         'percent': 0, 
         'message': f'Bắt đầu tải {total_products} hình ảnh sản phẩm...'
     })
@@ -1598,7 +1252,7 @@ def download_autonics_images(product_codes, output_folder):
         # Làm sạch mã sản phẩm
         clean_code = re.sub(r'[\(\)\s]+', '', code)
         if clean_code != code:
-            print(f"Đã làm sạch mã sản phẩm: {code} -> {clean_code}")
+            logger.info(f"Đã làm sạch mã sản phẩm: {code} -> {clean_code}")
         
         clean_product_codes.append(clean_code)
     
@@ -1626,7 +1280,7 @@ def download_autonics_images(product_codes, output_folder):
         try:
             # Tạo URL sản phẩm
             product_url = f"https://www.autonics.com/vn/model/{product_code}"
-            print(f"Đang truy cập URL: {product_url}")
+            logger.info(f"Đang truy cập URL: {product_url}")
             
             # Trích xuất thông tin hình ảnh
             img_info = extract_product_image(product_url)
@@ -1635,7 +1289,7 @@ def download_autonics_images(product_codes, output_folder):
                 with result_lock:
                     result['error'] = 'Không tìm thấy hình ảnh'
                     failed_downloads += 1
-                print(f"Không tìm thấy hình ảnh cho sản phẩm {product_code}")
+                logger.warning(f"Không tìm thấy hình ảnh cho sản phẩm {product_code}")
             else:
                 # Tải hình ảnh
                 img_result = download_product_image(img_info, output_folder)
@@ -1646,25 +1300,25 @@ def download_autonics_images(product_codes, output_folder):
                         result['image_path'] = img_result['path']
                         result['image_url'] = img_result['url']
                         successful_downloads += 1
-                    print(f"Tải thành công ảnh cho sản phẩm {product_code}")
+                    logger.info(f"Tải thành công ảnh cho sản phẩm {product_code}")
                 else:
                     with result_lock:
                         result['error'] = 'Không thể tải hình ảnh'
                         failed_downloads += 1
-                    print(f"Tải ảnh thất bại cho sản phẩm {product_code}")
+                    logger.info(f"Tải ảnh thất bại cho sản phẩm {product_code}")
         
         except Exception as e:
             error_msg = str(e)
             with result_lock:
                 result['error'] = error_msg
                 failed_downloads += 1
-            print(f"Lỗi khi xử lý sản phẩm {product_code}: {error_msg}")
+            logger.error(f"Lỗi khi xử lý sản phẩm {product_code}: {error_msg}")
         
         # Cập nhật tiến trình
         with progress_lock:
             current_processed += 1
             progress = int((current_processed / actual_total) * 100)
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': progress,
                 'message': f'Đang xử lý sản phẩm {product_code} ({current_processed}/{actual_total})'
             })
@@ -1677,7 +1331,7 @@ def download_autonics_images(product_codes, output_folder):
     # Sử dụng ThreadPoolExecutor để xử lý đa luồng
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Tạo các task để xử lý mã sản phẩm
-        futures = {executor.submit(process_product, code, i+1): code for i, code in enumerate(clean_product_codes)}
+        futures = {executor.submit(bind_current(process_product), code, i+1): code for i, code in enumerate(clean_product_codes)}
         
         # Xử lý kết quả khi hoàn thành
         for future in as_completed(futures):
@@ -1686,7 +1340,7 @@ def download_autonics_images(product_codes, output_folder):
                 result = future.result()
                 download_results.append(result)
             except Exception as e:
-                print(f"Lỗi không xác định khi xử lý {product_code}: {str(e)}")
+                logger.error(f"Lỗi không xác định khi xử lý {product_code}: {str(e)}")
                 # Tạo kết quả lỗi nếu có ngoại lệ không xử lý được
                 download_results.append({
                     'product_code': product_code,
@@ -1703,7 +1357,7 @@ def download_autonics_images(product_codes, output_folder):
     if skipped_codes > 0:
         completion_message += f', {skipped_codes} bỏ qua'
         
-    socketio.emit('progress_update', {
+    report_progress({
         'percent': 100,
         'message': completion_message
     })
@@ -1723,9 +1377,9 @@ def download_autonics_images(product_codes, output_folder):
         report_path = os.path.join(output_folder, 'download_report.xlsx')
         report_df = pd.DataFrame(download_results)
         report_df.to_excel(report_path, index=False)
-        print(f"Đã tạo báo cáo tại: {report_path}")
+        logger.info(f"Đã tạo báo cáo tại: {report_path}")
     except Exception as e:
-        print(f"Lỗi khi tạo báo cáo: {str(e)}")
+        logger.error(f"Lỗi khi tạo báo cáo: {str(e)}")
     
     return summary
 
@@ -1741,7 +1395,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
     download_results = []
     
     # Gửi thông báo bắt đầu
-    socketio.emit('progress_update', {
+    report_progress({
         'percent': 0, 
         'message': f'Bắt đầu tải {total_products} hình ảnh JPG chất lượng cao...'
     })
@@ -1757,7 +1411,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
         # Làm sạch mã sản phẩm
         clean_code = re.sub(r'[\(\)\s]+', '', code)
         if clean_code != code:
-            print(f"Đã làm sạch mã sản phẩm: {code} -> {clean_code}")
+            logger.info(f"Đã làm sạch mã sản phẩm: {code} -> {clean_code}")
         
         clean_product_codes.append(clean_code)
     
@@ -1788,7 +1442,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
         try:
             # Tạo URL sản phẩm
             product_url = f"https://www.autonics.com/vn/model/{product_code}"
-            print(f"Đang truy cập URL: {product_url}")
+            logger.info(f"Đang truy cập URL: {product_url}")
             
             # Trích xuất thông tin hình ảnh
             img_info = extract_product_image(product_url)
@@ -1797,7 +1451,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
                 with result_lock:
                     result['error'] = 'Không tìm thấy hình ảnh'
                     failed_downloads += 1
-                print(f"Không tìm thấy hình ảnh cho sản phẩm {product_code}")
+                logger.warning(f"Không tìm thấy hình ảnh cho sản phẩm {product_code}")
             else:
                 # Tải hình ảnh JPG chất lượng cao
                 img_result = download_jpg_product_image(img_info, output_folder)
@@ -1808,16 +1462,16 @@ def download_autonics_jpg_images(product_codes, output_folder):
                         result['image_path'] = img_result['path']
                         result['image_url'] = img_result['url']
                         successful_downloads += 1
-                    print(f"Tải thành công ảnh JPG chất lượng cao cho sản phẩm {product_code}")
+                    logger.info(f"Tải thành công ảnh JPG chất lượng cao cho sản phẩm {product_code}")
                 else:
                     with result_lock:
                         result['error'] = 'Không thể tải hình ảnh'
                         failed_downloads += 1
-                    print(f"Tải ảnh JPG thất bại cho sản phẩm {product_code}")
+                    logger.info(f"Tải ảnh JPG thất bại cho sản phẩm {product_code}")
             
             # Kiểm tra thời gian xử lý
             elapsed_time = time.time() - start_time
-            print(f"Đã xử lý sản phẩm {product_code} trong {elapsed_time:.2f} giây")
+            logger.info(f"Đã xử lý sản phẩm {product_code} trong {elapsed_time:.2f} giây")
             
             # Tạm dừng nếu còn thời gian trong giới hạn 10 giây
             remaining_time = 10 - elapsed_time
@@ -1829,17 +1483,17 @@ def download_autonics_jpg_images(product_codes, output_folder):
             with result_lock:
                 result['error'] = error_msg
                 failed_downloads += 1
-            print(f"Lỗi khi xử lý sản phẩm {product_code}: {error_msg}")
+            logger.error(f"Lỗi khi xử lý sản phẩm {product_code}: {error_msg}")
             
             # Kiểm tra thời gian đã trôi qua
             elapsed_time = time.time() - start_time
-            print(f"Xử lý thất bại sau {elapsed_time:.2f} giây")
+            logger.info(f"Xử lý thất bại sau {elapsed_time:.2f} giây")
         
         # Cập nhật tiến trình
         with progress_lock:
             current_processed += 1
             progress = int((current_processed / actual_total) * 100)
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': progress,
                 'message': f'Đang xử lý sản phẩm {product_code} ({current_processed}/{actual_total})'
             })
@@ -1852,7 +1506,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
     # Sử dụng ThreadPoolExecutor để xử lý đa luồng
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Tạo các task để xử lý mã sản phẩm
-        futures = {executor.submit(process_product, code, i+1): code for i, code in enumerate(clean_product_codes)}
+        futures = {executor.submit(bind_current(process_product), code, i+1): code for i, code in enumerate(clean_product_codes)}
         
         # Xử lý kết quả khi hoàn thành
         for future in as_completed(futures):
@@ -1861,7 +1515,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
                 result = future.result()
                 download_results.append(result)
             except Exception as e:
-                print(f"Lỗi không xác định khi xử lý {product_code}: {str(e)}")
+                logger.error(f"Lỗi không xác định khi xử lý {product_code}: {str(e)}")
                 # Tạo kết quả lỗi nếu có ngoại lệ không xử lý được
                 download_results.append({
                     'product_code': product_code,
@@ -1878,7 +1532,7 @@ def download_autonics_jpg_images(product_codes, output_folder):
     if skipped_codes > 0:
         completion_message += f', {skipped_codes} bỏ qua'
         
-    socketio.emit('progress_update', {
+    report_progress({
         'percent': 100,
         'message': completion_message
     })
@@ -1898,9 +1552,9 @@ def download_autonics_jpg_images(product_codes, output_folder):
         report_path = os.path.join(output_folder, 'download_report.xlsx')
         report_df = pd.DataFrame(download_results)
         report_df.to_excel(report_path, index=False)
-        print(f"Đã tạo báo cáo tại: {report_path}")
+        logger.info(f"Đã tạo báo cáo tại: {report_path}")
     except Exception as e:
-        print(f"Lỗi khi tạo báo cáo: {str(e)}")
+        logger.error(f"Lỗi khi tạo báo cáo: {str(e)}")
     
     return summary
 
@@ -1908,6 +1562,9 @@ def download_product_document(doc_info, output_folder):
     """
     Tải tài liệu PDF từ URL và lưu vào thư mục đầu ra
     
+    Dùng engine tải tài liệu dùng chung (stream vào file .part, resume bằng HTTP Range,
+    kiểm tra Content-Length, loại trùng theo URL/nội dung).
+    
     Args:
         doc_info (dict): Thông tin tài liệu cần tải
             - url: URL của tài liệu
@@ -1924,124 +1581,10 @@ def download_product_document(doc_info, output_folder):
             - name: Tên gốc của tài liệu
     """
     try:
-        # Tạo thư mục đầu ra nếu chưa tồn tại
-        os.makedirs(output_folder, exist_ok=True)
-        
-        # Lấy URL tài liệu
-        doc_url = doc_info['url']
-        
-        # Tạo tên file an toàn từ tên tài liệu
-        doc_name = doc_info.get('name', '')
-        if not doc_name:
-            doc_name = doc_url.split('/')[-1]
-        
-        # Loại bỏ các ký tự không hợp lệ trong tên file
-        safe_filename = re.sub(r'[\\/*?:"<>|]', '', doc_name)
-        # Thêm .pdf nếu chưa có
-        if not safe_filename.lower().endswith('.pdf'):
-            safe_filename += '.pdf'
-        
-        # Tạo đường dẫn đầy đủ đến file đích
-        file_path = os.path.join(output_folder, safe_filename)
-        
-        print(f"Đang tải tài liệu từ: {doc_url}")
-        print(f"Lưu vào: {file_path}")
-        
-        # Tải tài liệu với số lần thử lại
-        max_retries = 5
-        current_retry = 0
-        success = False
-        error_msg = ""
-        
-        while current_retry < max_retries and not success:
-            try:
-                # Tạo session với User-Agent của trình duyệt
-                session = requests.Session()
-                session.headers.update({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
-                    'Accept': 'application/pdf,application/x-pdf,application/octet-stream,*/*',
-                    'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'Connection': 'keep-alive',
-                    'Referer': 'https://baa.vn/'
-                })
-                
-                # Tạo một stream request để tải file mà không cần đọc toàn bộ vào bộ nhớ
-                response = session.get(doc_url, stream=True, timeout=60)  # Tăng timeout lên 60 giây
-                
-                # Kiểm tra content-type
-                content_type = response.headers.get('Content-Type', '').lower()
-                if 'application/pdf' not in content_type and not (content_type.startswith('application/') or 'octet-stream' in content_type):
-                    print(f"CẢNH BÁO: Nội dung không phải PDF (Content-Type: {content_type})")
-                    
-                    # Kiểm tra nếu header đầu tiên của file là %PDF-
-                    first_chunk = next(response.iter_content(chunk_size=10), None)
-                    if first_chunk and not first_chunk.startswith(b'%PDF-'):
-                        raise Exception(f"Nội dung tải về không phải là file PDF hợp lệ (Content-Type: {content_type})")
-                
-                # Kiểm tra content-length
-                content_length = response.headers.get('Content-Length')
-                if content_length:
-                    content_length = int(content_length)
-                    if content_length < 1000:
-                        raise Exception(f"File quá nhỏ ({content_length} bytes), có thể không phải file PDF hợp lệ")
-                    
-                # Lưu file
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                # Kiểm tra kích thước file
-                file_size = os.path.getsize(file_path)
-                if file_size < 1000:
-                    raise Exception(f"File quá nhỏ ({file_size} bytes), có thể không phải file PDF hợp lệ")
-                
-                # Kiểm tra nội dung file
-                with open(file_path, 'rb') as f:
-                    header = f.read(5)
-                    # Kiểm tra header PDF
-                    if not header.startswith(b'%PDF-'):
-                        raise Exception("File không có signature PDF hợp lệ (%PDF-)")
-                
-                print(f"Tải tài liệu thành công: {file_path} ({file_size} bytes)")
-                success = True
-                
-                # Ngừng vòng lặp nếu thành công
-                break
-                
-            except Exception as e:
-                current_retry += 1
-                error_msg = str(e)
-                
-                # Tăng thời gian chờ mỗi lần thử lại
-                wait_time = current_retry * 2
-                print(f"Lỗi khi tải tài liệu (lần thử {current_retry}/{max_retries}): {error_msg}")
-                print(f"Thử lại sau {wait_time} giây...")
-                
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                
-                time.sleep(wait_time)
-        
-        if success:
-            return {
-                'success': True,
-                'path': file_path,  # Đổi từ filepath thành path
-                'filename': safe_filename,
-                'url': doc_url,
-                'name': doc_name
-            }
-        else:
-            return {
-                'success': False,
-                'error': error_msg,
-                'url': doc_url,
-                'name': doc_name
-            }
-    
+        return get_document_downloader().download(doc_info, output_folder)
     except Exception as e:
         error_msg = str(e)
-        print(f"Lỗi khi tải tài liệu: {error_msg}")
+        logger.error(f"Lỗi khi tải tài liệu: {error_msg}")
         traceback.print_exc()
         
         return {
@@ -2070,7 +1613,7 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
     """
     # Kiểm tra input
     if not product_codes_or_urls:
-        print("Không có mã sản phẩm hoặc URL nào được cung cấp")
+        logger.info("Không có mã sản phẩm hoặc URL nào được cung cấp")
         return None
     
     # Tạo thư mục đầu ra nếu chưa tồn tại
@@ -2086,10 +1629,16 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
     # Khóa đồng bộ hóa cho các biến toàn cục
     result_lock = threading.Lock()
     
+    # Engine tải tài liệu dùng chung: một pool giới hạn cho mọi sản phẩm, loại trùng URL/nội dung
+    downloader = get_document_downloader()
+    # Downloader dùng chung cả tiến trình: chỉ báo cáo phần thống kê của lượt này
+    doc_stats_start = downloader.stats_snapshot()
+    
     # Định nghĩa hàm xử lý cho mỗi sản phẩm
     def process_product(item, index):
+        nonlocal successful_products, failed_products
         try:
-            print(f"\n[{index}/{total_products}] Đang xử lý: {item}")
+            logger.info(f"\n[{index}/{total_products}] Đang xử lý: {item}")
             
             # Xác định xem đầu vào là URL hay mã sản phẩm
             if item.startswith('http'):
@@ -2130,10 +1679,10 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
                                 name_elem = soup.select_one(selector)
                                 if name_elem:
                                     product_name = name_elem.text.strip()
-                                    print(f"  Tìm thấy tên sản phẩm: {product_name}")
+                                    logger.info(f"  Tìm thấy tên sản phẩm: {product_name}")
                                     break
                         except Exception as e:
-                            print(f"  Không thể trích xuất tên sản phẩm từ trang: {str(e)}")
+                            logger.warning(f"  Không thể trích xuất tên sản phẩm từ trang: {str(e)}")
                 except:
                     product_code = f"product_{index}"
                     product_name = f"Product {index}"
@@ -2163,14 +1712,14 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
                             name_elem = soup.select_one(selector)
                             if name_elem:
                                 product_name = name_elem.text.strip()
-                                print(f"  Tìm thấy tên sản phẩm: {product_name}")
+                                logger.info(f"  Tìm thấy tên sản phẩm: {product_name}")
                                 break
                     except Exception as e:
-                        print(f"  Không thể trích xuất tên sản phẩm từ trang: {str(e)}")
+                        logger.warning(f"  Không thể trích xuất tên sản phẩm từ trang: {str(e)}")
             
             # Bỏ qua nếu không tìm thấy URL sản phẩm
             if not product_url:
-                print(f"  Không thể tạo URL cho mã sản phẩm: {product_code}")
+                logger.warning(f"  Không thể tạo URL cho mã sản phẩm: {product_code}")
                 with result_lock:
                     skipped_codes.append(product_code)
                     product_results[product_code] = {
@@ -2193,7 +1742,7 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
             document_links = extract_product_documents(product_url)
             
             if not document_links:
-                print(f"  Không tìm thấy tài liệu nào cho {product_code}")
+                logger.warning(f"  Không tìm thấy tài liệu nào cho {product_code}")
                 with result_lock:
                     failed_products += 1
                     product_results[product_code] = {
@@ -2208,34 +1757,32 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
                     }
                 return None
             
-            print(f"  Tìm thấy {len(document_links)} tài liệu")
+            logger.info(f"  Tìm thấy {len(document_links)} tài liệu")
             
-            # Tải tài liệu sử dụng đa luồng trong mỗi sản phẩm
+            # Đưa tài liệu vào pool tải dùng chung (không tạo pool riêng cho từng sản phẩm)
             documents = []
             failed_documents = []
             
-            # Sử dụng ThreadPoolExecutor để tải các tài liệu của sản phẩm
-            with ThreadPoolExecutor(max_workers=5) as doc_executor:
-                doc_futures = {doc_executor.submit(download_product_document, doc_link, product_folder): doc_link for doc_link in document_links}
-                
-                for future in as_completed(doc_futures):
-                    doc_link = doc_futures[future]
-                    try:
-                        result = future.result()
-                        if result['success']:
-                            documents.append(result)
-                            print(f"    ✓ Đã tải: {result['path']}")
-                        else:
-                            failed_documents.append(result)
-                            print(f"    ✗ Lỗi: {result['error']}")
-                    except Exception as e:
-                        print(f"    ✗ Lỗi khi tải tài liệu {doc_link['url']}: {str(e)}")
-                        failed_documents.append({
-                            'success': False,
-                            'error': str(e),
-                            'url': doc_link.get('url', ''),
-                            'name': doc_link.get('name', '')
-                        })
+            doc_futures = {downloader.submit(doc_link, product_folder): doc_link for doc_link in document_links}
+            
+            for future in as_completed(doc_futures):
+                doc_link = doc_futures[future]
+                try:
+                    result = future.result()
+                    if result['success']:
+                        documents.append(result)
+                        item_logger.info("    ✓ Đã tải: %s", result['path'])
+                    else:
+                        failed_documents.append(result)
+                        logger.error(f"    ✗ Lỗi: {result['error']}")
+                except Exception as e:
+                    logger.error(f"    ✗ Lỗi khi tải tài liệu {doc_link['url']}: {str(e)}")
+                    failed_documents.append({
+                        'success': False,
+                        'error': str(e),
+                        'url': doc_link.get('url', ''),
+                        'name': doc_link.get('name', '')
+                    })
             
             # Cập nhật số liệu thống kê
             successful_documents = len(documents)
@@ -2262,11 +1809,11 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
                 product_results[product_code] = product_result
             
             # In kết quả tạm thời
-            print(f"  Kết quả: {successful_documents} thành công, {failed_documents_count} thất bại")
+            logger.info(f"  Kết quả: {successful_documents} thành công, {failed_documents_count} thất bại")
             return product_result
             
         except Exception as e:
-            print(f"  Lỗi khi tải tài liệu cho {item}: {str(e)}")
+            logger.error(f"  Lỗi khi tải tài liệu cho {item}: {str(e)}")
             traceback.print_exc()
             
             with result_lock:
@@ -2301,14 +1848,17 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
             try:
                 future.result()
             except Exception as e:
-                print(f"Lỗi không mong muốn trong quá trình xử lý: {str(e)}")
+                logger.error(f"Lỗi không mong muốn trong quá trình xử lý: {str(e)}")
     
     # Tạo báo cáo tổng hợp
-    print("\n--- Kết quả tải tài liệu ---")
-    print(f"Tổng số sản phẩm: {total_products}")
-    print(f"Thành công: {successful_products}")
-    print(f"Thất bại: {failed_products}")
-    print(f"Bỏ qua: {len(skipped_codes)}")
+    logger.info("\n--- Kết quả tải tài liệu ---")
+    logger.info(f"Tổng số sản phẩm: {total_products}")
+    logger.info(f"Thành công: {successful_products}")
+    logger.info(f"Thất bại: {failed_products}")
+    logger.info(f"Bỏ qua: {len(skipped_codes)}")
+    doc_stats = downloader.stats_since(doc_stats_start)
+    logger.info(f"Tài liệu: {doc_stats['downloaded']} đã tải ({doc_stats['bytes'] / (1024 * 1024):.1f} MB), "
+                f"{doc_stats['resumed']} lần resume, {doc_stats['url_duplicates'] + doc_stats['content_duplicates']} trùng lặp")
     
     # Tạo cấu trúc báo cáo
     report = {
@@ -2324,7 +1874,7 @@ def download_product_documents(product_codes_or_urls, output_folder='output_docu
     try:
         create_documents_report(report, output_folder)
     except Exception as e:
-        print(f"Lỗi khi tạo báo cáo Excel: {str(e)}")
+        logger.error(f"Lỗi khi tạo báo cáo Excel: {str(e)}")
     
     return report
 
@@ -2486,11 +2036,11 @@ def create_documents_report(report_data, output_folder):
                 doc_cell = row[3]  # Cột 'Tài liệu đã tải' là cột thứ 4 (index 3)
                 doc_cell.alignment = openpyxl.styles.Alignment(wrapText=True, vertical='top')
         
-        print(f"Đã tạo báo cáo Excel tại: {report_path}")
+        logger.info(f"Đã tạo báo cáo Excel tại: {report_path}")
         return True
     
     except Exception as e:
-        print(f"Lỗi khi tạo báo cáo Excel: {str(e)}")
+        logger.error(f"Lỗi khi tạo báo cáo Excel: {str(e)}")
         traceback.print_exc()
         return False
 
@@ -2526,7 +2076,7 @@ def extract_product_code_from_url(url):
             
         return None
     except Exception as e:
-        print(f"Lỗi khi trích xuất mã sản phẩm: {str(e)}")
+        logger.error(f"Lỗi khi trích xuất mã sản phẩm: {str(e)}")
         return None
 
 def standardize_product_code(code):
@@ -2568,7 +2118,7 @@ def download_baa_product_images(url_file, output_folder):
         urls = [line.strip() for line in f.readlines() if line.strip()]
     
     total_urls = len(urls)
-    print(f"Tổng số URL cần xử lý: {total_urls}")
+    logger.info(f"Tổng số URL cần xử lý: {total_urls}")
     
     # Đếm số URL đã xử lý và số lượng thành công
     processed_count = 0
@@ -2582,7 +2132,7 @@ def download_baa_product_images(url_file, output_folder):
     def process_url(url, index):
         nonlocal processed_count, success_count
         
-        print(f"[{index}/{total_urls}] Đang xử lý: {url}")
+        item_logger.info("[%s/%s] Đang xử lý: %s", index, total_urls, url)
         try:
             # Tải nội dung trang
             headers = {
@@ -2596,7 +2146,7 @@ def download_baa_product_images(url_file, output_folder):
                     response.raise_for_status()
                     break
                 except (requests.RequestException, Exception) as e:
-                    print(f"  > Lỗi khi tải trang ({attempt+1}/3): {str(e)}")
+                    logger.info(f"  > Lỗi khi tải trang ({attempt+1}/3): {str(e)}")
                     if attempt == 2:  # Lần thử cuối cùng
                         raise
                     time.sleep(2)
@@ -2611,40 +2161,40 @@ def download_baa_product_images(url_file, output_folder):
                 product_code_element = soup.select_one('span.product__symbol__value')
                 if product_code_element:
                     product_code = product_code_element.get_text(strip=True)
-                    print(f"  > Trích xuất mã sản phẩm từ span.product__symbol__value: {product_code}")
+                    logger.info(f"  > Trích xuất mã sản phẩm từ span.product__symbol__value: {product_code}")
                 else:
                     # Hoặc trích xuất từ URL nếu không tìm thấy trong trang
                     if "_" in url:
                         product_code = url.split('_')[-1].split('/')[-1]
                     else:
                         product_code = url.split('/')[-1]
-                    print(f"  > Trích xuất mã sản phẩm từ URL: {product_code}")
+                    logger.info(f"  > Trích xuất mã sản phẩm từ URL: {product_code}")
             except Exception as e:
-                print(f"  > Lỗi khi trích xuất mã sản phẩm: {str(e)}")
+                logger.info(f"  > Lỗi khi trích xuất mã sản phẩm: {str(e)}")
                 # Sử dụng URL làm mã sản phẩm trong trường hợp lỗi
                 product_code = url.split('/')[-1]
             
-            print(f"  > Mã sản phẩm: {product_code}")
+            logger.info(f"  > Mã sản phẩm: {product_code}")
             
             # Tìm ảnh sản phẩm
             image_url = None
             
             # Thử tìm ảnh từ div.modal-body-image với các class cụ thể
-            print(f"  > Đang tìm div.modal-body-image với các class")
+            logger.info(f"  > Đang tìm div.modal-body-image với các class")
             modal_div = soup.select_one('div.modal-body-image.position-absolute.w-100.h-100.d-none.active')
             if modal_div:
-                print(f"  > Tìm thấy div.modal-body-image.position-absolute.w-100.h-100.d-none.active")
+                logger.info(f"  > Tìm thấy div.modal-body-image.position-absolute.w-100.h-100.d-none.active")
                 # Trích xuất URL ảnh từ thuộc tính style
                 style = modal_div.get('style', '')
                 if 'background-image' in style:
                     image_url_match = re.search(r'url\([\'"]?(.*?)[\'"]?\)', style)
                     if image_url_match:
                         image_url = image_url_match.group(1)
-                        print(f"  > Trích xuất được URL ảnh từ style: {image_url}")
+                        logger.info(f"  > Trích xuất được URL ảnh từ style: {image_url}")
             
             # Nếu không tìm được từ selector cụ thể, thử tìm bất kỳ div.modal-body-image nào
             if not image_url:
-                print(f"  > Không tìm thấy div với class đầy đủ, thử tìm bất kỳ div.modal-body-image nào")
+                logger.info(f"  > Không tìm thấy div với class đầy đủ, thử tìm bất kỳ div.modal-body-image nào")
                 modal_divs = soup.select('div.modal-body-image')
                 for div in modal_divs:
                     style = div.get('style', '')
@@ -2652,22 +2202,22 @@ def download_baa_product_images(url_file, output_folder):
                         image_url_match = re.search(r'url\([\'"]?(.*?)[\'"]?\)', style)
                         if image_url_match:
                             image_url = image_url_match.group(1)
-                            print(f"  > Trích xuất được URL ảnh từ div.modal-body-image: {image_url}")
+                            logger.info(f"  > Trích xuất được URL ảnh từ div.modal-body-image: {image_url}")
                             break
             
             # Nếu không tìm thấy từ div.modal-body-image, thử tìm từ img.btn-image-view-360
             if not image_url:
-                print(f"  > Không tìm thấy ảnh từ div.modal-body-image, thử tìm từ img.btn-image-view-360")
+                logger.info(f"  > Không tìm thấy ảnh từ div.modal-body-image, thử tìm từ img.btn-image-view-360")
                 img_element = soup.select_one('img.btn-image-view-360')
                 if img_element:
                     image_url = img_element.get('src')
                     # Thay đổi kích thước ảnh (từ nhỏ sang lớn)
                     image_url = image_url.replace('/s/', '/l/')
-                    print(f"  > Tìm thấy ảnh từ img.btn-image-view-360: {image_url}")
+                    logger.info(f"  > Tìm thấy ảnh từ img.btn-image-view-360: {image_url}")
             
             # Thử tìm từ các img khác
             if not image_url:
-                print(f"  > Không tìm thấy ảnh từ selector cụ thể, tìm ảnh đầu tiên phù hợp")
+                logger.info(f"  > Không tìm thấy ảnh từ selector cụ thể, tìm ảnh đầu tiên phù hợp")
                 img_elements = soup.select('img.img-fluid')
                 for img in img_elements:
                     src = img.get('src')
@@ -2675,12 +2225,12 @@ def download_baa_product_images(url_file, output_folder):
                         image_url = src
                         # Thay đổi kích thước ảnh (từ nhỏ sang lớn)
                         image_url = image_url.replace('/s/', '/l/')
-                        print(f"  > Tìm thấy ảnh từ img.img-fluid: {image_url}")
+                        logger.info(f"  > Tìm thấy ảnh từ img.img-fluid: {image_url}")
                         break
             
             # Nếu vẫn không tìm thấy, thử tìm bất kỳ ảnh nào
             if not image_url:
-                print(f"  > Không tìm thấy ảnh từ các selector cụ thể, tìm bất kỳ ảnh nào")
+                logger.info(f"  > Không tìm thấy ảnh từ các selector cụ thể, tìm bất kỳ ảnh nào")
                 img_elements = soup.select('img')
                 for img in img_elements:
                     src = img.get('src')
@@ -2688,7 +2238,7 @@ def download_baa_product_images(url_file, output_folder):
                         image_url = src
                         # Thay đổi kích thước ảnh (từ nhỏ sang lớn)
                         image_url = image_url.replace('/s/', '/l/')
-                        print(f"  > Tìm thấy ảnh: {image_url}")
+                        logger.info(f"  > Tìm thấy ảnh: {image_url}")
                         break
             
             result = {
@@ -2717,7 +2267,7 @@ def download_baa_product_images(url_file, output_folder):
                     image_path = os.path.join(output_folder, image_filename)
                     
                     # Tải ảnh
-                    print(f"  > Đang tải ảnh từ: {image_url}")
+                    logger.info(f"  > Đang tải ảnh từ: {image_url}")
                     for attempt in range(3):
                         try:
                             img_response = requests.get(image_url, headers=headers, timeout=30)
@@ -2727,7 +2277,7 @@ def download_baa_product_images(url_file, output_folder):
                             img = Image.open(BytesIO(img_response.content))
                             img.save(image_path, 'WEBP', quality=90)
                             
-                            print(f"  > Đã lưu ảnh: {image_path}")
+                            logger.info(f"  > Đã lưu ảnh: {image_path}")
                             result['Trạng thái'] = 'Thành công'
                             result['Ảnh sản phẩm'] = image_filename
                             
@@ -2735,17 +2285,17 @@ def download_baa_product_images(url_file, output_folder):
                                 success_count += 1
                             break
                         except (requests.RequestException, Exception) as e:
-                            print(f"  > Lỗi khi tải ảnh ({attempt+1}/3): {str(e)}")
+                            logger.info(f"  > Lỗi khi tải ảnh ({attempt+1}/3): {str(e)}")
                             if attempt == 2:  # Lần thử cuối cùng
                                 result['Trạng thái'] = 'Lỗi'
                                 result['Lỗi'] = f"Không thể tải ảnh: {str(e)}"
                             time.sleep(2)
                 except Exception as e:
-                    print(f"  > Lỗi khi xử lý ảnh: {str(e)}")
+                    logger.info(f"  > Lỗi khi xử lý ảnh: {str(e)}")
                     result['Trạng thái'] = 'Lỗi'
                     result['Lỗi'] = f"Lỗi xử lý ảnh: {str(e)}"
             else:
-                print(f"  > Không tìm thấy ảnh sản phẩm")
+                logger.info(f"  > Không tìm thấy ảnh sản phẩm")
                 result['Trạng thái'] = 'Lỗi'
                 result['Lỗi'] = 'Không tìm thấy ảnh sản phẩm'
             
@@ -2758,7 +2308,7 @@ def download_baa_product_images(url_file, output_folder):
             return result
             
         except Exception as e:
-            print(f"  > Lỗi khi xử lý URL {url}: {str(e)}")
+            logger.info(f"  > Lỗi khi xử lý URL {url}: {str(e)}")
             error_result = {
                 'URL': url,
                 'Mã sản phẩm': 'Không xác định',
@@ -2786,56 +2336,21 @@ def download_baa_product_images(url_file, output_folder):
             try:
                 future.result()
             except Exception as e:
-                print(f"Lỗi không mong muốn khi xử lý {url}: {str(e)}")
+                logger.error(f"Lỗi không mong muốn khi xử lý {url}: {str(e)}")
     
     # Tạo báo cáo Excel
     report_file = os.path.join(output_folder, 'baa_images_report.xlsx')
     create_image_report(results, report_file)
-    print(f"Đã tạo báo cáo: {report_file}")
+    logger.info(f"Đã tạo báo cáo: {report_file}")
     
     # Tạo file ZIP
     zip_file = f"{output_folder}.zip"
     create_zip_from_folder(output_folder, zip_file)
-    print(f"Đã tạo file ZIP: {zip_file}")
+    logger.info(f"Đã tạo file ZIP: {zip_file}")
     
     # Trả về đường dẫn đến file ZIP
     return zip_file
 
-def resize_image_to_square(image, size=800):
-    """
-    Thay đổi kích thước ảnh thành hình vuông có kích thước được chỉ định
-    
-    Args:
-        image (PIL.Image): Đối tượng ảnh Pillow
-        size (int): Kích thước mong muốn cho ảnh vuông
-        
-    Returns:
-        PIL.Image: Ảnh đã được thay đổi kích thước thành hình vuông
-    """
-    # Lấy kích thước ảnh gốc
-    width, height = image.size
-    
-    # Tạo ảnh vuông mới với nền trắng
-    square_img = Image.new('RGBA' if image.mode == 'RGBA' else 'RGB', (size, size), (255, 255, 255))
-    
-    # Tính toán tỷ lệ để giữ nguyên tỷ lệ khung hình gốc
-    if width > height:
-        new_width = size
-        new_height = int(height * size / width)
-        resized_img = image.resize((new_width, new_height), Image.LANCZOS)
-        # Căn giữa theo chiều dọc
-        paste_y = (size - new_height) // 2
-        square_img.paste(resized_img, (0, paste_y))
-    else:
-        new_height = size
-        new_width = int(width * size / height)
-        resized_img = image.resize((new_width, new_height), Image.LANCZOS)
-        # Căn giữa theo chiều ngang
-        paste_x = (size - new_width) // 2
-        square_img.paste(resized_img, (paste_x, 0))
-    
-    return square_img
-
 def download_baa_product_images_fixed(product_urls, output_folder=None, create_report=True):
     try:
         # Chuyển đổi input thành list nếu nhận được string
@@ -2850,7 +2365,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
         # Đảm bảo thư mục output tồn tại
         os.makedirs(output_folder, exist_ok=True)
         
-        print(f"Thư mục lưu ảnh: {output_folder}")
+        logger.info(f"Thư mục lưu ảnh: {output_folder}")
         
         # Khởi tạo kết quả trả về
         results = {
@@ -2868,7 +2383,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
         # Hàm xử lý cho mỗi URL sản phẩm
         def process_product_url(url, i):
             if len(product_urls) > 1:  # Chỉ in tiến độ khi có nhiều hơn 1 URL
-                print(f"\n[{i}/{len(product_urls)}] Đang xử lý URL: {url}")
+                logger.info(f"\n[{i}/{len(product_urls)}] Đang xử lý URL: {url}")
             
             # Khởi tạo dữ liệu báo cáo cho URL này
             report_item = {
@@ -2887,7 +2402,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
             try:
                 # Lấy nội dung trang sản phẩm
                 headers = get_random_headers()
-                response = requests.get(url, headers=headers, timeout=30)
+                response = http_session.get(url, headers=headers, timeout=30)
                 response.raise_for_status()
                 
                 # Sử dụng hàm trích xuất URL ảnh và mã sản phẩm từ HTML
@@ -2899,19 +2414,19 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                 if product_symbol and product_symbol.text.strip():
                     product_code = product_symbol.text.strip()
                     if len(product_urls) == 1:  # Chỉ in chi tiết khi xử lý 1 URL
-                        print(f"  ✓ Tìm thấy mã sản phẩm từ span.product__symbol__value: {product_code}")
+                        item_logger.info("  ✓ Tìm thấy mã sản phẩm từ span.product__symbol__value: %s", product_code)
                 
                 # Ưu tiên sử dụng mã sản phẩm từ HTML
                 if product_code:
                     original_product_code = product_code
                     if len(product_urls) == 1:
-                        print(f"  ✓ Sử dụng mã sản phẩm từ HTML: {product_code}")
+                        item_logger.info("  ✓ Sử dụng mã sản phẩm từ HTML: %s", product_code)
                 else:
                     # Nếu không tìm được mã từ HTML, thử trích xuất từ URL
                     product_code = extract_product_code_from_url(url)
                     original_product_code = product_code
                     if len(product_urls) == 1:
-                        print(f"  ✓ Sử dụng mã sản phẩm từ URL: {product_code}")
+                        item_logger.info("  ✓ Sử dụng mã sản phẩm từ URL: %s", product_code)
                 
                 # Chuẩn hóa mã sản phẩm cho tên file - thay thế các ký tự đặc biệt
                 if product_code:
@@ -2941,7 +2456,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                                 if '800' in src:
                                     img_url = src
                                     if len(product_urls) == 1:
-                                        print(f"  ✓ Tìm thấy ảnh 800px từ modal-body-image.active: {img_url}")
+                                        item_logger.info("  ✓ Tìm thấy ảnh 800px từ modal-body-image.active: %s", img_url)
                                     break
                                 else:
                                     # Nếu không có kích thước 800, thử chuyển đổi
@@ -2952,7 +2467,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                                         folder_id = match.group(2)    # ID thư mục (ví dụ: 274)
                                         img_url = re.sub(pattern, f'/{type_folder}/{folder_id}/800/', src)
                                         if len(product_urls) == 1:
-                                            print(f"  ✓ Chuyển đổi ảnh từ modal-body-image.active sang kích thước 800px: {img_url}")
+                                            item_logger.info("  ✓ Chuyển đổi ảnh từ modal-body-image.active sang kích thước 800px: %s", img_url)
                                         break
                 
                 # PHƯƠNG PHÁP 2: Tìm trong div.modal-body__view-image
@@ -2966,7 +2481,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                                 if '800' in src:
                                     img_url = src
                                     if len(product_urls) == 1:
-                                        print(f"  ✓ Tìm thấy ảnh 800px từ div.modal-body__view-image: {img_url}")
+                                        item_logger.info("  ✓ Tìm thấy ảnh 800px từ div.modal-body__view-image: %s", img_url)
                                     break
                                 else:
                                     # Nếu không có kích thước 800, thử chuyển đổi
@@ -2977,7 +2492,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                                         folder_id = match.group(2)    # ID thư mục (ví dụ: 274)
                                         img_url = re.sub(pattern, f'/{type_folder}/{folder_id}/800/', src)
                                         if len(product_urls) == 1:
-                                            print(f"  ✓ Chuyển đổi ảnh từ div.modal-body__view-image sang kích thước 800px: {img_url}")
+                                            item_logger.info("  ✓ Chuyển đổi ảnh từ div.modal-body__view-image sang kích thước 800px: %s", img_url)
                                         break
                 
                 # PHƯƠNG PHÁP 3: Nếu không tìm thấy, lấy từ img.btn-image-view-360 và chuyển sang 800
@@ -2994,11 +2509,11 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                                 folder_id = match.group(2)    # ID thư mục (ví dụ: 274)
                                 img_url = re.sub(pattern, f'/{type_folder}/{folder_id}/800/', src)
                                 if len(product_urls) == 1:
-                                    print(f"  ✓ Chuyển đổi ảnh từ img.btn-image-view-360 sang kích thước 800px: {img_url}")
+                                    item_logger.info("  ✓ Chuyển đổi ảnh từ img.btn-image-view-360 sang kích thước 800px: %s", img_url)
                             else:
                                 img_url = src
                                 if len(product_urls) == 1:
-                                    print(f"  ✓ Tìm thấy ảnh từ img.btn-image-view-360: {img_url}")
+                                    item_logger.info("  ✓ Tìm thấy ảnh từ img.btn-image-view-360: %s", img_url)
                 
                 # PHƯƠNG PHÁP 4: Nếu vẫn không tìm thấy, thử og:image
                 if not img_url:
@@ -3014,10 +2529,10 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                                 folder_id = match.group(2)    # ID thư mục (ví dụ: 274)
                                 img_url = re.sub(pattern, f'/{type_folder}/{folder_id}/800/', img_url)
                                 if len(product_urls) == 1:
-                                    print(f"  ✓ Chuyển đổi ảnh từ og:image sang kích thước 800px: {img_url}")
+                                    item_logger.info("  ✓ Chuyển đổi ảnh từ og:image sang kích thước 800px: %s", img_url)
                         else:
                             if len(product_urls) == 1:
-                                print(f"  ✓ Tìm thấy ảnh từ og:image: {img_url}")
+                                item_logger.info("  ✓ Tìm thấy ảnh từ og:image: %s", img_url)
                 
                 # Nếu không tìm thấy ảnh nào, thông báo thất bại
                 if not img_url:
@@ -3027,7 +2542,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                     with result_lock:
                         results['report_data'].append(report_item)
                     if len(product_urls) == 1:
-                        print(f"  ✗ Không tìm thấy ảnh cho URL: {url}")
+                        logger.info(f"  ✗ Không tìm thấy ảnh cho URL: {url}")
                     return report_item
                 
                 # Chuẩn hóa URL ảnh
@@ -3040,40 +2555,24 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                     img_url = urljoin(base_url, img_url)
                 
                 if len(product_urls) == 1:
-                    print(f"  → Lưu ảnh vào thư mục: {output_folder}")
+                    logger.info(f"  → Lưu ảnh vào thư mục: {output_folder}")
                 
-                # Thử tải ảnh - giữ nguyên định dạng ảnh
-                try:
-                    # Tạo tên file ảnh dựa trên mã sản phẩm 
-                    img_filename = f"{product_code}.webp"
-                    img_path = os.path.join(output_folder, img_filename)
-                    
-                    if len(product_urls) == 1:
-                        print(f"  → Đang tải ảnh: {img_url}")
-                    
-                    # Tải ảnh
-                    img_response = requests.get(img_url, headers=headers, timeout=15)
-                    img_response.raise_for_status()
-                    
-                    # Kiểm tra MIME type
-                    content_type = img_response.headers.get('Content-Type', '')
-                    if not content_type.startswith('image/'):
-                        raise ValueError(f"Không phải file ảnh: {content_type}")
-                    
-                    # Xử lý ảnh
-                    img = Image.open(BytesIO(img_response.content))
-                    img = img.convert("RGB")
-                    
-                    # Resize ảnh về kích thước vuông 800x800
-                    img = resize_image_to_square(img, 800)
-                    
-                    # Lưu thông tin kích thước ảnh
-                    img_size = f"{img.width}x{img.height}"
-                    
-                    # Lưu ảnh dưới dạng WebP với chất lượng cao
-                    img.save(img_path, 'WEBP', quality=95)
-                    
-                    # Cập nhật kết quả
+                # Tải ảnh qua pipeline dùng chung: vuông 800x800 nền trắng, WebP chất lượng cao
+                # (nếu ảnh 800px trả về 404 thì thử ảnh 300px)
+                img_filename = f"{product_code}.webp"
+                img_path = os.path.join(output_folder, img_filename)
+                
+                if len(product_urls) == 1:
+                    logger.info(f"  → Đang tải ảnh: {img_url}")
+                
+                fallback_urls = [re.sub(r'/800/', '/300/', img_url)] if '800' in img_url else []
+                image_result = get_image_pipeline().process(ImageJob(
+                    img_url, img_path, resize=RESIZE_FIT, target_size=(800, 800), format='WEBP', quality=95,
+                    fallback_urls=fallback_urls, headers=headers, skip_existing=False
+                ))
+                
+                if image_result['success']:
+                    img_size = f"{image_result['width']}x{image_result['height']}"
                     with result_lock:
                         results['success'] += 1
                         results['image_paths'].append(img_path)
@@ -3082,61 +2581,13 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                     report_item['Kích thước ảnh'] = img_size
                     
                     if len(product_urls) == 1:
-                        print(f"  ✓ Đã lưu: {img_filename} ({img_size})")
-                    
-                except requests.exceptions.HTTPError as e:
-                    # Nếu lỗi 404 với ảnh 800px, thử với 300px
-                    if '404' in str(e) and '800' in img_url:
-                        try:
-                            # Thử lại với kích thước 300px
-                            img_url_300 = re.sub(r'/800/', '/300/', img_url)
-                            if len(product_urls) == 1:
-                                print(f"  → Thử lại với ảnh kích thước 300px: {img_url_300}")
-                            
-                            # Tải ảnh kích thước 300px
-                            img_response = requests.get(img_url_300, headers=headers, timeout=15)
-                            img_response.raise_for_status()
-                            
-                            # Kiểm tra MIME type
-                            content_type = img_response.headers.get('Content-Type', '')
-                            if not content_type.startswith('image/'):
-                                raise ValueError(f"Không phải file ảnh: {content_type}")
-                            
-                            # Xử lý ảnh
-                            img = Image.open(BytesIO(img_response.content))
-                            img = img.convert("RGB")
-                            
-                            # Lưu thông tin kích thước ảnh
-                            img_size = f"{img.width}x{img.height}"
-                            
-                            # Lưu ảnh dưới dạng WebP với chất lượng cao
-                            img.save(img_path, 'WEBP', quality=95)
-                            
-                            # Cập nhật kết quả
-                            with result_lock:
-                                results['success'] += 1
-                                results['image_paths'].append(img_path)
-                            report_item['Trạng thái'] = 'Thành công'
-                            report_item['Đường dẫn ảnh'] = img_path
-                            report_item['Kích thước ảnh'] = img_size
-                            
-                            if len(product_urls) == 1:
-                                print(f"  ✓ Đã lưu ảnh kích thước 300px: {img_filename} ({img_size})")
-                        except Exception as inner_e:
-                            with result_lock:
-                                results['failed'] += 1
-                            report_item['Lý do lỗi'] = f"Lỗi khi tải ảnh: {str(e)} và {str(inner_e)}"
-                    else:
-                        with result_lock:
-                            results['failed'] += 1
-                        report_item['Lý do lỗi'] = f"Lỗi HTTP: {str(e)}"
-                
-                except Exception as e:
+                        item_logger.info("  ✓ Đã lưu: %s (%s)", img_filename, img_size)
+                else:
                     if len(product_urls) == 1:
-                        print(f"  ✗ Lỗi khi tải ảnh: {str(e)}")
+                        logger.error(f"  ✗ Lỗi khi tải ảnh: {image_result.get('error')}")
                     with result_lock:
                         results['failed'] += 1
-                    report_item['Lý do lỗi'] = f"Lỗi khi tải ảnh: {str(e)}"
+                    report_item['Lý do lỗi'] = f"Lỗi khi tải ảnh: {image_result.get('error')}"
                 
                 # Thêm vào dữ liệu báo cáo
                 with result_lock:
@@ -3154,7 +2605,7 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                 with result_lock:
                     results['report_data'].append(report_item)
                 if len(product_urls) == 1:
-                    print(f"Lỗi khi xử lý URL {url}: {str(e)}")
+                    logger.error(f"Lỗi khi xử lý URL {url}: {str(e)}")
                 traceback.print_exc()
                 return report_item
         
@@ -3168,12 +2619,12 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                 try:
                     future.result()
                 except Exception as e:
-                    print(f"Lỗi không xử lý được: {str(e)}")
+                    logger.error(f"Lỗi không xử lý được: {str(e)}")
         
         # Tạo báo cáo Excel chỉ khi được yêu cầu
         if create_report and len(product_urls) > 1:  # Chỉ tạo báo cáo khi xử lý nhiều URL
             try:
-                print("\nĐang tạo báo cáo Excel...")
+                logger.info("\nĐang tạo báo cáo Excel...")
                 
                 # Tạo DataFrame từ dữ liệu báo cáo
                 df = pd.DataFrame(results['report_data'])
@@ -3232,17 +2683,17 @@ def download_baa_product_images_fixed(product_urls, output_folder=None, create_r
                 
                 # Thêm đường dẫn file báo cáo vào kết quả
                 results['report_file'] = report_path
-                print(f"Đã tạo báo cáo Excel: {report_path}")
+                logger.info(f"Đã tạo báo cáo Excel: {report_path}")
                 
             except Exception as e:
-                print(f"Lỗi khi tạo báo cáo Excel: {str(e)}")
+                logger.error(f"Lỗi khi tạo báo cáo Excel: {str(e)}")
                 traceback.print_exc()
         
         # Trả về kết quả
         return results
         
     except Exception as e:
-        print(f"Lỗi trong quá trình tải ảnh: {str(e)}")
+        logger.error(f"Lỗi trong quá trình tải ảnh: {str(e)}")
         traceback.print_exc()
         return {
             'total': len(product_urls) if isinstance(product_urls, list) else 1, 
@@ -3273,13 +2724,13 @@ def extract_baa_image_url_from_html(html_content):
                 # Chuyển đổi URL sang kích thước lớn
                 full_url = convert_to_large_image_url(img_url)
                 image_urls.append(full_url)
-                print(f"Đã tìm thấy ảnh chính: {full_url}")
+                logger.info(f"Đã tìm thấy ảnh chính: {full_url}")
         
         # Tìm mã sản phẩm
         product_code_element = soup.select_one('.product__symbol__value')
         if product_code_element:
             product_code = product_code_element.text.strip()
-            print(f"Mã sản phẩm: {product_code}")
+            logger.info(f"Mã sản phẩm: {product_code}")
         
         return {
             'image_urls': image_urls,
@@ -3287,7 +2738,7 @@ def extract_baa_image_url_from_html(html_content):
         }
         
     except Exception as e:
-        print(f"Lỗi khi trích xuất URL ảnh: {str(e)}")
+        logger.error(f"Lỗi khi trích xuất URL ảnh: {str(e)}")
         return {'image_urls': [], 'product_code': None}
 
 def clean_price(price_str):
@@ -3333,7 +2784,7 @@ def extract_product_price(url, index=1):
     Returns:
         dict: Thông tin mã và giá sản phẩm
     """
-    print(f"Đang trích xuất giá từ {url}")
+    logger.info(f"Đang trích xuất giá từ {url}")
     
     # Số lần thử tối đa
     max_retries = 3
@@ -3400,7 +2851,7 @@ def extract_product_price(url, index=1):
                                 product_code = code_match.group(1)
             
             if product_code:
-                print(f"Mã sản phẩm: {product_code}")
+                logger.info(f"Mã sản phẩm: {product_code}")
                 product_info['Mã sản phẩm'] = product_code
             
             # ------ PHẦN XỬ LÝ GIÁ SẢN PHẨM ------
@@ -3439,9 +2890,9 @@ def extract_product_price(url, index=1):
                         
                         # Định dạng giá cuối cùng
                         product_info['Giá'] = formatted_price + price_unit
-                        print(f"Giá từ data-root: {product_info['Giá']}")
+                        logger.info(f"Giá từ data-root: {product_info['Giá']}")
                     except ValueError as e:
-                        print(f"Lỗi khi xử lý giá từ data-root: {str(e)}")
+                        logger.error(f"Lỗi khi xử lý giá từ data-root: {str(e)}")
             
             # 2. NẾU KHÔNG TÌM THẤY: Tìm giá từ các vị trí thông thường
             if not product_info['Giá']:
@@ -3473,7 +2924,7 @@ def extract_product_price(url, index=1):
                         else:
                             product_info['Giá'] = product_price
                         
-                        print(f"Giá sản phẩm: {product_info['Giá']}")
+                        logger.info(f"Giá sản phẩm: {product_info['Giá']}")
                         break
             
             # 3. KIỂM TRA LẠI: Nếu vẫn không tìm thấy, tìm bất kỳ phần tử nào có thuộc tính data-root
@@ -3486,7 +2937,7 @@ def extract_product_price(url, index=1):
                             try:
                                 price_value = int(data_root)
                                 product_info['Giá'] = f"{price_value:,}₫".replace(",", ".")
-                                print(f"Giá từ data-root (phương pháp 3): {product_info['Giá']}")
+                                logger.info(f"Giá từ data-root (phương pháp 3): {product_info['Giá']}")
                                 break
                             except ValueError:
                                 continue
@@ -3499,12 +2950,12 @@ def extract_product_price(url, index=1):
             
         except requests.exceptions.RequestException as e:
             current_retry += 1
-            print(f"Lỗi tải trang (lần thử {current_retry}): {str(e)}")
+            logger.error(f"Lỗi tải trang (lần thử {current_retry}): {str(e)}")
             if current_retry < max_retries:
-                print(f"Thử lại trong 3 giây...")
+                logger.info(f"Thử lại trong 3 giây...")
                 time.sleep(3)
             else:
-                print(f"Đã thử {max_retries} lần, bỏ qua URL {url}")
+                logger.info(f"Đã thử {max_retries} lần, bỏ qua URL {url}")
     
     # Trả về dữ liệu tối thiểu nếu không thể tải trang
     return {
@@ -3531,7 +2982,7 @@ def extract_product_documents(product_url_or_code):
     cache_key = str(product_url_or_code).strip().lower()
     static_cache = getattr(extract_product_documents, 'cache', {})
     if cache_key in static_cache:
-        print(f"Lấy kết quả từ cache cho: {product_url_or_code}")
+        logger.info(f"Lấy kết quả từ cache cho: {product_url_or_code}")
         return static_cache[cache_key]
     
     try:
@@ -3541,17 +2992,17 @@ def extract_product_documents(product_url_or_code):
         # Nếu là URL, sử dụng trực tiếp
         if isinstance(product_url_or_code, str) and product_url_or_code.startswith('http'):
             product_url = product_url_or_code
-            print(f"Sử dụng URL trực tiếp: {product_url}")
+            logger.info(f"Sử dụng URL trực tiếp: {product_url}")
         else:
             # Nếu là mã sản phẩm, tìm URL tương ứng
             product_url = get_product_url(product_url_or_code)
             if not product_url:
-                print(f"Không tìm thấy URL sản phẩm cho mã: {product_url_or_code}")
+                logger.warning(f"Không tìm thấy URL sản phẩm cho mã: {product_url_or_code}")
                 static_cache[cache_key] = []
                 return []
         
         # 2. Tải trang sản phẩm với timeout tăng lên 60 giây
-        print(f"Đang tải trang sản phẩm: {product_url}")
+        item_logger.info("Đang tải trang sản phẩm: %s", product_url)
         
         # Tạo session với User-Agent giống trình duyệt
         session = requests.Session()
@@ -3594,7 +3045,7 @@ def extract_product_documents(product_url_or_code):
                     'url': href,
                     'name': name
                 })
-                print(f"Đã tìm thấy link tải tài liệu (#Link_download): {name} - {href}")
+                logger.info(f"Đã tìm thấy link tải tài liệu (#Link_download): {name} - {href}")
         
         # b. Tìm .feature__metadata__link--download
         feature_links = product_soup.select('.feature__metadata__link--download[href$=".pdf"], span.feature__metadata__link--download')
@@ -3631,7 +3082,7 @@ def extract_product_documents(product_url_or_code):
                     'url': href,
                     'name': name
                 })
-                print(f"Đã tìm thấy link tải tài liệu (.feature__metadata__link--download): {name} - {href}")
+                logger.info(f"Đã tìm thấy link tải tài liệu (.feature__metadata__link--download): {name} - {href}")
         
         # c. Tìm kiếm trong các bảng có chứa liên kết tài liệu
         catalog_tables = product_soup.select('.product-tab-content table, .tab-content table')
@@ -3660,7 +3111,7 @@ def extract_product_documents(product_url_or_code):
                             'url': href,
                             'name': name
                         })
-                        print(f"Đã tìm thấy link tải tài liệu (tìm trong bảng): {name} - {href}")
+                        logger.info(f"Đã tìm thấy link tải tài liệu (tìm trong bảng): {name} - {href}")
         
         # d. Kiểm tra tất cả các link có chứa PDF
         all_pdf_links = product_soup.select('a[href$=".pdf"]')
@@ -3679,7 +3130,7 @@ def extract_product_documents(product_url_or_code):
                     'url': href,
                     'name': name
                 })
-                print(f"Đã tìm thấy link PDF khác: {name} - {href}")
+                logger.info(f"Đã tìm thấy link PDF khác: {name} - {href}")
         
         # 4. Loại bỏ các link trùng lặp
         unique_links = []
@@ -3690,7 +3141,7 @@ def extract_product_documents(product_url_or_code):
                 added_urls.add(link['url'])
                 unique_links.append(link)
         
-        print(f"Tìm thấy {len(unique_links)} tài liệu PDF không trùng lặp")
+        logger.info(f"Tìm thấy {len(unique_links)} tài liệu PDF không trùng lặp")
         
         # Lưu vào cache
         static_cache[cache_key] = unique_links
@@ -3698,7 +3149,7 @@ def extract_product_documents(product_url_or_code):
         return unique_links
     
     except Exception as e:
-        print(f"Lỗi khi trích xuất tài liệu từ {product_url_or_code}: {str(e)}")
+        logger.error(f"Lỗi khi trích xuất tài liệu từ {product_url_or_code}: {str(e)}")
         traceback.print_exc()
         # Khởi tạo cache nếu chưa có
         if not hasattr(extract_product_documents, 'cache'):
@@ -3713,24 +3164,24 @@ def debug_extract_products_from_url(url):
     """
     Hàm debug để kiểm tra cấu trúc HTML và trích xuất sản phẩm
     """
-    print(f"\n=== DEBUG: Phân tích URL {url} ===")
+    logger.info(f"\n=== DEBUG: Phân tích URL {url} ===")
     
     # Kiểm tra loại URL
     if is_category_url(url):
-        print("✓ Được nhận diện là URL danh mục")
+        logger.info("✓ Được nhận diện là URL danh mục")
     elif is_product_url(url):
-        print("✓ Được nhận diện là URL sản phẩm")
+        logger.info("✓ Được nhận diện là URL sản phẩm")
     else:
-        print("✗ Không được nhận diện là URL hợp lệ")
+        logger.info("✗ Không được nhận diện là URL hợp lệ")
         return []
     
     # Tải HTML
     html = get_html_content(url)
     if not html:
-        print("✗ Không thể tải HTML")
+        logger.info("✗ Không thể tải HTML")
         return []
     
-    print(f"✓ Đã tải HTML, kích thước: {len(html)} ký tự")
+    logger.info(f"✓ Đã tải HTML, kích thước: {len(html)} ký tự")
     
     # Parse HTML
     soup = BeautifulSoup(html, 'html.parser')
@@ -3738,14 +3189,14 @@ def debug_extract_products_from_url(url):
     # Debug: Hiển thị title của trang
     title = soup.select_one('title')
     if title:
-        print(f"✓ Title trang: {title.get_text(strip=True)}")
+        logger.info(f"✓ Title trang: {title.get_text(strip=True)}")
     
     # Debug: Kiểm tra các class và ID chính
-    print("\n--- PHÂN TÍCH CẤU TRÚC HTML ---")
+    logger.info("\n--- PHÂN TÍCH CẤU TRÚC HTML ---")
     
     # Tìm các div chính có thể chứa sản phẩm
     main_containers = soup.select('div[class*="product"], div[class*="item"], div[class*="card"], .row, .container')
-    print(f"Tìm thấy {len(main_containers)} container có thể chứa sản phẩm")
+    logger.info(f"Tìm thấy {len(main_containers)} container có thể chứa sản phẩm")
     
     # Debug: Hiển thị một số class phổ biến
     common_classes = set()
@@ -3755,7 +3206,7 @@ def debug_extract_products_from_url(url):
                 common_classes.add(cls)
     
     if common_classes:
-        print(f"Các class phổ biến liên quan: {', '.join(sorted(common_classes)[:10])}")
+        logger.info(f"Các class phổ biến liên quan: {', '.join(sorted(common_classes)[:10])}")
     
     # Thử các selector khác nhau
     selectors_to_try = [
@@ -3789,8 +3240,8 @@ def debug_extract_products_from_url(url):
     
     for selector, description in selectors_to_try:
         elements = soup.select(selector)
-        print(f"\n--- {description} ({selector}) ---")
-        print(f"Tìm thấy {len(elements)} phần tử")
+        logger.info(f"\n--- {description} ({selector}) ---")
+        logger.info(f"Tìm thấy {len(elements)} phần tử")
         
         # Xử lý đặc biệt cho img[alt]
         if selector == 'img[alt]':
@@ -3813,9 +3264,9 @@ def debug_extract_products_from_url(url):
                         if is_product:
                             product_links.append(full_url)
                         
-                        print(f"  [IMG] {full_url[:80]}{'...' if len(full_url) > 80 else ''}")
-                        print(f"        Alt: {alt_text}")
-                        print(f"        Is Product: {'✓' if is_product else '✗'}")
+                        logger.info(f"  [IMG] {full_url[:80]}{'...' if len(full_url) > 80 else ''}")
+                        logger.info(f"        Alt: {alt_text}")
+                        logger.info(f"        Is Product: {'✓' if is_product else '✗'}")
         else:
             for i, element in enumerate(elements[:5]):  # Chỉ hiển thị 5 phần tử đầu
                 href = element.get('href', '')
@@ -3834,19 +3285,19 @@ def debug_extract_products_from_url(url):
                     if is_product:
                         product_links.append(full_url)
                     
-                    print(f"  [{i+1}] {full_url[:80]}{'...' if len(full_url) > 80 else ''}")
-                    print(f"      Text: {text}")
-                    print(f"      Is Product: {'✓' if is_product else '✗'}")
+                    logger.info(f"  [{i+1}] {full_url[:80]}{'...' if len(full_url) > 80 else ''}")
+                    logger.info(f"      Text: {text}")
+                    logger.info(f"      Is Product: {'✓' if is_product else '✗'}")
     
     # Debug: Hiển thị một phần HTML để phân tích
-    print(f"\n--- MẪU HTML (1000 ký tự đầu) ---")
-    print(html[:1000])
-    print("...")
+    logger.info(f"\n--- MẪU HTML (1000 ký tự đầu) ---")
+    logger.info(html[:1000])
+    logger.info("...")
     
     # Debug: Tìm tất cả các link và phân tích pattern
-    print(f"\n--- PHÂN TÍCH TẤT CẢ LINK ---")
+    logger.info(f"\n--- PHÂN TÍCH TẤT CẢ LINK ---")
     all_links = soup.select('a[href]')
-    print(f"Tổng số link trên trang: {len(all_links)}")
+    logger.info(f"Tổng số link trên trang: {len(all_links)}")
     
     # Phân loại link theo pattern
     patterns = {
@@ -3872,29 +3323,29 @@ def debug_extract_products_from_url(url):
     
     for pattern_name, links in patterns.items():
         if links:
-            print(f"Pattern '{pattern_name}': {len(links)} link")
+            logger.info(f"Pattern '{pattern_name}': {len(links)} link")
             for link in links[:3]:
-                print(f"  - {link}")
+                logger.info(f"  - {link}")
     
     # Loại bỏ trùng lặp
     unique_links = list(dict.fromkeys(all_found_links))
     unique_product_links = list(dict.fromkeys(product_links))
     
-    print(f"\n=== KẾT QUẢ DEBUG ===")
-    print(f"Tổng số link tìm thấy: {len(unique_links)}")
-    print(f"Số link sản phẩm hợp lệ: {len(unique_product_links)}")
+    logger.info(f"\n=== KẾT QUẢ DEBUG ===")
+    logger.info(f"Tổng số link tìm thấy: {len(unique_links)}")
+    logger.info(f"Số link sản phẩm hợp lệ: {len(unique_product_links)}")
     
     if unique_product_links:
-        print("\nCác URL sản phẩm hợp lệ:")
+        logger.info("\nCác URL sản phẩm hợp lệ:")
         for i, link in enumerate(unique_product_links[:10]):  # Hiển thị tối đa 10
-            print(f"  {i+1}. {link}")
+            logger.info(f"  {i+1}. {link}")
     else:
-        print("\n⚠️  KHÔNG TÌM THẤY URL SẢN PHẨM NÀO!")
-        print("Điều này có thể do:")
-        print("  1. Cấu trúc HTML của trang đã thay đổi")
-        print("  2. Selector không phù hợp với trang này")
-        print("  3. Trang không chứa sản phẩm")
-        print("  4. Cần cập nhật hàm is_product_url()")
+        logger.info("\n⚠️  KHÔNG TÌM THẤY URL SẢN PHẨM NÀO!")
+        logger.info("Điều này có thể do:")
+        logger.info("  1. Cấu trúc HTML của trang đã thay đổi")
+        logger.info("  2. Selector không phù hợp với trang này")
+        logger.info("  3. Trang không chứa sản phẩm")
+        logger.info("  4. Cần cập nhật hàm is_product_url()")
     
     return unique_product_links
 
@@ -3902,17 +3353,17 @@ def test_baa_url_direct(url="https://baa.vn/vn/Category/den-thap-led-qlight_1479
     """
     Hàm test trực tiếp với URL BAA.vn để debug
     """
-    print(f"\n=== TEST TRỰC TIẾP URL BAA.VN ===")
-    print(f"URL: {url}")
+    logger.info(f"\n=== TEST TRỰC TIẾP URL BAA.VN ===")
+    logger.info(f"URL: {url}")
     
     try:
         # Test tải HTML
         html = get_html_content(url)
         if not html:
-            print("❌ Không thể tải HTML")
+            logger.error("❌ Không thể tải HTML")
             return
         
-        print(f"✅ Đã tải HTML: {len(html)} ký tự")
+        logger.info(f"✅ Đã tải HTML: {len(html)} ký tự")
         
         # Parse HTML
         soup = BeautifulSoup(html, 'html.parser')
@@ -3920,14 +3371,14 @@ def test_baa_url_direct(url="https://baa.vn/vn/Category/den-thap-led-qlight_1479
         # Tìm title
         title = soup.select_one('title')
         if title:
-            print(f"📄 Title: {title.get_text(strip=True)}")
+            logger.info(f"📄 Title: {title.get_text(strip=True)}")
         
         # Tìm tất cả link trên trang
         all_links = soup.select('a[href]')
-        print(f"🔗 Tổng số link trên trang: {len(all_links)}")
+        logger.info(f"🔗 Tổng số link trên trang: {len(all_links)}")
         
         # Tìm các pattern URL phổ biến
-        print(f"\n--- PHÂN TÍCH PATTERN URL ---")
+        logger.info(f"\n--- PHÂN TÍCH PATTERN URL ---")
         patterns_found = {
             'vn_with_number': [],
             'san_pham': [],
@@ -3960,50 +3411,36 @@ def test_baa_url_direct(url="https://baa.vn/vn/Category/den-thap-led-qlight_1479
         # Hiển thị kết quả
         for pattern_name, urls in patterns_found.items():
             if urls:
-                print(f"\n{pattern_name.upper()}: {len(urls)} URL")
+                logger.info(f"\n{pattern_name.upper()}: {len(urls)} URL")
                 for i, link_url in enumerate(urls[:5]):  # Chỉ hiển thị 5 URL đầu
                     is_product = is_product_url(link_url)
                     is_category = is_category_url(link_url)
-                    print(f"  {i+1}. {link_url}")
-                    print(f"     Product: {'✅' if is_product else '❌'} | Category: {'✅' if is_category else '❌'}")
+                    logger.info(f"  {i+1}. {link_url}")
+                    logger.info(f"     Product: {'✅' if is_product else '❌'} | Category: {'✅' if is_category else '❌'}")
         
         # Test extract_product_urls
-        print(f"\n--- TEST EXTRACT_PRODUCT_URLS ---")
+        logger.info(f"\n--- TEST EXTRACT_PRODUCT_URLS ---")
         product_urls = extract_product_urls(url)
-        print(f"🎯 Kết quả extract_product_urls: {len(product_urls)} URL")
+        logger.info(f"🎯 Kết quả extract_product_urls: {len(product_urls)} URL")
         
         if product_urls:
-            print("Các URL sản phẩm tìm được:")
+            logger.info("Các URL sản phẩm tìm được:")
             for i, prod_url in enumerate(product_urls[:5]):
-                print(f"  {i+1}. {prod_url}")
+                logger.info(f"  {i+1}. {prod_url}")
         else:
-            print("❌ Không tìm được URL sản phẩm nào!")
+            logger.error("❌ Không tìm được URL sản phẩm nào!")
         
         return product_urls
         
     except Exception as e:
-        print(f"❌ Lỗi khi test: {str(e)}")
+        logger.error(f"❌ Lỗi khi test: {str(e)}")
         import traceback
         traceback.print_exc()
         return []
 
 def _is_baa_product_url(url):
     """Kiểm tra URL sản phẩm đặc biệt cho BAA.vn"""
-    if 'baa.vn' not in url.lower():
-        return False
-    
-    # Pattern 1: /vn/san-pham/...
-    if '/san-pham/' in url:
-        return True
-    
-    # Pattern 2: /vn/name_number (nhưng không phải Category)
-    if re.search(r'/vn/[^/]+_\d+/?$', url) and '/Category/' not in url:
-        # Loại bỏ các URL category hoặc các URL không phải sản phẩm
-        excluded_keywords = ['category', 'list', 'search', 'page', 'menu', 'navigation']
-        if not any(keyword in url.lower() for keyword in excluded_keywords):
-            return True
-    
-    return False
+    return url_classifier.is_baa_product_url(url)
 
 def extract_baa_product_price(soup, product_name=""):
     """
@@ -4024,20 +3461,20 @@ def extract_baa_product_price(soup, product_name=""):
         price_element = soup.select_one('span.product__price-print[data-root]')
         
         if not price_element or not price_element.get('data-root'):
-            print(f"  → Không có cấu trúc giá hợp lệ - để trống giá")
+            logger.info(f"  → Không có cấu trúc giá hợp lệ - để trống giá")
             return ""
         
         # 2. Lấy giá từ data-root
         try:
             price_value = float(price_element.get('data-root'))
-            print(f"  → Tìm thấy giá từ product__price-print data-root: {price_value:,.0f}")
+            logger.info(f"  → Tìm thấy giá từ product__price-print data-root: {price_value:,.0f}")
         except (ValueError, TypeError):
-            print(f"  → data-root không hợp lệ: {price_element.get('data-root')} - để trống giá")
+            logger.info(f"  → data-root không hợp lệ: {price_element.get('data-root')} - để trống giá")
             return ""
         
         # 3. Kiểm tra giá có hợp lệ không
         if price_value <= 0:
-            print(f"  → Giá không hợp lệ: {price_value} - để trống giá")
+            logger.info(f"  → Giá không hợp lệ: {price_value} - để trống giá")
             return ""
         
         # 4. Áp dụng giảm giá 5%
@@ -4052,10 +3489,10 @@ def extract_baa_product_price(soup, product_name=""):
         # 6. Định dạng giá cuối cùng
         formatted_price = f"{discounted_price:,.0f}{currency}".replace(",", ".")
         
-        print(f"  → Giá gốc: {price_value:,.0f}{currency} → Giá sau giảm 5%: {formatted_price}")
+        logger.info(f"  → Giá gốc: {price_value:,.0f}{currency} → Giá sau giảm 5%: {formatted_price}")
         
         return formatted_price
         
     except Exception as e:
-        print(f"  → Lỗi khi trích xuất giá: {str(e)}")
+        logger.info(f"  → Lỗi khi trích xuất giá: {str(e)}")
         return ""
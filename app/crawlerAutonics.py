@@ -7,7 +7,6 @@ Ngày tạo: $(date)
 
 import os
 import time
-import requests
 import re
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
@@ -15,16 +14,14 @@ from bs4 import BeautifulSoup
 import concurrent.futures
 from queue import Queue
 import pandas as pd
-from PIL import Image, ImageEnhance
-from io import BytesIO
-import json
 import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-try:
-    from app.webp_converter import WebPConverter
-except ImportError:
-    from webp_converter import WebPConverter
+from app.image_pipeline import get_image_pipeline, ImageJob, RESIZE_FIT
+from app.metrics import StatsCounters, fetch_histogram, parse_histogram, webdriver_opened, webdriver_closed
+from app.progress_reporter import current_reporter, STAGE_LISTING, STAGE_DETAIL
+from app.http_metrics import MeteredSession
+from app.crawl_profiler import CrawlProfiler, STAGE_PARSE, STAGE_EXCEL
 import threading
 
 # Selenium imports for dynamic content
@@ -71,6 +68,8 @@ class AutonicsCrawler:
         self.max_workers = max_workers
         self.max_retries = max_retries
         self.socketio = socketio
+        # Reporter của job đang chạy (lấy theo request tạo crawler)
+        self.progress = current_reporter() if socketio else None
         
         # Tạo thư mục output
         os.makedirs(self.output_root, exist_ok=True)
@@ -80,7 +79,7 @@ class AutonicsCrawler:
         self.vietnam_base_url = "https://www.autonics.com/vn"
         
         # Cấu hình session với retry strategy
-        self.session = requests.Session()
+        self.session = MeteredSession('autonics')
         retry_strategy = Retry(
             total=self.max_retries,
             backoff_factor=1,
@@ -115,15 +114,20 @@ class AutonicsCrawler:
         self.chrome_options.add_argument('--disable-extensions')
         
         # Thống kê
-        self.stats = {
-            "categories_processed": 0,
-            "series_found": 0,
-            "products_found": 0,
-            "products_processed": 0,
-            "images_downloaded": 0,
-            "failed_requests": 0,
-            "failed_images": 0
-        }
+        # Bộ đếm chia shard theo luồng: tăng từ nhiều worker mà không cần khóa
+        self.stats = StatsCounters((
+            "categories_processed",
+            "series_found",
+            "products_found",
+            "products_processed",
+            "images_downloaded",
+            "failed_requests",
+            "failed_images",
+        ))
+        self.fetch_latency = fetch_histogram('autonics')
+        self.parse_latency = parse_histogram('autonics')
+        # Profiler theo giai đoạn (tắt mặc định, bật bằng CRAWLER_PROFILE=1)
+        self.profiler = CrawlProfiler('autonics')
         
         logger.info("✅ Đã khởi tạo AutonicsCrawler với Selenium support")
     
@@ -131,6 +135,7 @@ class AutonicsCrawler:
         """Tạo một WebDriver Chrome mới (tương tự FotekScraper)"""
         try:
             driver = webdriver.Chrome(options=self.chrome_options)
+            webdriver_opened('autonics', driver)
             driver.implicitly_wait(10)
             return driver
         except Exception as e:
@@ -139,30 +144,28 @@ class AutonicsCrawler:
     
     def close_driver(self, driver):
         """Đóng WebDriver"""
+        webdriver_closed(driver)
         try:
             driver.quit()
         except Exception as e:
             logger.warning(f"Lỗi khi đóng WebDriver: {e}")
     
-    def emit_progress(self, percent, message, detail=""):
-        """Emit tiến trình qua Socket.IO"""
-        if self.socketio:
-            self.socketio.emit('progress_update', {
-                'percent': percent,
-                'message': message,
-                'detail': detail
-            })
+    def emit_progress(self, percent, message, detail="", stage=None, stage_percent=None):
+        """Emit tiến trình qua Socket.IO (gộp, giới hạn tần suất, chỉ vào room của job; stage: giai đoạn listing/detail/images/export)"""
+        if self.progress:
+            self.progress.update(percent, message, detail, stage=stage, stage_percent=stage_percent)
         else:
             print(f"[{percent}%] {message} - {detail}")
     
     def get_html_content(self, url, timeout=30):
         """Lấy nội dung HTML từ URL"""
         try:
-            response = self.session.get(url, timeout=timeout)
+            with self.fetch_latency.time():
+                response = self.session.get(url, timeout=timeout)
             response.raise_for_status()
             return response.text
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self.stats.inc("failed_requests")
             logger.error(f"Lỗi khi lấy HTML từ {url}: {str(e)}")
             return None
     
@@ -223,7 +226,7 @@ class AutonicsCrawler:
                 series_url = f"{self.base_url}/vn/series/{series['urlNm']}"
                 series_urls.append(series_url)
         
-        self.stats["series_found"] += len(series_urls)
+        self.stats.inc("series_found", len(series_urls))
         logger.info(f"Tìm thấy {len(series_urls)} series từ {category_url}")
         logger.info(f"Series URLs: {series_urls[:5]}{'...' if len(series_urls) > 5 else ''}")
         return series_urls
@@ -390,15 +393,16 @@ class AutonicsCrawler:
         try:
             # Lấy thông tin chi tiết sản phẩm
             self.emit_progress(50, f"Đang lấy thông tin chi tiết model {model_code}...")
-            product_details = self.extract_product_details(model_url)
+            with self.profiler.item(model_url):
+                product_details = self.extract_product_details(model_url)
             
             if not product_details:
                 logger.warning(f"Không thể lấy thông tin chi tiết cho model: {model_url}")
                 return [], model_code
             
             # Update stats
-            self.stats["products_found"] += 1
-            self.stats["products_processed"] += 1
+            self.stats.inc("products_found")
+            self.stats.inc("products_processed")
             
             self.emit_progress(90, f"Đã hoàn thành cào model {model_code}")
             
@@ -446,15 +450,16 @@ class AutonicsCrawler:
                     continue
                 
                 # Lấy thông tin chi tiết sản phẩm
-                product_details = self.extract_product_details(model_url)
+                with self.profiler.item(model_url):
+                    product_details = self.extract_product_details(model_url)
                 
                 if product_details:
                     all_products_data.append(product_details)
                     successful_models.append(model_code)
                     
                     # Update stats
-                    self.stats["products_found"] += 1
-                    self.stats["products_processed"] += 1
+                    self.stats.inc("products_found")
+                    self.stats.inc("products_processed")
                     
                     logger.info(f"✅ Đã cào thành công model: {model_code}")
                 else:
@@ -689,7 +694,7 @@ class AutonicsCrawler:
                 
                 page += 1
             
-            self.stats["products_found"] += len(all_products_data)
+            self.stats.inc("products_found", len(all_products_data))
             
             # Validation: So sánh actual vs expected count
             actual_count = len(all_products_data)
@@ -888,7 +893,8 @@ class AutonicsCrawler:
         init_data = self.extract_product_init_data(html)
         
         # Fallback to HTML parsing nếu không có __INIT_DATA__
-        soup = BeautifulSoup(html, 'html.parser')
+        with self.parse_latency.time(), self.profiler.span(STAGE_PARSE):
+            soup = BeautifulSoup(html, 'html.parser')
         
         # Khởi tạo dữ liệu sản phẩm
         product_data = {
@@ -1098,43 +1104,22 @@ class AutonicsCrawler:
             logger.error(f"Lỗi khi extract product __INIT_DATA__: {str(e)}")
             return None
     
-    def add_white_background_to_image(self, image, target_size=(800, 800)):
-        """
-        Thêm nền trắng vào ảnh và resize về kích thước target
-        
-        Args:
-            image: PIL Image object
-            target_size: Kích thước mục tiêu (width, height)
-            
-        Returns:
-            PIL Image: Ảnh đã được xử lý
-        """
-        # Tạo ảnh nền trắng với kích thước target
-        background = Image.new('RGB', target_size, (255, 255, 255))
-        
-        # Convert ảnh gốc sang RGBA nếu cần
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        # Tính toán tỷ lệ resize để fit vào target size
-        img_ratio = min(target_size[0] / image.width, target_size[1] / image.height)
-        new_size = (int(image.width * img_ratio), int(image.height * img_ratio))
-        
-        # Resize ảnh
-        image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Tính toán vị trí để paste ảnh vào giữa nền trắng
-        x = (target_size[0] - new_size[0]) // 2
-        y = (target_size[1] - new_size[1]) // 2
-        
-        # Paste ảnh vào nền trắng
-        background.paste(image, (x, y), image if image.mode == 'RGBA' else None)
-        
-        return background
+    def _image_job(self, image_url, save_path, product_code):
+        """Job pipeline ảnh cho một sản phẩm: 800x800 nền trắng, WebP chất lượng 90, ghi đè ảnh đã có"""
+        filename = f"{standardize_filename(product_code)}.webp"
+        return ImageJob(image_url, os.path.join(save_path, filename), resize=RESIZE_FIT, target_size=(800, 800),
+                        format='WEBP', quality=90, method=6, session=self.session, skip_existing=False)
+    
+    def _record_image_result(self, result):
+        if result['success']:
+            self.stats.inc("images_downloaded")
+            return True
+        self.stats.inc("failed_images")
+        return False
     
     def download_and_process_image(self, image_url, save_path, product_code):
         """
-        Tải và xử lý ảnh sản phẩm
+        Tải và xử lý ảnh sản phẩm qua pipeline ảnh dùng chung
         
         Args:
             image_url: URL của ảnh
@@ -1144,52 +1129,8 @@ class AutonicsCrawler:
         Returns:
             bool: True nếu thành công
         """
-        try:
-            # Tải ảnh
-            response = self.session.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Mở ảnh từ bytes
-            image = Image.open(BytesIO(response.content))
-            
-            # Thêm nền trắng
-            processed_image = self.add_white_background_to_image(image)
-            
-            # Tạo tên file
-            filename = f"{standardize_filename(product_code)}.webp"
-            full_path = os.path.join(save_path, filename)
-            
-            # Tạo thư mục nếu chưa tồn tại
-            os.makedirs(save_path, exist_ok=True)
-            
-            # Lưu ảnh tạm dưới dạng PNG
-            temp_path = full_path.replace('.webp', '.png')
-            processed_image.save(temp_path, 'PNG', quality=95)
-            
-            # Chuyển đổi sang WebP
-            result = WebPConverter.convert_to_webp(
-                input_path=temp_path,
-                output_path=full_path,
-                quality=90,
-                lossless=False,
-                method=6
-            )
-            
-            # Xóa file tạm
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            
-            if result['success']:
-                self.stats["images_downloaded"] += 1
-                return True
-            else:
-                self.stats["failed_images"] += 1
-                return False
-                
-        except Exception as e:
-            logger.error(f"Lỗi khi xử lý ảnh {image_url}: {str(e)}")
-            self.stats["failed_images"] += 1
-            return False
+        result = get_image_pipeline().process(self._image_job(image_url, save_path, product_code))
+        return self._record_image_result(result)
     
     def create_excel_with_specifications(self, products_data, output_path):
         """
@@ -1283,7 +1224,7 @@ class AutonicsCrawler:
         self.emit_progress(10, f"Bắt đầu cào category: {category_name}")
         
         # 1. Lấy danh sách series
-        self.emit_progress(20, "Đang thu thập danh sách series...")
+        self.emit_progress(20, "Đang thu thập danh sách series...", stage=STAGE_LISTING, stage_percent=0)
         series_urls = self.extract_series_from_category(category_url)
         
         if not series_urls:
@@ -1296,18 +1237,21 @@ class AutonicsCrawler:
         
         for i, series_url in enumerate(series_urls):
             progress = 40 + (i / len(series_urls)) * 30
-            self.emit_progress(progress, f"Đang xử lý series {i+1}/{len(series_urls)}")
+            self.emit_progress(progress, f"Đang xử lý series {i+1}/{len(series_urls)}",
+                               stage=STAGE_LISTING, stage_percent=i * 100 // len(series_urls))
             
             products_data = self.extract_products_from_series(series_url)
             all_products_data.extend(products_data)
         
         # 3. Lấy thông tin chi tiết sản phẩm với đa luồng
-        self.emit_progress(70, f"Đang lấy thông tin chi tiết {len(all_products_data)} sản phẩm...")
+        self.emit_progress(70, f"Đang lấy thông tin chi tiết {len(all_products_data)} sản phẩm...",
+                           stage=STAGE_LISTING, stage_percent=100)
         detailed_products = []
         
         def process_product(product_data):
             try:
-                details = self.extract_product_details(product_data['url'])
+                with self.profiler.item(product_data['url']):
+                    details = self.extract_product_details(product_data['url'])
                 if details:
                     return details
             except Exception as e:
@@ -1321,10 +1265,11 @@ class AutonicsCrawler:
                 result = future.result()
                 if result:
                     detailed_products.append(result)
-                    self.stats["products_processed"] += 1
+                    self.stats.inc("products_processed")
                 
                 progress = 70 + (i / len(futures)) * 20
-                self.emit_progress(progress, f"Đã xử lý {i+1}/{len(futures)} sản phẩm")
+                self.emit_progress(progress, f"Đã xử lý {i+1}/{len(futures)} sản phẩm",
+                                   stage=STAGE_DETAIL, stage_percent=(i + 1) * 100 // len(futures))
         
         return detailed_products, category_name
     
@@ -1338,7 +1283,16 @@ class AutonicsCrawler:
         Returns:
             str: Đường dẫn thư mục kết quả
         """
+        with self.profiler.run():
+            result_dir = self._crawl_products(urls)
+        self.profiler.write_report(result_dir)
+        return result_dir
+    
+    def _crawl_products(self, urls):
+        """Thân của crawl_products (được profiler đo khi bật)"""
         start_time = time.time()
+        # Pipeline ảnh dùng chung cả tiến trình: chỉ báo cáo phần thống kê của lượt này
+        image_stats_start = get_image_pipeline().stats_snapshot()
         
         # Tạo thư mục kết quả với timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -1384,7 +1338,7 @@ class AutonicsCrawler:
                 
                 if products_data:
                     self._save_products_data(products_data, category_name, result_dir)
-                    self.stats["categories_processed"] += 1
+                    self.stats.inc("categories_processed")
                 
                 processed_count += 1
                 
@@ -1406,7 +1360,7 @@ class AutonicsCrawler:
                 
                 if all_products_data:
                     self._save_products_data(all_products_data, folder_name, result_dir)
-                    self.stats["categories_processed"] += 1  # Treat as 1 category for stats
+                    self.stats.inc("categories_processed")  # Treat as 1 category for stats
                     logger.info(f"✅ Đã gộp {len(all_products_data)} models vào folder: {folder_name}")
                 
                 # Update processed count for all model URLs
@@ -1428,7 +1382,7 @@ class AutonicsCrawler:
                     
                     if products_data:
                         self._save_products_data(products_data, category_name, result_dir)
-                        self.stats["categories_processed"] += 1  # Treat as a category for stats
+                        self.stats.inc("categories_processed")  # Treat as a category for stats
                     
                     processed_count += 1
                     
@@ -1468,6 +1422,7 @@ class AutonicsCrawler:
         logger.info(f"Ảnh đã tải: {self.stats['images_downloaded']}")
         logger.info(f"Request thất bại: {self.stats['failed_requests']}")
         logger.info(f"Ảnh thất bại: {self.stats['failed_images']}")
+        get_image_pipeline().log_stats(since=image_stats_start)
         
         return result_dir
     
@@ -1490,22 +1445,18 @@ class AutonicsCrawler:
             # Tải ảnh với đa luồng
             logger.info(f"Đang tải ảnh cho {category_name}...")
             
-            def download_image(product):
-                if product.get('image_url') and product.get('product_code'):
-                    return self.download_and_process_image(
-                        product['image_url'],
-                        images_dir,
-                        product['product_code']
-                    )
-                return False
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                image_futures = [executor.submit(download_image, product) for product in products_data]
-                concurrent.futures.wait(image_futures)
+            jobs = [
+                self._image_job(product['image_url'], images_dir, product['product_code'])
+                for product in products_data
+                if product.get('image_url') and product.get('product_code')
+            ]
+            for result in get_image_pipeline().map(jobs):
+                self._record_image_result(result)
             
             # Tạo file Excel
             excel_path = os.path.join(category_dir, f"{category_name}.xlsx")
-            self.create_excel_with_specifications(products_data, excel_path)
+            with self.profiler.span(STAGE_EXCEL, item=excel_path):
+                self.create_excel_with_specifications(products_data, excel_path)
             
             logger.info(f"Đã lưu {len(products_data)} sản phẩm vào {category_dir}")
             
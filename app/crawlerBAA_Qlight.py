@@ -12,17 +12,13 @@ import pandas as pd
 import re
 from urllib.parse import urlparse, urljoin
 from bs4 import BeautifulSoup
-import requests
 import traceback
 from queue import Queue
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import logging
-from PIL import Image
-import io
 import hashlib
 from openpyxl import Workbook
-from openpyxl.drawing.image import Image as XLImage
 import openpyxl.styles
 import tempfile
 
@@ -31,21 +27,71 @@ from app.crawler import (
     is_category_url, is_product_url, extract_product_urls, extract_product_info,
     download_baa_product_images_fixed, get_html_content, HEADERS
 )
-from app.webp_converter import WebPConverter
+from app.excel_images import embed_images
+from app.image_pipeline import get_image_pipeline, ImageJob, RESIZE_FLATTEN
+from app.http_metrics import MeteredSession
 from app import socketio
 
 # Cấu hình logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Cache metadata series (danh sách series và link sản phẩm của từng trang series), dùng chung
+# giữa /baa-qlight/series và /crawl-baa-qlight-series để không tải lại các trang listing
+SERIES_CACHE_TTL = 30 * 60
+_series_list_cache = {}
+_series_listing_cache = {}
+_series_cache_lock = threading.Lock()
+
+
+def _cache_get(cache, key, ttl=SERIES_CACHE_TTL):
+    with _series_cache_lock:
+        entry = cache.get(key)
+    if entry and time.time() - entry[0] < ttl:
+        return entry[1]
+    return None
+
+
+def _cache_put(cache, key, value):
+    with _series_cache_lock:
+        cache[key] = (time.time(), value)
+
+
+def clear_series_cache():
+    """Xóa cache metadata series (danh sách series và link sản phẩm)"""
+    with _series_cache_lock:
+        _series_list_cache.clear()
+        _series_listing_cache.clear()
+
+
+def _safe_name(name):
+    return re.sub(r'[<>:"/\\|?*]', '_', name)
+
 class BAAQlightCrawler:
     """Crawler chuyên dụng cho BAA Qlight với hỗ trợ đa luồng và xử lý series"""
     
     def __init__(self, base_url="https://baa.vn/vn/qlight/", max_workers=10):
         self.base_url = base_url
         self.max_workers = max_workers
-        self.session = requests.Session()
+        self.session = MeteredSession('baa_qlight')
         self.session.headers.update(HEADERS)
+        # Pool dùng chung cho mọi trang listing series và trang sản phẩm (tạo khi cần)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        """Pool luồng sống suốt vòng đời crawler"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='qlight')
+            return self._executor
+
+    def close(self):
+        """Đóng pool luồng dùng chung"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
         
     def extract_series_info(self, url):
         """
@@ -139,16 +185,22 @@ class BAAQlightCrawler:
             logger.error(f"Lỗi khi trích xuất thông tin series từ {url}: {str(e)}")
             return None
     
-    def get_products_from_series(self, series_url):
+    def get_products_from_series(self, series_url, use_cache=True):
         """
         Lấy danh sách sản phẩm từ một series
         
         Args:
             series_url (str): URL của series
+            use_cache (bool): Dùng kết quả listing đã cache (SERIES_CACHE_TTL)
             
         Returns:
             list: Danh sách URL sản phẩm trong series
         """
+        if use_cache:
+            cached = _cache_get(_series_listing_cache, series_url)
+            if cached is not None:
+                logger.info(f"♻️ Dùng cache listing: {len(cached)} sản phẩm trong series {series_url}")
+                return list(cached)
         try:
             html = get_html_content(series_url)
             if not html:
@@ -199,19 +251,23 @@ class BAAQlightCrawler:
                     filtered_urls.append(url)
             
             logger.info(f"Tìm thấy {len(filtered_urls)} sản phẩm trong series: {series_url}")
+            if filtered_urls:
+                _cache_put(_series_listing_cache, series_url, list(filtered_urls))
             return filtered_urls
             
         except Exception as e:
             logger.error(f"Lỗi khi lấy sản phẩm từ series {series_url}: {str(e)}")
             return []
     
-    def crawl_product_info(self, url, index=1):
+    def crawl_product_info(self, url, index=1, series_info=None):
         """
         Cào thông tin một sản phẩm
         
         Args:
             url (str): URL sản phẩm
             index (int): Số thứ tự
+            series_info (dict, optional): Series đã biết ({'name', 'url'}); nếu không có
+                sẽ tải lại trang sản phẩm để trích xuất series
             
         Returns:
             dict: Thông tin sản phẩm
@@ -221,7 +277,8 @@ class BAAQlightCrawler:
             product_info = extract_product_info(url, index=index)
             
             # Thêm thông tin series
-            series_info = self.extract_series_info(url)
+            if series_info is None:
+                series_info = self.extract_series_info(url)
             if series_info:
                 product_info['Series'] = series_info['name']
                 product_info['Series_URL'] = series_info['url']
@@ -277,16 +334,16 @@ class BAAQlightCrawler:
         # Tạo danh sách arguments cho ThreadPoolExecutor
         args_list = [(url, i+1) for i, url in enumerate(product_urls)]
         
-        # Sử dụng ThreadPoolExecutor để xử lý đa luồng
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(process_product, args) for args in args_list]
-            
-            # Chờ tất cả futures hoàn thành
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    logger.error(f"❌ Lỗi trong thread: {str(e)}")
+        # Dùng pool chung của crawler thay vì tạo pool mới mỗi lần gọi
+        executor = self._get_executor()
+        futures = [executor.submit(process_product, args) for args in args_list]
+        
+        # Chờ tất cả futures hoàn thành
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"❌ Lỗi trong thread: {str(e)}")
         
         logger.info(f"✅ Hoàn thành cào thông tin {len(results)}/{total_count} sản phẩm")
         return results
@@ -305,79 +362,76 @@ class BAAQlightCrawler:
         webp_folder = os.path.join(output_folder, "webp_images")
         os.makedirs(webp_folder, exist_ok=True)
         
-        converted_products = []
         total_products = len(product_info_list)
         
         logger.info(f"🖼️ Bắt đầu chuyển đổi {total_products} ảnh sang WebP...")
         
+        # Gửi tất cả ảnh vào pipeline dùng chung cùng lúc thay vì xử lý tuần tự từng sản phẩm
+        jobs = {}
         for i, product_info in enumerate(product_info_list, 1):
-            try:
-                img_url = product_info.get('Ảnh sản phẩm', '')
-                if not img_url:
-                    product_info['Ảnh_WebP'] = ''
-                    converted_products.append(product_info)
-                    logger.info(f"⏭️ Bỏ qua sản phẩm {i}/{total_products}: Không có ảnh")
-                    continue
-                
-                # Tải ảnh từ URL
-                response = self.session.get(img_url, timeout=30)
-                response.raise_for_status()
-                
-                # Tạo tên file WebP an toàn
-                product_code = product_info.get('Mã sản phẩm', 'unknown')
-                # Loại bỏ ký tự đặc biệt khỏi tên file
-                safe_product_code = re.sub(r'[<>:"/\\|?*]', '_', product_code)
-                webp_filename = f"{safe_product_code}.webp"
-                webp_path = os.path.join(webp_folder, webp_filename)
-                
-                # Kiểm tra xem file đã tồn tại chưa
-                if os.path.exists(webp_path):
-                    product_info['Ảnh_WebP'] = webp_path
-                    converted_products.append(product_info)
-                    logger.info(f"✓ Sử dụng ảnh có sẵn {i}/{total_products}: {safe_product_code}")
-                    continue
-                
-                # Chuyển đổi sang WebP sử dụng WebPConverter
-                img = Image.open(io.BytesIO(response.content))
-                
-                # Chuyển đổi sang RGB nếu cần
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Lưu ảnh tạm thời để sử dụng WebPConverter
-                temp_img_path = os.path.join(webp_folder, f"temp_{safe_product_code}.jpg")
-                img.save(temp_img_path, 'JPEG', quality=95)
-                
-                # Sử dụng WebPConverter để đảm bảo chất lượng
-                result = WebPConverter.convert_to_webp(
-                    input_path=temp_img_path,
-                    output_path=webp_path,
-                    quality=90,
-                    lossless=False,
-                    method=6
-                )
-                
-                # Xóa file tạm
-                if os.path.exists(temp_img_path):
-                    os.remove(temp_img_path)
-                
-                if result['success']:
-                    # Cập nhật đường dẫn ảnh
-                    product_info['Ảnh_WebP'] = webp_path
-                    converted_products.append(product_info)
-                    logger.info(f"✓ Đã chuyển đổi ảnh {i}/{total_products}: {safe_product_code} ({result['compression_ratio']:.1f}%)")
-                else:
-                    logger.error(f"❌ Lỗi chuyển đổi WebP cho {safe_product_code}: {result.get('error', 'Unknown error')}")
-                    product_info['Ảnh_WebP'] = ''
-                    converted_products.append(product_info)
-                
-            except Exception as e:
-                logger.error(f"❌ Lỗi chuyển đổi ảnh cho sản phẩm {product_info.get('Mã sản phẩm', 'unknown')}: {str(e)}")
+            job = self._image_job(product_info, webp_folder)
+            if job is None:
                 product_info['Ảnh_WebP'] = ''
-                converted_products.append(product_info)
+                logger.info(f"⏭️ Bỏ qua sản phẩm {i}/{total_products}: Không có ảnh")
+            else:
+                jobs[i] = job
+        
+        results = get_image_pipeline().map(list(jobs.values()))
+        for (i, job), result in zip(jobs.items(), results):
+            self._apply_image_result(product_info_list[i - 1], result, f"{i}/{total_products}")
+        
+        logger.info(f"✅ Hoàn thành chuyển đổi {len(product_info_list)} ảnh sang WebP")
+        return product_info_list
+
+    def _image_job(self, product_info, webp_folder):
+        """
+        Job pipeline ảnh cho một sản phẩm (nền trắng, giữ kích thước, WebP chất lượng 90)
+        
+        Returns:
+            ImageJob: None nếu sản phẩm không có ảnh
+        """
+        img_url = product_info.get('Ảnh sản phẩm', '')
+        if not img_url:
+            return None
+        # Tên file WebP an toàn (loại bỏ ký tự đặc biệt)
+        safe_product_code = _safe_name(product_info.get('Mã sản phẩm', 'unknown'))
+        return ImageJob(img_url, os.path.join(webp_folder, f"{safe_product_code}.webp"), resize=RESIZE_FLATTEN,
+                        format='WEBP', quality=90, method=6, session=self.session)
+
+    @staticmethod
+    def _apply_image_result(product_info, result, label=''):
+        """Gán đường dẫn ảnh WebP (hoặc rỗng khi lỗi) vào 'Ảnh_WebP'"""
+        code = product_info.get('Mã sản phẩm', 'unknown')
+        if result['success']:
+            product_info['Ảnh_WebP'] = result['path']
+            if result.get('existing'):
+                logger.info(f"✓ Sử dụng ảnh có sẵn {label}: {code}")
+            else:
+                ratio = (1 - result['bytes'] / result['source_bytes']) * 100 if result.get('source_bytes') else 0
+                logger.info(f"✓ Đã chuyển đổi ảnh {label}: {code} ({ratio:.1f}%)")
+        else:
+            logger.error(f"❌ Lỗi chuyển đổi ảnh cho sản phẩm {code}: {result.get('error')}")
+            product_info['Ảnh_WebP'] = ''
+        return product_info
+
+    def _convert_product_image(self, product_info, webp_folder, label=''):
+        """
+        Tải ảnh của một sản phẩm và chuyển sang WebP qua pipeline ảnh dùng chung (gán đường dẫn vào 'Ảnh_WebP')
         
-        logger.info(f"✅ Hoàn thành chuyển đổi {len(converted_products)} ảnh sang WebP")
-        return converted_products
+        Args:
+            product_info (dict): Thông tin sản phẩm
+            webp_folder (str): Thư mục lưu ảnh WebP
+            label (str): Nhãn hiển thị trong log (ví dụ "3/20")
+            
+        Returns:
+            dict: product_info đã cập nhật
+        """
+        job = self._image_job(product_info, webp_folder)
+        if job is None:
+            product_info['Ảnh_WebP'] = ''
+            logger.info(f"⏭️ Bỏ qua sản phẩm {label}: Không có ảnh")
+            return product_info
+        return self._apply_image_result(product_info, get_image_pipeline().process(job), label)
     
     def create_excel_by_series(self, product_info_list, output_folder):
         """
@@ -407,7 +461,7 @@ class BAAQlightCrawler:
         for i, (series_name, products) in enumerate(series_groups.items(), 1):
             try:
                 # Tạo tên file Excel an toàn
-                safe_series_name = re.sub(r'[<>:"/\\|?*]', '_', series_name)
+                safe_series_name = _safe_name(series_name)
                 excel_filename = f"BAA_Qlight_{safe_series_name}.xlsx"
                 excel_path = os.path.join(output_folder, excel_filename)
                 
@@ -469,21 +523,15 @@ class BAAQlightCrawler:
             image_sheet['B1'] = 'Tên sản phẩm'
             image_sheet['C1'] = 'Ảnh sản phẩm'
             
-            # Thêm ảnh cho từng sản phẩm
+            # Thêm thông tin cho từng sản phẩm
+            placements = []
             for i, product in enumerate(products, start=2):
                 image_sheet[f'A{i}'] = product.get('Mã sản phẩm', '')
                 image_sheet[f'B{i}'] = product.get('Tên sản phẩm', '')
-                
-                webp_path = product.get('Ảnh_WebP', '')
-                if webp_path and os.path.exists(webp_path):
-                    try:
-                        # Thêm ảnh vào Excel
-                        img = XLImage(webp_path)
-                        img.width = 100
-                        img.height = 100
-                        image_sheet.add_image(img, f'C{i}')
-                    except Exception as e:
-                        logger.error(f"Lỗi thêm ảnh vào Excel: {str(e)}")
+                placements.append((f'C{i}', product.get('Ảnh_WebP', '')))
+            
+            # Nhúng thumbnail 100x100 (tạo song song, cache theo hash) thay cho ảnh full-size
+            embed_images(image_sheet, placements)
         
         except Exception as e:
             logger.error(f"Lỗi tạo sheet ảnh: {str(e)}")
@@ -527,13 +575,21 @@ class BAAQlightCrawler:
         except Exception as e:
             logger.error(f"Lỗi tạo sheet thông tin series: {str(e)}")
     
-    def get_all_series_list(self):
+    def get_all_series_list(self, use_cache=True):
         """
         Lấy danh sách tất cả series từ widget trên trang web
         
+        Args:
+            use_cache (bool): Dùng danh sách đã cache (SERIES_CACHE_TTL)
+        
         Returns:
             list: Danh sách series với thông tin tên, URL và số lượng sản phẩm
         """
+        if use_cache:
+            cached = _cache_get(_series_list_cache, self.base_url)
+            if cached is not None:
+                logger.info(f"♻️ Dùng cache danh sách {len(cached)} series")
+                return [dict(item) for item in cached]
         try:
             logger.info("🔍 Đang lấy danh sách tất cả series...")
             
@@ -598,12 +654,168 @@ class BAAQlightCrawler:
             series_list.sort(key=lambda x: x['product_count'], reverse=True)
             
             logger.info(f"✅ Tìm thấy {len(series_list)} series")
+            if series_list:
+                _cache_put(_series_list_cache, self.base_url, [dict(item) for item in series_list])
             return series_list
             
         except Exception as e:
             logger.error(f"❌ Lỗi khi lấy danh sách series: {str(e)}")
             return []
     
+    def _crawl_series_product(self, url, index, state):
+        """
+        Cào một sản phẩm của series đã biết và chuyển ảnh sang WebP (chạy trong pool chung)
+        """
+        product_info = self.crawl_product_info(url, index, series_info={'name': state['name'], 'url': state['url']})
+        if product_info:
+            self._convert_product_image(product_info, state['webp_folder'], f"{state['name']} #{index}")
+        return product_info
+
+    def _finish_series(self, state):
+        """
+        Ghi file Excel của một series ngay khi series hoàn tất và trả về kết quả của series
+        """
+        series_name = state['name']
+        products = sorted(state['products'], key=lambda p: p.get('STT', 0))
+        duration = time.time() - state['start_time']
+        if not state['product_urls']:
+            return {
+                'success': False,
+                'series_name': series_name,
+                'series_url': state['url'],
+                'error': 'Không tìm thấy sản phẩm nào trong series',
+                'message': f"Series {series_name} không có sản phẩm"
+            }
+        
+        logger.info(f"📊 Đang tạo file Excel cho series {series_name}...")
+        excel_files = self.create_excel_by_series(products, state['folder'])
+        
+        summary_path = None
+        if state['write_summary']:
+            summary_path = os.path.join(state['folder'], f"BAA_Qlight_{_safe_name(series_name)}_Summary.xlsx")
+            pd.DataFrame(products).to_excel(summary_path, index=False)
+        
+        result = {
+            'success': True,
+            'series_name': series_name,
+            'series_url': state['url'],
+            'total_products': len(products),
+            'excel_files': excel_files,
+            'summary_file': summary_path,
+            'output_folder': state['folder'],
+            'duration': duration,
+            'products': products,
+            'message': f"Hoàn thành cào dữ liệu {len(products)} sản phẩm từ series {series_name} trong {duration:.2f} giây"
+        }
+        logger.info(f"✅ {result['message']}")
+        return result
+
+    def crawl_series_list(self, series_list, output_folder, per_series_folders=True, write_summary=True,
+                          seen_urls=None, progress_callback=None):
+        """
+        Cào nhiều series cùng lúc qua một pool dùng chung: trang listing của mọi series và
+        trang sản phẩm của chúng cùng chạy trong pool, nên thời gian phụ thuộc vào số luồng
+        chứ không phải số series. File Excel của mỗi series được ghi ngay khi series đó xong.
+        
+        Args:
+            series_list (list): Danh sách dict {'name', 'url'} (product_count nếu có)
+            output_folder (str): Thư mục lưu kết quả
+            per_series_folders (bool): Mỗi series một thư mục con
+            write_summary (bool): Ghi thêm file tổng hợp của từng series
+            seen_urls (set, optional): Tập URL dùng chung để không cào trùng sản phẩm giữa các series
+            progress_callback (callable, optional): Gọi callback(result, done, total) khi một series xong
+            
+        Returns:
+            list: Kết quả từng series (cùng dạng với crawl_specific_series)
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        executor = self._get_executor()
+        
+        # Bổ sung product_count từ cache để xếp series lớn lên trước (giảm thời gian chờ cuối)
+        known_counts = {item['url']: item.get('product_count', 0)
+                        for item in (_cache_get(_series_list_cache, self.base_url) or [])}
+        ordered = sorted(
+            enumerate(series_list, 1),
+            key=lambda pair: pair[1].get('product_count', known_counts.get(pair[1].get('url'), 0)),
+            reverse=True
+        )
+        
+        pending = {}
+        results = []
+        for idx, ser in ordered:
+            series_name = ser.get('name') or f'Series_{idx}'
+            folder = os.path.join(output_folder, _safe_name(series_name)) if per_series_folders else output_folder
+            webp_folder = os.path.join(folder, "webp_images")
+            os.makedirs(webp_folder, exist_ok=True)
+            state = {
+                'name': series_name,
+                'url': ser.get('url'),
+                'folder': folder,
+                'webp_folder': webp_folder,
+                'write_summary': write_summary,
+                'product_urls': [],
+                'products': [],
+                'remaining': 0,
+                'start_time': time.time(),
+            }
+            logger.info(f"🚀 Bắt đầu cào dữ liệu series: {series_name}")
+            future = executor.submit(self.get_products_from_series, state['url'])
+            pending[future] = ('listing', state)
+        
+        total = len(series_list)
+        
+        def finish(state):
+            # Lỗi khi ghi một series chỉ làm hỏng series đó, không dừng cả lượt cào
+            try:
+                result = self._finish_series(state)
+            except Exception as e:
+                logger.error(f"❌ Lỗi khi ghi kết quả series {state['name']}: {str(e)}")
+                result = {
+                    'success': False,
+                    'series_name': state['name'],
+                    'series_url': state['url'],
+                    'error': str(e),
+                    'message': f"Lỗi khi ghi kết quả series {state['name']}: {str(e)}"
+                }
+            results.append(result)
+            if progress_callback:
+                try:
+                    progress_callback(result, len(results), total)
+                except Exception as e:
+                    logger.warning(f"⚠️ Lỗi progress callback: {str(e)}")
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, state = pending.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Lỗi trong thread ({state['name']}): {str(e)}")
+                    value = [] if kind == 'listing' else None
+                
+                if kind == 'listing':
+                    product_urls = value or []
+                    if seen_urls is not None:
+                        product_urls = [url for url in product_urls if url not in seen_urls]
+                        seen_urls.update(product_urls)
+                    state['product_urls'] = product_urls
+                    state['remaining'] = len(product_urls)
+                    logger.info(f"✓ Tìm thấy {len(product_urls)} sản phẩm từ series {state['name']}")
+                    for index, url in enumerate(product_urls, 1):
+                        product_future = executor.submit(self._crawl_series_product, url, index, state)
+                        pending[product_future] = ('product', state)
+                    if not product_urls:
+                        finish(state)
+                else:
+                    if value:
+                        state['products'].append(value)
+                    state['remaining'] -= 1
+                    if state['remaining'] == 0:
+                        finish(state)
+        
+        return results
+
     def crawl_specific_series(self, series_url, series_name, output_folder=None):
         """
         Cào dữ liệu cho một series cụ thể
@@ -619,63 +831,10 @@ class BAAQlightCrawler:
         if not output_folder:
             output_folder = os.path.join(os.getcwd(), f"output_baa_qlight_{series_name}")
         
-        os.makedirs(output_folder, exist_ok=True)
-        
-        start_time = time.time()
-        logger.info(f"🚀 Bắt đầu cào dữ liệu series: {series_name}")
-        
         try:
-            # Bước 1: Lấy danh sách sản phẩm từ series
-            logger.info(f"📋 Đang lấy danh sách sản phẩm từ series {series_name}...")
-            product_urls = self.get_products_from_series(series_url)
-            logger.info(f"✓ Tìm thấy {len(product_urls)} sản phẩm từ series {series_name}")
-            
-            if not product_urls:
-                return {
-                    'success': False,
-                    'error': 'Không tìm thấy sản phẩm nào trong series',
-                    'message': f"Series {series_name} không có sản phẩm"
-                }
-            
-            # Bước 2: Cào thông tin sản phẩm đa luồng
-            logger.info(f"🔄 Đang cào thông tin sản phẩm từ series {series_name} (đa luồng)...")
-            product_info_list = self.crawl_products_multithread(product_urls)
-            logger.info(f"✓ Đã cào thông tin {len(product_info_list)} sản phẩm")
-            
-            # Bước 3: Chuyển đổi ảnh sang WebP
-            logger.info(f"🖼️ Đang chuyển đổi ảnh sang WebP cho series {series_name}...")
-            product_info_list = self.convert_images_to_webp(product_info_list, output_folder)
-            logger.info("✓ Hoàn thành chuyển đổi ảnh WebP")
-            
-            # Bước 4: Tạo file Excel cho series
-            logger.info(f"📊 Đang tạo file Excel cho series {series_name}...")
-            excel_files = self.create_excel_by_series(product_info_list, output_folder)
-            logger.info(f"✓ Đã tạo {len(excel_files)} file Excel")
-            
-            # Bước 5: Tạo file tổng hợp cho series
-            logger.info(f"📋 Đang tạo file tổng hợp cho series {series_name}...")
-            summary_df = pd.DataFrame(product_info_list)
-            summary_path = os.path.join(output_folder, f"BAA_Qlight_{series_name}_Summary.xlsx")
-            summary_df.to_excel(summary_path, index=False)
-            
-            end_time = time.time()
-            duration = end_time - start_time
-            
-            result = {
-                'success': True,
-                'series_name': series_name,
-                'series_url': series_url,
-                'total_products': len(product_info_list),
-                'excel_files': excel_files,
-                'summary_file': summary_path,
-                'output_folder': output_folder,
-                'duration': duration,
-                'message': f"Hoàn thành cào dữ liệu {len(product_info_list)} sản phẩm từ series {series_name} trong {duration:.2f} giây"
-            }
-            
-            logger.info(f"✅ {result['message']}")
-            return result
-            
+            results = self.crawl_series_list([{'name': series_name, 'url': series_url}], output_folder,
+                                             per_series_folders=False)
+            return results[0]
         except Exception as e:
             logger.error(f"❌ Lỗi trong quá trình cào dữ liệu series {series_name}: {str(e)}")
             return {
@@ -708,64 +867,60 @@ class BAAQlightCrawler:
             product_urls = extract_product_urls(self.base_url)
             logger.info(f"✓ Tìm thấy {len(product_urls)} sản phẩm từ trang chính")
             
-            # Bước 2: Thu thập thông tin series từ các sản phẩm
+            # Bước 2: Danh sách series từ widget (có cache); nếu không có, suy ra từ vài sản phẩm đầu
             logger.info("🔍 Đang thu thập thông tin series...")
+            series_list = self.get_all_series_list()
+            if not series_list:
+                sample_products = product_urls[:min(10, len(product_urls))]
+                found = {}
+                for series_data in self._get_executor().map(self.extract_series_info, sample_products):
+                    if series_data and series_data['name'] not in found:
+                        found[series_data['name']] = series_data
+                        logger.info(f"✓ Tìm thấy series: {series_data['name']}")
+                series_list = list(found.values())
+            
+            # Bước 3: Listing series, chi tiết sản phẩm và ảnh chạy chung một pool;
+            # file Excel của mỗi series được ghi ngay khi series đó hoàn tất
+            logger.info(f"📦 Đang cào {len(series_list)} series (đa luồng, pool dùng chung)...")
+            seen_urls = set()
+            series_results = self.crawl_series_list(series_list, output_folder, per_series_folders=False,
+                                                    write_summary=False, seen_urls=seen_urls)
+            
+            product_info_list = []
+            excel_files = []
             series_info = {}
-            series_products = {}
-            
-            # Lấy thông tin series từ một số sản phẩm đầu tiên để tìm các series
-            sample_products = product_urls[:min(10, len(product_urls))]
-            for url in sample_products:
-                series_data = self.extract_series_info(url)
-                if series_data and series_data['name'] not in series_info:
-                    series_info[series_data['name']] = series_data
-                    logger.info(f"✓ Tìm thấy series: {series_data['name']}")
-            
-            # Bước 3: Lấy sản phẩm từ từng series
-            logger.info("📦 Đang lấy sản phẩm từ các series...")
-            all_product_urls = set(product_urls)  # Bắt đầu với sản phẩm từ trang chính
-            
-            for series_name, series_data in series_info.items():
-                series_products_list = self.get_products_from_series(series_data['url'])
-                series_products[series_name] = series_products_list
-                all_product_urls.update(series_products_list)
-                logger.info(f"✓ Series '{series_name}': {len(series_products_list)} sản phẩm")
-            
-            # Chuyển về list và loại bỏ trùng lặp
-            final_product_urls = list(all_product_urls)
-            logger.info(f"✓ Tổng cộng {len(final_product_urls)} sản phẩm unique")
-            
-            # Bước 4: Cào thông tin sản phẩm đa luồng
-            logger.info("🔄 Đang cào thông tin sản phẩm (đa luồng)...")
-            product_info_list = self.crawl_products_multithread(final_product_urls)
+            series_report = []
+            for result in series_results:
+                series_report.append({
+                    'Series': result['series_name'],
+                    'Số sản phẩm': result.get('total_products', 0),
+                    'URL Series': result['series_url']
+                })
+                if result.get('success'):
+                    product_info_list.extend(result['products'])
+                    excel_files.extend(result['excel_files'])
+                    series_info[result['series_name']] = {'name': result['series_name'], 'url': result['series_url']}
+            
+            # Bước 4: Sản phẩm ở trang chính không thuộc series nào đã cào
+            leftover_urls = [url for url in product_urls if url not in seen_urls]
+            if leftover_urls:
+                logger.info(f"🔄 Đang cào {len(leftover_urls)} sản phẩm ngoài các series đã liệt kê...")
+                leftover_folder = os.path.join(output_folder, "ngoai_series")
+                os.makedirs(leftover_folder, exist_ok=True)
+                leftover_products = self.crawl_products_multithread(leftover_urls)
+                leftover_products = self.convert_images_to_webp(leftover_products, leftover_folder)
+                excel_files.extend(self.create_excel_by_series(leftover_products, leftover_folder))
+                product_info_list.extend(leftover_products)
             logger.info(f"✓ Đã cào thông tin {len(product_info_list)} sản phẩm")
             
-            # Bước 5: Chuyển đổi ảnh sang WebP
-            logger.info("🖼️ Đang chuyển đổi ảnh sang WebP...")
-            product_info_list = self.convert_images_to_webp(product_info_list, output_folder)
-            logger.info("✓ Hoàn thành chuyển đổi ảnh WebP")
-            
-            # Bước 6: Tạo file Excel theo series
-            logger.info("📊 Đang tạo file Excel theo series...")
-            excel_files = self.create_excel_by_series(product_info_list, output_folder)
-            logger.info(f"✓ Đã tạo {len(excel_files)} file Excel")
-            
-            # Bước 7: Tạo file tổng hợp
+            # Bước 5: Tạo file tổng hợp
             logger.info("📋 Đang tạo file tổng hợp...")
             summary_df = pd.DataFrame(product_info_list)
             summary_path = os.path.join(output_folder, "BAA_Qlight_Summary.xlsx")
             summary_df.to_excel(summary_path, index=False)
             
-            # Bước 8: Tạo báo cáo series
+            # Bước 6: Tạo báo cáo series
             logger.info("📈 Đang tạo báo cáo series...")
-            series_report = []
-            for series_name, products in series_products.items():
-                series_report.append({
-                    'Series': series_name,
-                    'Số sản phẩm': len(products),
-                    'URL Series': series_info.get(series_name, {}).get('url', '')
-                })
-            
             series_df = pd.DataFrame(series_report)
             series_report_path = os.path.join(output_folder, "BAA_Qlight_Series_Report.xlsx")
             series_df.to_excel(series_report_path, index=False)
@@ -810,7 +965,10 @@ def crawl_baa_qlight(output_folder=None, max_workers=10):
         dict: Kết quả cào dữ liệu
     """
     crawler = BAAQlightCrawler(max_workers=max_workers)
-    return crawler.crawl_baa_qlight(output_folder)
+    try:
+        return crawler.crawl_baa_qlight(output_folder)
+    finally:
+        crawler.close()
 
 def get_all_series_list(max_workers=5):
     """
@@ -839,7 +997,29 @@ def crawl_specific_series(series_url, series_name, output_folder=None, max_worke
         dict: Kết quả cào dữ liệu cho series
     """
     crawler = BAAQlightCrawler(max_workers=max_workers)
-    return crawler.crawl_specific_series(series_url, series_name, output_folder)
+    try:
+        return crawler.crawl_specific_series(series_url, series_name, output_folder)
+    finally:
+        crawler.close()
+
+def crawl_series_list(series_list, output_folder, max_workers=10, progress_callback=None):
+    """
+    Hàm tiện ích để cào nhiều series qua một pool dùng chung
+    
+    Args:
+        series_list (list): Danh sách dict {'name', 'url'}
+        output_folder (str): Thư mục gốc, mỗi series một thư mục con
+        max_workers (int): Số luồng tối đa (cho toàn bộ các series)
+        progress_callback (callable, optional): Gọi callback(result, done, total) khi một series xong
+        
+    Returns:
+        list: Kết quả từng series
+    """
+    crawler = BAAQlightCrawler(max_workers=max_workers)
+    try:
+        return crawler.crawl_series_list(series_list, output_folder, progress_callback=progress_callback)
+    finally:
+        crawler.close()
 
 def test_series_extraction():
     """
@@ -12,13 +12,15 @@ import re
 import time
 import json
 import logging
+import threading
 import concurrent.futures
 from datetime import datetime
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, parse_qsl, urlencode, quote, unquote
 
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
+from lxml import etree
 
 # Selenium
 from selenium import webdriver
@@ -29,24 +31,62 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 
 from app import utils, socketio
+from app.progress_reporter import current_reporter
+from app.metrics import (
+    StatsCounters, fetch_histogram, parse_histogram, webdriver_opened, webdriver_closed,
+    webdriver_slots_gauge
+)
+from app.http_metrics import MeteredSession
+from app.crawl_profiler import CrawlProfiler, STAGE_PARSE, STAGE_SPECS, STAGE_EXCEL
+from app.selenium_utils import collect_anchor_data
+from app.spec_engine import (
+    has_class, parse_html, element_text, pairs_from_list_items,
+    table_from_element, render_pairs, render_element_table
+)
 
 
 logger = logging.getLogger(__name__)
 
+# XPath trang chi tiết sản phẩm (biên dịch một lần, dùng chung cho mọi worker)
+_PRODUCT_NAME_XPATH = etree.XPath(f"//h1[{has_class('content-title')}]")
+_PRODUCT_SKU_XPATH = etree.XPath(f"//p[{has_class('content-meta__sku')}]")
+_PRODUCT_BRAND_XPATH = etree.XPath(f"//a[{has_class('content-meta__brand')}]")
+_TECHNICAL_DIV_XPATHS = (
+    etree.XPath(f"//div[@id='technical' and {has_class('content-tab__detail')}]"),
+    etree.XPath("//div[@id='technical']"),
+    etree.XPath(f"//*[{has_class('content-tab__detail')}]"),
+)
+
 
 class HopLongCrawler:
     """Crawler dành cho hoplongtech.com"""
 
-    def __init__(self, output_root: str | None = None, max_workers: int = 10, socketio_instance=None):
+    def __init__(self, output_root: str | None = None, max_workers: int = 10, socketio_instance=None,
+                 selenium_slots: int = 2, max_parallel_brands: int | None = None):
         self.base_url = "https://hoplongtech.com"
         self.output_root = output_root or os.path.join(os.getcwd(), "output_hoplong")
         os.makedirs(self.output_root, exist_ok=True)
 
+        # Kích thước pool chi tiết sản phẩm dùng chung cho mọi brand (tổng concurrency HTTP)
         self.max_workers = max_workers
+        # Số request trang danh sách chạy cùng lúc, dùng chung cho mọi brand và category
+        self.listing_workers = min(max_workers, 5)
+        self._listing_semaphore = threading.BoundedSemaphore(max(1, self.listing_workers))
+        # Số Chrome driver được mở cùng lúc (áp bộ lọc hãng); các brand khác chờ slot
+        self.selenium_slots = max(1, int(selenium_slots))
+        self._selenium_semaphore = threading.BoundedSemaphore(self.selenium_slots)
+        webdriver_slots_gauge('hoplong').set(self.selenium_slots)
+        # Số brand thu thập links song song (mặc định: bằng selenium_slots)
+        self.max_parallel_brands = max(1, int(max_parallel_brands or self.selenium_slots))
+        # Mẫu URL bộ lọc hãng theo category: {category_url: {'ready', 'template', 'baseline', 'baseline_ready'}}
+        self._brand_filter_state: dict[str, dict] = {}
+        self._brand_filter_lock = threading.Lock()
         self.socketio = socketio_instance or socketio
+        # Reporter của job đang chạy (lấy theo request tạo crawler)
+        self.progress = current_reporter() if self.socketio else None
 
         # requests session - enhanced với connection pooling và retry
-        self.session = requests.Session()
+        self.session = MeteredSession('hoplong')
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
@@ -105,19 +145,23 @@ class HopLongCrawler:
         self.chrome_options.add_experimental_option('useAutomationExtension', False)
 
         # stats
-        self.stats = {
-            "categories_processed": 0,
-            "brands_processed": 0,
-            "products_found": 0,
-            "products_processed": 0,
-            "errors": 0,
-        }
-
-    def emit_progress(self, percent: int | float, message: str, detail: str = "") -> None:
-        data = {'percent': percent, 'message': message, 'detail': detail}
+        self.stats = StatsCounters((
+            "categories_processed",
+            "brands_processed",
+            "products_found",
+            "products_processed",
+            "errors",
+        ))
+        self.fetch_latency = fetch_histogram('hoplong')
+        self.parse_latency = parse_histogram('hoplong')
+        # Profiler theo giai đoạn (tắt mặc định, bật bằng CRAWLER_PROFILE=1)
+        self.profiler = CrawlProfiler('hoplong')
+
+    def emit_progress(self, percent: int | float, message: str, detail: str = "",
+                      stage: str | None = None, stage_percent: int | float | None = None) -> None:
         try:
-            if self.socketio:
-                self.socketio.emit('progress_update', data)
+            if self.progress:
+                self.progress.update(percent, message, detail, stage=stage, stage_percent=stage_percent)
             else:
                 print(f"[{percent}%] {message} - {detail}")
         except Exception:
@@ -128,6 +172,7 @@ class HopLongCrawler:
         def _create_driver():
             try:
                 driver = webdriver.Chrome(options=self.chrome_options)
+                webdriver_opened('hoplong', driver)
                 driver.implicitly_wait(10)
                 # Set timeouts
                 driver.set_page_load_timeout(60)
@@ -148,6 +193,7 @@ class HopLongCrawler:
             raise
 
     def close_driver(self, driver):
+        webdriver_closed(driver)
         try:
             driver.quit()
         except Exception:
@@ -778,111 +824,240 @@ class HopLongCrawler:
             logger.error(f"Traceback: {traceback.format_exc()}")
             return False
 
+    @staticmethod
+    def _brand_value_style(value: str, brand_name: str) -> str | None:
+        """Kiểu mã hóa tên hãng trong URL: 'exact', 'lower', 'upper' hoặc 'slug' (None nếu không khớp)."""
+        value = unquote(value).replace('+', ' ').strip()
+        if value == brand_name:
+            return 'exact'
+        if value == brand_name.upper():
+            return 'upper'
+        # Slug được ưu tiên hơn chữ thường: với hãng một từ hai kiểu trùng nhau,
+        # còn với hãng nhiều từ ("Schneider Electric") website thường dùng slug
+        if value == utils.slug(brand_name):
+            return 'slug'
+        if value.lower() == brand_name.lower():
+            return 'lower'
+        return None
+
+    @staticmethod
+    def _encode_brand_value(brand_name: str, style: str) -> str:
+        if style == 'lower':
+            return brand_name.lower()
+        if style == 'upper':
+            return brand_name.upper()
+        if style == 'slug':
+            return utils.slug(brand_name)
+        return brand_name
+
+    def _discover_brand_filter_template(self, category_url: str, filtered_url: str, brand_name: str) -> dict | None:
+        """
+        Suy ra mẫu URL lọc hãng từ URL mà trình duyệt nhận được sau khi click bộ lọc.
+
+        Tìm tham số query (hoặc đoạn path) mang tên hãng; nếu hãng được mã hóa bằng ID
+        nội bộ hoặc URL không đổi (lọc bằng AJAX) thì không có mẫu và trả về None.
+        """
+        if not filtered_url or filtered_url.rstrip('/') == category_url.rstrip('/'):
+            return None
+
+        parsed = urlparse(filtered_url)
+        params = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != 'page']
+        for position, (key, value) in enumerate(params):
+            style = self._brand_value_style(value, brand_name)
+            if style:
+                return {'kind': 'query', 'url': parsed, 'params': params, 'position': position, 'style': style}
+
+        segments = parsed.path.split('/')
+        for position, segment in enumerate(segments):
+            style = self._brand_value_style(segment, brand_name)
+            if style:
+                return {'kind': 'path', 'url': parsed, 'segments': segments, 'position': position, 'style': style}
+
+        return None
+
+    def _brand_filter_url(self, template: dict, brand_name: str) -> str:
+        """Dựng URL danh sách đã lọc cho một hãng từ mẫu đã suy ra."""
+        value = self._encode_brand_value(brand_name, template['style'])
+        parsed = template['url']
+        if template['kind'] == 'query':
+            params = list(template['params'])
+            key, _ = params[template['position']]
+            params[template['position']] = (key, value)
+            return parsed._replace(query=urlencode(params)).geturl()
+
+        segments = list(template['segments'])
+        segments[template['position']] = quote(value)
+        return parsed._replace(path='/'.join(segments)).geturl()
+
+    def _begin_brand_filter_discovery(self, category_url: str) -> bool:
+        """Trả về True nếu luồng hiện tại là luồng đầu tiên phải dò bộ lọc hãng bằng trình duyệt."""
+        with self._brand_filter_lock:
+            if category_url in self._brand_filter_state:
+                return False
+            self._brand_filter_state[category_url] = {
+                'ready': threading.Event(), 'template': None, 'baseline': None, 'baseline_ready': None
+            }
+            return True
+
+    def _end_brand_filter_discovery(self, category_url: str) -> None:
+        state = self._brand_filter_state.get(category_url)
+        if state is not None:
+            state['ready'].set()
+
+    def _learn_brand_filter_template(self, category_url: str, filtered_url: str, brand_name: str) -> None:
+        """Ghi nhớ mẫu URL lọc hãng (chỉ lần đầu suy ra được) để các hãng sau dùng HTTP."""
+        with self._brand_filter_lock:
+            state = self._brand_filter_state.setdefault(
+                category_url, {'ready': threading.Event(), 'template': None, 'baseline': None, 'baseline_ready': None}
+            )
+            if state['template'] is None:
+                template = self._discover_brand_filter_template(category_url, filtered_url, brand_name)
+                if template:
+                    state['template'] = template
+                    logger.info(f"🧭 Learned brand filter URL pattern ({template['kind']}, {template['style']}) from {filtered_url}")
+                else:
+                    logger.info(f"🧭 Brand filter is not URL-based for {category_url}, keeping browser mode")
+        state['ready'].set()
+
+    def _brand_filter_baseline(self, category_url: str, state: dict, wait_timeout: float) -> list[str] | None:
+        """
+        Links trang 1 khi chưa lọc, dùng để phát hiện URL bị website bỏ qua bộ lọc.
+
+        Chỉ một luồng tải (ngoài khóa) cho mỗi category, các luồng khác chờ kết quả;
+        nếu tải lỗi, trạng thái lỗi được ghi lại để không brand nào tải lại.
+
+        Returns:
+            list[str] hoặc None: None nếu không lấy được (cần quay về trình duyệt)
+        """
+        with self._brand_filter_lock:
+            owner = state['baseline_ready'] is None
+            if owner:
+                state['baseline_ready'] = threading.Event()
+            ready = state['baseline_ready']
+
+        if owner:
+            try:
+                baseline_links, _ = self._fetch_listing_page(category_url, 1)
+                state['baseline'] = baseline_links
+            except Exception as e:
+                logger.warning(f"⚠️ Cannot fetch unfiltered listing for {category_url}, URL brand filter disabled: {e}")
+                state['baseline'] = False
+            finally:
+                ready.set()
+        elif not ready.wait(wait_timeout):
+            return None
+
+        baseline = state['baseline']
+        return None if baseline is False else baseline
+
+    def _fetch_brand_links_via_template(self, category_url: str, brand_name: str, wait_timeout: float = 180.0) -> list[str] | None:
+        """
+        Lấy links sản phẩm của một hãng chỉ bằng HTTP qua mẫu URL bộ lọc đã học.
+
+        Returns:
+            list[str] hoặc None: None nếu chưa có mẫu hoặc URL có vẻ không áp dụng bộ lọc
+            (khi đó cần quay về trình duyệt)
+        """
+        state = self._brand_filter_state.get(category_url)
+        if state is None:
+            return None
+        # Chờ luồng đầu tiên dò xong bộ lọc bằng trình duyệt
+        state['ready'].wait(wait_timeout)
+        template = state['template']
+        if not template:
+            return None
+
+        baseline = self._brand_filter_baseline(category_url, state, wait_timeout)
+        if baseline is None:
+            return None
+
+        filtered_url = self._brand_filter_url(template, brand_name)
+        try:
+            product_links = self._fetch_all_pages_bs4(filtered_url, self.session)
+        except Exception as e:
+            logger.warning(f"⚠️ URL brand filter failed for '{brand_name}' ({filtered_url}): {e}")
+            return None
+
+        if not product_links:
+            logger.warning(f"⚠️ URL brand filter returned no products for '{brand_name}', falling back to browser")
+            return None
+        if baseline and set(product_links[:len(baseline)]) == set(baseline):
+            logger.warning(f"⚠️ URL brand filter seems ignored for '{brand_name}', falling back to browser")
+            return None
+
+        logger.info(f"⚡ URL brand filter: {len(product_links)} products for {brand_name} via {filtered_url}")
+        return product_links
+
     def _collect_product_links(self, driver) -> list[str]:
         """Thu thập toàn bộ link sản phẩm (có thể phải scroll/pagination)."""
         links: list[str] = []
 
         def snapshot() -> set[str]:
             result = set()
-            
-            # Selectors dựa trên HTML structure thực tế
-            selectors_to_try = [
-                # Chính xác từ HTML user cung cấp
-                ".product-list__item .thumbnail a",     # Main selector từ HTML
-                ".product-list__item .content h3 a",   # Alternative từ content
-                ".product-list__item a[href*='/products/']",  # Direct products links
-                "a[href^='/products/']",                # Links bắt đầu /products/
-                "a[href*='/products/']",                # Links chứa /products/
-                ".grid-list a[href*='/products/']",     # Trong grid-list container
-                
-                # Fallback patterns  
-                "a[href^='/product/']",         # Original pattern
-                "a[href*='/product/']",         # Contains /product/
-                "a[href^='/san-pham/']",        # Vietnamese pattern
-                "a[href*='/san-pham/']",        # Contains /san-pham/
-                ".product-item a",              # Product item links
-                ".product-card a",              # Product card links  
-                ".product-list a",              # Product list links
-                "a.product-link",               # Product link class
-                ".col-product a",               # Column product links
-                ".grid-item a",                 # Grid item links
-                ".list-item a",                 # List item links
-                "div[class*='product'] a",      # Divs with product class
-            ]
-            
-            for selector in selectors_to_try:
-                try:
-                    items = driver.find_elements(By.CSS_SELECTOR, selector)
-                    logger.debug(f"🔍 Selector '{selector}' tìm thấy {len(items)} elements")
-                    
-                    for a in items:
-                        href = a.get_attribute('href') or ''
-                        title = a.get_attribute('title') or a.text or ''
-                        
-                        if href:
-                            # Optimize logging - chỉ log khi debug mode
-                            if logger.isEnabledFor(logging.DEBUG):
-                                logger.debug(f"  Found link: {href} | Title: {title[:50]}")
-                            
-                            # Validate product URL patterns - ưu tiên /products/
-                            is_valid = False
-                            if '/products/' in href:  # Priority pattern
-                                is_valid = True
-                            elif any(pattern in href for pattern in ['/product/', '/san-pham/']):
-                                is_valid = True
-                            elif any(keyword in href.lower() for keyword in ['item', 'detail', 'view']) and 'hoplongtech.com' in href:
-                                is_valid = True
-                                
-                            if is_valid:
-                                # Ensure full URL và chính xác domain
-                                if href.startswith('/'):
-                                    href = urljoin(self.base_url, href)
-                                elif not href.startswith('http'):
-                                    continue
-                                
-                                # Chỉ lấy links từ hoplongtech.com
-                                if 'hoplongtech.com' in href:
-                                    result.add(href)
-                                    if logger.isEnabledFor(logging.DEBUG):
-                                        logger.debug(f"    ✅ Added to result set")
-                                elif logger.isEnabledFor(logging.DEBUG):
-                                    logger.debug(f"    ❌ Skipped - wrong domain: {href}")
-                                    
-                except Exception as e:
-                    logger.debug(f"❌ Selector '{selector}' failed: {e}")
+
+            # Một lần execute_script cho toàn bộ selector thay vì find_elements + get_attribute từng phần tử
+            try:
+                anchors = collect_anchor_data(driver, self.PRODUCT_LINK_SELECTORS)
+            except WebDriverException as e:
+                logger.debug(f"❌ Thu thập links bằng JavaScript thất bại: {e}")
+                anchors = []
+
+            for anchor in anchors:
+                href = anchor['href']
+                if not href:
                     continue
-            
+                title = anchor['title'] or anchor['text']
+
+                # Optimize logging - chỉ log khi debug mode
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"  Found link: {href} | Title: {title[:50]}")
+
+                # Validate product URL patterns - ưu tiên /products/
+                is_valid = False
+                if '/products/' in href:  # Priority pattern
+                    is_valid = True
+                elif any(pattern in href for pattern in ['/product/', '/san-pham/']):
+                    is_valid = True
+                elif any(keyword in href.lower() for keyword in ['item', 'detail', 'view']) and 'hoplongtech.com' in href:
+                    is_valid = True
+
+                if is_valid:
+                    # Ensure full URL và chính xác domain
+                    if href.startswith('/'):
+                        href = urljoin(self.base_url, href)
+                    elif not href.startswith('http'):
+                        continue
+
+                    # Chỉ lấy links từ hoplongtech.com
+                    if 'hoplongtech.com' in href:
+                        result.add(href)
+                    elif logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"    ❌ Skipped - wrong domain: {href}")
+
             # Enhanced fallback với detailed logging
             if not result:
                 logger.warning("🔄 Không tìm thấy product links với selectors, thử comprehensive fallback...")
                 try:
-                    all_links = driver.find_elements(By.CSS_SELECTOR, "a[href]")
+                    all_links = collect_anchor_data(driver, "a[href]")
                     logger.info(f"🔍 Analyzing {len(all_links)} total links...")
-                    
-                    sample_links = []
-                    for i, a in enumerate(all_links):
-                        href = a.get_attribute('href') or ''
-                        if href:
-                            if i < 10:  # Log first 10 for debugging
-                                sample_links.append(href)
-                            
-                            if (any(pattern in href for pattern in ['/products/', '/product/', '/san-pham/']) and 
+
+                    for anchor in all_links:
+                        href = anchor['href']
+                        if (any(pattern in href for pattern in ['/products/', '/product/', '/san-pham/']) and
                                 'hoplongtech.com' in href):
-                                if href.startswith('/'):
-                                    href = urljoin(self.base_url, href)
-                                result.add(href)
-                    
-                    logger.debug(f"Sample links found: {sample_links}")
-                            
+                            result.add(href)
+
+                    logger.debug(f"Sample links found: {[a['href'] for a in all_links[:10]]}")
+
                 except Exception as e:
                     logger.error(f"❌ Comprehensive fallback failed: {e}")
-            
+
             logger.info(f"📦 Total unique product links found: {len(result)}")
             if result:
                 logger.info(f"✅ Sample valid product links: {list(result)[:5]}")
             else:
                 logger.warning("❌ No product links found - may need to debug page structure")
-            
+
             return result
 
         seen = snapshot()
@@ -993,114 +1168,99 @@ class HopLongCrawler:
         
         return final_links
 
-    def _collect_product_links_bs4(self, url: str, session: requests.Session = None) -> list[str]:
-        """Thu thập product links từ một trang sử dụng BeautifulSoup - version tối ưu."""
+    # Product link selectors - theo priority
+    PRODUCT_LINK_SELECTORS = [
+        # Priority selectors từ HTML structure thực tế
+        ".product-list__item .thumbnail a",
+        ".product-list__item .content h3 a",
+        ".product-list__item a[href*='/products/']",
+        "a[href^='/products/']",
+        "a[href*='/products/']",
+        ".grid-list a[href*='/products/']",
+
+        # Fallback patterns
+        "a[href^='/product/']",
+        "a[href*='/product/']",
+        "a[href^='/san-pham/']",
+        "a[href*='/san-pham/']",
+        ".product-item a",
+        ".product-card a",
+        ".product-list a",
+        "a.product-link",
+        ".col-product a",
+        ".grid-item a",
+        ".list-item a",
+        "div[class*='product'] a"
+    ]
+
+    def _fetch_listing_soup(self, url: str, session: requests.Session = None) -> BeautifulSoup:
+        """Tải và parse một trang danh sách đúng một lần (có retry)."""
         if session is None:
             session = self.session
-            
+
+        def _fetch_page():
+            # Giữ slot chỉ trong lúc gửi request, không giữ khi chờ retry
+            with self._listing_semaphore:
+                resp = session.get(url, timeout=30)
+            resp.raise_for_status()
+            return resp.text
+
+        html_content = self.retry_with_backoff(_fetch_page, max_retries=3, base_delay=1.5)
+        return BeautifulSoup(html_content, 'html.parser')
+
+    def _extract_product_links_from_soup(self, soup: BeautifulSoup, url: str = "") -> list[str]:
+        """Lấy product links từ một trang đã parse, giữ thứ tự xuất hiện và không trùng lặp."""
+        links: dict[str, None] = {}
+
+        # Một lần select cho toàn bộ selector thay vì lặp từng selector
+        for element in soup.select(", ".join(self.PRODUCT_LINK_SELECTORS)):
+            href = element.get('href', '').strip()
+            if not href:
+                continue
+
+            # Validate product URL patterns
+            if '/products/' in href or '/product/' in href or '/san-pham/' in href:
+                is_valid = True
+            else:
+                is_valid = any(keyword in href.lower() for keyword in ['item', 'detail', 'view']) and 'hoplongtech.com' in href
+            if not is_valid:
+                continue
+
+            # Ensure full URL
+            if href.startswith('/'):
+                href = urljoin(self.base_url, href)
+            elif not href.startswith('http'):
+                continue
+
+            # Only accept hoplongtech.com domain
+            if 'hoplongtech.com' in href:
+                links[href] = None
+
+        # Enhanced fallback nếu không tìm thấy gì
+        if not links:
+            logger.warning("🔄 No product links found with primary selectors, trying comprehensive fallback...")
+            for a in soup.find_all('a', href=True):
+                href = a.get('href', '').strip()
+                if href and any(pattern in href for pattern in ['/products/', '/product/', '/san-pham/']):
+                    if 'hoplongtech.com' in href:
+                        if href.startswith('/'):
+                            href = urljoin(self.base_url, href)
+                        links[href] = None
+
+        result = list(links)
+        logger.info(f"📦 Found {len(result)} product links from: {url}")
+        if result and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"✅ Sample links: {result[:3]}")
+        elif not result:
+            logger.warning(f"❌ No product links found on page: {url}")
+        return result
+
+    def _collect_product_links_bs4(self, url: str, session: requests.Session = None) -> list[str]:
+        """Thu thập product links từ một trang sử dụng BeautifulSoup - version tối ưu."""
         try:
             logger.debug(f"🔍 Collecting product links from: {url}")
-            
-            # Fetch page content với retry
-            def _fetch_page():
-                resp = session.get(url, timeout=30)
-                resp.raise_for_status()
-                return resp.text
-            
-            html_content = self.retry_with_backoff(_fetch_page, max_retries=3, base_delay=1.5)
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            links = set()
-            
-            # Product link selectors - theo priority
-            selectors_to_try = [
-                # Priority selectors từ HTML structure thực tế
-                ".product-list__item .thumbnail a",
-                ".product-list__item .content h3 a", 
-                ".product-list__item a[href*='/products/']",
-                "a[href^='/products/']",
-                "a[href*='/products/']",
-                ".grid-list a[href*='/products/']",
-                
-                # Fallback patterns
-                "a[href^='/product/']",
-                "a[href*='/product/']", 
-                "a[href^='/san-pham/']",
-                "a[href*='/san-pham/']",
-                ".product-item a",
-                ".product-card a",
-                ".product-list a",
-                "a.product-link",
-                ".col-product a",
-                ".grid-item a",
-                ".list-item a",
-                "div[class*='product'] a"
-            ]
-            
-            for selector in selectors_to_try:
-                try:
-                    elements = soup.select(selector)
-                    logger.debug(f"🔍 Selector '{selector}' found {len(elements)} elements")
-                    
-                    for element in elements:
-                        href = element.get('href', '').strip()
-                        if not href:
-                            continue
-                            
-                        # Validate product URL patterns
-                        is_valid = False
-                        if '/products/' in href:  # Priority pattern
-                            is_valid = True
-                        elif any(pattern in href for pattern in ['/product/', '/san-pham/']):
-                            is_valid = True
-                        elif any(keyword in href.lower() for keyword in ['item', 'detail', 'view']) and 'hoplongtech.com' in href:
-                            is_valid = True
-                            
-                        if is_valid:
-                            # Ensure full URL
-                            if href.startswith('/'):
-                                href = urljoin(self.base_url, href)
-                            elif not href.startswith('http'):
-                                continue
-                                
-                            # Only accept hoplongtech.com domain
-                            if 'hoplongtech.com' in href:
-                                links.add(href)
-                                if logger.isEnabledFor(logging.DEBUG):
-                                    logger.debug(f"  ✅ Added: {href}")
-                                    
-                except Exception as e:
-                    logger.debug(f"❌ Selector '{selector}' failed: {e}")
-                    continue
-            
-            # Enhanced fallback nếu không tìm thấy gì
-            if not links:
-                logger.warning("🔄 No product links found with primary selectors, trying comprehensive fallback...")
-                try:
-                    all_links = soup.find_all('a', href=True)
-                    logger.debug(f"🔍 Analyzing {len(all_links)} total links...")
-                    
-                    for a in all_links:
-                        href = a.get('href', '').strip()
-                        if href and any(pattern in href for pattern in ['/products/', '/product/', '/san-pham/']):
-                            if 'hoplongtech.com' in href:
-                                if href.startswith('/'):
-                                    href = urljoin(self.base_url, href)
-                                links.add(href)
-                                
-                except Exception as e:
-                    logger.error(f"❌ Comprehensive fallback failed: {e}")
-            
-            result = sorted(list(links))
-            logger.info(f"📦 Found {len(result)} product links from: {url}")
-            
-            if result and logger.isEnabledFor(logging.DEBUG):
-                logger.debug(f"✅ Sample links: {result[:3]}")
-            elif not result:
-                logger.warning(f"❌ No product links found on page: {url}")
-                
-            return result
-            
+            soup = self._fetch_listing_soup(url, session)
+            return sorted(self._extract_product_links_from_soup(soup, url))
         except Exception as e:
             logger.error(f"❌ Error collecting product links from {url}: {e}")
             return []
@@ -1181,278 +1341,190 @@ class HopLongCrawler:
             logger.error(f"❌ Error extracting pagination info: {e}")
             return pagination_info
 
+    @staticmethod
+    def _listing_page_url(base_url: str, page: int) -> str:
+        """URL của trang thứ `page` trong danh sách đã lọc."""
+        if page == 1:
+            return base_url
+        return f"{base_url}{'&' if '?' in base_url else '?'}page={page}"
+
+    def _fetch_listing_page(self, base_url: str, page: int, session: requests.Session = None) -> tuple[list[str], dict]:
+        """Tải một trang danh sách, parse một lần, trả về (product links, pagination info)."""
+        page_url = self._listing_page_url(base_url, page)
+        logger.info(f"📄 Fetching page {page}: {page_url}")
+        soup = self._fetch_listing_soup(page_url, session)
+        return self._extract_product_links_from_soup(soup, page_url), self._extract_pagination_info(soup)
+
     def _fetch_all_pages_bs4(self, base_url: str, session: requests.Session = None, max_pages: int = 100) -> list[str]:
         """
         Fetch tất cả product links từ tất cả pages của filtered results sử dụng BeautifulSoup.
         base_url: URL của trang đầu tiên (đã có brand filter applied)
+
+        Mỗi trang chỉ được tải và parse một lần. Khi trang 1 cho biết tổng số trang,
+        các trang 2..N được tải song song; nếu không, duyệt tuần tự theo nút "Xem thêm".
         """
         if session is None:
             session = self.session
-            
-        all_links = []
-        current_page = 1
-        consecutive_empty_pages = 0  # Safety valve
-        
+
+        # dict giữ thứ tự chèn - dùng như ordered set để khử trùng lặp O(1)
+        all_links: dict[str, None] = {}
+        raw_count = 0
+        pages_crawled = 0
+
+        def _merge(page: int, page_links: list[str]) -> int:
+            nonlocal raw_count
+            before = len(all_links)
+            all_links.update(dict.fromkeys(page_links))
+            raw_count += len(page_links)
+            new_count = len(all_links) - before
+            logger.info(f"✅ Page {page}: Found {len(page_links)} products ({new_count} new), Total: {len(all_links)}")
+            if new_count != len(page_links):
+                logger.warning(f"⚠️ Page {page}: {len(page_links) - new_count} duplicate products detected")
+            return new_count
+
         try:
             logger.info(f"🔄 Starting multi-page fetch from: {base_url}")
-            logger.info(f"🔧 Initial max_pages limit: {max_pages}")
-            
-            while current_page <= max_pages:
+
+            page_links, pagination_info = self._fetch_listing_page(base_url, 1, session)
+            pages_crawled = 1
+            _merge(1, page_links)
+
+            total_pages = pagination_info['total_pages']
+            next_page = 2
+
+            if total_pages > 1:
+                # Tổng số trang đã biết: tải song song các trang còn lại, gộp theo đúng thứ tự trang
+                logger.info(f"📊 Website has {total_pages} total pages, fetching pages 2..{total_pages} concurrently")
+                pages = list(range(2, total_pages + 1))
+                workers = max(1, min(self.listing_workers, len(pages)))
+                results: dict[int, list[str]] = {}
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {executor.submit(self._fetch_listing_page, base_url, page, session): page for page in pages}
+                    for future in concurrent.futures.as_completed(futures):
+                        page = futures[future]
+                        try:
+                            results[page], info = future.result()
+                            pages_crawled += 1
+                            if page == total_pages:
+                                pagination_info = info
+                        except Exception as e:
+                            logger.error(f"❌ Error processing page {page}: {e}")
+                            results[page] = []
+                for page in pages:
+                    _merge(page, results.get(page, []))
+                next_page = total_pages + 1
+
+            # Không biết tổng số trang (hoặc trang cuối vẫn báo còn trang sau): duyệt tuần tự
+            consecutive_empty_pages = 0
+            limit = max(max_pages, total_pages)
+            while pagination_info['has_next'] and next_page <= limit:
                 try:
-                    # IMPROVED: Construct page URL với advanced logic
-                    if current_page == 1:
-                        page_url = base_url
-                        logger.info(f"📄 Fetching page {current_page} (base URL): {page_url}")
-                    else:
-                        # Multiple URL patterns to try
-                        url_patterns = [
-                            f"{base_url}{'&' if '?' in base_url else '?'}page={current_page}",
-                            f"{base_url}{'&' if '?' in base_url else '?'}p={current_page}",
-                            f"{base_url}/page/{current_page}",
-                            f"{base_url}?page={current_page}" if '?' not in base_url else f"{base_url}&page={current_page}"
-                        ]
-                        
-                        # Use first pattern for now, thêm logic để test multiple patterns nếu cần
-                        page_url = url_patterns[0]
-                        logger.info(f"📄 Fetching page {current_page}: {page_url}")
-                        logger.debug(f"📄 Alternative URL patterns available: {url_patterns[1:]}")
-                    
-                    # Fetch page content với retry
-                    def _fetch_page():
-                        resp = session.get(page_url, timeout=30)
-                        resp.raise_for_status()
-                        return resp.text
-                    
-                    html_content = self.retry_with_backoff(_fetch_page, max_retries=3, base_delay=1.5)
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    # Extract pagination info từ current page
-                    pagination_info = self._extract_pagination_info(soup)
-                    
-                    # Collect product links từ current page
-                    page_links = self._collect_product_links_bs4(page_url, session)
-                    
-                    if page_links:
-                        # ENHANCED: Check for duplicates và track unique links
-                        unique_page_links = [link for link in page_links if link not in all_links]
-                        all_links.extend(unique_page_links)
-                        
-                        # Reset consecutive empty pages counter
-                        consecutive_empty_pages = 0
-                        
-                        logger.info(f"✅ Page {current_page}: Found {len(page_links)} products ({len(unique_page_links)} new), Total: {len(all_links)}")
-                        
-                        # Additional debugging
-                        if len(unique_page_links) != len(page_links):
-                            logger.warning(f"⚠️ Page {current_page}: {len(page_links) - len(unique_page_links)} duplicate products detected")
-                            
-                        # Sample products for debugging
-                        if logger.isEnabledFor(logging.DEBUG) and page_links:
-                            logger.debug(f"📦 Sample products from page {current_page}: {page_links[:3]}")
-                    else:
-                        consecutive_empty_pages += 1
-                        logger.warning(f"⚠️ Page {current_page}: No products found (consecutive empty: {consecutive_empty_pages})")
-                        
-                        # Safety valve: stop after 3 consecutive empty pages
-                        if consecutive_empty_pages >= 3:
-                            logger.warning(f"🛑 Stopping after {consecutive_empty_pages} consecutive empty pages - likely pagination ended")
-                            break
-                            
-                        # If no products found on page 2+, it might mean pagination ended
-                        if current_page > 1 and consecutive_empty_pages >= 2:
-                            logger.warning(f"⚠️ Multiple empty pages detected, likely pagination ended")
-                            break
-                    
-                    # ENHANCED: Check if we should continue với detailed logging
-                    logger.debug(f"📊 Pagination check - Current: {pagination_info['current_page']}, Total: {pagination_info['total_pages']}, Has next: {pagination_info['has_next']}")
-                    
-                    if not pagination_info['has_next']:
-                        logger.info(f"🏁 Pagination indicates last page reached: {current_page}/{pagination_info['total_pages']}")
-                        break
-                        
-                    # Verify current page number matches expected
-                    if pagination_info['current_page'] != current_page:
-                        logger.warning(f"⚠️ Page number mismatch: expected {current_page}, got {pagination_info['current_page']}")
-                    
-                    # Update max_pages if we know total pages - KHÔNG giới hạn bằng max_pages ban đầu
-                    if pagination_info['total_pages'] > 1:
-                        # Allow crawling up to actual total pages, không bị giới hạn bởi max_pages
-                        actual_max = pagination_info['total_pages']
-                        logger.info(f"📊 Website has {actual_max} total pages, will crawl all of them")
-                        # Chỉ cập nhật max_pages nếu nó lớn hơn giá trị hiện tại
-                        if actual_max > max_pages:
-                            max_pages = actual_max
-                            logger.info(f"📊 Increased max_pages to: {max_pages} to cover all pages")
-                    
-                    current_page += 1
-                    
-                    # Small delay để tránh rate limiting
-                    time.sleep(0.5)
-                    
-                except requests.exceptions.RequestException as e:
-                    logger.error(f"❌ Network error on page {current_page}: {e}")
-                    # Try next page nếu current page fail
-                    current_page += 1
-                    if current_page > max_pages:
-                        break
-                    time.sleep(2.0)  # Longer delay after error
-                    continue
-                    
+                    page_links, pagination_info = self._fetch_listing_page(base_url, next_page, session)
+                    pages_crawled += 1
                 except Exception as e:
-                    logger.error(f"❌ Error processing page {current_page}: {e}")
-                    current_page += 1
-                    if current_page > max_pages:
-                        break
+                    logger.error(f"❌ Error processing page {next_page}: {e}")
+                    next_page += 1
+                    time.sleep(2.0)
                     continue
-            
-            # Remove duplicates và sort với enhanced reporting
-            unique_links = sorted(list(set(all_links)))
-            pages_crawled = current_page - 1
-            
+
+                if _merge(next_page, page_links):
+                    consecutive_empty_pages = 0
+                else:
+                    consecutive_empty_pages += 1
+                    logger.warning(f"⚠️ Page {next_page}: No new products (consecutive empty: {consecutive_empty_pages})")
+                    if consecutive_empty_pages >= 2:
+                        logger.warning("🛑 Multiple empty pages detected, likely pagination ended")
+                        break
+
+                next_page += 1
+                # Small delay để tránh rate limiting
+                time.sleep(0.5)
+
+            unique_links = list(all_links)
             logger.info(f"🎯 MULTI-PAGE FETCH COMPLETED:")
             logger.info(f"   📄 Pages crawled: {pages_crawled}")
-            logger.info(f"   📦 Total products found: {len(all_links)} (raw)")
+            logger.info(f"   📦 Total products found: {raw_count} (raw)")
             logger.info(f"   🔗 Unique products: {len(unique_links)}")
-            logger.info(f"   ♻️ Duplicates removed: {len(all_links) - len(unique_links)}")
-            
-            # Additional insights
-            if pages_crawled > 0:
-                avg_products_per_page = len(unique_links) / pages_crawled
-                logger.info(f"   📊 Average products per page: {avg_products_per_page:.1f}")
-            
-            # Warning if numbers seem low
-            if len(unique_links) < 100:
-                logger.warning(f"⚠️ Only {len(unique_links)} products found - this seems low, may indicate pagination issues")
-            
+            logger.info(f"   ♻️ Duplicates removed: {raw_count - len(unique_links)}")
             return unique_links
-            
+
         except Exception as e:
             logger.error(f"❌ Critical error in multi-page fetch: {e}")
             import traceback
             logger.debug(f"Traceback: {traceback.format_exc()}")
-            return all_links  # Return partial results
+            return list(all_links)  # Return partial results
 
     # ======= PRODUCT DETAILS =======
-    def _parse_specs_from_technical_div(self, technical_div: BeautifulSoup) -> list[tuple[str, str]]:
+    @staticmethod
+    def _first_match(root, *xpaths):
+        """Phần tử đầu tiên khớp một trong các XPath (thử theo thứ tự)"""
+        for xpath in xpaths:
+            found = xpath(root)
+            if found:
+                return found[0]
+        return None
+
+    def _parse_specs_from_technical_div(self, technical_div) -> list[tuple[str, str]]:
         """
-        Trích xuất cặp (title, content) từ #technical theo structure:
+        Trích xuất cặp (title, content) từ #technical (phần tử lxml) theo structure:
         <ul>
             <li>
                 <span class="title">Tên sản phẩm</span>
                 <span class="content">Cảm biến tiệm cận E2B-M12KN05-WP-B2 2M OMI Omron</span>
             </li>
         </ul>
+        Nếu không có, thử các li dạng "Tiêu đề: nội dung".
         """
-        pairs: list[tuple[str, str]] = []
-        if not technical_div:
-            return pairs
+        if technical_div is None:
+            return []
 
         logger.debug("🔍 Parsing technical specifications...")
-        
-        # Extract từ ul/li/span structure theo HTML user cung cấp
-        ul_elements = technical_div.find_all('ul')
-        logger.debug(f"Found {len(ul_elements)} ul elements")
-        
-        for ul_idx, ul in enumerate(ul_elements):
-            li_elements = ul.find_all('li', recursive=False)
-            logger.debug(f"UL {ul_idx + 1}: Found {len(li_elements)} li elements")
-            
-            for li_idx, li in enumerate(li_elements):
-                # Tìm span với class='title' và class='content'
-                title_span = li.find('span', class_='title')
-                content_span = li.find('span', class_='content')
-                
-                title = title_span.get_text(strip=True) if title_span else ''
-                content = content_span.get_text(strip=True) if content_span else ''
-                
-                logger.debug(f"  LI {li_idx + 1}: '{title}' = '{content}'")
-                
-                # Chỉ thêm vào nếu có ít nhất title hoặc content
-                if title or content:
-                    pairs.append((title, content))
-        
-        # Fallback: nếu không tìm thấy gì bằng structure chính xác, thử các pattern khác
-        if not pairs:
-            logger.warning("🔄 No specs found with primary structure, trying fallback patterns...")
-            
-            # Thử tìm tất cả li elements có text
-            all_li = technical_div.find_all('li')
-            for li in all_li:
-                text = li.get_text(strip=True)
-                if ':' in text:
-                    # Split theo dấu : đầu tiên
-                    parts = text.split(':', 1)
-                    if len(parts) == 2:
-                        title, content = parts[0].strip(), parts[1].strip()
-                        if title and content:
-                            pairs.append((title, content))
-                            logger.debug(f"  Fallback: '{title}' = '{content}'")
-        
+        pairs = pairs_from_list_items(technical_div)
         logger.info(f"📊 Total specifications extracted: {len(pairs)}")
         return pairs
 
-    def _build_specs_html(self, technical_div: BeautifulSoup, pairs: list[tuple[str, str]]) -> str:
+    def _build_specs_html(self, technical_div, pairs: list[tuple[str, str]]) -> str:
         """Tạo HTML thông số kỹ thuật theo yêu cầu, thêm Copyright ở cuối."""
-        # Nếu technical_div có table: giữ nguyên, chỉ thêm hàng Copyright vào cuối tbody
-        if technical_div:
-            table = technical_div.find('table')
-            if table:
-                # loại bỏ <col>/<colgroup>
-                for col in table.find_all(['col', 'colgroup']):
-                    col.decompose()
-                tbody = table.find('tbody') or table
-                tr = technical_div.new_tag('tr')
-                td1 = technical_div.new_tag('td')
-                td1['style'] = 'font-weight: bold;'
-                td1.string = 'Copyright'
-                td2 = technical_div.new_tag('td')
-                td2.string = 'Haiphongtech.vn'
-                tr.append(td1)
-                tr.append(td2)
-                tbody.append(tr)
-                return str(table)
+        # Nếu technical_div có table: giữ cấu trúc bảng (rowspan/colspan), thêm hàng Copyright cuối bảng
+        if technical_div is not None:
+            table = next(technical_div.iter('table'), None)
+            if table is not None:
+                spec_table = table_from_element(table, footnote_class=None)
+                return render_element_table(spec_table.add_copyright(), styled=False)
 
         # Fallback: dựng bảng 2 cột từ pairs
-        rows = [
-            '<table id="specifications" border="1" cellpadding="8" cellspacing="0" style="border-collapse:collapse;width:100%;font-family:Arial;">',
-            '<thead><tr style="background:#f2f2f2;"><th>Thông số</th><th>Giá trị</th></tr></thead>',
-            '<tbody>'
-        ]
-        for k, v in pairs:
-            k_esc = (k or '').replace('<', '&lt;').replace('>', '&gt;')
-            v_esc = (v or '').replace('<', '&lt;').replace('>', '&gt;')
-            if k_esc or v_esc:
-                rows.append(f'<tr><td><strong>{k_esc}</strong></td><td>{v_esc}</td></tr>')
-        rows.append('<tr><td style="font-weight: bold;">Copyright</td><td>Haiphongtech.vn</td></tr>')
-        rows.append('</tbody></table>')
-        return '\n'.join(rows)
+        return render_pairs(pairs)
 
     def extract_product_details(self, product_url: str, category_name: str, expected_brand: str = None) -> dict | None:
         """STRICT extraction - Lấy chi tiết sản phẩm với validation nghiêm ngặt theo brand."""
+        with self.profiler.item(product_url):
+            return self._extract_product_details(product_url, category_name, expected_brand)
+
+    def _extract_product_details(self, product_url: str, category_name: str, expected_brand: str = None) -> dict | None:
         try:
             logger.debug(f"🔍 Extracting product details from: {product_url}")
             if expected_brand:
                 logger.info(f"🎯 Expected brand: {expected_brand}")
                 
-            resp = self.session.get(product_url, timeout=30)
+            with self.fetch_latency.time():
+                resp = self.session.get(product_url, timeout=30)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            # Parse trang một lần bằng lxml
+            with self.parse_latency.time(), self.profiler.span(STAGE_PARSE):
+                root = parse_html(resp.content)
 
             # Tên sản phẩm: <h1 class="content-title">
-            name_el = soup.select_one('h1.content-title')
-            product_name = name_el.get_text(strip=True) if name_el else ''
+            product_name = element_text(self._first_match(root, _PRODUCT_NAME_XPATH))
             logger.debug(f"📝 Product name: {product_name}")
 
             # Mã sản phẩm: <p class="content-meta__sku">Mã sản phẩm: E2B-M12KN05-WP-B2 2M OMI</p>
-            sku_el = soup.select_one('p.content-meta__sku')
-            sku_text = sku_el.get_text(strip=True) if sku_el else ''
+            sku_text = element_text(self._first_match(root, _PRODUCT_SKU_XPATH))
             # Lấy phần sau "Mã sản phẩm:" 
             product_code = re.sub(r'^\s*Mã\s*sản\s*phẩm\s*:\s*', '', sku_text, flags=re.IGNORECASE).strip()
             logger.debug(f"🏷️ Product code: {product_code}")
 
             # Hãng sản phẩm: <a class="content-meta__brand">
-            brand_el = soup.select_one('a.content-meta__brand')
-            actual_brand = brand_el.get_text(strip=True) if brand_el else ''
+            actual_brand = element_text(self._first_match(root, _PRODUCT_BRAND_XPATH))
             logger.info(f"🏭 Actual brand from product: {actual_brand}")
 
             # STRICT BRAND VALIDATION
@@ -1464,17 +1536,15 @@ class HopLongCrawler:
                 else:
                     logger.info(f"✅ BRAND MATCH VERIFIED: {actual_brand}")
 
-            # Thông số kỹ thuật: <div class="content-tab__detail" id="technical">
-            tech_div = soup.select_one('div.content-tab__detail#technical')
-            if not tech_div:
-                # Fallback selectors
-                tech_div = soup.select_one('div#technical') or soup.select_one('.content-tab__detail')
+            # Thông số kỹ thuật: <div class="content-tab__detail" id="technical"> (kèm fallback selectors)
+            tech_div = self._first_match(root, *_TECHNICAL_DIV_XPATHS)
                 
             logger.debug(f"🔧 Technical div found: {tech_div is not None}")
 
             # Extract specifications từ ul/li/span structure
-            pairs = self._parse_specs_from_technical_div(tech_div) if tech_div else []
-            specs_html = self._build_specs_html(tech_div, pairs)
+            with self.profiler.span(STAGE_SPECS):
+                pairs = self._parse_specs_from_technical_div(tech_div)
+                specs_html = self._build_specs_html(tech_div, pairs)
             
             if logger.isEnabledFor(logging.DEBUG):
                 logger.debug(f"📊 Specifications extracted: {len(pairs)} pairs")
@@ -1501,7 +1571,7 @@ class HopLongCrawler:
             logger.error(f"❌ Lỗi khi lấy chi tiết sản phẩm {product_url}: {e}")
             import traceback
             logger.debug(f"Traceback: {traceback.format_exc()}")
-            self.stats["errors"] += 1
+            self.stats.inc('errors')
             return None
 
     # ======= MAIN ORCHESTRATION =======
@@ -1547,6 +1617,12 @@ class HopLongCrawler:
 
     def crawl_category_by_brands(self, category_url: str, brands: list[str]) -> str:
         """OPTIMIZED: Cào 1 danh mục cho nhiều hãng với parallel processing."""
+        with self.profiler.run():
+            batch_folder = self._crawl_category_by_brands(category_url, brands)
+        self.profiler.write_report(batch_folder)
+        return batch_folder
+
+    def _crawl_category_by_brands(self, category_url: str, brands: list[str]) -> str:
         start = time.time()
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         batch_folder = os.path.join(self.output_root, f"HopLong_{timestamp}")
@@ -1564,99 +1640,142 @@ class HopLongCrawler:
         
         self.emit_progress(0, f"Bắt đầu cào HopLong: {category_name}", category_url)
 
-        # OPTIMIZATION DECISION: Choose parallel vs sequential based on brand count
-        if len(brands) >= 2 and len(brands) <= 4:
-            logger.info(f"🚀 PARALLEL MODE: Processing {len(brands)} brands concurrently")
+        # Nhiều brand: một pool chi tiết sản phẩm dùng chung cho tất cả brand
+        if len(brands) >= 2:
+            logger.info(f"🚀 PARALLEL MODE: Processing {len(brands)} brands with a shared product pool")
             return self._crawl_brands_parallel_mode(category_url, brands, batch_folder, category_name, category_dir, start)
         else:
             logger.info(f"🔄 SEQUENTIAL MODE: {len(brands)} brands (parallel not optimal)")
             return self._crawl_brands_sequential_mode(category_url, brands, batch_folder, category_name, category_dir, start)
 
     def _crawl_brands_parallel_mode(self, category_url: str, brands: list[str], batch_folder: str, category_name: str, category_dir: str, start_time: float) -> str:
-        """OPTIMIZED: Process multiple brands in parallel for major speed boost."""
-        import threading
-        
+        """
+        Cào nhiều brand với một pool chi tiết sản phẩm toàn cục.
+
+        Các brand thu thập links song song (số Chrome driver mở cùng lúc bị giới hạn bởi
+        selenium_slots, số brand chạy cùng lúc bởi max_parallel_brands); links của mọi brand
+        được đẩy vào cùng một pool max_workers luồng. Request trang danh sách của mọi brand
+        dùng chung listing_workers slot, nên tổng concurrency tới website tối đa là
+        max_workers + listing_workers thay vì brands x workers.
+        File Excel của mỗi brand được xuất ngay khi sản phẩm cuối cùng của brand đó xong.
+        """
         # Shared data between threads
         shared_data = {
             "category_name": category_name,
             "category_dir": category_dir,
             "results_lock": threading.Lock()
         }
-        
-        def process_brand_parallel(brand_data):
-            """Process single brand in parallel thread."""
-            idx, brand = brand_data
-            brand_display = brand.strip()
-            if not brand_display:
-                return None
-                
-            thread_id = threading.current_thread().name
-            logger.info(f"[{thread_id}] 🔄 Processing brand {idx+1}/{len(brands)}: {brand_display}")
-            
-            try:
-                # Update progress
-                with shared_data["results_lock"]:
-                    self.emit_progress(
-                        5 + idx * (80/max(1, len(brands))), 
-                        f"[Parallel] Đang xử lý: {brand_display}",
-                        f"Thread: {thread_id[-8:]}"
-                    )
-                
-                # Get product links for this brand
-                product_links = self._get_brand_links_threadsafe(category_url, brand_display, idx, shared_data)
-                
-                # Process products for this brand
-                results = self._process_brand_products_threadsafe(product_links, brand_display, idx, shared_data)
-                
-                # Export Excel for this brand
-                if results:
-                    excel_name = f"{shared_data['category_name']} {brand_display}.xlsx"
-                    excel_path = os.path.join(shared_data['category_dir'], excel_name)
-                    self._export_excel(results, excel_path)
-                    
-                    with shared_data["results_lock"]:
-                        self.stats['brands_processed'] += 1
-                        
-                    logger.info(f"[{thread_id}] ✅ Completed {brand_display}: {len(results)} products")
-                
-                return {"brand": brand_display, "products": len(results), "success": True}
-                
-            except Exception as e:
-                logger.error(f"[{thread_id}] ❌ Error processing {brand_display}: {e}")
-                with shared_data["results_lock"]:
-                    self.stats['errors'] += 1
-                return {"brand": brand_display, "products": 0, "success": False, "error": str(e)}
-        
-        # PARALLEL EXECUTION
-        max_parallel_brands = min(len(brands), 3)  # Max 3 concurrent brand processing
-        logger.info(f"🔧 Using {max_parallel_brands} parallel brand workers")
-        
-        brand_data = [(idx, brand) for idx, brand in enumerate(brands)]
+
+        brand_list = [(idx, brand.strip()) for idx, brand in enumerate(brands) if brand.strip()]
+        if not brand_list:
+            return batch_folder
+
+        # Trạng thái theo brand: số sản phẩm còn chờ và kết quả đã có
+        brand_state = {
+            brand_display: {"idx": idx, "pending": 0, "total": 0, "results": [], "done": False}
+            for idx, brand_display in brand_list
+        }
         brand_results = []
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel_brands, thread_name_prefix="Brand") as executor:
-            futures = {executor.submit(process_brand_parallel, data): data for data in brand_data}
-            
-            for future in concurrent.futures.as_completed(futures):
-                brand_data_item = futures[future]
+        total_links = 0
+        completed_products = 0
+
+        def finish_brand(brand_display: str) -> None:
+            state = brand_state[brand_display]
+            state["done"] = True
+            results = state["results"]
+            if results:
+                excel_name = f"{shared_data['category_name']} {brand_display}.xlsx"
+                excel_path = os.path.join(shared_data['category_dir'], excel_name)
                 try:
-                    result = future.result()
-                    if result:
-                        brand_results.append(result)
+                    with self.profiler.span(STAGE_EXCEL, item=excel_path):
+                        self._export_excel(results, excel_path)
+                    self.stats.inc('brands_processed')
+                    logger.info(f"✅ Completed {brand_display}: {len(results)} products -> {excel_name}")
                 except Exception as e:
-                    logger.error(f"❌ Future exception for brand {brand_data_item}: {e}")
-        
+                    logger.error(f"❌ Cannot export Excel for {brand_display}: {e}")
+                    self.stats.inc('errors')
+            brand_results.append({"brand": brand_display, "products": len(results), "success": bool(results)})
+            # Giải phóng bộ nhớ sau khi đã ghi file
+            state["results"] = []
+
+        link_workers = min(len(brand_list), self.max_parallel_brands)
+        logger.info(f"🔧 {link_workers} brand link collectors, {self.selenium_slots} Selenium slots, "
+                    f"{self.max_workers} shared product workers")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=link_workers, thread_name_prefix="Brand") as link_executor, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="Product") as product_executor:
+
+            pending = {}
+            for idx, brand_display in brand_list:
+                future = link_executor.submit(self._get_brand_links_threadsafe, category_url, brand_display, idx, shared_data)
+                pending[future] = ("links", brand_display, None)
+
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    kind, brand_display, url = pending.pop(future)
+                    state = brand_state[brand_display]
+
+                    if kind == "links":
+                        try:
+                            product_links = future.result() or []
+                        except Exception as e:
+                            logger.error(f"❌ Error getting links for {brand_display}: {e}")
+                            self.stats.inc('errors')
+                            product_links = []
+
+                        if not product_links:
+                            logger.warning(f"⚠️ No products found for brand '{brand_display}'")
+                            finish_brand(brand_display)
+                            continue
+
+                        state["pending"] = state["total"] = len(product_links)
+                        total_links += len(product_links)
+                        self.emit_progress(
+                            5 + 15 * sum(1 for st in brand_state.values() if st["total"] or st["done"]) / len(brand_list),
+                            f"[Parallel] Đã lấy {len(product_links)} links: {brand_display}",
+                            f"Tổng {total_links} sản phẩm trong hàng đợi"
+                        )
+                        for product_url in product_links:
+                            product_future = product_executor.submit(
+                                self.extract_product_details, product_url,
+                                shared_data["category_name"], brand_display
+                            )
+                            pending[product_future] = ("product", brand_display, product_url)
+                        continue
+
+                    # kind == "product"
+                    try:
+                        item = future.result()
+                        if item:
+                            state["results"].append(item)
+                            self.stats.inc('products_processed')
+                    except Exception as e:
+                        logger.error(f"❌ Error processing {url}: {e}")
+
+                    completed_products += 1
+                    state["pending"] -= 1
+                    if state["pending"] == 0:
+                        finish_brand(brand_display)
+
+                    if completed_products % max(1, total_links // 20) == 0 or state["pending"] == 0:
+                        self.emit_progress(
+                            20 + 75 * completed_products / max(1, total_links),
+                            f"Đã xử lý {completed_products}/{total_links} sản phẩm",
+                            f"{brand_display}: {state['total'] - state['pending']}/{state['total']}"
+                        )
+
         # COMPLETION SUMMARY
         successful_brands = sum(1 for r in brand_results if r.get("success"))
         total_products = sum(r.get("products", 0) for r in brand_results)
         
-        self.stats['categories_processed'] += 1
+        self.stats.inc('categories_processed')
         duration = time.time() - start_time
         
         logger.info(f"=== PARALLEL CRAWL COMPLETED ===")
         logger.info(f"Category: {shared_data['category_name']}")
         logger.info(f"Duration: {duration:.1f}s")
-        logger.info(f"Brands: {successful_brands}/{len(brands)} successful")
+        logger.info(f"Brands: {successful_brands}/{len(brand_list)} successful")
         logger.info(f"Products: {total_products} total")
         
         self.emit_progress(100, f"Parallel crawl hoàn thành: {shared_data['category_name']}", f"{duration:.1f}s - {total_products} sản phẩm")
@@ -1665,16 +1784,21 @@ class HopLongCrawler:
     def _get_brand_links_threadsafe(self, category_url: str, brand_display: str, idx: int, shared_data: dict) -> list[str]:
         """OPTIMIZED: Thread-safe method to get product links for a brand."""
         def _crawl_brand():
-            driver = self.get_driver()
+            # Chờ slot Selenium; slot được trả ngay khi driver đóng (trước bước BeautifulSoup)
+            self._selenium_semaphore.acquire()
+            slot_held = True
+            driver = None
             product_links: list[str] = []
             try:
+                driver = self.get_driver()
                 driver.get(category_url)
                 WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
                 time.sleep(0.8)  # Reduced wait time
                 
-                # Update category name from HTML (thread-safe, only first brand)
-                if idx == 0:
+                # Update category name from HTML (thread-safe, only first browser session)
+                if not shared_data.get("category_name_resolved"):
                     with shared_data["results_lock"]:
+                        shared_data["category_name_resolved"] = True
                         try:
                             real_category_name = self._category_name_from_html(driver)
                             if real_category_name and real_category_name != "Danh mục":
@@ -1703,10 +1827,13 @@ class HopLongCrawler:
                 # HYBRID APPROACH: Get filtered URL từ Selenium, sau đó dùng BeautifulSoup
                 filtered_url = driver.current_url
                 logger.info(f"🔗 Filtered URL obtained: {filtered_url}")
+                self._learn_brand_filter_template(category_url, filtered_url, brand_display)
                 
                 # Đóng driver sớm để tiết kiệm resource
                 self.close_driver(driver)
                 driver = None  # Mark as closed
+                self._selenium_semaphore.release()
+                slot_held = False
                 
                 # Chuyển sang BeautifulSoup để thu thập product links với pagination
                 logger.info(f"🔄 Switching to BeautifulSoup for multi-page collection: {brand_display}")
@@ -1715,73 +1842,36 @@ class HopLongCrawler:
                 product_links = self._fetch_all_pages_bs4(filtered_url, self.session)
                 logger.info(f"📦 HYBRID: Found {len(product_links)} products for {brand_display}")
                 
-                with shared_data["results_lock"]:
-                    self.stats['products_found'] += len(product_links)
+                self.stats.inc('products_found', len(product_links))
                 
                 return product_links
                 
             except Exception as e:
                 logger.error(f"❌ Error getting links for {brand_display}: {e}")
-                with shared_data["results_lock"]:
-                    self.stats['errors'] += 1
+                self.stats.inc('errors')
                 return []
             finally:
                 if driver is not None:
                     self.close_driver(driver)
+                if slot_held:
+                    self._selenium_semaphore.release()
         
+        # Brand đầu tiên dò bộ lọc bằng trình duyệt; các brand sau thử lọc qua URL bằng HTTP
+        discoverer = self._begin_brand_filter_discovery(category_url)
+        if not discoverer:
+            product_links = self._fetch_brand_links_via_template(category_url, brand_display)
+            if product_links is not None:
+                self.stats.inc('products_found', len(product_links))
+                return product_links
+
         try:
             return self.retry_with_backoff(_crawl_brand, max_retries=2, base_delay=2.0)
         except Exception as e:
             logger.error(f"❌ Failed to get links for {brand_display}: {e}")
             return []
-
-    def _process_brand_products_threadsafe(self, product_links: list[str], brand_display: str, idx: int, shared_data: dict) -> list[dict]:
-        """OPTIMIZED: Thread-safe method to process products for a brand."""
-        results = []
-        
-        if not product_links:
-            return results
-            
-        def task(url: str):
-            return self.extract_product_details(url, shared_data["category_name"], expected_brand=brand_display)
-
-        # OPTIMIZED: Dynamic worker calculation for thread safety
-        optimal_workers = min(
-            self.max_workers // 2,  # Reduce workers when in parallel brand mode
-            len(product_links) // 2 + 1,
-            12  # Max 12 workers per brand in parallel mode
-        )
-        
-        logger.info(f"🔧 Using {optimal_workers} workers for {len(product_links)} products ({brand_display})")
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=optimal_workers) as executor:
-            futures = {executor.submit(task, url): url for url in product_links}
-            
-            completed_count = 0
-            for fut in concurrent.futures.as_completed(futures):
-                url = futures[fut]
-                try:
-                    item = fut.result()
-                    if item:
-                        results.append(item)
-                        with shared_data["results_lock"]:
-                            self.stats['products_processed'] += 1
-                        
-                    completed_count += 1
-                    
-                    # Thread-safe progress update
-                    if completed_count % max(1, len(product_links) // 10) == 0 or completed_count == len(product_links):
-                        with shared_data["results_lock"]:
-                            self.emit_progress(
-                                20 + idx * (60/4),  # Approximate progress for parallel mode
-                                f"[{brand_display}] {completed_count}/{len(product_links)}",
-                                f"{len(results)} thành công"
-                            )
-                except Exception as e:
-                    logger.error(f"❌ Error processing {url}: {e}")
-                    completed_count += 1
-                    
-        return results
+        finally:
+            if discoverer:
+                self._end_brand_filter_discovery(category_url)
 
     def _crawl_brands_sequential_mode(self, category_url: str, brands: list[str], batch_folder: str, category_name: str, category_dir: str, start_time: float) -> str:
         """OPTIMIZED: Sequential processing with enhanced performance."""
@@ -1846,6 +1936,7 @@ class HopLongCrawler:
                     except:
                         filtered_url = category_url  # Fallback to original URL
                         logger.warning("⚠️ Cannot get filtered URL, using original category URL")
+                    self._learn_brand_filter_template(category_url, filtered_url, brand_display)
 
                     # Đóng driver sớm để tiết kiệm resource
                     self.close_driver(driver) 
@@ -1879,18 +1970,25 @@ class HopLongCrawler:
                     if driver is not None:
                         self.close_driver(driver)
             
+            # Brand đầu tiên dò bộ lọc bằng trình duyệt; các brand sau thử lọc qua URL bằng HTTP
+            discoverer = self._begin_brand_filter_discovery(category_url)
             try:
-                product_links = self.retry_with_backoff(_crawl_brand, max_retries=2, base_delay=3.0)
-                self.stats['products_found'] += len(product_links)
+                product_links = None if discoverer else self._fetch_brand_links_via_template(category_url, brand_display)
+                if product_links is None:
+                    product_links = self.retry_with_backoff(_crawl_brand, max_retries=2, base_delay=3.0)
+                self.stats.inc('products_found', len(product_links))
             except Exception as e:
                 logger.error(f"Thất bại hoàn toàn khi crawl brand {brand_display}: {e}")
-                self.stats['errors'] += 1
+                self.stats.inc('errors')
                 self.emit_progress(
                     5 + idx * (80/max(1, len(brands))), 
                     f"Bỏ qua brand {brand_display}", 
                     f"Lỗi: {str(e)[:100]}..."
                 )
                 continue
+            finally:
+                if discoverer:
+                    self._end_brand_filter_discovery(category_url)
 
             # OPTIMIZED: Enhanced multithreading với adaptive workers
             results: list[dict] = []
@@ -1922,7 +2020,7 @@ class HopLongCrawler:
                             item = fut.result()
                             if item:
                                 results.append(item)
-                                self.stats['products_processed'] += 1
+                                self.stats.inc('products_processed')
                                 
                             completed_count += 1
                             
@@ -1942,10 +2040,11 @@ class HopLongCrawler:
             if results:
                 excel_name = f"{category_name} {brand_display}.xlsx"
                 excel_path = os.path.join(category_dir, excel_name)
-                self._export_excel(results, excel_path)
-                self.stats['brands_processed'] += 1
+                with self.profiler.span(STAGE_EXCEL, item=excel_path):
+                    self._export_excel(results, excel_path)
+                self.stats.inc('brands_processed')
 
-        self.stats['categories_processed'] += 1
+        self.stats.inc('categories_processed')
         dur = time.time() - start_time
         
         # Log kết quả tổng kết
@@ -7,21 +7,29 @@ Ngày tạo: $(date)
 
 import os
 import time
-import requests
 import re
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import concurrent.futures
+from contextlib import contextmanager
 from queue import Queue
 import pandas as pd
-from PIL import Image, ImageEnhance
-from io import BytesIO
 import json
 import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from app.webp_converter import WebPConverter
+from app.selenium_utils import collect_anchor_data
+from lxml import etree
+from app.keyence_specs import parse_page, process_keyence_specs, clean_specs_html
+from app.spec_engine import table_from_pairs, render_pairs_table, has_class, element_text
+from app.image_pipeline import get_image_pipeline, ImageJob, RESIZE_FLATTEN
+from app.metrics import StatsCounters, fetch_histogram, parse_histogram, webdriver_opened, webdriver_closed
+from app.progress_reporter import current_reporter
+from app.http_metrics import MeteredSession
+from app import crawl_profiler
+from app.crawl_profiler import CrawlProfiler, STAGE_PARSE, STAGE_SPECS, STAGE_EXCEL
 import threading
 
 # Selenium imports for dynamic content
@@ -37,6 +45,35 @@ from selenium.webdriver.common.action_chains import ActionChains
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+# Các phần tử của trang chi tiết sản phẩm (tìm trên cây lxml dùng chung với phần thông số)
+def _class_xpath(tag, *classes, relative=False):
+    return etree.XPath(f"{'.' if relative else ''}//{tag}[{' and '.join(has_class(c) for c in classes)}]")
+
+
+_PRODUCT_CODE_XPATH = _class_xpath('span', 'prd-utility-body-medium', 'prd-utility-block')
+_CATEGORY_LINK_XPATH = _class_xpath('a', 'prd-inlineLink', 'prd-utility-focusRing')
+_INLINE_LINKS_XPATH = _class_xpath('a', 'prd-inlineLink')
+_LINK_LABEL_XPATH = _class_xpath('span', 'prd-inlineLink-label', relative=True)
+_DESCRIPTION_XPATHS = (
+    _class_xpath('span', 'prd-utility-heading-1', 'prd-utility-marginBottom-2', 'prd-utility-block'),
+    _class_xpath('span', 'prd-utility-heading-1'),
+    _class_xpath('h1', 'prd-utility-heading-1'),
+)
+_PRODUCT_IMAGE_XPATH = _class_xpath('img', 'prd-modelIntroduction-image')
+
+
+def _first_match(xpath, element):
+    found = xpath(element)
+    return found[0] if found else None
+
+
+def _link_label(link):
+    """Text của span.prd-inlineLink-label trong link breadcrumb (None nếu không có)"""
+    label = _first_match(_LINK_LABEL_XPATH, link)
+    return element_text(label) if label is not None else None
+
+
 def sanitize_folder_name(name):
     """Làm sạch tên folder để phù hợp với hệ điều hành"""
     # Loại bỏ các ký tự không hợp lệ
@@ -80,7 +117,7 @@ class KeyenceCrawler:
     Cào dữ liệu sản phẩm với xử lý đa luồng và discontinued products
     """
     
-    def __init__(self, output_root=None, max_workers=8, max_retries=3, socketio=None):
+    def __init__(self, output_root=None, max_workers=8, max_retries=3, socketio=None, max_parallel_categories=3):
         """
         Khởi tạo KeyenceCrawler
         
@@ -89,11 +126,17 @@ class KeyenceCrawler:
             max_workers: Số luồng tối đa
             max_retries: Số lần thử lại khi request thất bại
             socketio: Socket.IO instance để emit tiến trình
+            max_parallel_categories: Số category xử lý song song (dùng chung ngân sách max_workers)
         """
         self.output_root = output_root or os.path.join(os.getcwd(), "output_keyence")
         self.max_workers = max_workers
         self.max_retries = max_retries
+        self.max_parallel_categories = max(1, max_parallel_categories)
+        # Pool series/ảnh dùng chung cho mọi category trong crawl_products (None khi chạy lẻ)
+        self._work_executor = None
         self.socketio = socketio
+        # Reporter của job đang chạy (lấy theo request tạo crawler)
+        self.progress = current_reporter() if socketio else None
         
         # Tạo thư mục output
         os.makedirs(self.output_root, exist_ok=True)
@@ -102,7 +145,7 @@ class KeyenceCrawler:
         self.base_url = "https://www.keyence.com.vn"
         
         # Cấu hình session với retry strategy
-        self.session = requests.Session()
+        self.session = MeteredSession('keyence')
         retry_strategy = Retry(
             total=self.max_retries,
             backoff_factor=1,
@@ -160,15 +203,20 @@ class KeyenceCrawler:
         self.chrome_options.add_experimental_option("prefs", prefs)
         
         # Thống kê
-        self.stats = {
-            "categories_processed": 0,
-            "series_found": 0,
-            "products_found": 0,
-            "products_processed": 0,
-            "images_downloaded": 0,
-            "failed_requests": 0,
-            "failed_images": 0
-        }
+        # Bộ đếm chia shard theo luồng: tăng từ nhiều worker mà không cần khóa
+        self.stats = StatsCounters((
+            "categories_processed",
+            "series_found",
+            "products_found",
+            "products_processed",
+            "images_downloaded",
+            "failed_requests",
+            "failed_images",
+        ))
+        self.fetch_latency = fetch_histogram('keyence')
+        self.parse_latency = parse_histogram('keyence')
+        # Profiler theo giai đoạn (tắt mặc định, bật bằng CRAWLER_PROFILE=1)
+        self.profiler = CrawlProfiler('keyence')
         
         logger.info("✅ Đã khởi tạo KeyenceCrawler với Selenium support")
     
@@ -176,6 +224,7 @@ class KeyenceCrawler:
         """Tạo một WebDriver Chrome mới"""
         try:
             driver = webdriver.Chrome(options=self.chrome_options)
+            webdriver_opened('keyence', driver)
             driver.implicitly_wait(10)
             return driver
         except Exception as e:
@@ -184,274 +233,24 @@ class KeyenceCrawler:
     
     def close_driver(self, driver):
         """Đóng WebDriver"""
+        webdriver_closed(driver)
         try:
             driver.quit()
         except Exception as e:
             logger.warning(f"Lỗi khi đóng WebDriver: {e}")
     
-    def _parse_keyence_specs(self, soup):
-        """
-        Parse thông số kỹ thuật Keyence theo chuẩn hãng với BeautifulSoup
-        Áp dụng logic đơn giản và chính xác theo yêu cầu user
-        
-        Args:
-            soup: BeautifulSoup object của product page
-            
-        Returns:
-            list: Danh sách specs items [{"key": str, "value": str, "attributeid": str}]
-        """
-        try:
-            # Tìm tất cả rows trong specs table
-            rows = soup.select('div.specTable-block table tr')
-            
-            items = []
-            for tr in rows:
-                key_main = tr.select_one('td.specTable-clm-0')
-                key_sub = tr.select_one('td.specTable-clm-1')
-                val_td = tr.select_one('td.specTable-clm-4')  # cột giá trị
-                
-                # Nếu không có cột giá trị, thử tìm trong các cột khác (PS-26 format)
-                if not val_td:
-                    val_td = tr.select_one('td.specTable-clm-2')  # PS-26 style
-                    if not val_td:
-                        val_td = tr.select_one('td.specTable-clm-1')  # 2-column simple
-                
-                # Bỏ các hàng không có ô key chính hoặc ô giá trị
-                if not key_main or not val_td:
-                    continue
-                
-                # Text gọn + xử lý xuống dòng <br>
-                def text_of(el):
-                    if not el:
-                        return ""
-                    # Join các text fragments với ' ; ' 
-                    return ' ; '.join([s.strip() for s in el.stripped_strings])
-                
-                key = text_of(key_main)
-                if key_sub and key_sub.get_text(strip=True):
-                    key = f"{key} — {text_of(key_sub)}"
-                
-                value = text_of(val_td)
-                # Chuyển đổi các ký tự trống thành empty string
-                if value in ["―", "—", "-"]:
-                    value = ""
-                
-                # Chỉ thêm nếu có key và value hợp lệ
-                if key and key != value:
-                    items.append({
-                        "key": key,
-                        "value": value,
-                        "attributeid": val_td.get("attributeid", "")  # giữ lại id nếu cần map
-                    })
-            
-            logger.info(f"✅ Parsed {len(items)} specification items theo chuẩn hãng")
-            return items
-            
-        except Exception as e:
-            logger.error(f"❌ Lỗi khi parse Keyence specs: {str(e)}")
-            return []
-    
-    def _parse_keyence_footnotes(self, soup):
-        """
-        Parse footnotes từ specTable-foot rows
-        
-        Args:
-            soup: BeautifulSoup object của product page
-            
-        Returns:
-            dict: Footnotes {attributeid: content}
-        """
-        try:
-            footnotes = {}
-            footer_rows = soup.select('div.specTable-block table tr.specTable-foot')
-            
-            for footer_row in footer_rows:
-                cells = footer_row.find_all('td')
-                if cells:
-                    footnote_content = ' ; '.join([s.strip() for s in cells[0].stripped_strings])
-                    attributeid = cells[0].get('attributeid', 'footnotes')
-                    footnotes[attributeid] = footnote_content
-            
-            return footnotes
-            
-        except Exception as e:
-            logger.debug(f"Lỗi khi parse footnotes: {str(e)}")
-            return {}
-
-    def _extract_original_specs_html(self, soup):
-        """
-        Trích xuất nguyên khối HTML phần Thông số kỹ thuật từ trang Keyence.
-        Đồng thời tiêm inline-style tối thiểu để đảm bảo hiển thị đẹp khi không có CSS của Keyence.
-
-        Args:
-            soup: BeautifulSoup của product page
-
-        Returns:
-            str: HTML phần specs đã được chuẩn hóa; rỗng nếu không tìm thấy
-        """
-        try:
-            specs_div = soup.find('div', class_='prd-specsTable')
-            if not specs_div:
-                return ''
-
-            # Lấy section chứa specs nếu có
-            section = specs_div.find_parent('section') or specs_div
-
-            # Xác thực tiêu đề là "Thông số kỹ thuật" nếu tồn tại
-            h2 = section.find('h2') if hasattr(section, 'find') else None
-            if h2 and 'thông số' not in h2.get_text(strip=True).lower():
-                # Không đúng section specs
-                return ''
-
-            # Tiêm inline styles tối thiểu để nhìn giống website khi thiếu CSS gốc
-            self._inject_inline_styles_to_keyence_specs(section)
-
-            return str(section)
-        except Exception:
-            return ''
-
-    def _inject_inline_styles_to_keyence_specs(self, section):
-        """
-        Thêm inline-style cơ bản vào table/td/th để hiển thị giống website trong môi trường không có CSS gốc.
-        Modify in-place.
-        """
-        try:
-            table = section.find('table') if hasattr(section, 'find') else None
-            if not table:
-                return
-
-            # Thêm style cho table
-            table_attrs = table.get('style', '')
-            add_table_style = 'border-collapse:collapse;width:100%;'
-            if add_table_style not in table_attrs:
-                table['style'] = (table_attrs + ';' + add_table_style).strip(';')
-
-            # Thêm border/padding cho tất cả ô
-            for cell in table.find_all(['td', 'th']):
-                cell_style = cell.get('style', '')
-                add_cell_style = 'border:1px solid #e5e5e5;padding:8px;vertical-align:top;'
-                if add_cell_style not in cell_style:
-                    cell['style'] = (cell_style + ';' + add_cell_style).strip(';')
-
-            # Làm nổi bật header nếu có thead
-            thead = table.find('thead')
-            if thead:
-                for th in thead.find_all('th'):
-                    th_style = th.get('style', '')
-                    add_th_style = 'background:#f7f7f7;font-weight:600;'
-                    if add_th_style not in th_style:
-                        th['style'] = (th_style + ';' + add_th_style).strip(';')
-        except Exception:
-            # An toàn: không chặn workflow nếu styling thất bại
-            pass
-    
     def clean_specs(self, html: str) -> str:
         """
-        Làm sạch HTML thông số kỹ thuật theo yêu cầu:
-        - Chỉ giữ lại duy nhất "rowspan" và "colspan" trên mọi thẻ trong bảng
-        - Xóa toàn bộ <col>/<colgroup>
-        - Tái tạo tối thiểu: <section><h2>Thông số kỹ thuật</h2><table>...</table></section>
-        - Chèn một hàng bản quyền ngay trước các hàng footnotes (tr.specTable-foot) nếu có,
-          hoặc ở cuối bảng nếu không có footnotes.
-        - Sau khi làm sạch, tiêm inline-style tối thiểu để đường kẻ là nét liền.
+        Làm sạch HTML thông số kỹ thuật (chỉ giữ rowspan/colspan, bỏ col/colgroup,
+        chèn hàng bản quyền trước footnotes và tiêm inline-style).
+        Xem app.keyence_specs để biết chi tiết.
         """
-        try:
-            if not html:
-                return ""
-
-            soup = BeautifulSoup(html, "html.parser")
-
-            # Tìm tiêu đề H2 và bảng đầu tiên ngay sau đó
-            h2 = soup.find("h2", string=lambda s: s and "Thông số kỹ thuật" in s)
-            table = h2.find_next("table") if h2 else None
-            if not (h2 and table):
-                return ""
-
-            # Ghi nhận vị trí của hàng foot đầu tiên để chèn bản quyền phía trên
-            all_rows = table.find_all("tr")
-            foot_index = None
-            for idx, row in enumerate(all_rows):
-                classes = row.get("class", []) or []
-                if any(cls == "specTable-foot" for cls in classes):
-                    foot_index = idx
-                    break
-
-            # Loại bỏ <col> và <colgroup>
-            for col in table.find_all(["col", "colgroup"]):
-                col.decompose()
-
-            # Hàm loại bỏ mọi attribute trừ rowspan/colspan
-            def strip_attrs(tag):
-                if not getattr(tag, "attrs", None):
-                    return
-                keep = {}
-                for key in ("rowspan", "colspan"):
-                    if key in tag.attrs:
-                        keep[key] = tag.attrs[key]
-                tag.attrs = keep
-
-            # Strip attributes trên table và toàn bộ con
-            strip_attrs(table)
-            for t in table.find_all(True):
-                strip_attrs(t)
-
-            # Tạo soup tối thiểu và gắn table đã làm sạch
-            out = BeautifulSoup(features="html.parser")
-            sec = out.new_tag("section")
-            h2_min = out.new_tag("h2")
-            h2_min.string = h2.get_text(strip=True)
-            sec.append(h2_min)
-
-            # Sao chép table sang out-soup
-            table_copy_soup = BeautifulSoup(str(table), "html.parser")
-            table_copy = table_copy_soup.find("table")
-
-            # Chèn hàng bản quyền
-            # Tìm tbody hoặc dùng table nếu không có
-            tbody = table_copy.find("tbody")
-            if not tbody:
-                tbody = table_copy
-
-            # Tạo <tr> bản quyền với style đậm cho ô đầu tiên
-            tr_c = table_copy_soup.new_tag("tr")
-            td_label = table_copy_soup.new_tag("td")
-            td_label["style"] = "font-weight: bold;"
-            td_label.string = "Copyright"
-            td_value = table_copy_soup.new_tag("td")
-            td_value.string = "Haiphongtech.vn"
-            tr_c.append(td_label)
-            tr_c.append(td_value)
-
-            # Xác định vị trí chèn: trước hàng foot đầu tiên nếu có
-            rows_copy = table_copy.find_all("tr")
-            if foot_index is not None and foot_index < len(rows_copy):
-                # Tìm đúng node hàng theo index để chèn trước
-                target_row = rows_copy[foot_index]
-                target_row.insert_before(tr_c)
-            else:
-                tbody.append(tr_c)
-
-            sec.append(table_copy)
-            out.append(sec)
-
-            # Tiêm inline styles tối thiểu sau khi làm sạch và chèn bản quyền
-            styled_soup = BeautifulSoup(out.prettify(), "html.parser")
-            section_tag = styled_soup.find("section") or styled_soup
-            self._inject_inline_styles_to_keyence_specs(section_tag)
-            return str(styled_soup)
-
-        except Exception as e:
-            logger.debug(f"Lỗi khi clean specs HTML: {e}")
-            return ""
+        return clean_specs_html(html)
     
-    def emit_progress(self, percent, message, detail=""):
-        """Emit tiến trình qua Socket.IO"""
-        if self.socketio:
-            self.socketio.emit('progress_update', {
-                'percent': percent,
-                'message': message,
-                'detail': detail
-            })
+    def emit_progress(self, percent, message, detail="", stage=None, stage_percent=None):
+        """Emit tiến trình qua Socket.IO (gộp, giới hạn tần suất, chỉ vào room của job; stage: giai đoạn listing/detail/images/export)"""
+        if self.progress:
+            self.progress.update(percent, message, detail, stage=stage, stage_percent=stage_percent)
         else:
             print(f"[{percent}%] {message} - {detail}")
     
@@ -460,11 +259,12 @@ class KeyenceCrawler:
     def get_html_content(self, url, timeout=30):
         """Lấy nội dung HTML từ URL"""
         try:
-            response = self.session.get(url, timeout=timeout)
+            with self.fetch_latency.time():
+                response = self.session.get(url, timeout=timeout)
             response.raise_for_status()
             return response.text
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self.stats.inc("failed_requests")
             logger.error(f"Lỗi khi lấy HTML từ {url}: {str(e)}")
             return None
 
@@ -512,15 +312,17 @@ class KeyenceCrawler:
                     return self.extract_series_fallback(category_url)
                 
                 # Tìm tất cả normal series links
-                normal_series_links = driver.find_elements(By.CSS_SELECTOR, "a.prd-seriesCard-link")
+                # Lấy href và nhãn của mọi card trong một lần execute_script
+                normal_series_links = collect_anchor_data(
+                    driver, "a.prd-seriesCard-link", label_selector=".prd-seriesCard-linkLabel"
+                )
                 
-                for link_element in normal_series_links:
+                for link_data in normal_series_links:
                     try:
-                        href = link_element.get_attribute('href')
+                        href = link_data['href']
                         
                         # Extract series name từ linkLabel
-                        link_label = link_element.find_element(By.CSS_SELECTOR, ".prd-seriesCard-linkLabel")
-                        series_name = link_label.text.strip()
+                        series_name = link_data['label']
                         
                         if href and series_name:
                             # Convert relative URL thành absolute URL
@@ -556,15 +358,17 @@ class KeyenceCrawler:
                         time.sleep(3)  # Đợi content load
                         
                         # Tìm discontinued series links
-                        discontinued_series_links = driver.find_elements(By.CSS_SELECTOR, "a.prd-seriesCardDiscontinued")
+                        discontinued_series_links = collect_anchor_data(
+                            driver, "a.prd-seriesCardDiscontinued",
+                            label_selector=".prd-seriesCardDiscontinued-title"
+                        )
                         
-                        for link_element in discontinued_series_links:
+                        for link_data in discontinued_series_links:
                             try:
-                                href = link_element.get_attribute('href')
+                                href = link_data['href']
                                 
                                 # Extract series name từ title
-                                title_element = link_element.find_element(By.CSS_SELECTOR, ".prd-seriesCardDiscontinued-title")
-                                series_name = title_element.text.strip()
+                                series_name = link_data['label']
                                 
                                 if href and series_name:
                                     # Convert relative URL thành absolute URL
@@ -618,7 +422,7 @@ class KeyenceCrawler:
         if driver:
             self.close_driver(driver)
         
-        self.stats["series_found"] += len(series_data)
+        self.stats.inc("series_found", len(series_data))
         logger.info(f"🎯 Tổng cộng tìm thấy {len(series_data)} series từ {category_url}")
         
         return series_data
@@ -780,40 +584,28 @@ class KeyenceCrawler:
                     "a[data-ga-label*='model']"  # Links có GA label model
                 ]
                 
-                for selector in selectors:
-                    try:
-                        links = driver.find_elements(By.CSS_SELECTOR, selector)
-                        if links:
-                            product_links = links
-                            logger.info(f"✅ Tìm thấy {len(links)} product links với selector: {selector}")
-                            break
-                    except Exception as e:
-                        logger.debug(f"Lỗi với selector {selector}: {str(e)}")
-                        continue
+                # Thử lần lượt các selector (dừng ở selector đầu tiên có kết quả) trong một lần execute_script
+                try:
+                    product_links = collect_anchor_data(driver, selectors, first_match=True)
+                    if product_links:
+                        selector = selectors[product_links[0]['selector']]
+                        logger.info(f"✅ Tìm thấy {len(product_links)} product links với selector: {selector}")
+                except Exception as e:
+                    logger.debug(f"Lỗi khi thu thập product links: {str(e)}")
                 
                 # Nếu không tìm thấy bằng selector, thử tìm tất cả links chứa model
                 if not product_links:
-                    all_links = driver.find_elements(By.CSS_SELECTOR, "a[href]")
-                    for link in all_links:
-                        href = link.get_attribute('href')
-                        if href and '/models/' in href and href != models_url:
-                            product_links.append(link)
+                    all_links = collect_anchor_data(driver, "a[href]")
+                    product_links = [link for link in all_links
+                                     if link['href'] and '/models/' in link['href'] and link['href'] != models_url]
                     logger.info(f"🔍 Fallback: Tìm thấy {len(product_links)} product links")
                 
-                for link_element in product_links:
+                for link_data in product_links:
                     try:
-                        href = link_element.get_attribute('href')
+                        href = link_data['href']
                         
-                        # Lấy product name từ text hoặc alt attribute
-                        product_name = ""
-                        try:
-                            product_name = link_element.text.strip()
-                            if not product_name:
-                                # Thử lấy từ alt attribute của img trong link
-                                img = link_element.find_element(By.CSS_SELECTOR, "img")
-                                product_name = img.get_attribute('alt') or ""
-                        except:
-                            pass
+                        # Lấy product name từ text hoặc alt attribute của img trong link
+                        product_name = link_data['text'] or link_data['img_alt'].strip()
                         
                         if href and href != models_url:
                             # Filter chỉ lấy link sản phẩm thật sự
@@ -879,7 +671,7 @@ class KeyenceCrawler:
         if driver:
             self.close_driver(driver)
         
-        self.stats["products_found"] += len(products_data)
+        self.stats.inc("products_found", len(products_data))
         logger.info(f"🎯 Tổng cộng tìm thấy {len(products_data)} sản phẩm từ {models_url}")
         
         return products_data
@@ -974,7 +766,9 @@ class KeyenceCrawler:
             if not html:
                 return None
             
-            soup = BeautifulSoup(html, 'html.parser')
+            # Trang chỉ được parse một lần (lxml); tên, mã, ảnh và thông số đều lấy trên cùng cây
+            with self.parse_latency.time(), self.profiler.span(STAGE_PARSE):
+                root = parse_page(html)
             
             product_data = {
                 'product_code': '',
@@ -989,9 +783,9 @@ class KeyenceCrawler:
             }
             
             # 1. Lấy mã sản phẩm từ span.prd-utility-body-medium
-            product_code_element = soup.find('span', class_='prd-utility-body-medium prd-utility-block')
-            if product_code_element:
-                product_data['product_code'] = product_code_element.get_text(strip=True)
+            product_code_element = _first_match(_PRODUCT_CODE_XPATH, root)
+            if product_code_element is not None:
+                product_data['product_code'] = element_text(product_code_element)
             
             # 2. Lấy các thành phần để tạo tên sản phẩm theo yêu cầu chính xác
             # Phần 1: Category từ breadcrumb navigation - chính xác theo yêu cầu
@@ -1002,73 +796,59 @@ class KeyenceCrawler:
             # <span class="prd-inlineLink-label">Cảm biến quang điện</span></a>
             
             # Ưu tiên tìm link chính xác với class "prd-inlineLink prd-utility-focusRing"
-            exact_link = soup.find('a', class_='prd-inlineLink prd-utility-focusRing')
-            if exact_link:
-                label_span = exact_link.find('span', class_='prd-inlineLink-label')
-                if label_span:
-                    category_name = label_span.get_text(strip=True)
+            exact_link = _first_match(_CATEGORY_LINK_XPATH, root)
+            if exact_link is not None:
+                label = _link_label(exact_link)
+                if label is not None:
+                    category_name = label
                     # Loại bỏ "Trang chủ" nếu đó là kết quả
                     if category_name.lower() in ['trang chủ', 'home']:
                         category_name = ''
             
             # Fallback: tìm trong tất cả breadcrumb links nếu chưa có
             if not category_name:
-                prd_inline_links = soup.find_all('a', class_='prd-inlineLink')
+                # Nhãn của các link breadcrumb (bỏ link không có nhãn)
+                labels = [label for label in map(_link_label, _INLINE_LINKS_XPATH(root)) if label is not None]
                 
                 # First pass: tìm exact match "Cảm biến quang điện"
-                for link in prd_inline_links:
-                    label_span = link.find('span', class_='prd-inlineLink-label')
-                    if label_span:
-                        text = label_span.get_text(strip=True)
-                        if text.lower() == 'cảm biến quang điện':
-                            category_name = text
-                            break
+                for text in labels:
+                    if text.lower() == 'cảm biến quang điện':
+                        category_name = text
+                        break
                 
                 # Second pass: tìm specific sensor types nếu chưa có exact match
                 if not category_name:
                     specific_sensors = ['cảm biến sợi quang', 'cảm biến laser', 'cảm biến tiệm cận', 
                                       'cảm biến vị trí', 'cảm biến hình ảnh', 'cảm biến áp suất', 
                                       'cảm biến nhiệt độ', 'cảm biến đo mức']
-                    for link in prd_inline_links:
-                        label_span = link.find('span', class_='prd-inlineLink-label')
-                        if label_span:
-                            text = label_span.get_text(strip=True)
-                            if text.lower() in specific_sensors:
-                                category_name = text
-                                break
+                    for text in labels:
+                        if text.lower() in specific_sensors:
+                            category_name = text
+                            break
                 
                 # Third pass: fallback to general "cảm biến"
                 if not category_name:
-                    for link in prd_inline_links:
-                        label_span = link.find('span', class_='prd-inlineLink-label')
-                        if label_span:
-                            text = label_span.get_text(strip=True)
-                            if text.lower() == 'cảm biến':
-                                category_name = text
-                                break
+                    for text in labels:
+                        if text.lower() == 'cảm biến':
+                            category_name = text
+                            break
                 
                 # Fallback cuối: lấy link đầu tiên không phải "Trang chủ"
                 if not category_name:
-                    for link in prd_inline_links:
-                        label_span = link.find('span', class_='prd-inlineLink-label')
-                        if label_span:
-                            text = label_span.get_text(strip=True)
-                            if text.lower() not in ['trang chủ', 'home', 'products', 'sản phẩm']:
-                                category_name = text
-                                break
+                    for text in labels:
+                        if text.lower() not in ['trang chủ', 'home', 'products', 'sản phẩm']:
+                            category_name = text
+                            break
             
             product_data['category'] = category_name
             
             # Phần 3: Mô tả từ span.prd-utility-heading-1
             description = ''
-            description_element = soup.find('span', class_='prd-utility-heading-1 prd-utility-marginBottom-2 prd-utility-block')
-            if not description_element:
-                description_element = soup.find('span', class_='prd-utility-heading-1')
-            if not description_element:
-                description_element = soup.find('h1', class_='prd-utility-heading-1')
-            
-            if description_element:
-                description = description_element.get_text(strip=True)
+            for description_xpath in _DESCRIPTION_XPATHS:
+                description_element = _first_match(description_xpath, root)
+                if description_element is not None:
+                    description = element_text(description_element)
+                    break
             
             # 3. Ghép tên sản phẩm theo thứ tự chính xác: Category + Product Code + Description + KEYENCE
             name_parts = []
@@ -1085,32 +865,25 @@ class KeyenceCrawler:
             product_data['full_product_name'] = product_name
             
             # 5. Lấy ảnh sản phẩm từ img.prd-modelIntroduction-image
-            img_element = soup.find('img', class_='prd-modelIntroduction-image')
-            if img_element and img_element.get('src'):
-                image_src = img_element['src']
+            img_element = _first_match(_PRODUCT_IMAGE_XPATH, root)
+            if img_element is not None and img_element.get('src'):
+                image_src = img_element.get('src')
                 # Convert relative URL thành absolute URL
                 if image_src.startswith('/'):
                     product_data['image_url'] = urljoin(self.base_url, image_src)
                 else:
                     product_data['image_url'] = image_src
             
-            # 6. Lấy thông số kỹ thuật theo chuẩn hãng với BeautifulSoup đơn giản
+            # 6. Lấy thông số kỹ thuật theo chuẩn hãng
             product_data['specifications'] = []
             product_data['footnotes'] = {}
             
-            # Lưu nguyên khối HTML <section> thông số kỹ thuật của trang gốc (ưu tiên dùng)
-            original_specs_html = self._extract_original_specs_html(soup)
-            # Làm sạch theo yêu cầu và chèn bản quyền trước footnotes nếu có
-            cleaned_specs_html = self.clean_specs(original_specs_html) if original_specs_html else ''
-            product_data['specs_html_original'] = cleaned_specs_html or original_specs_html or ''
-
-            # Parse specs theo chuẩn hãng
-            specs_items = self._parse_keyence_specs(soup)
-            product_data['specifications'] = specs_items
-            
-            # Parse footnotes riêng biệt  
-            footnotes = self._parse_keyence_footnotes(soup)
-            product_data['footnotes'] = footnotes
+            # Specs, footnotes và HTML bảng đã làm sạch (có bản quyền) trên cây đã parse
+            with self.profiler.span(STAGE_SPECS):
+                specs = process_keyence_specs(root)
+            product_data['specs_html_original'] = specs['specs_html']
+            product_data['specifications'] = specs['specifications']
+            product_data['footnotes'] = specs['footnotes']
             
             # 7. Extract series name từ URL nếu chưa có
             if not product_data.get('series'):
@@ -1127,9 +900,24 @@ class KeyenceCrawler:
             logger.error(f"Lỗi khi trích xuất thông tin sản phẩm từ {product_url}: {str(e)}")
             return None
 
+    def _image_job(self, image_url, save_path, product_code):
+        """Job pipeline ảnh Keyence: thêm nền trắng nếu cần, giữ nguyên kích thước gốc, WebP chất lượng 95, ghi đè ảnh đã có"""
+        filename = f"{standardize_filename_keyence(product_code)}.webp"
+        return ImageJob(image_url, os.path.join(save_path, filename), resize=RESIZE_FLATTEN,
+                        format='WEBP', quality=95, method=6, session=self.session, skip_existing=False)
+    
+    def _record_image_result(self, result):
+        if result['success']:
+            self.stats.inc("images_downloaded")
+            logger.info(f"✅ Đã tải và chuyển đổi ảnh Keyence: {os.path.basename(result['path'])}")
+            return True
+        self.stats.inc("failed_images")
+        logger.error(f"❌ Lỗi khi tải ảnh Keyence từ {result['url']}: {result.get('error')}")
+        return False
+    
     def process_image_with_white_background(self, image_url, save_path, product_code):
         """
-        Tải và xử lý ảnh sản phẩm Keyence, thêm nền trắng và chuyển sang WebP
+        Tải và xử lý ảnh sản phẩm Keyence qua pipeline ảnh dùng chung
         Keyence images thường không có nền, cần thêm white background
         
         Args:
@@ -1140,81 +928,11 @@ class KeyenceCrawler:
         Returns:
             bool: True nếu thành công
         """
-        try:
-            if not image_url or not product_code:
-                return False
-            
-            # Tải ảnh
-            response = self.session.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Mở ảnh từ bytes
-            original_image = Image.open(BytesIO(response.content))
-            
-            # Chỉ thêm nền trắng nếu cần, giữ nguyên kích thước gốc
-            processed_image = self.add_white_background_keyence(original_image)
-            
-            # Tạo tên file theo logic standardize_filename_keyence
-            filename = f"{standardize_filename_keyence(product_code)}.webp"
-            full_path = os.path.join(save_path, filename)
-            
-            # Tạo thư mục nếu chưa tồn tại
-            os.makedirs(save_path, exist_ok=True)
-            
-            # Lưu trực tiếp sang WebP để giữ nguyên chất lượng
-            processed_image.save(full_path, 'WebP', quality=95, method=6)
-            result = True
-            
-            if result:
-                self.stats["images_downloaded"] += 1
-                logger.info(f"✅ Đã tải và chuyển đổi ảnh Keyence: {filename}")
-                return True
-            else:
-                self.stats["failed_images"] += 1
-                logger.error(f"❌ Lỗi chuyển đổi ảnh WebP: {filename}")
-                return False
-                
-        except Exception as e:
-            self.stats["failed_images"] += 1
-            logger.error(f"❌ Lỗi khi tải ảnh Keyence từ {image_url}: {str(e)}")
+        if not image_url or not product_code:
             return False
-
-    def add_white_background_keyence(self, image):
-        """
-        Chỉ thêm nền trắng vào ảnh Keyence nếu cần, giữ nguyên kích thước gốc
-        Keyence images thường transparent, cần white background cho WordPress
-        
-        Args:
-            image: PIL Image object
-            
-        Returns:
-            PIL Image: Ảnh đã được xử lý với nền trắng, giữ nguyên kích thước
-        """
-        try:
-            # Lấy kích thước gốc
-            original_size = image.size
-            
-            # Nếu ảnh đã có nền RGB rồi thì return luôn
-            if image.mode == 'RGB':
-                return image
-            
-            # Convert ảnh sang RGBA để preserve transparency
-            if image.mode != 'RGBA':
-                image = image.convert('RGBA')
-            
-            # Tạo ảnh nền trắng với kích thước gốc
-            background = Image.new('RGB', original_size, (255, 255, 255))
-            
-            # Paste ảnh gốc lên nền trắng (giữ nguyên kích thước)
-            background.paste(image, (0, 0), image)
-            
-            return background
-            
-        except Exception as e:
-            logger.error(f"Lỗi khi thêm white background: {str(e)}")
-            # Return ảnh gốc convert sang RGB nếu có lỗi
-            return image.convert('RGB') if image.mode != 'RGB' else image
-
+        result = get_image_pipeline().process(self._image_job(image_url, save_path, product_code))
+        return self._record_image_result(result)
+    
     def create_excel_with_keyence_specs(self, products_data, excel_path):
         """
         Tạo file Excel với thông số kỹ thuật theo định dạng Keyence
@@ -1310,46 +1028,20 @@ class KeyenceCrawler:
             specifications = product.get('specifications', [])
             footnotes = product.get('footnotes', {})
             
-            # Bắt đầu với bảng 2-column chuẩn
-            rows = [
-                '<table id="specifications" border="1" cellpadding="8" cellspacing="0" style="border-collapse:collapse;width:100%;font-family:Arial;">',
-                '<thead><tr style="background:#f2f2f2;"><th>Thông số</th><th>Giá trị</th></tr></thead>',
-                '<tbody>'
-            ]
-            
-            # Thêm mã sản phẩm đầu tiên
-            rows.append(f'<tr><td><strong>Mẫu</strong></td><td>{product_code}</td></tr>')
-            
-            # Thêm tất cả specifications từ parsed data
+            # Mã sản phẩm đầu tiên, sau đó các thông số đã parse (bỏ hàng thiếu key/value)
+            table = table_from_pairs([('Mẫu', product_code)])
             for item in specifications:
                 key = item.get('key', '')
                 value = item.get('value', '')
-                
                 if key and value:
-                    # Escape HTML để tránh conflict
-                    key_escaped = key.replace('<', '&lt;').replace('>', '&gt;')
-                    value_escaped = value.replace('<', '&lt;').replace('>', '&gt;')
-                    
-                    rows.append(f'<tr><td><strong>{key_escaped}</strong></td><td>{value_escaped}</td></tr>')
-            
-            # Thêm footnotes nếu có
-            if footnotes:
-                footnote_content = ""
-                for attributeid, content in footnotes.items():
-                    footnote_content += content + " "
-                
-                footnote_content = footnote_content.strip()
-                if footnote_content:
-                    footnote_escaped = footnote_content.replace('<', '&lt;').replace('>', '&gt;')
-                    rows.append(f'<tr><td><strong>Ghi chú</strong></td><td>{footnote_escaped}</td></tr>')
-            
-            # Thêm Copyright
-            rows.append('<tr><td><strong>Copyright</strong></td><td>Haiphongtech.vn</td></tr>')
-            
-            # Đóng bảng
-            rows.append('</tbody></table>')
-            
-            return '\n'.join(rows)
+                    table.add_pair(key, value)
+
+            # Gộp footnotes thành một hàng ghi chú
+            footnote_content = ' '.join(content for content in footnotes.values() if content).strip()
+            if footnote_content:
+                table.add_pair('Ghi chú', footnote_content)
+
+            return render_pairs_table(table.add_copyright())
             
         except Exception as e:
             logger.error(f"Lỗi khi tạo HTML table cho sản phẩm Keyence: {str(e)}")
@@ -1366,32 +1058,24 @@ class KeyenceCrawler:
         Returns:
             str: Đường dẫn thư mục chứa kết quả
         """
+        with self.profiler.run():
+            result_dir = self._crawl_products(category_urls)
+        self.profiler.write_report(result_dir)
+        return result_dir
+
+    def _crawl_products(self, category_urls):
+        """Thân của crawl_products (được profiler đo khi bật)"""
         start_time = time.time()
+        # Pipeline ảnh dùng chung cả tiến trình: chỉ báo cáo phần thống kê của lượt này
+        image_stats_start = get_image_pipeline().stats_snapshot()
         timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
         result_dir = os.path.join(self.output_root, f"KeyenceProducts_{timestamp}")
         os.makedirs(result_dir, exist_ok=True)
         
         self.emit_progress(0, "Bắt đầu cào dữ liệu Keyence", f"Sẽ xử lý {len(category_urls)} categories")
         
-        # Process each category với retry logic
-        for i, category_url in enumerate(category_urls):
-            category_success = False
-            max_category_retries = 2
-            
-            for category_attempt in range(max_category_retries):
-                logger.info(f"🔄 Category attempt {category_attempt + 1}/{max_category_retries} for: {category_url}")
-                category_success = self._process_single_keyence_category(
-                    category_url, i, len(category_urls), result_dir
-                )
-                
-                if category_success:
-                    logger.info(f"✅ Category thành công: {category_url}")
-                    break
-                elif category_attempt < max_category_retries - 1:
-                    logger.warning(f"⚠️ Category attempt {category_attempt + 1} thất bại, thử lại sau 10 giây...")
-                    time.sleep(10)
-                else:
-                    logger.error(f"❌ Category thất bại hoàn toàn sau {max_category_retries} lần thử: {category_url}")
+        # Xử lý các category song song; category thất bại được thử lại ở cuối
+        self._run_category_scheduler(category_urls, result_dir, self._process_single_keyence_category)
         
         # Hoàn thành
         end_time = time.time()
@@ -1410,9 +1094,92 @@ class KeyenceCrawler:
 
         logger.info(f"Request thất bại: {self.stats['failed_requests']}")
         logger.info(f"Ảnh thất bại: {self.stats['failed_images']}")
+        get_image_pipeline().log_stats(since=image_stats_start)
         
         return result_dir
 
+    @contextmanager
+    def _task_executor(self, max_workers):
+        """
+        Pool chạy series/ảnh của một category: dùng pool chung của crawl_products nếu có
+        (ngân sách luồng toàn cục), nếu không thì tạo pool riêng
+        """
+        if self._work_executor is not None:
+            yield self._work_executor
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield executor
+
+    def _run_category_scheduler(self, category_urls, result_dir, process_category, max_category_retries=2, retry_delay=10):
+        """
+        Xử lý nhiều category đồng thời trong một ngân sách luồng chung.
+
+        Tối đa max_parallel_categories category chạy cùng lúc; series và ảnh của mọi
+        category được đẩy vào cùng một pool max_workers luồng, nên tổng concurrency
+        không nhân lên theo số category. Category thất bại không chặn hàng đợi mà được
+        gom lại và thử lại thành một đợt song song ở cuối. Mỗi category vẫn ghi vào
+        thư mục riêng trong result_dir.
+
+        Args:
+            category_urls: Danh sách URL category
+            result_dir: Thư mục chứa kết quả
+            process_category: Hàm (category_url, index, total, result_dir) -> bool
+            max_category_retries: Tổng số lượt thử cho mỗi category
+            retry_delay: Số giây chờ trước mỗi đợt thử lại
+
+        Returns:
+            list: Các URL category thất bại sau mọi lượt thử
+        """
+        total = len(category_urls)
+        pending = list(enumerate(category_urls))
+        completed = 0
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="KeyenceWork") as work_executor:
+            self._work_executor = work_executor
+            try:
+                for category_attempt in range(max_category_retries):
+                    if not pending:
+                        break
+                    if category_attempt > 0:
+                        logger.warning(f"⚠️ Thử lại {len(pending)} category thất bại sau {retry_delay} giây...")
+                        time.sleep(retry_delay)
+
+                    failed = []
+                    workers = min(self.max_parallel_categories, len(pending))
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="KeyenceCategory") as category_executor:
+                        futures = {}
+                        for index, category_url in pending:
+                            logger.info(f"🔄 Category attempt {category_attempt + 1}/{max_category_retries} for: {category_url}")
+                            future = category_executor.submit(crawl_profiler.bind(process_category), category_url, index, total, result_dir)
+                            futures[future] = (index, category_url)
+
+                        for future in concurrent.futures.as_completed(futures):
+                            index, category_url = futures[future]
+                            try:
+                                category_success = future.result()
+                            except Exception as e:
+                                logger.error(f"❌ Lỗi không mong muốn với category {category_url}: {str(e)}")
+                                category_success = False
+
+                            if category_success:
+                                completed += 1
+                                logger.info(f"✅ Category thành công: {category_url}")
+                                self.emit_progress(
+                                    int(completed / total * 90),
+                                    f"Đã hoàn thành {completed}/{total} categories",
+                                    category_url
+                                )
+                            else:
+                                failed.append((index, category_url))
+
+                    pending = sorted(failed)
+            finally:
+                self._work_executor = None
+
+        for _, category_url in pending:
+            logger.error(f"❌ Category thất bại hoàn toàn sau {max_category_retries} lần thử: {category_url}")
+        return [category_url for _, category_url in pending]
+
     def _process_single_keyence_category(self, category_url, category_index, total_categories, result_dir):
         """
         Process một category Keyence với error handling và retry logic
@@ -1485,10 +1252,11 @@ class KeyenceCrawler:
                     series_products = []
                     for product_info in products_list:  # Lấy toàn bộ sản phẩm
                         try:
-                            product_details = self.extract_product_details(product_info['url'])
+                            with self.profiler.item(product_info['url']):
+                                product_details = self.extract_product_details(product_info['url'])
                             if product_details:
                                 series_products.append(product_details)
-                                self.stats["products_processed"] += 1
+                                self.stats.inc("products_processed")
                         except Exception as e:
                             logger.error(f"Lỗi khi xử lý product {product_info['url']}: {str(e)}")
                             continue
@@ -1500,8 +1268,9 @@ class KeyenceCrawler:
                     return []
             
             # Xử lý series với đa luồng
-            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(series_list))) as executor:
-                future_to_series = {executor.submit(process_keyence_series, series): series for series in series_list}
+            with self._task_executor(min(self.max_workers, len(series_list))) as executor:
+                process_series = crawl_profiler.bind(process_keyence_series)
+                future_to_series = {executor.submit(process_series, series): series for series in series_list}
                 
                 for future in concurrent.futures.as_completed(future_to_series):
                     series = future_to_series[future]
@@ -1522,28 +1291,19 @@ class KeyenceCrawler:
                 f"Category: {category_name}"
             )
             
-            # Tải ảnh với đa luồng và white background processing
-            def download_keyence_image(product):
-                """Download và xử lý ảnh cho một sản phẩm Keyence"""
-                try:
-                    if product.get('image_url') and product.get('product_code'):
-                        return self.process_image_with_white_background(
-                            product['image_url'],
-                            images_dir,
-                            product['product_code']
-                        )
-                except Exception as e:
-                    logger.error(f"Lỗi khi tải ảnh cho {product.get('product_code', 'Unknown')}: {str(e)}")
-                    return False
-            
-            # Download ảnh với đa luồng
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                image_futures = [executor.submit(download_keyence_image, product) for product in all_products_data]
-                concurrent.futures.wait(image_futures)
+            # Tải ảnh qua pipeline ảnh dùng chung (pool, loại trùng và thống kê chung cho mọi crawler)
+            jobs = [
+                self._image_job(product['image_url'], images_dir, product['product_code'])
+                for product in all_products_data
+                if product.get('image_url') and product.get('product_code')
+            ]
+            for result in get_image_pipeline().map(jobs):
+                self._record_image_result(result)
             
             # Tạo file Excel với Keyence specs
             excel_path = os.path.join(category_dir, f"{category_name}.xlsx")
-            excel_success = self.create_excel_with_keyence_specs(all_products_data, excel_path)
+            with self.profiler.span(STAGE_EXCEL, item=excel_path):
+                excel_success = self.create_excel_with_keyence_specs(all_products_data, excel_path)
             
             if excel_success:
                 logger.info(f"✅ Đã hoàn thành category: {category_name}")
@@ -1551,7 +1311,7 @@ class KeyenceCrawler:
             else:
                 logger.warning(f"⚠️ Hoàn thành category {category_name} nhưng không tạo được Excel")
             
-            self.stats["categories_processed"] += 1
+            self.stats.inc("categories_processed")
             return True
             
         except Exception as e:
@@ -7,21 +7,28 @@ Ngày tạo: $(date)
 
 import os
 import time
-import requests
 import re
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import concurrent.futures
+from contextlib import contextmanager
 from queue import Queue
 import pandas as pd
-from PIL import Image, ImageEnhance
-from io import BytesIO
 import json
+import sqlite3
 import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from app.webp_converter import WebPConverter
+from app.selenium_utils import collect_anchor_data
+from app.spec_engine import render_pairs
+from app.translation import Translator, TranslationMemory, GeminiBackend
+from app.image_pipeline import get_image_pipeline, ImageJob, RESIZE_FIT
+from app.metrics import StatsCounters, fetch_histogram, parse_histogram, webdriver_opened, webdriver_closed
+from app.progress_reporter import current_reporter
+from app.http_metrics import MeteredSession
+from app import crawl_profiler
+from app.crawl_profiler import CrawlProfiler, STAGE_PARSE, STAGE_TRANSLATE, STAGE_EXCEL
 import threading
 
 # Selenium imports for dynamic content
@@ -86,7 +93,8 @@ class OmronCrawler:
         'plc': 'programmable-logic-controllers',
     }
     
-    def __init__(self, output_root=None, max_workers=8, max_retries=3, socketio=None, gemini_api_key=None):
+    def __init__(self, output_root=None, max_workers=8, max_retries=3, socketio=None, gemini_api_key=None, max_parallel_categories=3,
+                 translation_backend=None, translation_memory_path=None):
         """
         Khởi tạo OmronCrawler
         
@@ -96,11 +104,20 @@ class OmronCrawler:
             max_retries: Số lần thử lại khi request thất bại
             socketio: Socket.IO instance để emit tiến trình
             gemini_api_key: API key cho Gemini AI translation
+            max_parallel_categories: Số category xử lý song song (dùng chung ngân sách max_workers)
+            translation_backend: Backend dịch thay cho Gemini (ví dụ StubBackend khi thử nghiệm)
+            translation_memory_path: File SQLite bộ nhớ dịch (mặc định: TRANSLATION_MEMORY_PATH
+                hoặc output_root/translation_memory.sqlite3)
         """
         self.output_root = output_root or os.path.join(os.getcwd(), "output_omron")
         self.max_workers = max_workers
         self.max_retries = max_retries
+        self.max_parallel_categories = max(1, max_parallel_categories)
+        # Pool series/ảnh dùng chung cho mọi category trong crawl_products (None khi chạy lẻ)
+        self._work_executor = None
         self.socketio = socketio
+        # Reporter của job đang chạy (lấy theo request tạo crawler)
+        self.progress = current_reporter() if socketio else None
         
         # Tạo thư mục output
         os.makedirs(self.output_root, exist_ok=True)
@@ -108,24 +125,26 @@ class OmronCrawler:
         # Base URLs
         self.base_url = "https://industrial.omron.co.uk"
         
+        # Bộ nhớ dịch dùng chung giữa các lần chạy
+        self.translation_memory_path = (translation_memory_path or os.getenv('TRANSLATION_MEMORY_PATH')
+                                        or os.path.join(self.output_root, 'translation_memory.sqlite3'))
+        self.translator = None
+        self._translation_backend = None
+
         # Khởi tạo Gemini AI
         self.gemini_model = None
         api_key = gemini_api_key or os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
         
-        if api_key:
-            try:
-                genai.configure(api_key=api_key)
-                self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-                logger.info("✅ Đã khởi tạo Gemini AI thành công")
-            except Exception as e:
-                logger.error(f"❌ Lỗi khởi tạo Gemini AI: {str(e)}")
-                self.gemini_model = None
+        if translation_backend is not None:
+            self._init_translator(translation_backend)
+        elif api_key:
+            self.setup_gemini_ai(api_key)
         else:
             logger.warning("⚠️ Không có Gemini API key, sẽ bỏ qua việc dịch tự động")
             logger.info("💡 Để sử dụng dịch tự động, hãy thiết lập biến môi trường GEMINI_API_KEY")
         
         # Cấu hình session với retry strategy
-        self.session = requests.Session()
+        self.session = MeteredSession('omron')
         retry_strategy = Retry(
             total=self.max_retries,
             backoff_factor=1,
@@ -183,16 +202,21 @@ class OmronCrawler:
         self.chrome_options.add_experimental_option("prefs", prefs)
         
         # Thống kê
-        self.stats = {
-            "categories_processed": 0,
-            "series_found": 0,
-            "products_found": 0,
-            "products_processed": 0,
-            "images_downloaded": 0,
-            "failed_requests": 0,
-            "failed_images": 0,
-            "translations_completed": 0
-        }
+        # Bộ đếm chia shard theo luồng: tăng từ nhiều worker mà không cần khóa
+        self.stats = StatsCounters((
+            "categories_processed",
+            "series_found",
+            "products_found",
+            "products_processed",
+            "images_downloaded",
+            "failed_requests",
+            "failed_images",
+            "translations_completed",
+        ))
+        self.fetch_latency = fetch_histogram('omron')
+        self.parse_latency = parse_histogram('omron')
+        # Profiler theo giai đoạn (tắt mặc định, bật bằng CRAWLER_PROFILE=1)
+        self.profiler = CrawlProfiler('omron')
         
         logger.info("✅ Đã khởi tạo OmronCrawler với Selenium support và Gemini AI")
     
@@ -200,6 +224,7 @@ class OmronCrawler:
         """Tạo một WebDriver Chrome mới"""
         try:
             driver = webdriver.Chrome(options=self.chrome_options)
+            webdriver_opened('omron', driver)
             driver.implicitly_wait(10)
             return driver
         except Exception as e:
@@ -208,19 +233,16 @@ class OmronCrawler:
     
     def close_driver(self, driver):
         """Đóng WebDriver"""
+        webdriver_closed(driver)
         try:
             driver.quit()
         except Exception as e:
             logger.warning(f"Lỗi khi đóng WebDriver: {e}")
     
-    def emit_progress(self, percent, message, detail=""):
-        """Emit tiến trình qua Socket.IO"""
-        if self.socketio:
-            self.socketio.emit('progress_update', {
-                'percent': percent,
-                'message': message,
-                'detail': detail
-            })
+    def emit_progress(self, percent, message, detail="", stage=None, stage_percent=None):
+        """Emit tiến trình qua Socket.IO (gộp, giới hạn tần suất, chỉ vào room của job; stage: giai đoạn listing/detail/images/export)"""
+        if self.progress:
+            self.progress.update(percent, message, detail, stage=stage, stage_percent=stage_percent)
         else:
             print(f"[{percent}%] {message} - {detail}")
     
@@ -241,12 +263,59 @@ class OmronCrawler:
         try:
             genai.configure(api_key=api_key)
             self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+            self._init_translator(GeminiBackend(self.gemini_model))
             logger.info("✅ Đã thiết lập Gemini AI thành công")
             return True
         except Exception as e:
             logger.error(f"❌ Lỗi thiết lập Gemini AI: {str(e)}")
             self.gemini_model = None
             return False
+
+    def _init_translator(self, backend):
+        """
+        Tạo Translator (dịch theo lô + bộ nhớ dịch SQLite) cho backend đã chọn
+        """
+        self.close_translator()
+        self._translation_backend = backend
+        try:
+            memory = TranslationMemory(self.translation_memory_path)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Không mở được bộ nhớ dịch {self.translation_memory_path}: {str(e)}")
+            memory = None
+        self.translator = Translator(backend, memory=memory)
+
+    def close_translator(self):
+        """
+        Dừng luồng gom lô, thread pool và đóng bộ nhớ dịch SQLite của Translator.
+        Backend được giữ lại để lần crawl sau tạo lại Translator.
+        """
+        translator, self.translator = self.translator, None
+        if translator is not None:
+            translator.close()
+
+    def translate_texts(self, texts, target_language="Vietnamese"):
+        """
+        Dịch nhiều text cùng lúc: tra bộ nhớ dịch, loại trùng và gom các chuỗi
+        chưa có thành lô (chung với các luồng khác) trước khi gọi Gemini
+        
+        Args:
+            texts: Danh sách text cần dịch
+            target_language: Ngôn ngữ đích
+            
+        Returns:
+            list: Text đã dịch, cùng thứ tự (text gốc nếu không dịch được)
+        """
+        texts = list(texts)
+        if not self.translator:
+            if any(text and text.strip() for text in texts):
+                logger.warning("Gemini AI chưa được thiết lập - sẽ sử dụng text gốc")
+            return texts
+        
+        translated = self.translator.translate_many(texts, target_language)
+        self.stats.inc("translations_completed", sum(
+            1 for text, result in zip(texts, translated) if text and text.strip() and result != text
+        ))
+        return translated
     
     def translate_with_gemini(self, text, target_language="Vietnamese"):
         """
@@ -262,45 +331,7 @@ class OmronCrawler:
         # Kiểm tra điều kiện cơ bản
         if not text or not text.strip():
             return text
-            
-        # Nếu không có Gemini model, log và trả về text gốc
-        if not self.gemini_model:
-            logger.warning("Gemini AI chưa được thiết lập - sẽ sử dụng text gốc")
-            return text
-        
-        try:
-            # Tối ưu prompt để dịch tốt hơn
-            prompt = f"""Dịch đoạn text kỹ thuật sau sang tiếng Việt. 
-Giữ nguyên:
-- Mã sản phẩm, model number
-- Đơn vị đo lường (mm, V, A, etc.)
-- Số liệu kỹ thuật
-- Tên thương hiệu
-
-Chỉ dịch:
-- Mô tả sản phẩm
-- Thuật ngữ kỹ thuật
-- Tính năng và đặc điểm
-
-Text cần dịch: "{text}"
-
-Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
-
-            logger.debug(f"Đang dịch text: {text[:100]}...")
-            response = self.gemini_model.generate_content(prompt)
-            
-            if response and response.text:
-                translated_text = response.text.strip()
-                self.stats["translations_completed"] += 1
-                logger.debug(f"Dịch thành công: {text[:50]} -> {translated_text[:50]}")
-                return translated_text
-            else:
-                logger.warning(f"Không nhận được response từ Gemini cho text: {text[:50]}...")
-                return text
-                
-        except Exception as e:
-            logger.error(f"Lỗi khi dịch với Gemini cho text '{text[:50]}...': {str(e)}")
-            return text
+        return self.translate_texts([text], target_language)[0]
 
     def fix_category_url(self, url):
         """
@@ -331,11 +362,12 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
     def get_html_content(self, url, timeout=30):
         """Lấy nội dung HTML từ URL"""
         try:
-            response = self.session.get(url, timeout=timeout)
+            with self.fetch_latency.time():
+                response = self.session.get(url, timeout=timeout)
             response.raise_for_status()
             return response.text
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self.stats.inc("failed_requests")
             logger.error(f"Lỗi khi lấy HTML từ {url}: {str(e)}")
             return None
     
@@ -384,20 +416,17 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                     return self.extract_series_fallback(category_url)
                 
                 # Tìm các series links trong fieldset.products
-                series_links = driver.find_elements(By.CSS_SELECTOR, "fieldset.products a[href*='/en/products/']")
+                # Các selector được thử theo thứ tự, dừng ở selector đầu tiên có kết quả (một lần execute_script)
+                series_links = collect_anchor_data(driver, [
+                    "fieldset.products a[href*='/en/products/']",
+                    ".inputgroup a[href*='/en/products/']",  # Selector fallback trong inputgroup
+                    ".inputgroup.shortened a[href*='/en/products/']"  # Selector legacy
+                ], first_match=True)
                 
-                if not series_links:
-                    # Thử selector fallback trong inputgroup
-                    series_links = driver.find_elements(By.CSS_SELECTOR, ".inputgroup a[href*='/en/products/']")
-                    
-                if not series_links:
-                    # Thử selector legacy
-                    series_links = driver.find_elements(By.CSS_SELECTOR, ".inputgroup.shortened a[href*='/en/products/']")
-                
-                for link_element in series_links:
+                for link_data in series_links:
                     try:
-                        href = link_element.get_attribute('href')
-                        series_name = link_element.text.strip()
+                        href = link_data['href']
+                        series_name = link_data['text']
                         
                         if href and series_name:
                             # Convert relative URL thành absolute URL
@@ -443,7 +472,7 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
         if driver:
             self.close_driver(driver)
         
-        self.stats["series_found"] += len(series_data)
+        self.stats.inc("series_found", len(series_data))
         logger.info(f"🎯 Tổng cộng tìm thấy {len(series_data)} series từ {category_url}")
         
         return series_data
@@ -632,13 +661,15 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                 # Thử tìm table với class details trước
                 try:
                     table_selector = "table.details, table[class*='col-0'][class*='col-4'][class*='col-7'][class*='col-9']"
-                    product_table = driver.find_element(By.CSS_SELECTOR, table_selector)
-                    if product_table:
-                        # Tìm tất cả product links trong table
-                        product_links = product_table.find_elements(By.CSS_SELECTOR, "td.product-name a, .product-name a")
+                    product_links = collect_anchor_data(
+                        driver, "td.product-name a, .product-name a", root_selector=table_selector
+                    )
+                    if product_links:
                         logger.info(f"🎯 Tìm thấy {len(product_links)} sản phẩm trong table.details")
-                except NoSuchElementException:
-                    logger.info("Không tìm thấy table.details, thử các selector khác")
+                    else:
+                        logger.info("Không tìm thấy table.details, thử các selector khác")
+                except Exception as e:
+                    logger.debug(f"Lỗi khi đọc table.details: {str(e)}")
                     
                 # Nếu không tìm thấy trong table, thử các selector backup
                 if not product_links:
@@ -648,21 +679,18 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                         ".product-item a",
                         ".product-link"
                     ]
-                    for selector in selectors:
-                        try:
-                            links = driver.find_elements(By.CSS_SELECTOR, selector)
-                            if links:
-                                product_links = links
-                                logger.info(f"Fallback: Tìm thấy {len(links)} product links với selector: {selector}")
-                                break
-                        except Exception as e:
-                            logger.debug(f"Lỗi với selector {selector}: {str(e)}")
-                            continue
+                    try:
+                        product_links = collect_anchor_data(driver, selectors, first_match=True)
+                        if product_links:
+                            selector = selectors[product_links[0]['selector']]
+                            logger.info(f"Fallback: Tìm thấy {len(product_links)} product links với selector: {selector}")
+                    except Exception as e:
+                        logger.debug(f"Lỗi khi thu thập product links: {str(e)}")
                     
-                for link_element in product_links:
+                for link_data in product_links:
                     try:
-                        href = link_element.get_attribute('href')
-                        product_name = link_element.text.strip()
+                        href = link_data['href']
+                        product_name = link_data['text']
                         
                         if href and product_name:
                             # Convert relative/absolute URL thành absolute URL
@@ -724,7 +752,7 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
         if driver:
             self.close_driver(driver)
         
-        self.stats["products_found"] += len(products_data)
+        self.stats.inc("products_found", len(products_data))
         logger.info(f"🎯 Tổng cộng tìm thấy {len(products_data)} sản phẩm từ {series_url}")
         
         return products_data
@@ -851,7 +879,8 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
             if not html:
                 return None
             
-            soup = BeautifulSoup(html, 'html.parser')
+            with self.parse_latency.time(), self.profiler.span(STAGE_PARSE):
+                soup = BeautifulSoup(html, 'html.parser')
             
             product_data = {
                 'product_code': '',
@@ -906,10 +935,6 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
             english_name = ' '.join(name_parts)
             product_data['product_name'] = english_name
             
-            # Dịch tên sản phẩm sang tiếng Việt sử dụng Gemini
-            vietnamese_name = self.translate_with_gemini(english_name)
-            product_data['full_product_name'] = vietnamese_name
-            
             # 4. Lấy ảnh sản phẩm từ figure > a.image-link > img
             figure_element = soup.find('figure')
             if figure_element:
@@ -926,6 +951,7 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                             product_data['image_url'] = image_src
             
             # 5. Lấy thông số kỹ thuật từ bảng Specifications
+            raw_specs = []
             spec_table = soup.find('table', class_='one')
             if spec_table:
                 rows = spec_table.find_all('tr')
@@ -935,10 +961,18 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                         key = cells[0].get_text(strip=True)
                         value = cells[1].get_text(strip=True)
                         if key and value:
-                            # Dịch key và value sang tiếng Việt
-                            vietnamese_key = self.translate_with_gemini(key)
-                            vietnamese_value = self.translate_with_gemini(value)
-                            product_data['specifications'][vietnamese_key] = vietnamese_value
+                            raw_specs.append((key, value))
+            
+            # 6. Dịch tên sản phẩm, key và value sang tiếng Việt trong một lần gọi
+            # (các chuỗi lặp lại như "Power supply voltage" lấy từ bộ nhớ dịch)
+            texts = [english_name]
+            for key, value in raw_specs:
+                texts.extend((key, value))
+            with self.profiler.span(STAGE_TRANSLATE):
+                translated = self.translate_texts(texts)
+            product_data['full_product_name'] = translated[0]
+            for index in range(len(raw_specs)):
+                product_data['specifications'][translated[1 + 2 * index]] = translated[2 + 2 * index]
             
             return product_data
             
@@ -946,10 +980,24 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
             logger.error(f"Lỗi khi trích xuất thông tin sản phẩm từ {product_url}: {str(e)}")
             return None
     
+    def _image_job(self, image_url, save_path, product_code):
+        """Job pipeline ảnh cho một sản phẩm: 800x800 nền trắng, WebP chất lượng 90 (tên file theo standardize_filename), ghi đè ảnh đã có"""
+        filename = f"{standardize_filename(product_code)}.webp"
+        return ImageJob(image_url, os.path.join(save_path, filename), resize=RESIZE_FIT, target_size=(800, 800),
+                        format='WEBP', quality=90, method=6, session=self.session, skip_existing=False)
+    
+    def _record_image_result(self, result):
+        if result['success']:
+            self.stats.inc("images_downloaded")
+            logger.info(f"✅ Đã tải và chuyển đổi ảnh: {os.path.basename(result['path'])}")
+            return True
+        self.stats.inc("failed_images")
+        logger.error(f"❌ Lỗi khi tải ảnh từ {result['url']}: {result.get('error')}")
+        return False
+    
     def download_and_process_image(self, image_url, save_path, product_code):
         """
-        Tải và xử lý ảnh sản phẩm, chuyển sang WebP
-        Sử dụng logic tương tự Google Apps Script để tạo tên file
+        Tải và xử lý ảnh sản phẩm, chuyển sang WebP qua pipeline ảnh dùng chung
         
         Args:
             image_url: URL của ảnh
@@ -959,91 +1007,10 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
         Returns:
             bool: True nếu thành công
         """
-        try:
-            if not image_url or not product_code:
-                return False
-            
-            # Tải ảnh
-            response = self.session.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            # Mở ảnh từ bytes
-            image = Image.open(BytesIO(response.content))
-            
-            # Thêm nền trắng và resize
-            processed_image = self.add_white_background_to_image(image)
-            
-            # Tạo tên file theo logic standardize_filename
-            filename = f"{standardize_filename(product_code)}.webp"
-            full_path = os.path.join(save_path, filename)
-            
-            # Tạo thư mục nếu chưa tồn tại
-            os.makedirs(save_path, exist_ok=True)
-            
-            # Lưu ảnh tạm dưới dạng PNG
-            temp_path = full_path.replace('.webp', '.png')
-            processed_image.save(temp_path, 'PNG', quality=95)
-            
-            # Chuyển đổi sang WebP
-            result = WebPConverter.convert_to_webp(
-                input_path=temp_path,
-                output_path=full_path,
-                quality=90,
-                lossless=False,
-                method=6
-            )
-            
-            # Xóa file tạm
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            
-            if result:
-                self.stats["images_downloaded"] += 1
-                logger.info(f"✅ Đã tải và chuyển đổi ảnh: {filename}")
-                return True
-            else:
-                self.stats["failed_images"] += 1
-                logger.error(f"❌ Lỗi chuyển đổi ảnh WebP: {filename}")
-                return False
-                
-        except Exception as e:
-            self.stats["failed_images"] += 1
-            logger.error(f"❌ Lỗi khi tải ảnh từ {image_url}: {str(e)}")
+        if not image_url or not product_code:
             return False
-    
-    def add_white_background_to_image(self, image, target_size=(800, 800)):
-        """
-        Thêm nền trắng vào ảnh và resize về kích thước target
-        
-        Args:
-            image: PIL Image object
-            target_size: Kích thước mục tiêu (width, height)
-            
-        Returns:
-            PIL Image: Ảnh đã được xử lý
-        """
-        # Tạo ảnh nền trắng với kích thước target
-        background = Image.new('RGB', target_size, (255, 255, 255))
-        
-        # Convert ảnh gốc sang RGBA nếu cần
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        # Tính toán tỷ lệ resize để fit vào target size
-        img_ratio = min(target_size[0] / image.width, target_size[1] / image.height)
-        new_size = (int(image.width * img_ratio), int(image.height * img_ratio))
-        
-        # Resize ảnh
-        image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Tính toán vị trí để paste ảnh vào giữa nền trắng
-        x = (target_size[0] - new_size[0]) // 2
-        y = (target_size[1] - new_size[1]) // 2
-        
-        # Paste ảnh vào nền trắng
-        background.paste(image, (x, y), image if image.mode == 'RGBA' else None)
-        
-        return background
+        result = get_image_pipeline().process(self._image_job(image_url, save_path, product_code))
+        return self._record_image_result(result)
     
     def create_excel_with_specifications(self, products_data, excel_path):
         """
@@ -1132,42 +1099,10 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
             product_name = product.get('full_product_name', '')
             specifications = product.get('specifications', {})
             
-            # Bắt đầu tạo HTML table theo format yêu cầu
-            html = '''<table id="specifications" border="1" cellpadding="8" cellspacing="0" style="border-collapse: collapse; font-family: Arial; width: 100%;">
-<thead>
-<tr style="background-color: #f2f2f2;">
-<th>Thông số</th>
-<th>Giá trị</th>
-</tr>
-</thead>
-<tbody>
-<tr>
-<td style="font-weight: bold;">Mã sản phẩm</td>
-<td>{}</td>
-</tr>
-<tr>
-<td style="font-weight: bold;">Tên sản phẩm</td>
-<td>{}</td>
-</tr>'''.format(product_code, product_name)
-            
-            # Thêm các thông số kỹ thuật
-            for key, value in specifications.items():
-                html += f'''
-<tr>
-<td style="font-weight: bold;">{key}</td>
-<td>{value}</td>
-</tr>'''
-            
-            # Thêm Copyright ở cuối bảng
-            html += '''
-<tr>
-<td style="font-weight: bold;">Copyright</td>
-<td>Haiphongtech.vn</td>
-</tr>
-</tbody>
-</table>'''
-            
-            return html
+            # Bảng 2 cột chuẩn: mã, tên, các thông số và Copyright ở cuối bảng
+            pairs = [('Mã sản phẩm', product_code), ('Tên sản phẩm', product_name)]
+            pairs.extend(specifications.items())
+            return render_pairs(pairs)
             
         except Exception as e:
             logger.error(f"Lỗi khi tạo HTML table cho sản phẩm: {str(e)}")
@@ -1183,37 +1118,40 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
         Returns:
             str: Đường dẫn thư mục chứa kết quả
         """
+        if self.translator is None and self._translation_backend is not None:
+            self._init_translator(self._translation_backend)
+        try:
+            with self.profiler.run():
+                result_dir = self._crawl_products(category_urls)
+        finally:
+            # Mỗi lượt crawl có Translator riêng: không để lại luồng và kết nối SQLite
+            self.close_translator()
+        self.profiler.write_report(result_dir)
+        return result_dir
+
+    def _crawl_products(self, category_urls):
+        """Thân của crawl_products (được profiler đo khi bật)"""
         start_time = time.time()
+        # Pipeline ảnh dùng chung cả tiến trình: chỉ báo cáo phần thống kê của lượt này
+        image_stats_start = get_image_pipeline().stats_snapshot()
         timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
         result_dir = os.path.join(self.output_root, f"OmronProduct_{timestamp}")
         os.makedirs(result_dir, exist_ok=True)
         
         self.emit_progress(0, "Bắt đầu cào dữ liệu Omron", f"Sẽ xử lý {len(category_urls)} categories")
         
-        # Process each category with retry logic
-        for i, original_url in enumerate(category_urls):
-            # Tự động sửa URL nếu cần
+        # Tự động sửa URL nếu cần
+        fixed_urls = []
+        for original_url in category_urls:
             category_url = self.fix_category_url(original_url)
             if category_url != original_url:
                 self.emit_progress(5, f"URL đã được sửa", f"'{original_url.split('/')[-1]}' -> '{category_url.split('/')[-1]}'")
                 logger.info(f"🔧 Fixed URL: {original_url} -> {category_url}")
-            category_success = False
-            max_category_retries = 2
-            
-            for category_attempt in range(max_category_retries):
-                logger.info(f"🔄 Category attempt {category_attempt + 1}/{max_category_retries} for: {category_url}")
-                category_success = self._process_single_category(
-                    category_url, i, len(category_urls), result_dir
-                )
-                
-                if category_success:
-                    logger.info(f"✅ Category thành công: {category_url}")
-                    break
-                elif category_attempt < max_category_retries - 1:
-                    logger.warning(f"⚠️ Category attempt {category_attempt + 1} thất bại, thử lại sau 10 giây...")
-                    time.sleep(10)
-                else:
-                    logger.error(f"❌ Category thất bại hoàn toàn sau {max_category_retries} lần thử: {category_url}")
+            fixed_urls.append(category_url)
+        category_urls = fixed_urls
+
+        # Xử lý các category song song; category thất bại được thử lại ở cuối
+        self._run_category_scheduler(category_urls, result_dir, self._process_single_category)
         
         # Hoàn thành
         end_time = time.time()
@@ -1229,12 +1167,99 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
         logger.info(f"Sản phẩm tìm thấy: {self.stats['products_found']}")
         logger.info(f"Sản phẩm đã xử lý: {self.stats['products_processed']}")
         logger.info(f"Ảnh đã tải: {self.stats['images_downloaded']}")
+        get_image_pipeline().log_stats(since=image_stats_start)
         logger.info(f"Bản dịch hoàn thành: {self.stats['translations_completed']}")
+        if self.translator:
+            t_stats = self.translator.stats
+            logger.info(f"Dịch: {t_stats['requested']} chuỗi, {t_stats['cache_hits'] + t_stats['memory_hits']} "
+                        f"từ bộ nhớ dịch, {t_stats['batches']} request Gemini ({t_stats['failed_batches']} lỗi)")
         logger.info(f"Request thất bại: {self.stats['failed_requests']}")
         logger.info(f"Ảnh thất bại: {self.stats['failed_images']}")
         
         return result_dir
     
+    @contextmanager
+    def _task_executor(self, max_workers):
+        """
+        Pool chạy series/ảnh của một category: dùng pool chung của crawl_products nếu có
+        (ngân sách luồng toàn cục), nếu không thì tạo pool riêng
+        """
+        if self._work_executor is not None:
+            yield self._work_executor
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield executor
+
+    def _run_category_scheduler(self, category_urls, result_dir, process_category, max_category_retries=2, retry_delay=10):
+        """
+        Xử lý nhiều category đồng thời trong một ngân sách luồng chung.
+
+        Tối đa max_parallel_categories category chạy cùng lúc; series và ảnh của mọi
+        category được đẩy vào cùng một pool max_workers luồng, nên tổng concurrency
+        không nhân lên theo số category. Category thất bại không chặn hàng đợi mà được
+        gom lại và thử lại thành một đợt song song ở cuối. Mỗi category vẫn ghi vào
+        thư mục riêng trong result_dir.
+
+        Args:
+            category_urls: Danh sách URL category
+            result_dir: Thư mục chứa kết quả
+            process_category: Hàm (category_url, index, total, result_dir) -> bool
+            max_category_retries: Tổng số lượt thử cho mỗi category
+            retry_delay: Số giây chờ trước mỗi đợt thử lại
+
+        Returns:
+            list: Các URL category thất bại sau mọi lượt thử
+        """
+        total = len(category_urls)
+        pending = list(enumerate(category_urls))
+        completed = 0
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="OmronWork") as work_executor:
+            self._work_executor = work_executor
+            try:
+                for category_attempt in range(max_category_retries):
+                    if not pending:
+                        break
+                    if category_attempt > 0:
+                        logger.warning(f"⚠️ Thử lại {len(pending)} category thất bại sau {retry_delay} giây...")
+                        time.sleep(retry_delay)
+
+                    failed = []
+                    workers = min(self.max_parallel_categories, len(pending))
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="OmronCategory") as category_executor:
+                        futures = {}
+                        for index, category_url in pending:
+                            logger.info(f"🔄 Category attempt {category_attempt + 1}/{max_category_retries} for: {category_url}")
+                            future = category_executor.submit(crawl_profiler.bind(process_category), category_url, index, total, result_dir)
+                            futures[future] = (index, category_url)
+
+                        for future in concurrent.futures.as_completed(futures):
+                            index, category_url = futures[future]
+                            try:
+                                category_success = future.result()
+                            except Exception as e:
+                                logger.error(f"❌ Lỗi không mong muốn với category {category_url}: {str(e)}")
+                                category_success = False
+
+                            if category_success:
+                                completed += 1
+                                logger.info(f"✅ Category thành công: {category_url}")
+                                self.emit_progress(
+                                    int(completed / total * 90),
+                                    f"Đã hoàn thành {completed}/{total} categories",
+                                    category_url
+                                )
+                            else:
+                                failed.append((index, category_url))
+
+                    pending = sorted(failed)
+            finally:
+                self._work_executor = None
+
+        for _, category_url in pending:
+            logger.error(f"❌ Category thất bại hoàn toàn sau {max_category_retries} lần thử: {category_url}")
+        return [category_url for _, category_url in pending]
+
     def _process_single_category(self, category_url, category_index, total_categories, result_dir):
         """
         Process một category với error handling và retry logic
@@ -1305,10 +1330,11 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                     series_products = []
                     for product_info in products_list:
                         try:
-                            product_details = self.extract_product_details(product_info['url'])
+                            with self.profiler.item(product_info['url']):
+                                product_details = self.extract_product_details(product_info['url'])
                             if product_details:
                                 series_products.append(product_details)
-                                self.stats["products_processed"] += 1
+                                self.stats.inc("products_processed")
                         except Exception as e:
                             logger.error(f"Lỗi khi xử lý product {product_info['url']}: {str(e)}")
                             continue
@@ -1320,8 +1346,8 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                     return []
             
             # Xử lý series với đa luồng
-            with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(series_list))) as executor:
-                future_to_series = {executor.submit(process_series, series): series for series in series_list}
+            with self._task_executor(min(self.max_workers, len(series_list))) as executor:
+                future_to_series = {executor.submit(crawl_profiler.bind(process_series), series): series for series in series_list}
                 
                 for future in concurrent.futures.as_completed(future_to_series):
                     series = future_to_series[future]
@@ -1342,28 +1368,19 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
                 f"Category: {category_name}"
             )
             
-            # Tải ảnh với đa luồng
-            def download_image(product):
-                """Download ảnh cho một sản phẩm"""
-                try:
-                    if product.get('image_url') and product.get('product_code'):
-                        return self.download_and_process_image(
-                            product['image_url'],
-                            images_dir,
-                            product['product_code']
-                        )
-                except Exception as e:
-                    logger.error(f"Lỗi khi tải ảnh cho {product.get('product_code', 'Unknown')}: {str(e)}")
-                    return False
-            
-            # Download ảnh với đa luồng
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                image_futures = [executor.submit(download_image, product) for product in all_products_data]
-                concurrent.futures.wait(image_futures)
+            # Tải ảnh qua pipeline ảnh dùng chung (pool, loại trùng và thống kê chung cho mọi crawler)
+            jobs = [
+                self._image_job(product['image_url'], images_dir, product['product_code'])
+                for product in all_products_data
+                if product.get('image_url') and product.get('product_code')
+            ]
+            for result in get_image_pipeline().map(jobs):
+                self._record_image_result(result)
             
             # Tạo file Excel
             excel_path = os.path.join(category_dir, f"{category_name}.xlsx")
-            excel_success = self.create_excel_with_specifications(all_products_data, excel_path)
+            with self.profiler.span(STAGE_EXCEL, item=excel_path):
+                excel_success = self.create_excel_with_specifications(all_products_data, excel_path)
             
             if excel_success:
                 logger.info(f"✅ Đã hoàn thành category: {category_name}")
@@ -1371,7 +1388,7 @@ Trả về chỉ bản dịch tiếng Việt, không thêm giải thích:"""
             else:
                 logger.warning(f"⚠️ Hoàn thành category {category_name} nhưng không tạo được Excel")
             
-            self.stats["categories_processed"] += 1
+            self.stats.inc("categories_processed")
             return True
             
         except Exception as e:
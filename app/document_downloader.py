@@ -0,0 +1,386 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+
+from app.log_config import get_item_logger
+from app.metrics import queue_depth_gauge
+from app.http_metrics import MeteredSession
+
+logger = logging.getLogger(__name__)
+item_logger = get_item_logger(__name__)
+
+DOCUMENT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,application/x-pdf,application/octet-stream,*/*',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Connection': 'keep-alive',
+    'Referer': 'https://baa.vn/'
+}
+
+PART_SUFFIX = '.part'
+PDF_SIGNATURE = b'%PDF-'
+MIN_DOCUMENT_SIZE = 1000
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+class DocumentValidationError(Exception):
+    """Nội dung tải về không phải tài liệu hợp lệ (tải lại từ đầu thay vì resume)"""
+
+
+def document_file_name(doc_info):
+    """
+    Tên file an toàn (.pdf) cho một tài liệu
+
+    Args:
+        doc_info (dict): {'url', 'name'}
+
+    Returns:
+        tuple: (tên tài liệu, tên file)
+    """
+    doc_url = doc_info['url']
+    doc_name = doc_info.get('name', '') or doc_url.split('/')[-1]
+    # Loại bỏ các ký tự không hợp lệ trong tên file
+    safe_filename = re.sub(r'[\\/*?:"<>|]', '', doc_name)
+    # Thêm .pdf nếu chưa có
+    if not safe_filename.lower().endswith('.pdf'):
+        safe_filename += '.pdf'
+    return doc_name, safe_filename
+
+
+def _sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src, dest):
+    """Tạo hard link tới file đã tải (copy nếu hệ thống file không hỗ trợ)"""
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class DocumentDownloader:
+    """
+    Engine tải tài liệu (PDF datasheet, catalog...) dùng chung cho mọi sản phẩm.
+
+    - Stream vào file ``.part`` theo từng chunk cố định, không giữ cả file trong bộ nhớ
+    - Khi lỗi giữa chừng, thử lại bằng HTTP Range từ byte đã có thay vì tải lại từ đầu
+    - Kiểm tra Content-Length/Content-Range và chữ ký %PDF- trước khi đổi tên file
+    - Loại trùng: cùng URL đang tải chỉ tải một lần; cùng nội dung (sha256) chỉ lưu một bản (hard link)
+    - Một pool giới hạn và một session (keep-alive) cho toàn bộ lượt tải
+    """
+
+    def __init__(self, max_workers=6, chunk_size=256 * 1024, max_retries=5, timeout=(15, 60),
+                 headers=None, min_size=MIN_DOCUMENT_SIZE):
+        """
+        Args:
+            max_workers: Số tài liệu tải đồng thời tối đa
+            chunk_size: Kích thước mỗi chunk ghi ra đĩa (bytes)
+            max_retries: Số lần thử lại cho mỗi tài liệu
+            timeout: Timeout (kết nối, đọc) của mỗi request
+            headers: Headers HTTP (mặc định DOCUMENT_HEADERS)
+            min_size: Kích thước tối thiểu của một tài liệu hợp lệ (bytes)
+        """
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.max_retries = max(1, max_retries)
+        self.timeout = timeout
+        self.min_size = min_size
+
+        self.session = MeteredSession('documents')
+        self.session.headers.update(headers or DOCUMENT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='documents')
+        self._queue_depth = queue_depth_gauge('documents', 'downloads')
+        self._lock = threading.Lock()
+        self._by_url = {}
+        self._by_hash = {}
+        self.stats = {
+            'downloaded': 0,
+            'bytes': 0,
+            'resumed': 0,
+            'url_duplicates': 0,
+            'content_duplicates': 0,
+            'failed': 0,
+        }
+
+    # ======= API =======
+
+    def submit(self, doc_info, output_folder):
+        """
+        Đưa một tài liệu vào hàng đợi tải
+
+        Args:
+            doc_info (dict): {'url', 'name'}
+            output_folder (str): Thư mục lưu file
+
+        Returns:
+            Future: Kết quả cùng dạng với download()
+        """
+        doc_url = doc_info['url']
+        doc_name, safe_filename = document_file_name(doc_info)
+        file_path = os.path.join(output_folder, safe_filename)
+
+        with self._lock:
+            # _by_url chỉ giữ các lượt tải đang chạy; file đã tải xong được loại trùng theo sha256
+            primary = self._by_url.get(doc_url)
+            is_new = primary is None
+            if is_new:
+                self._queue_depth.inc()
+                primary = self._executor.submit(self._download, doc_url, doc_name, safe_filename, file_path)
+                self._by_url[doc_url] = primary
+            else:
+                self.stats['url_duplicates'] += 1
+
+        if is_new:
+            # Gắn callback ngoài khóa: future xong sớm thì callback chạy ngay trong luồng này
+            primary.add_done_callback(lambda future: self._finish(doc_url, future))
+            return primary
+
+        # URL đang được tải cho sản phẩm khác: không tải lại, chỉ liên kết file khi xong
+        derived = Future()
+
+        def on_done(future):
+            try:
+                derived.set_result(self._reuse(future.result(), doc_name, safe_filename, file_path))
+            except Exception as e:
+                derived.set_result(self._failure(doc_url, doc_name, str(e)))
+
+        primary.add_done_callback(on_done)
+        return derived
+
+    def _finish(self, doc_url, future):
+        self._queue_depth.dec()
+        with self._lock:
+            if self._by_url.get(doc_url) is future:
+                del self._by_url[doc_url]
+
+    def download(self, doc_info, output_folder):
+        """
+        Tải một tài liệu (chờ kết quả)
+
+        Returns:
+            dict: success, path, filename, url, name (hoặc error khi thất bại)
+        """
+        try:
+            return self.submit(doc_info, output_folder).result()
+        except Exception as e:
+            return self._failure(doc_info.get('url', ''), doc_info.get('name', ''), str(e))
+
+    def stats_snapshot(self):
+        """Bản sao thống kê hiện tại"""
+        with self._lock:
+            return dict(self.stats)
+
+    def stats_since(self, baseline):
+        """
+        Thống kê phát sinh kể từ một bản sao trước đó
+
+        Args:
+            baseline (dict): Kết quả stats_snapshot() lúc bắt đầu lượt chạy
+
+        Returns:
+            dict: Hiệu số của từng chỉ số
+        """
+        current = self.stats_snapshot()
+        return {key: value - baseline.get(key, 0) for key, value in current.items()}
+
+    def close(self):
+        """Đóng pool và session"""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    # ======= DOWNLOAD =======
+
+    @staticmethod
+    def _failure(doc_url, doc_name, error):
+        return {'success': False, 'error': error, 'url': doc_url, 'name': doc_name}
+
+    def _reuse(self, result, doc_name, safe_filename, file_path):
+        if not result.get('success'):
+            return dict(result, name=doc_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        _link_or_copy(result['path'], file_path)
+        item_logger.info("Dùng lại tài liệu đã tải: %s", result['url'])
+        return dict(result, path=file_path, filename=safe_filename, name=doc_name, deduplicated=True)
+
+    def _is_valid_file(self, path):
+        if not os.path.exists(path) or os.path.getsize(path) < self.min_size:
+            return False
+        with open(path, 'rb') as f:
+            return f.read(len(PDF_SIGNATURE)) == PDF_SIGNATURE
+
+    def _download(self, doc_url, doc_name, safe_filename, file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        item_logger.info("Đang tải tài liệu từ: %s", doc_url)
+        logger.info(f"Lưu vào: {file_path}")
+
+        error_msg = ''
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                file_size, resumed = self._fetch(doc_url, file_path)
+                deduplicated = self._dedupe_content(file_path)
+                with self._lock:
+                    self.stats['downloaded'] += 1
+                    self.stats['bytes'] += file_size
+                logger.info(f"Tải tài liệu thành công: {file_path} ({file_size} bytes"
+                            f"{', resume ' + str(resumed) + ' lần' if resumed else ''})")
+                result = {
+                    'success': True,
+                    'path': file_path,
+                    'filename': safe_filename,
+                    'url': doc_url,
+                    'name': doc_name,
+                    'size': file_size,
+                }
+                if deduplicated:
+                    result['deduplicated'] = True
+                return result
+            except Exception as e:
+                error_msg = str(e)
+                if isinstance(e, DocumentValidationError):
+                    # Nội dung sai: bỏ phần đã tải, lần sau tải lại từ đầu
+                    self._remove(file_path + PART_SUFFIX)
+                logger.error(f"Lỗi khi tải tài liệu (lần thử {attempt}/{self.max_retries}): {error_msg}")
+                if attempt < self.max_retries:
+                    # Tăng thời gian chờ mỗi lần thử lại; phần đã tải (.part) được giữ để resume
+                    wait_time = attempt * 2
+                    logger.info(f"Thử lại sau {wait_time} giây...")
+                    time.sleep(wait_time)
+
+        self._remove(file_path + PART_SUFFIX)
+        with self._lock:
+            self.stats['failed'] += 1
+        return self._failure(doc_url, doc_name, error_msg)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _fetch(self, doc_url, file_path):
+        """
+        Tải (hoặc tải tiếp) một tài liệu vào file .part rồi đổi tên khi đã kiểm tra đủ dữ liệu
+
+        Returns:
+            tuple: (kích thước file, số lần resume)
+
+        Raises:
+            DocumentValidationError: Nội dung không phải PDF hợp lệ
+            IOError/requests.RequestException: Lỗi mạng hoặc thiếu dữ liệu (có thể resume)
+        """
+        if self._is_valid_file(file_path):
+            # Đã tải xong ở lần chạy trước
+            return os.path.getsize(file_path), 0
+
+        part_path = file_path + PART_SUFFIX
+        resumed = 0
+        expected = None
+        # Vòng lặp nội bộ cho trường hợp server bỏ qua/không chấp nhận Range
+        for _ in range(2):
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            with self.session.get(doc_url, stream=True, timeout=self.timeout, headers=headers) as response:
+                if offset and response.status_code == 416:
+                    # Phần đã có không khớp với file trên server: tải lại từ đầu
+                    self._remove(part_path)
+                    continue
+                response.raise_for_status()
+
+                mode = 'wb'
+                if offset and response.status_code == 206:
+                    match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+                    if not match or int(match.group(1)) != offset:
+                        raise IOError(f"Content-Range không khớp vị trí resume {offset}")
+                    if match.group(3) != '*':
+                        expected = int(match.group(3))
+                    mode = 'ab'
+                    resumed = 1
+                    with self._lock:
+                        self.stats['resumed'] += 1
+                    logger.info(f"Tải tiếp tài liệu từ byte {offset}: {doc_url}")
+                else:
+                    # 200: server gửi lại toàn bộ file
+                    offset = 0
+                    content_length = response.headers.get('Content-Length')
+                    if content_length and content_length.isdigit():
+                        expected = int(content_length)
+
+                if expected is not None and expected < self.min_size:
+                    raise DocumentValidationError(
+                        f"File quá nhỏ ({expected} bytes), có thể không phải file PDF hợp lệ")
+
+                content_type = response.headers.get('Content-Type', '').lower()
+                check_signature = offset == 0 and 'application/pdf' not in content_type
+
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if not chunk:
+                            continue
+                        if check_signature:
+                            check_signature = False
+                            if not chunk.startswith(PDF_SIGNATURE):
+                                raise DocumentValidationError(
+                                    f"Nội dung tải về không phải là file PDF hợp lệ (Content-Type: {content_type})")
+                        f.write(chunk)
+            break
+
+        file_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if expected is not None and file_size != expected:
+            raise IOError(f"Tải chưa đủ dữ liệu ({file_size}/{expected} bytes)")
+        if file_size < self.min_size:
+            raise DocumentValidationError(f"File quá nhỏ ({file_size} bytes), có thể không phải file PDF hợp lệ")
+        with open(part_path, 'rb') as f:
+            if not f.read(len(PDF_SIGNATURE)) == PDF_SIGNATURE:
+                raise DocumentValidationError("File không có signature PDF hợp lệ (%PDF-)")
+
+        os.replace(part_path, file_path)
+        return file_size, resumed
+
+    def _dedupe_content(self, file_path):
+        """
+        Nếu đã có file cùng nội dung (sha256), thay file vừa tải bằng hard link tới bản đó
+        """
+        digest = _sha256(file_path)
+        with self._lock:
+            existing = self._by_hash.get(digest)
+            if existing is None or not os.path.exists(existing):
+                self._by_hash[digest] = file_path
+                return False
+            self.stats['content_duplicates'] += 1
+        _link_or_copy(existing, file_path)
+        return True
+
+
+_default_downloader = None
+_default_lock = threading.Lock()
+
+
+def get_document_downloader():
+    """Engine tải tài liệu dùng chung của tiến trình (tạo khi cần)"""
+    global _default_downloader
+    with _default_lock:
+        if _default_downloader is None:
+            _default_downloader = DocumentDownloader()
+        return _default_downloader
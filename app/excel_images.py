@@ -0,0 +1,168 @@
+import os
+import hashlib
+import logging
+import tempfile
+import concurrent.futures
+
+from PIL import Image
+from openpyxl.drawing.image import Image as XLImage
+
+logger = logging.getLogger(__name__)
+
+# Kích thước ảnh nhúng trong Excel (pixel)
+THUMBNAIL_SIZE = (100, 100)
+THUMBNAIL_QUALITY = 85
+
+# Thư mục cache thumbnail, khóa theo hash nội dung ảnh gốc (CRAWLER_THUMBNAIL_CACHE để đổi)
+ENV_CACHE_DIR = 'CRAWLER_THUMBNAIL_CACHE'
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'crawler_excel_thumbnails')
+
+# Dưới ngưỡng này tạo thumbnail ngay trong tiến trình hiện tại (không đáng khởi động process pool)
+MIN_PARALLEL_THUMBNAILS = 8
+
+
+def _file_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _make_thumbnail(task):
+    """
+    Tạo thumbnail JPEG nền trắng cho một ảnh (chạy trong process pool)
+
+    Args:
+        task: (đường dẫn ảnh gốc, đường dẫn thumbnail, (rộng, cao))
+
+    Returns:
+        str: Đường dẫn thumbnail, None nếu lỗi
+    """
+    src_path, dest_path, size = task
+    try:
+        with Image.open(src_path) as img:
+            # Với JPEG, draft() giải mã thẳng ở độ phân giải nhỏ hơn
+            img.draft('RGB', size)
+            img.thumbnail(size, Image.LANCZOS)
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            # Canh giữa trên nền trắng đúng kích thước ô ảnh (giữ tỉ lệ, không bị kéo giãn)
+            if img.size != tuple(size):
+                canvas = Image.new('RGB', tuple(size), (255, 255, 255))
+                canvas.paste(img, ((size[0] - img.width) // 2, (size[1] - img.height) // 2))
+                img = canvas
+            tmp_path = f'{dest_path}.{os.getpid()}.tmp'
+            img.save(tmp_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+        os.replace(tmp_path, dest_path)
+        return dest_path
+    except Exception as e:
+        logger.error(f"Lỗi tạo thumbnail cho {src_path}: {str(e)}")
+        return None
+
+
+def build_thumbnails(image_paths, size=THUMBNAIL_SIZE, cache_dir=None, max_workers=None):
+    """
+    Tạo (hoặc lấy từ cache) thumbnail cho danh sách ảnh để nhúng vào Excel.
+
+    Thumbnail được cache theo hash nội dung ảnh gốc + kích thước, nên ảnh trùng
+    nội dung giữa các sản phẩm/lần chạy chỉ được xử lý một lần. Các ảnh chưa có
+    trong cache được thu nhỏ song song bằng process pool.
+
+    Args:
+        image_paths: Danh sách đường dẫn ảnh gốc (bỏ qua phần tử rỗng/không tồn tại)
+        size: Kích thước tối đa (rộng, cao)
+        cache_dir: Thư mục cache (mặc định: CRAWLER_THUMBNAIL_CACHE hoặc thư mục tạm)
+        max_workers: Số tiến trình tối đa (mặc định: số CPU, 1 để chạy tuần tự)
+
+    Returns:
+        dict: {đường dẫn ảnh gốc: đường dẫn thumbnail}
+    """
+    cache_dir = cache_dir or os.environ.get(ENV_CACHE_DIR) or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    thumbnails = {}
+    tasks = {}
+    cached = 0
+    for path in dict.fromkeys(p for p in image_paths if p):
+        if not os.path.exists(path):
+            continue
+        try:
+            key = _file_hash(path)
+        except OSError as e:
+            logger.error(f"Không đọc được ảnh {path}: {str(e)}")
+            continue
+        dest_path = os.path.join(cache_dir, f'{key}_{size[0]}x{size[1]}.jpg')
+        if os.path.exists(dest_path):
+            thumbnails[path] = dest_path
+            cached += 1
+        else:
+            # Ảnh trùng nội dung dùng chung một tác vụ
+            tasks.setdefault(dest_path, []).append(path)
+
+    if not tasks:
+        return thumbnails
+
+    work = [(paths[0], dest_path, tuple(size)) for dest_path, paths in tasks.items()]
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(work))
+
+    results = None
+    if max_workers > 1 and len(work) >= MIN_PARALLEL_THUMBNAILS:
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_make_thumbnail, work, chunksize=max(1, len(work) // (max_workers * 4))))
+        except Exception as e:
+            # Process pool có thể không khả dụng (môi trường hạn chế, eventlet...), xử lý tuần tự
+            logger.warning(f"Không thể tạo thumbnail song song ({str(e)}), chuyển sang tuần tự")
+    if results is None:
+        results = [_make_thumbnail(task) for task in work]
+
+    for (_, dest_path, _), result in zip(work, results):
+        if result:
+            for path in tasks[dest_path]:
+                thumbnails[path] = result
+
+    created = sum(1 for result in results if result)
+    logger.info(f"🖼️ Thumbnail Excel: {created}/{len(work)} tạo mới, {cached} lấy từ cache")
+    return thumbnails
+
+
+def embed_images(worksheet, placements, size=THUMBNAIL_SIZE, cache_dir=None, max_workers=None):
+    """
+    Nhúng ảnh vào worksheet openpyxl dưới dạng thumbnail đã thu nhỏ sẵn.
+
+    Thay cho XLImage(ảnh gốc) + đặt width/height (Excel vẫn lưu ảnh full-size,
+    openpyxl còn chuyển WebP sang PNG full-size khi save), workbook chỉ chứa
+    thumbnail JPEG cỡ ``size`` nên file nhỏ và lưu nhanh.
+
+    Args:
+        worksheet: Worksheet openpyxl
+        placements: Danh sách (ô neo, đường dẫn ảnh gốc), ví dụ [('C2', 'a.webp')]
+        size: Kích thước thumbnail (rộng, cao)
+        cache_dir: Thư mục cache thumbnail
+        max_workers: Số tiến trình tạo thumbnail
+
+    Returns:
+        int: Số ảnh đã nhúng
+    """
+    placements = [(anchor, path) for anchor, path in placements if path]
+    thumbnails = build_thumbnails([path for _, path in placements], size=size,
+                                  cache_dir=cache_dir, max_workers=max_workers)
+    embedded = 0
+    for anchor, path in placements:
+        thumb_path = thumbnails.get(path)
+        if not thumb_path:
+            continue
+        try:
+            # openpyxl đọc kích thước thật của thumbnail, không cần co giãn
+            worksheet.add_image(XLImage(thumb_path), anchor)
+            embedded += 1
+        except Exception as e:
+            logger.error(f"Lỗi thêm ảnh vào Excel: {str(e)}")
+    return embedded
@@ -0,0 +1,244 @@
+import re
+import logging
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tiền tố hãng thường bị gắn vào mã sản phẩm trên các website khác nhau
+VENDOR_PREFIXES = [
+    'AUTONICS', 'OMRON', 'MITSUBISHI', 'PANASONIC', 'KEYENCE', 'SIEMENS', 'SCHNEIDER',
+    'IDEC', 'FUJI', 'DELTA', 'HANYOUNG', 'QLIGHT', 'SICK', 'LS', 'ABB'
+]
+
+# Các từ thừa thường xuất hiện quanh mã sản phẩm
+NOISE_WORDS = ['GIÁ', 'PRICE', 'BÁO GIÁ', 'MUA HÀNG', 'MUA']
+
+# Phần còn lại sau khi bỏ tiền tố hãng phải đủ dài, tránh "LS-100" thành "100"
+MIN_STRIPPED_KEY_LENGTH = 4
+# Điểm khi chỉ khớp sau khi bỏ tiền tố hãng (thấp hơn khớp chính xác/chuẩn hóa đầy đủ)
+VENDOR_STRIPPED_SCORE = 0.95
+# Khác nhau ở vài ký tự cuối thường là biến thể khác (PNP/NPN, cáp 2M/5M): trừ điểm
+SUFFIX_LENGTH = 2
+SUFFIX_MISMATCH_PENALTY = 0.15
+
+METHOD_EXACT = 'exact'
+METHOD_NORMALIZED = 'normalized'
+METHOD_PREFIX = 'prefix'
+METHOD_FUZZY = 'fuzzy'
+
+_NON_ALNUM_RE = re.compile(r'[^0-9A-Z]+')
+# Từ thừa chỉ bị bỏ khi đứng riêng (không dính chữ/số khác), để mã như "MUAFLEX-1" giữ nguyên
+_NOISE_WORDS_RE = re.compile(
+    r'(?<![^\W_])(?:' + '|'.join(re.escape(w) for w in sorted(NOISE_WORDS, key=len, reverse=True)) + r')(?![^\W_])'
+)
+_VENDOR_PREFIX_RE = re.compile(
+    r'^(?:' + '|'.join(re.escape(p) for p in sorted(VENDOR_PREFIXES, key=len, reverse=True)) + r')[\s\-_./]+'
+)
+
+
+def normalize_code_key(code, strip_vendor: bool = True) -> str:
+    """
+    Tạo khóa chuẩn hóa cho mã sản phẩm để so khớp giữa các nhà cung cấp.
+
+    Bỏ tiền tố hãng, từ thừa và mọi ký tự phân cách, ví dụ
+    "E3Z-D61 2M" và "OMRON E3ZD61-2M" đều thành "E3ZD612M".
+    Tiền tố hãng chỉ bị bỏ khi phần còn lại có ít nhất ``MIN_STRIPPED_KEY_LENGTH`` ký tự.
+
+    Args:
+        code: Mã sản phẩm gốc
+        strip_vendor: Có bỏ tiền tố hãng hay không
+
+    Returns:
+        str: Khóa chuẩn hóa (có thể rỗng)
+    """
+    if code is None:
+        return ''
+    key = str(code).upper().strip()
+    if key in ('', 'NAN', 'NONE'):
+        return ''
+    key = _NOISE_WORDS_RE.sub(' ', key)
+    key = key.strip()
+    if strip_vendor:
+        stripped = _NON_ALNUM_RE.sub('', _VENDOR_PREFIX_RE.sub('', key))
+        if len(stripped) >= MIN_STRIPPED_KEY_LENGTH:
+            return stripped
+    return _NON_ALNUM_RE.sub('', key)
+
+
+def _ngrams(key: str, n: int) -> set:
+    """
+    Tách khóa thành tập n-gram, có đệm biên để khớp tốt phần đầu mã.
+    """
+    padded = f'^{key}$'
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class FuzzyCodeIndex:
+    """
+    Chỉ mục tra cứu mã sản phẩm gần đúng.
+
+    Tra cứu theo ba tầng: khớp chính xác, khớp khóa chuẩn hóa (dict; khớp chỉ nhờ bỏ
+    tiền tố hãng được ``VENDOR_STRIPPED_SCORE`` điểm), và khớp gần
+    đúng qua chỉ mục đảo n-gram. Ở tầng cuối chỉ những n-gram hiếm (posting list
+    ngắn hơn ``max_posting``) được dùng để sinh ứng viên và chỉ ``max_candidates``
+    ứng viên có nhiều n-gram chung nhất mới được chấm điểm, nên chi phí mỗi truy vấn
+    bị chặn trên và tổng chi phí N x M không còn là bậc hai.
+    Hai mã khác nhau ở ``SUFFIX_LENGTH`` ký tự cuối (thường là biến thể sản phẩm khác)
+    bị trừ ``SUFFIX_MISMATCH_PENALTY`` điểm.
+    """
+
+    def __init__(self, codes: Iterable, ngram_size: int = 3, max_posting: int = 500,
+                 max_candidates: int = 10):
+        """
+        Args:
+            codes: Danh sách mã sản phẩm cần lập chỉ mục
+            ngram_size: Độ dài n-gram
+            max_posting: Bỏ qua n-gram xuất hiện ở quá nhiều mã (quá phổ biến)
+            max_candidates: Số ứng viên tối đa được chấm điểm cho mỗi truy vấn
+        """
+        self.ngram_size = ngram_size
+        self.max_posting = max_posting
+        self.max_candidates = max_candidates
+
+        self._exact: Dict[str, str] = {}
+        self._by_key: Dict[str, str] = {}
+        self._by_full_key: Dict[str, str] = {}
+        self._keys: List[str] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        for code in codes:
+            if code is None:
+                continue
+            code_str = str(code).strip()
+            key = normalize_code_key(code_str)
+            if not key:
+                continue
+            self._exact.setdefault(code_str.upper(), code_str)
+            self._by_full_key.setdefault(normalize_code_key(code_str, strip_vendor=False), code_str)
+            if key in self._by_key:
+                continue
+            self._by_key[key] = code_str
+            key_id = len(self._keys)
+            self._keys.append(key)
+            for gram in _ngrams(key, ngram_size):
+                self._postings[gram].append(key_id)
+
+        logger.info(f"Đã lập chỉ mục {len(self._keys)} khóa mã sản phẩm, {len(self._postings)} n-gram")
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def similarity(key_a: str, key_b: str) -> float:
+        """
+        Điểm tương đồng giữa hai khóa chuẩn hóa (0..1)
+        """
+        if not key_a or not key_b:
+            return 0.0
+        return SequenceMatcher(None, key_a, key_b, autojunk=False).ratio()
+
+    def _candidates(self, key: str) -> List[int]:
+        grams = _ngrams(key, self.ngram_size)
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        if not postings:
+            return []
+
+        rare = [p for p in postings if len(p) <= self.max_posting]
+        if not rare:
+            # Tất cả n-gram đều phổ biến: chỉ dùng vài n-gram hiếm nhất
+            rare = sorted(postings, key=len)[:2]
+
+        counts = Counter(chain.from_iterable(rare))
+        return [key_id for key_id, _ in counts.most_common(self.max_candidates)]
+
+    def lookup(self, code, threshold: float = 0.85) -> Tuple[Optional[str], float, Optional[str]]:
+        """
+        Tìm mã khớp nhất trong chỉ mục
+
+        Args:
+            code: Mã sản phẩm cần tìm
+            threshold: Ngưỡng điểm tối thiểu cho khớp gần đúng
+
+        Returns:
+            Tuple (mã khớp, điểm, phương thức); (None, 0.0, None) nếu không khớp
+        """
+        if code is None:
+            return None, 0.0, None
+        code_str = str(code).strip()
+        if code_str.upper() in self._exact:
+            return self._exact[code_str.upper()], 1.0, METHOD_EXACT
+
+        full_key = normalize_code_key(code_str, strip_vendor=False)
+        if full_key in self._by_full_key:
+            return self._by_full_key[full_key], 1.0, METHOD_NORMALIZED
+        key = normalize_code_key(code_str)
+        if not key:
+            return None, 0.0, None
+        if key in self._by_key:
+            if VENDOR_STRIPPED_SCORE < threshold:
+                return None, 0.0, None
+            return self._by_key[key], VENDOR_STRIPPED_SCORE, METHOD_NORMALIZED
+
+        best_id, best_score, best_method = None, 0.0, None
+        # seq2 được phân tích một lần cho mọi ứng viên
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(key)
+        for key_id in self._candidates(key):
+            other = self._keys[key_id]
+            matcher.set_seq1(other)
+            # Các cận trên rẻ của ratio: bỏ qua ứng viên chắc chắn dưới ngưỡng
+            cutoff = max(threshold, best_score)
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            score = matcher.ratio()
+            is_prefix = other.startswith(key) or key.startswith(other)
+            if not is_prefix and other[-SUFFIX_LENGTH:] != key[-SUFFIX_LENGTH:]:
+                score -= SUFFIX_MISMATCH_PENALTY
+            method = METHOD_PREFIX if is_prefix else METHOD_FUZZY
+            if score > best_score or (score == best_score and is_prefix and best_method != METHOD_PREFIX):
+                best_id, best_score, best_method = key_id, score, method
+
+        if best_id is None or best_score < threshold:
+            return None, 0.0, None
+        return self._by_key[self._keys[best_id]], round(best_score, 4), best_method
+
+
+def match_codes(source_codes: Iterable, target_codes: Iterable, threshold: float = 0.85,
+                index: Optional[FuzzyCodeIndex] = None) -> pd.DataFrame:
+    """
+    So khớp danh sách mã nguồn với danh sách mã đích
+
+    Args:
+        source_codes: Các mã cần tìm
+        target_codes: Các mã dùng để lập chỉ mục (bỏ qua nếu đã truyền index)
+        threshold: Ngưỡng điểm tối thiểu cho khớp gần đúng
+        index: Chỉ mục dựng sẵn (tùy chọn)
+
+    Returns:
+        pd.DataFrame: Các cột 'Mã nguồn', 'Mã khớp', 'Điểm khớp', 'Phương thức khớp'
+    """
+    if index is None:
+        index = FuzzyCodeIndex(target_codes)
+
+    rows = []
+    cache: Dict[str, Tuple[Optional[str], float, Optional[str]]] = {}
+    for code in source_codes:
+        code_str = '' if code is None else str(code)
+        if code_str not in cache:
+            cache[code_str] = index.lookup(code_str, threshold)
+        matched, score, method = cache[code_str]
+        rows.append({
+            'Mã nguồn': code_str,
+            'Mã khớp': matched or '',
+            'Điểm khớp': score if matched else None,
+            'Phương thức khớp': method or ''
+        })
+
+    return pd.DataFrame(rows, columns=['Mã nguồn', 'Mã khớp', 'Điểm khớp', 'Phương thức khớp'])
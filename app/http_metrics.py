@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app import crawl_profiler
+from app.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+# ======= THỜI GIAN MỞ KẾT NỐI =======
+# Kết nối mới (DNS + TCP + TLS) được đo riêng để profiler tách khỏi thời gian chờ server
+
+def _add_connect_seconds(seconds):
+    _local.connect_seconds = getattr(_local, 'connect_seconds', 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect_seconds(time.perf_counter() - started)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect_seconds(time.perf_counter() - started)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+_TIMED_POOL_CLASSES = {'http': _TimedHTTPConnectionPool, 'https': _TimedHTTPSConnectionPool}
+
+
+class _HostMetrics:
+    """Các số liệu HTTP của một cặp (vendor, host)"""
+
+    def __init__(self, vendor, host):
+        registry = get_metrics()
+        labels = {'vendor': vendor, 'host': host}
+        self.vendor = vendor
+        self.host = host
+        self.in_flight = registry.gauge('crawler_http_requests_in_flight', 'Số request HTTP đang chạy', **labels)
+        self.rate = registry.rate('crawler_http_requests_per_second', 'Số request HTTP mỗi giây (trung bình 60 giây)', **labels)
+        self.latency = registry.histogram('crawler_http_response_seconds', 'Thời gian phản hồi HTTP (gồm tải nội dung)', **labels)
+        self.bytes = registry.counter('crawler_http_downloaded_bytes_total', 'Số byte đã tải về', **labels)
+
+    def count_status(self, code):
+        get_metrics().counter('crawler_http_requests_total', 'Số request HTTP theo mã trạng thái',
+                              vendor=self.vendor, host=self.host, code=str(code)).inc()
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def host_metrics(vendor, host):
+    """Số liệu HTTP của (vendor, host), tạo khi cần"""
+    key = (vendor, host)
+    metrics = _hosts.get(key)
+    if metrics is None:
+        with _hosts_lock:
+            metrics = _hosts.get(key)
+            if metrics is None:
+                metrics = _HostMetrics(vendor, host)
+                _hosts[key] = metrics
+    return metrics
+
+
+class MeteredSession(requests.Session):
+    """
+    requests.Session ghi số liệu cho mỗi request theo vendor và host: đang chạy,
+    request/giây, thời gian phản hồi, mã trạng thái ('error' khi lỗi mạng) và số byte tải về.
+
+    Một lượt gọi (kể cả các bước redirect) được tính là một request của host ban đầu.
+    Khi có profiler gắn với luồng (app.crawl_profiler), thời gian được tách thành
+    connect / server_wait / download cho mục đang xử lý.
+    """
+
+    def __init__(self, vendor):
+        """
+        Args:
+            vendor: Nhãn vendor của số liệu (autonics, omron, images...)
+        """
+        super().__init__()
+        self.vendor = vendor
+
+    def mount(self, prefix, adapter):
+        super().mount(prefix, adapter)
+        # Pool kết nối đo thời gian mở kết nối mới (DNS + TCP + TLS)
+        poolmanager = getattr(adapter, 'poolmanager', None)
+        if poolmanager is not None:
+            poolmanager.pool_classes_by_scheme = _TIMED_POOL_CLASSES
+
+    def send(self, request, **kwargs):
+        # Redirect gọi lại send() bên trong lượt gọi đang đo: không tính lần nữa
+        if getattr(_local, 'active', False):
+            return super().send(request, **kwargs)
+
+        metrics = host_metrics(self.vendor, urlparse(request.url).hostname or '')
+        metrics.rate.mark()
+        _local.active = True
+        _local.connect_seconds = 0.0
+        start = time.perf_counter()
+        try:
+            with metrics.in_flight.track_inprogress():
+                response = super().send(request, **kwargs)
+        except requests.RequestException:
+            metrics.latency.observe(time.perf_counter() - start)
+            metrics.count_status('error')
+            raise
+        finally:
+            _local.active = False
+
+        elapsed = time.perf_counter() - start
+        metrics.latency.observe(elapsed)
+        metrics.count_status(response.status_code)
+        if kwargs.get('stream'):
+            # Nội dung chưa được đọc: dùng Content-Length nếu có
+            size = response.headers.get('Content-Length', '')
+            if size.isdigit():
+                metrics.bytes.inc(int(size))
+        else:
+            metrics.bytes.inc(len(response.content))
+        if crawl_profiler.current() is not None:
+            self._profile(response, elapsed)
+        return response
+
+    @staticmethod
+    def _profile(response, elapsed):
+        connect = getattr(_local, 'connect_seconds', 0.0)
+        # response.elapsed: từ lúc gửi tới khi nhận header (gồm mở kết nối) của bước cuối
+        headers = sum(r.elapsed.total_seconds() for r in response.history) + response.elapsed.total_seconds()
+        headers = min(max(headers, connect), elapsed)
+        crawl_profiler.record(crawl_profiler.STAGE_CONNECT, connect, network=True)
+        crawl_profiler.record(crawl_profiler.STAGE_SERVER_WAIT, headers - connect, network=True)
+        crawl_profiler.record(crawl_profiler.STAGE_DOWNLOAD, elapsed - headers, network=True)
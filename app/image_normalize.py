@@ -0,0 +1,232 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Tổng bộ nhớ giải mã ảnh tối đa cho các luồng chạy đồng thời trong tiến trình (CRAWLER_IMAGE_MEMORY_MB để đổi)
+ENV_MEMORY_BUDGET = 'CRAWLER_IMAGE_MEMORY_MB'
+DEFAULT_MEMORY_BUDGET_MB = 512
+
+# Giữ ảnh sau reduce() lớn hơn kích thước đích ít nhất chừng này lần để LANCZOS vẫn cho chất lượng tốt
+REDUCING_GAP = 3
+
+WHITE = (255, 255, 255)
+
+
+class MemoryBudget:
+    """
+    Giới hạn tổng bộ nhớ giải mã ảnh của các luồng xử lý đồng thời.
+
+    Mỗi luồng đặt trước số byte ước tính trước khi giải mã; nếu vượt ngân sách thì
+    chờ đến khi luồng khác giải phóng. Ảnh lớn hơn cả ngân sách vẫn được xử lý,
+    nhưng một mình.
+    """
+
+    def __init__(self, limit_bytes):
+        """
+        Args:
+            limit_bytes: Tổng số byte tối đa được giữ cùng lúc
+        """
+        self.limit_bytes = max(1, int(limit_bytes))
+        self._used = 0
+        self._peak = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """
+        Giữ chỗ ``nbytes`` trong ngân sách trong suốt khối with
+
+        Args:
+            nbytes: Số byte ước tính cần dùng
+        """
+        nbytes = min(max(0, int(nbytes)), self.limit_bytes)
+        with self._condition:
+            while self._used and self._used + nbytes > self.limit_bytes:
+                self._condition.wait()
+            self._used += nbytes
+            self._peak = max(self._peak, self._used)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._used -= nbytes
+                self._condition.notify_all()
+
+    @property
+    def used_bytes(self):
+        with self._condition:
+            return self._used
+
+    @property
+    def peak_bytes(self):
+        with self._condition:
+            return self._peak
+
+
+_default_budget = None
+_default_lock = threading.Lock()
+
+
+def get_memory_budget():
+    """Ngân sách bộ nhớ giải mã ảnh dùng chung của tiến trình (tạo khi cần)"""
+    global _default_budget
+    with _default_lock:
+        if _default_budget is None:
+            try:
+                limit_mb = float(os.environ.get(ENV_MEMORY_BUDGET, DEFAULT_MEMORY_BUDGET_MB))
+            except ValueError:
+                limit_mb = DEFAULT_MEMORY_BUDGET_MB
+            _default_budget = MemoryBudget(limit_mb * 1024 * 1024)
+        return _default_budget
+
+
+def fit_size(size, target_size):
+    """
+    Kích thước lớn nhất giữ nguyên tỉ lệ nằm vừa trong target_size
+
+    Args:
+        size: Kích thước gốc (rộng, cao)
+        target_size: Kích thước khung (rộng, cao)
+
+    Returns:
+        tuple: (rộng, cao) mới, tối thiểu 1x1
+    """
+    ratio = min(target_size[0] / size[0], target_size[1] / size[1])
+    return max(1, int(size[0] * ratio)), max(1, int(size[1] * ratio))
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _working_mode(image):
+    """Chế độ màu dùng để giải mã/reduce (giữ kênh alpha nếu có)"""
+    return 'RGBA' if _has_alpha(image) else 'RGB'
+
+
+def estimate_decode_bytes(image):
+    """Ước tính số byte cần để giải mã ảnh ở kích thước hiện tại (4 byte/pixel)"""
+    width, height = image.size
+    return width * height * 4
+
+
+def draft_for_target(image, target_size):
+    """
+    Với JPEG, yêu cầu bộ giải mã giải mã thẳng ở độ phân giải thu nhỏ (1/2, 1/4, 1/8)
+    nhưng vẫn không nhỏ hơn REDUCING_GAP lần kích thước đích. Các định dạng khác giữ nguyên.
+
+    Args:
+        image: Ảnh PIL chưa load()
+        target_size: Kích thước đích (rộng, cao)
+
+    Returns:
+        PIL.Image: Chính ảnh đó (đã đặt chế độ draft nếu được)
+    """
+    if image.format == 'JPEG' and target_size:
+        requested = (target_size[0] * REDUCING_GAP, target_size[1] * REDUCING_GAP)
+        try:
+            image.draft(image.mode if image.mode in ('RGB', 'L') else 'RGB', requested)
+        except Exception as e:
+            logger.debug(f"Không đặt được draft cho ảnh JPEG: {e}")
+    return image
+
+
+def reduce_for_target(image, target_size):
+    """
+    Thu nhỏ theo hệ số nguyên bằng reduce() (lấy trung bình khối pixel, rất rẻ) sao cho
+    ảnh vẫn lớn hơn REDUCING_GAP lần kích thước đích; bước LANCZOS sau đó chỉ chạy
+    trên ảnh đã nhỏ.
+
+    Args:
+        image: Ảnh PIL
+        target_size: Kích thước đích (rộng, cao)
+
+    Returns:
+        PIL.Image: Ảnh đã reduce (hoặc ảnh gốc nếu không cần)
+    """
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        return image
+    new_size = fit_size(image.size, target_size)
+    factor = min(image.width // (new_size[0] * REDUCING_GAP), image.height // (new_size[1] * REDUCING_GAP))
+    if factor >= 2:
+        return image.reduce(factor)
+    return image
+
+
+def prepare_image(image, target_size=None, mode=None, budget=None):
+    """
+    Giải mã ảnh với bộ nhớ bị giới hạn: draft (JPEG) -> load trong ngân sách bộ nhớ
+    -> reduce() về gần kích thước đích -> đổi chế độ màu trên ảnh đã nhỏ.
+
+    Args:
+        image: Ảnh PIL vừa Image.open() (chưa load)
+        target_size: Kích thước đích (rộng, cao); None nếu giữ nguyên kích thước
+        mode: Chế độ màu đầu ra (mặc định RGBA nếu có alpha, ngược lại RGB)
+        budget (MemoryBudget, optional): Ngân sách bộ nhớ (mặc định dùng chung của tiến trình)
+
+    Returns:
+        PIL.Image: Ảnh đã giải mã, đã reduce và đúng chế độ màu
+    """
+    budget = budget or get_memory_budget()
+    draft_for_target(image, target_size)
+    mode = mode or _working_mode(image)
+
+    # Ảnh gốc + bản đổi chế độ màu có thể cùng tồn tại trong lúc xử lý
+    with budget.reserve(estimate_decode_bytes(image) * 2):
+        image.load()
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            # reduce()/LANCZOS không hỗ trợ ảnh palette hay 1-bit
+            image = image.convert(_working_mode(image))
+        if target_size:
+            image = reduce_for_target(image, target_size)
+        if image.mode != mode:
+            image = image.convert(mode)
+    return image
+
+
+def fit_on_white(image, target_size=(800, 800), budget=None):
+    """
+    Resize ảnh vừa khung target_size (giữ tỉ lệ) và đặt giữa nền trắng
+
+    Args:
+        image: Ảnh PIL vừa Image.open()
+        target_size: Kích thước khung (rộng, cao)
+        budget (MemoryBudget, optional): Ngân sách bộ nhớ
+
+    Returns:
+        PIL.Image: Ảnh RGB đúng kích thước target_size
+    """
+    image = prepare_image(image, target_size, budget=budget)
+    new_size = fit_size(image.size, target_size)
+    if image.size != new_size:
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+    background = Image.new('RGB', tuple(target_size), WHITE)
+    x = (target_size[0] - new_size[0]) // 2
+    y = (target_size[1] - new_size[1]) // 2
+    background.paste(image, (x, y), image if image.mode == 'RGBA' else None)
+    return background
+
+
+def flatten_on_white(image, budget=None):
+    """
+    Đặt ảnh (thường có nền trong suốt) lên nền trắng, giữ nguyên kích thước gốc
+
+    Args:
+        image: Ảnh PIL vừa Image.open()
+        budget (MemoryBudget, optional): Ngân sách bộ nhớ
+
+    Returns:
+        PIL.Image: Ảnh RGB
+    """
+    image = prepare_image(image, budget=budget)
+    if image.mode == 'RGB':
+        return image
+    background = Image.new('RGB', image.size, WHITE)
+    background.paste(image, (0, 0), image)
+    return background
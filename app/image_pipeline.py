@@ -0,0 +1,506 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+from app.image_normalize import fit_on_white, flatten_on_white, prepare_image
+from app.log_config import get_item_logger
+from app import crawl_profiler
+from app.metrics import image_stage_histogram, queue_depth_gauge
+from app.http_metrics import MeteredSession
+
+logger = logging.getLogger(__name__)
+item_logger = get_item_logger(__name__)
+
+IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8',
+    'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Connection': 'keep-alive'
+}
+
+# Cách xử lý ảnh sau khi giải mã
+RESIZE_NONE = 'none'        # Giữ nguyên kích thước, chỉ đổi chế độ màu cho định dạng đích
+RESIZE_FIT = 'fit'          # Vừa khung target_size (giữ tỉ lệ), đặt giữa nền trắng
+RESIZE_FLATTEN = 'flatten'  # Giữ nguyên kích thước, đặt ảnh trong suốt lên nền trắng
+
+# Chữ ký file theo định dạng (kiểm tra nhanh trước khi giải mã)
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG', b'GIF8', b'RIFF', b'BM', b'II*\x00', b'MM\x00*')
+
+MIN_IMAGE_BYTES = 100
+TMP_SUFFIX = '.tmp'
+
+
+class ImageValidationError(Exception):
+    """Nội dung tải về không phải ảnh hợp lệ (không thử lại cùng URL)"""
+
+
+class ImageJob:
+    """
+    Một ảnh cần tải và chuẩn hóa.
+
+    ``format=None`` lưu nguyên dữ liệu tải về (không giải mã/mã hóa lại).
+    """
+
+    __slots__ = ('url', 'dest_path', 'resize', 'target_size', 'format', 'quality', 'method',
+                 'save_options', 'fallback_urls', 'session', 'headers', 'skip_existing', 'min_bytes')
+
+    def __init__(self, url, dest_path, resize=RESIZE_FIT, target_size=(800, 800), format='WEBP', quality=90,
+                 method=6, save_options=None, fallback_urls=(), session=None, headers=None, skip_existing=True,
+                 min_bytes=MIN_IMAGE_BYTES):
+        """
+        Args:
+            url: URL ảnh
+            dest_path: Đường dẫn file đầu ra
+            resize: RESIZE_FIT, RESIZE_FLATTEN hoặc RESIZE_NONE
+            target_size: Kích thước khung (rộng, cao) cho RESIZE_FIT
+            format: 'WEBP', 'JPEG'... hoặc None để lưu nguyên bản
+            quality: Chất lượng nén
+            method: Phương pháp nén WebP (0-6)
+            save_options: Tham số lưu bổ sung cho Pillow (ví dụ {'subsampling': 0})
+            fallback_urls: Các URL thay thế thử lần lượt khi URL chính lỗi (ví dụ 404)
+            session: requests.Session riêng của crawler (giữ headers/cookies của hãng)
+            headers: Headers bổ sung cho request ảnh (ví dụ Referer)
+            skip_existing: Bỏ qua nếu file đầu ra đã tồn tại và không rỗng
+            min_bytes: Kích thước tối thiểu của dữ liệu ảnh hợp lệ
+        """
+        self.url = url
+        self.dest_path = dest_path
+        self.resize = resize
+        self.target_size = tuple(target_size) if target_size else None
+        self.format = format
+        self.quality = quality
+        self.method = method
+        self.save_options = dict(save_options or {})
+        self.fallback_urls = tuple(u for u in fallback_urls if u)
+        self.session = session
+        self.headers = dict(headers) if headers else None
+        self.skip_existing = skip_existing
+        self.min_bytes = min_bytes
+
+    def processing_key(self):
+        """Khóa loại trùng: cùng URL + cùng cách xử lý cho ra cùng một file"""
+        return (self.url, self.fallback_urls, self.resize, self.target_size, self.format, self.quality,
+                self.method, tuple(sorted(self.save_options.items())))
+
+
+def _link_or_copy(src, dest):
+    """Tạo hard link tới file đã xử lý (copy nếu hệ thống file không hỗ trợ)"""
+    if os.path.abspath(src) == os.path.abspath(dest):
+        return
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class ImagePipeline:
+    """
+    Pipeline ảnh sản phẩm dùng chung cho mọi crawler:
+    fetch -> validate -> decode -> pad/resize -> encode -> store.
+
+    - Một session (keep-alive) và một executor (thay được) cho mọi lượt tải ảnh
+    - Loại trùng: cùng URL + cùng cách xử lý đang chạy chỉ tải/xử lý một lần, các đích khác dùng hard link
+    - Cache dữ liệu gốc theo URL (giới hạn dung lượng) cho các cách xử lý khác nhau của cùng ảnh
+    - Giải mã/resize qua app.image_normalize (draft/reduce, ngân sách bộ nhớ chung)
+    - Ghi file nguyên tử (file tạm + đổi tên), một bộ thống kê cho mọi crawler
+    """
+
+    def __init__(self, executor=None, max_workers=8, max_retries=3, timeout=(10, 30), headers=None,
+                 source_cache_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            executor: concurrent.futures.Executor chạy các job, dùng chung bộ nhớ với pipeline
+                (ThreadPoolExecutor, GreenPool adapter...); mặc định tạo ThreadPoolExecutor riêng
+            max_workers: Số ảnh xử lý đồng thời khi tự tạo executor
+            max_retries: Số lần thử lại khi lỗi mạng
+            timeout: Timeout (kết nối, đọc) của mỗi request
+            headers: Headers HTTP mặc định (mặc định IMAGE_HEADERS)
+            source_cache_bytes: Dung lượng tối đa cache dữ liệu ảnh gốc (0 để tắt)
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(1, max_retries)
+        self.timeout = timeout
+        self.source_cache_bytes = source_cache_bytes
+
+        self.session = MeteredSession('images')
+        self.session.headers.update(headers or IMAGE_HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='images')
+        self._queue_depth = queue_depth_gauge('images', 'jobs')
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._sources = OrderedDict()
+        self._sources_size = 0
+        self.stats = {
+            'requested': 0,
+            'fetched': 0,
+            'fetched_bytes': 0,
+            'source_cache_hits': 0,
+            'deduplicated': 0,
+            'skipped_existing': 0,
+            'stored': 0,
+            'stored_bytes': 0,
+            'failed': 0,
+            'fetch_seconds': 0.0,
+            'decode_seconds': 0.0,
+            'resize_seconds': 0.0,
+            'encode_seconds': 0.0,
+            'store_seconds': 0.0,
+        }
+        self._latency = {stage: image_stage_histogram(stage)
+                         for stage in ('fetch', 'decode', 'resize', 'encode', 'store')}
+
+    # ======= API =======
+
+    def submit(self, job):
+        """
+        Đưa một ảnh vào pipeline
+
+        Args:
+            job (ImageJob): Ảnh cần xử lý
+
+        Returns:
+            Future: Kết quả dict cùng dạng với process()
+        """
+        with self._lock:
+            self.stats['requested'] += 1
+
+        if job.skip_existing and os.path.exists(job.dest_path) and os.path.getsize(job.dest_path) > 0:
+            with self._lock:
+                self.stats['skipped_existing'] += 1
+            future = Future()
+            future.set_result(self._success(job, job.dest_path, existing=True))
+            return future
+
+        key = job.processing_key()
+        with self._lock:
+            # Chỉ loại trùng với job đang chạy: job đã xong được bỏ khỏi _by_key,
+            # nên lượt crawl sau luôn tải và xử lý lại
+            primary = self._by_key.get(key)
+            is_new = primary is None
+            if is_new:
+                self._queue_depth.inc()
+                primary = self._executor.submit(self._run, job, crawl_profiler.current())
+                self._by_key[key] = primary
+            else:
+                self.stats['deduplicated'] += 1
+
+        if is_new:
+            # Gắn callback ngoài khóa: future xong sớm thì callback chạy ngay trong luồng này
+            primary.add_done_callback(lambda future: self._finish(key, future))
+            return primary
+
+        # Ảnh đang được xử lý cho đích khác: chỉ liên kết file khi xong
+        derived = Future()
+
+        def on_done(future):
+            try:
+                result = future.result()
+                if result.get('success'):
+                    _link_or_copy(result['path'], job.dest_path)
+                    result = dict(result, path=job.dest_path, deduplicated=True)
+                derived.set_result(result)
+            except Exception as e:
+                derived.set_result(self._failure(job, str(e)))
+
+        primary.add_done_callback(on_done)
+        return derived
+
+    def _finish(self, key, future):
+        self._queue_depth.dec()
+        with self._lock:
+            if self._by_key.get(key) is future:
+                del self._by_key[key]
+
+    def process(self, job):
+        """
+        Xử lý một ảnh (chờ kết quả)
+
+        Returns:
+            dict: success, path, url, width, height, bytes, source_bytes (hoặc error khi thất bại)
+        """
+        try:
+            return self.submit(job).result()
+        except Exception as e:
+            return self._failure(job, str(e))
+
+    def map(self, jobs, on_result=None):
+        """
+        Xử lý nhiều ảnh đồng thời
+
+        Args:
+            jobs: Danh sách ImageJob
+            on_result: Hàm gọi ngay khi xong từng ảnh: on_result(job, result)
+
+        Returns:
+            list: Kết quả theo đúng thứ tự jobs
+        """
+        futures = {self.submit(job): index for index, job in enumerate(jobs)}
+        results = [None] * len(futures)
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = self._failure(jobs[index], str(e))
+            if on_result:
+                on_result(jobs[index], results[index])
+        return results
+
+    def stats_snapshot(self):
+        """Bản sao thống kê hiện tại"""
+        with self._lock:
+            return dict(self.stats)
+
+    def stats_since(self, baseline):
+        """
+        Thống kê phát sinh kể từ một bản sao trước đó
+
+        Args:
+            baseline (dict): Kết quả stats_snapshot() lúc bắt đầu lượt chạy
+
+        Returns:
+            dict: Hiệu số của từng chỉ số
+        """
+        current = self.stats_snapshot()
+        return {key: value - baseline.get(key, 0) for key, value in current.items()}
+
+    def log_stats(self, since=None):
+        """
+        Ghi thống kê pipeline ra log
+
+        Args:
+            since (dict, optional): Bản sao stats_snapshot() lúc bắt đầu lượt chạy; khi có,
+                chỉ ghi phần phát sinh trong lượt đó (pipeline dùng chung cả tiến trình)
+        """
+        stats = self.stats_snapshot() if since is None else self.stats_since(since)
+        logger.info(
+            f"🖼️ Pipeline ảnh: {stats['stored']} đã lưu, {stats['skipped_existing']} có sẵn, "
+            f"{stats['deduplicated']} trùng, {stats['failed']} lỗi; "
+            f"tải {stats['fetched']} ảnh ({stats['fetched_bytes'] / 1024 / 1024:.1f} MB, "
+            f"cache {stats['source_cache_hits']}); thời gian fetch/decode/resize/encode/store: "
+            f"{stats['fetch_seconds']:.1f}/{stats['decode_seconds']:.1f}/{stats['resize_seconds']:.1f}/"
+            f"{stats['encode_seconds']:.1f}/{stats['store_seconds']:.1f}s"
+        )
+
+    def close(self):
+        """Đóng executor (nếu pipeline tự tạo) và session"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        self.session.close()
+
+    # ======= STAGES =======
+
+    @staticmethod
+    def _success(job, path, **extra):
+        result = {'success': True, 'path': path, 'url': job.url}
+        result.update(extra)
+        return result
+
+    @staticmethod
+    def _failure(job, error):
+        return {'success': False, 'path': '', 'url': job.url, 'error': error}
+
+    def _timed(self, stage, started):
+        elapsed = time.perf_counter() - started
+        self._latency[stage].observe(elapsed)
+        crawl_profiler.record(f'image_{stage}', elapsed)
+        with self._lock:
+            self.stats[f'{stage}_seconds'] += elapsed
+
+    def _run(self, job, profile_context=None):
+        # Ảnh được ghi vào profiler của lượt cào đã gửi job (phần tải đã có span image_fetch)
+        profiler = profile_context[0] if profile_context else None
+        with crawl_profiler.attach(profiler, f'ảnh: {os.path.basename(job.dest_path)}', network=False):
+            return self._process_job(job)
+
+    def _process_job(self, job):
+        try:
+            started = time.perf_counter()
+            data, source_url = self._fetch(job)
+            self._timed('fetch', started)
+
+            if job.format is None:
+                started = time.perf_counter()
+                self._store(data, job.dest_path)
+                self._timed('store', started)
+                result = self._success(job, job.dest_path, bytes=len(data), source_bytes=len(data))
+            else:
+                started = time.perf_counter()
+                image = self._decode(data, job)
+                self._timed('decode', started)
+
+                started = time.perf_counter()
+                image = self._resize(image, job)
+                self._timed('resize', started)
+
+                started = time.perf_counter()
+                encoded = self._encode(image, job)
+                self._timed('encode', started)
+
+                started = time.perf_counter()
+                self._store(encoded, job.dest_path)
+                self._timed('store', started)
+                result = self._success(job, job.dest_path, width=image.width, height=image.height,
+                                       bytes=len(encoded), source_bytes=len(data))
+
+            if source_url != job.url:
+                result['source_url'] = source_url
+            with self._lock:
+                self.stats['stored'] += 1
+                self.stats['stored_bytes'] += result['bytes']
+            item_logger.info("Đã lưu ảnh: %s (%s bytes)", job.dest_path, result['bytes'])
+            return result
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+            logger.error(f"❌ Lỗi xử lý ảnh {job.url}: {str(e)}")
+            return self._failure(job, str(e))
+
+    def _cached_source(self, url):
+        with self._lock:
+            data = self._sources.get(url)
+            if data is not None:
+                self._sources.move_to_end(url)
+                self.stats['source_cache_hits'] += 1
+            return data
+
+    def _cache_source(self, url, data):
+        if len(data) > self.source_cache_bytes:
+            return
+        with self._lock:
+            if url in self._sources:
+                return
+            self._sources[url] = data
+            self._sources_size += len(data)
+            while self._sources_size > self.source_cache_bytes:
+                _, evicted = self._sources.popitem(last=False)
+                self._sources_size -= len(evicted)
+
+    def _fetch(self, job):
+        """
+        Tải dữ liệu ảnh (thử URL chính rồi các URL thay thế, thử lại khi lỗi mạng)
+
+        Returns:
+            tuple: (bytes, URL đã dùng)
+        """
+        session = job.session or self.session
+        urls = (job.url,) + job.fallback_urls
+        last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            for url in urls:
+                # skip_existing=False: luôn tải lại, không dùng dữ liệu gốc đã cache
+                data = self._cached_source(url) if job.skip_existing else None
+                if data is not None:
+                    return data, url
+                try:
+                    response = session.get(url, timeout=self.timeout, headers=job.headers)
+                    if 400 <= response.status_code < 500:
+                        # Lỗi phía client (404...): thử URL thay thế, không thử lại URL này
+                        last_error = ImageValidationError(f"HTTP {response.status_code}: {url}")
+                        continue
+                    response.raise_for_status()
+                    data = response.content
+                    self._validate(data, response.headers.get('Content-Type', ''), job)
+                except ImageValidationError as e:
+                    last_error = e
+                    continue
+                except requests.RequestException as e:
+                    last_error = e
+                    logger.warning(f"Lỗi khi tải ảnh (lần {attempt}/{self.max_retries}): {url}: {str(e)}")
+                    continue
+                with self._lock:
+                    self.stats['fetched'] += 1
+                    self.stats['fetched_bytes'] += len(data)
+                self._cache_source(url, data)
+                return data, url
+            if isinstance(last_error, ImageValidationError) or attempt == self.max_retries:
+                break
+            time.sleep(0.5 * attempt)
+        raise last_error or IOError(f"Không tải được ảnh: {job.url}")
+
+    @staticmethod
+    def _validate(data, content_type, job):
+        if len(data) < job.min_bytes:
+            raise ImageValidationError(f"Ảnh quá nhỏ ({len(data)} bytes)")
+        content_type = content_type.lower()
+        if content_type.startswith('image/'):
+            return
+        # Một số CDN trả sai Content-Type: chấp nhận nếu nội dung có chữ ký ảnh
+        if not data.startswith(IMAGE_SIGNATURES) and b'ftypavif' not in data[:32]:
+            raise ImageValidationError(f"URL không trả về hình ảnh (Content-Type: {content_type})")
+
+    @staticmethod
+    def _decode(data, job):
+        try:
+            image = Image.open(BytesIO(data))
+        except Exception as e:
+            raise ImageValidationError(f"Không giải mã được ảnh: {str(e)}")
+        if job.resize == RESIZE_NONE:
+            mode = None if job.format == 'WEBP' else 'RGB'
+            return prepare_image(image, mode=mode)
+        # fit/flatten tự giải mã thu nhỏ ở bước resize
+        return image
+
+    @staticmethod
+    def _resize(image, job):
+        if job.resize == RESIZE_FIT:
+            return fit_on_white(image, job.target_size or (800, 800))
+        if job.resize == RESIZE_FLATTEN:
+            return flatten_on_white(image)
+        return image
+
+    @staticmethod
+    def _encode(image, job):
+        fmt = job.format.upper()
+        if fmt in ('JPEG', 'JPG') and image.mode != 'RGB':
+            image = image.convert('RGB')
+        elif fmt == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+        options = {'quality': job.quality}
+        if fmt == 'WEBP':
+            options.update(method=job.method, lossless=False)
+        options.update(job.save_options)
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG' if fmt == 'JPG' else fmt, **options)
+        encoded = buffer.getvalue()
+        if fmt == 'WEBP' and not (encoded[:4] == b'RIFF' and encoded[8:12] == b'WEBP'):
+            raise ValueError("Dữ liệu mã hóa không phải WebP hợp lệ")
+        return encoded
+
+    @staticmethod
+    def _store(data, dest_path):
+        os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+        tmp_path = f'{dest_path}.{threading.get_ident()}{TMP_SUFFIX}'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, dest_path)
+
+
+_default_pipeline = None
+_default_lock = threading.Lock()
+
+
+def get_image_pipeline():
+    """Pipeline ảnh dùng chung của tiến trình (tạo khi cần)"""
+    global _default_pipeline
+    with _default_lock:
+        if _default_pipeline is None:
+            _default_pipeline = ImagePipeline()
+        return _default_pipeline
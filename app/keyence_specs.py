@@ -0,0 +1,202 @@
+import logging
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from app.spec_engine import (
+    TABLE_STYLE, CELL_STYLE, HEADER_STYLE, append_style, has_class, parse_html,
+    table_from_element, render_element_table
+)
+
+logger = logging.getLogger(__name__)
+
+SPECS_TITLE = 'Thông số kỹ thuật'
+FOOTNOTE_CLASS = 'specTable-foot'
+
+EMPTY_VALUES = ('―', '—', '-')
+
+
+_SPECS_DIV_XPATH = etree.XPath(f"//div[{has_class('prd-specsTable')}]")
+_SPEC_ROWS_XPATH = etree.XPath(f"//div[{has_class('specTable-block')}]//table//tr")
+_FIRST_TABLE_XPATH = etree.XPath('.//table[1]')
+_FIRST_H2_XPATH = etree.XPath('.//h2[1]')
+_NEXT_TABLE_XPATH = etree.XPath('following::table[1]')
+
+
+def _cell_xpath(column):
+    return etree.XPath(f".//td[{has_class(f'specTable-clm-{column}')}][1]")
+
+
+_KEY_MAIN_XPATH = _cell_xpath(0)
+_KEY_SUB_XPATH = _cell_xpath(1)
+_VALUE_XPATHS = (_cell_xpath(4), _cell_xpath(2), _cell_xpath(1))
+
+
+def _classes(element):
+    return (element.get('class') or '').split()
+
+
+def _strings(element):
+    """Các đoạn text đã strip của một phần tử (tương đương stripped_strings của BeautifulSoup)"""
+    return [s.strip() for s in element.itertext() if s and s.strip()]
+
+
+def _first(xpath, element):
+    found = xpath(element)
+    return found[0] if found else None
+
+
+def parse_page(page_html):
+    """
+    Parse trang sản phẩm bằng lxml (một lần duy nhất cho toàn bộ xử lý thông số)
+    """
+    return parse_html(page_html)
+
+
+def _parse_spec_rows(root):
+    """
+    Đọc các hàng thông số và footnotes trong một lượt duyệt qua div.specTable-block
+    """
+    items = []
+    footnotes = {}
+    for tr in _SPEC_ROWS_XPATH(root):
+        if FOOTNOTE_CLASS in _classes(tr):
+            cells = tr.xpath('.//td')
+            if cells:
+                footnotes[cells[0].get('attributeid', 'footnotes')] = ' ; '.join(_strings(cells[0]))
+
+        key_main = _first(_KEY_MAIN_XPATH, tr)
+        if key_main is None:
+            continue
+        val_td = None
+        for value_xpath in _VALUE_XPATHS:
+            val_td = _first(value_xpath, tr)
+            if val_td is not None:
+                break
+        if val_td is None:
+            continue
+
+        key = ' ; '.join(_strings(key_main))
+        key_sub = _first(_KEY_SUB_XPATH, tr)
+        if key_sub is not None and ''.join(_strings(key_sub)):
+            key = f"{key} — {' ; '.join(_strings(key_sub))}"
+
+        value = ' ; '.join(_strings(val_td))
+        if value in EMPTY_VALUES:
+            value = ''
+
+        if key and key != value:
+            items.append({
+                'key': key,
+                'value': value,
+                'attributeid': val_td.get('attributeid', '')
+            })
+    return items, footnotes
+
+
+def _find_specs_section(root):
+    """
+    Tìm section chứa bảng thông số (div.prd-specsTable hoặc section cha của nó)
+    """
+    specs_div = _first(_SPECS_DIV_XPATH, root)
+    if specs_div is None:
+        return None
+    section = next(specs_div.iterancestors('section'), None)
+    return section if section is not None else specs_div
+
+
+def _styled_original_html(section):
+    """
+    HTML gốc của section thông số với inline-style tối thiểu (dùng khi không làm sạch được)
+    """
+    table = _first(_FIRST_TABLE_XPATH, section)
+    if table is not None:
+        table.set('style', append_style(table.get('style', ''), TABLE_STYLE))
+        for cell in table.iter('td', 'th'):
+            cell.set('style', append_style(cell.get('style', ''), CELL_STYLE))
+        thead = next(table.iter('thead'), None)
+        if thead is not None:
+            for th in thead.iter('th'):
+                th.set('style', append_style(th.get('style', ''), HEADER_STYLE))
+    return lxml_html.tostring(section, encoding='unicode', with_tail=False)
+
+
+def build_specs_html(section):
+    """
+    Tạo HTML thông số đã làm sạch: <section><h2>Thông số kỹ thuật</h2><table>...</table></section>
+
+    Args:
+        section: Phần tử lxml của section thông số
+
+    Returns:
+        str: HTML đã làm sạch; rỗng nếu không có tiêu đề "Thông số kỹ thuật" và bảng theo sau
+    """
+    h2 = next((h for h in section.iter('h2') if SPECS_TITLE in h.text_content()), None)
+    if h2 is None:
+        return ''
+    # Bảng đầu tiên sau tiêu đề theo thứ tự tài liệu, nằm trong section
+    table = _first(_NEXT_TABLE_XPATH, h2)
+    if table is None or not any(a is section for a in table.iterancestors()):
+        return ''
+
+    spec_table = table_from_element(table, footnote_class=FOOTNOTE_CLASS, title=''.join(_strings(h2)))
+    return render_element_table(spec_table.add_copyright(), styled=True)
+
+
+def process_keyence_specs(page):
+    """
+    Xử lý toàn bộ phần thông số kỹ thuật của một trang sản phẩm Keyence với một lần parse.
+
+    Trích xuất các hàng thông số, footnotes và HTML bảng đã làm sạch (chỉ giữ
+    rowspan/colspan, có hàng bản quyền và inline-style) trực tiếp trên cây lxml,
+    không serialize rồi parse lại.
+
+    Args:
+        page: HTML của trang (str/bytes) hoặc cây lxml đã parse
+
+    Returns:
+        dict: {'specifications': list, 'footnotes': dict, 'specs_html': str}
+    """
+    result = {'specifications': [], 'footnotes': {}, 'specs_html': ''}
+    try:
+        root = parse_page(page) if isinstance(page, (str, bytes)) else page
+    except (etree.ParserError, ValueError) as e:
+        logger.debug(f"Không parse được trang Keyence: {e}")
+        return result
+
+    try:
+        result['specifications'], result['footnotes'] = _parse_spec_rows(root)
+        logger.info(f"✅ Parsed {len(result['specifications'])} specification items theo chuẩn hãng")
+    except Exception as e:
+        logger.error(f"❌ Lỗi khi parse Keyence specs: {str(e)}")
+
+    try:
+        section = _find_specs_section(root)
+        if section is not None:
+            heading = _first(_FIRST_H2_XPATH, section)
+            if heading is None or 'thông số' in ''.join(_strings(heading)).lower():
+                result['specs_html'] = build_specs_html(section) or _styled_original_html(section)
+    except Exception as e:
+        logger.debug(f"Lỗi khi clean specs HTML: {e}")
+
+    return result
+
+
+def clean_specs_html(section_html):
+    """
+    Làm sạch một đoạn HTML section thông số đã có sẵn
+
+    Args:
+        section_html (str): HTML chứa tiêu đề "Thông số kỹ thuật" và bảng
+
+    Returns:
+        str: HTML đã làm sạch; rỗng nếu không tìm thấy tiêu đề/bảng
+    """
+    if not section_html:
+        return ''
+    try:
+        root = parse_page(section_html)
+        return build_specs_html(root)
+    except Exception as e:
+        logger.debug(f"Lỗi khi clean specs HTML: {e}")
+        return ''
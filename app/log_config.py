@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime
+
+# Biến môi trường điều khiển logging (không cần sửa code khi chạy production):
+#   CRAWLER_LOG_LEVEL         Mức log gốc, ví dụ INFO
+#   CRAWLER_LOG_LEVELS        Mức log theo module, ví dụ "app.crawler=WARNING,app.crawler.items=ERROR"
+#   CRAWLER_LOG_JSON          1 để ghi log dạng JSON (mỗi dòng một object)
+#   CRAWLER_LOG_SAMPLE_EVERY  Với log theo từng item: chỉ giữ 1 trên N bản ghi cùng mẫu
+#   CRAWLER_LOG_FILE          Đường dẫn file log (tùy chọn)
+ENV_LEVEL = 'CRAWLER_LOG_LEVEL'
+ENV_MODULE_LEVELS = 'CRAWLER_LOG_LEVELS'
+ENV_JSON = 'CRAWLER_LOG_JSON'
+ENV_SAMPLE_EVERY = 'CRAWLER_LOG_SAMPLE_EVERY'
+ENV_FILE = 'CRAWLER_LOG_FILE'
+
+# Hậu tố của logger dành cho thông điệp theo từng item (mỗi link, mỗi sản phẩm, mỗi file)
+ITEM_LOGGER_SUFFIX = 'items'
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Định dạng bản ghi log thành một dòng JSON
+    """
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        sampled = getattr(record, 'sampled_count', None)
+        if sampled:
+            payload['sampled_count'] = sampled
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Chỉ cho qua bản ghi đầu tiên và sau đó 1 trên N bản ghi có cùng mẫu thông điệp.
+
+    Mẫu là chuỗi định dạng gốc (record.msg), nên các thông điệp theo từng item cần
+    dùng tham số kiểu ``logger.info("Tìm thấy URL: %s", url)`` thay vì f-string.
+    """
+
+    def __init__(self, every=1):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+        if count == 1 or count % self.every == 0:
+            record.sampled_count = count
+            return True
+        return False
+
+
+_sampling_filter = SamplingFilter(os.environ.get(ENV_SAMPLE_EVERY, 1))
+
+
+def get_item_logger(name):
+    """
+    Lấy logger cho thông điệp theo từng item của một module (ví dụ 'app.crawler.items').
+
+    Có thể tắt riêng bằng CRAWLER_LOG_LEVELS="app.crawler.items=WARNING" và được lấy
+    mẫu theo CRAWLER_LOG_SAMPLE_EVERY.
+    """
+    item_logger = logging.getLogger(f'{name}.{ITEM_LOGGER_SUFFIX}')
+    if _sampling_filter not in item_logger.filters:
+        item_logger.addFilter(_sampling_filter)
+    return item_logger
+
+
+def parse_module_levels(spec):
+    """
+    Phân tích chuỗi "module=LEVEL,module2=LEVEL" thành dict
+    """
+    levels = {}
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        name, level = part.split('=', 1)
+        name, level = name.strip(), level.strip().upper()
+        if name and level:
+            levels[name] = level
+    return levels
+
+
+def setup_logging(level=None, module_levels=None, json_output=None, sample_every=None, log_file=None):
+    """
+    Cấu hình logging cho toàn ứng dụng với handler không chặn dựa trên hàng đợi.
+
+    Các luồng crawler chỉ đẩy bản ghi vào queue (QueueHandler); một QueueListener
+    chạy nền thực hiện ghi ra stdout/file, nên worker không phải tranh khóa stdout.
+    Gọi nhiều lần là an toàn: lần sau chỉ cập nhật mức log.
+
+    Args:
+        level (str): Mức log gốc (mặc định: CRAWLER_LOG_LEVEL hoặc INFO)
+        module_levels (dict): Mức log theo tên logger (gộp với CRAWLER_LOG_LEVELS)
+        json_output (bool): Ghi log dạng JSON (mặc định: CRAWLER_LOG_JSON)
+        sample_every (int): Tỷ lệ lấy mẫu cho logger theo item (mặc định: CRAWLER_LOG_SAMPLE_EVERY)
+        log_file (str): File log tùy chọn (mặc định: CRAWLER_LOG_FILE)
+
+    Returns:
+        logging.handlers.QueueListener: Listener đang chạy
+    """
+    global _listener
+
+    level = (level or os.environ.get(ENV_LEVEL) or 'INFO').upper()
+    levels = parse_module_levels(os.environ.get(ENV_MODULE_LEVELS))
+    levels.update(module_levels or {})
+    if json_output is None:
+        json_output = os.environ.get(ENV_JSON, '').lower() in ('1', 'true', 'yes')
+    if sample_every is None:
+        sample_every = os.environ.get(ENV_SAMPLE_EVERY, _sampling_filter.every)
+    log_file = log_file or os.environ.get(ENV_FILE)
+
+    _sampling_filter.every = max(1, int(sample_every))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = JsonFormatter() if json_output else logging.Formatter(DEFAULT_FORMAT)
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if log_file:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            handlers.append(logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=20 * 1024 * 1024, backupCount=5, encoding='utf-8'))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        # Thay các handler cũ (ví dụ từ logging.basicConfig) bằng QueueHandler
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        log_queue = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    return _listener
@@ -0,0 +1,504 @@
+import time
+import bisect
+import logging
+import threading
+import weakref
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Mốc (giây) mặc định của histogram độ trễ: fetch/parse/encode của crawler
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Sharded:
+    """
+    Nền cho số liệu chia shard theo luồng: mỗi luồng ghi vào shard riêng nên không
+    cần khóa khi ghi; khi đọc thì cộng dồn các shard. Shard của luồng đã kết thúc
+    được gộp vào phần "đã nghỉ" để số shard không tăng mãi khi thread pool thay luồng.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []  # [(weakref luồng, shard)]
+        self._lock = threading.Lock()  # chỉ dùng khi tạo shard và khi đọc
+        self._retired = self._new_shard()
+
+    def _new_shard(self):
+        raise NotImplementedError
+
+    def _merge(self, total, shard):
+        raise NotImplementedError
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._new_shard()
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            self._local.shard = shard
+        return shard
+
+    def _collect(self):
+        """Cộng dồn mọi shard thành một shard mới"""
+        total = self._new_shard()
+        with self._lock:
+            alive = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    # Luồng đã kết thúc sẽ không ghi nữa
+                    self._merge(self._retired, shard)
+                else:
+                    alive.append((thread_ref, shard))
+            self._shards = alive
+            self._merge(total, self._retired)
+            for _, shard in alive:
+                self._merge(total, shard)
+        return total
+
+    def reset(self):
+        """Đưa mọi shard về 0"""
+        with self._lock:
+            self._shards = []
+            self._retired = self._new_shard()
+            # Luồng đang chạy sẽ tạo shard mới ở lần ghi tiếp theo
+            self._local = threading.local()
+
+
+class StatsCounters(_Sharded, Mapping):
+    """
+    Nhóm bộ đếm theo tên (thay cho dict stats của crawler) an toàn khi nhiều luồng cùng tăng.
+
+    Ghi bằng ``inc(name, amount)``; đọc như dict (``stats['products_processed']``,
+    ``dict(stats)``) hoặc ``snapshot()``.
+    """
+
+    def __init__(self, names=()):
+        """
+        Args:
+            names: Tên các bộ đếm luôn có mặt (giá trị 0) trong snapshot, theo thứ tự
+        """
+        self._names = tuple(names)
+        super().__init__()
+
+    def _new_shard(self):
+        return {}
+
+    def _merge(self, total, shard):
+        for name, value in list(shard.items()):
+            total[name] = total.get(name, 0) + value
+
+    def inc(self, name, amount=1):
+        """
+        Tăng bộ đếm
+
+        Args:
+            name: Tên bộ đếm
+            amount: Lượng tăng (mặc định 1)
+        """
+        shard = self._shard()
+        shard[name] = shard.get(name, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {tên: tổng giá trị} tại thời điểm đọc
+        """
+        total = self._collect()
+        result = dict.fromkeys(self._names, 0)
+        result.update(total)
+        return result
+
+    def __getitem__(self, name):
+        snapshot = self.snapshot()
+        if name not in snapshot:
+            raise KeyError(name)
+        return snapshot[name]
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __len__(self):
+        return len(self.snapshot())
+
+    def __repr__(self):
+        return f'StatsCounters({self.snapshot()!r})'
+
+
+class Counter(_Sharded):
+    """Một bộ đếm đơn, chia shard theo luồng"""
+
+    def _new_shard(self):
+        return [0]
+
+    def _merge(self, total, shard):
+        total[0] += shard[0]
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._collect()[0]
+
+
+class Gauge:
+    """
+    Giá trị tức thời (request đang chạy, độ sâu hàng đợi, WebDriver đang mở...).
+    Ghi bằng inc/dec/set, hoặc gắn callback để đọc giá trị lúc xuất số liệu.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._callback = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def set_function(self, callback):
+        """Đọc giá trị từ ``callback()`` mỗi lần xuất (None để bỏ)"""
+        self._callback = callback
+
+    @contextmanager
+    def track_inprogress(self):
+        """Tăng gauge trong thời gian chạy khối with"""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    @property
+    def value(self):
+        callback = self._callback
+        if callback is not None:
+            try:
+                return callback()
+            except Exception as e:
+                logger.debug(f"Lỗi khi đọc gauge: {e}")
+                return 0
+        return self._value
+
+
+class RateMeter:
+    """Số sự kiện mỗi giây, tính trung bình trên cửa sổ trượt ``window`` giây"""
+
+    def __init__(self, window=60):
+        self.window = max(1, int(window))
+        self._slots = [[0, 0] for _ in range(self.window)]  # [giây, số sự kiện]
+        self._lock = threading.Lock()
+
+    def mark(self, amount=1):
+        now = int(time.time())
+        with self._lock:
+            slot = self._slots[now % self.window]
+            if slot[0] != now:
+                slot[0] = now
+                slot[1] = 0
+            slot[1] += amount
+
+    @property
+    def value(self):
+        now = int(time.time())
+        with self._lock:
+            total = sum(count for second, count in self._slots if now - second < self.window)
+        return total / self.window
+
+
+class _HistogramShard:
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class Histogram(_Sharded):
+    """
+    Histogram theo mốc cố định (kiểu Prometheus), chia shard theo luồng.
+    Percentile được ước tính bằng nội suy tuyến tính trong mốc chứa nó.
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        """
+        Args:
+            buckets: Các mốc cận trên tăng dần (giây với histogram độ trễ)
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__()
+
+    def _new_shard(self):
+        # Thêm một ô cho giá trị lớn hơn mốc cuối (+Inf)
+        return _HistogramShard(len(self.buckets) + 1)
+
+    def _merge(self, total, shard):
+        for i, count in enumerate(shard.counts):
+            total.counts[i] += count
+        total.sum += shard.sum
+        total.count += shard.count
+        total.max = max(total.max, shard.max)
+
+    def observe(self, value):
+        """Ghi nhận một giá trị"""
+        shard = self._shard()
+        shard.counts[bisect.bisect_left(self.buckets, value)] += 1
+        shard.sum += value
+        shard.count += 1
+        if value > shard.max:
+            shard.max = value
+
+    @contextmanager
+    def time(self):
+        """Đo thời gian chạy của khối with và ghi vào histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self, percentiles=(50, 90, 99)):
+        """
+        Args:
+            percentiles: Các percentile cần ước tính
+
+        Returns:
+            dict: count, sum, avg, max, buckets [(mốc, số lượng tích lũy)] và p50/p90/p99...
+        """
+        total = self._collect()
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), total.counts):
+            running += count
+            cumulative.append((bound, running))
+        result = {
+            'count': total.count,
+            'sum': total.sum,
+            'avg': total.sum / total.count if total.count else 0.0,
+            'max': total.max,
+            'buckets': cumulative,
+        }
+        for q in percentiles:
+            result[f'p{q}'] = self._percentile(total, q)
+        return result
+
+    def _percentile(self, total, q):
+        if not total.count:
+            return 0.0
+        rank = total.count * q / 100
+        running = 0
+        lower = 0.0
+        for i, count in enumerate(total.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else total.max
+            if count and running + count >= rank:
+                fraction = (rank - running) / count
+                return min(lower + (upper - lower) * fraction, total.max)
+            running += count
+            lower = upper
+        return total.max
+
+
+class MetricsRegistry:
+    """
+    Nơi đăng ký số liệu dùng chung của tiến trình, mỗi số liệu xác định bởi tên + nhãn
+    (ví dụ ``histogram('crawler_fetch_seconds', vendor='autonics')``).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, factory, name, help_text, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = factory()
+                    self._metrics[key] = metric
+                    self._help.setdefault(name, (kind, help_text))
+        return metric
+
+    def counter(self, name, help_text='', **labels):
+        """Bộ đếm theo tên + nhãn (tạo khi cần)"""
+        return self._get('counter', Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_LATENCY_BUCKETS, **labels):
+        """Histogram theo tên + nhãn (tạo khi cần)"""
+        return self._get('histogram', lambda: Histogram(buckets), name, help_text, labels)
+
+    def gauge(self, name, help_text='', **labels):
+        """Gauge theo tên + nhãn (tạo khi cần)"""
+        return self._get('gauge', Gauge, name, help_text, labels)
+
+    def rate(self, name, help_text='', window=60, **labels):
+        """Tốc độ (sự kiện/giây trên cửa sổ trượt) theo tên + nhãn, xuất dưới dạng gauge"""
+        return self._get('gauge', lambda: RateMeter(window), name, help_text, labels)
+
+    def collect(self):
+        """
+        Returns:
+            list: [(tên, loại, mô tả, nhãn dict, số liệu)] sắp theo tên
+        """
+        with self._lock:
+            items = list(self._metrics.items())
+            help_map = dict(self._help)
+        result = []
+        for (name, labels), metric in sorted(items, key=lambda item: item[0]):
+            kind, help_text = help_map[name]
+            result.append((name, kind, help_text, dict(labels), metric))
+        return result
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {tên: [{'labels': ..., 'value' | histogram snapshot}]}
+        """
+        result = {}
+        for name, kind, _, labels, metric in self.collect():
+            if kind == 'histogram':
+                entry = dict(metric.snapshot(), labels=labels)
+            else:
+                entry = {'labels': labels, 'value': metric.value}
+            result.setdefault(name, []).append(entry)
+        return result
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def get_metrics():
+    """Registry số liệu dùng chung của tiến trình (tạo khi cần)"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+        return _default_registry
+
+
+# ======= XUẤT KIỂU PROMETHEUS =======
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in items) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(registry=None):
+    """
+    Xuất mọi số liệu của registry theo định dạng văn bản của Prometheus
+
+    Args:
+        registry: MetricsRegistry (mặc định get_metrics())
+
+    Returns:
+        str: Nội dung cho endpoint /metrics
+    """
+    registry = registry or get_metrics()
+    lines = []
+    last_name = None
+    for name, kind, help_text, labels, metric in registry.collect():
+        if name != last_name:
+            help_line = help_text.replace('\\', '\\\\').replace('\n', '\\n')
+            lines.append(f'# HELP {name} {help_line}')
+            lines.append(f'# TYPE {name} {kind}')
+            last_name = name
+        if kind == 'histogram':
+            snapshot = metric.snapshot(percentiles=())
+            for bound, count in snapshot['buckets']:
+                lines.append(f'{name}_bucket{_format_labels(labels, {"le": _format_value(bound)})} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(snapshot["sum"])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {snapshot["count"]}')
+        else:
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(metric.value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ======= SỐ LIỆU DÙNG CHUNG =======
+
+def fetch_histogram(vendor):
+    """Histogram thời gian tải trang (giây) của crawler ``vendor``"""
+    return get_metrics().histogram('crawler_fetch_seconds', 'Thời gian tải trang', vendor=vendor)
+
+
+def parse_histogram(vendor):
+    """Histogram thời gian phân tích trang sản phẩm (giây) của crawler ``vendor``"""
+    return get_metrics().histogram('crawler_parse_seconds', 'Thời gian phân tích trang', vendor=vendor)
+
+
+def image_stage_histogram(stage):
+    """Histogram thời gian từng bước (fetch, decode, resize, encode, store) của pipeline ảnh"""
+    return get_metrics().histogram('image_pipeline_seconds', 'Thời gian từng bước xử lý ảnh', stage=stage)
+
+
+def queue_depth_gauge(pipeline, queue):
+    """Gauge độ sâu hàng đợi ``queue`` của pipeline ``pipeline`` (baa, images, upscale...)"""
+    return get_metrics().gauge('pipeline_queue_depth', 'Số việc đang chờ (hoặc đang xử lý) trong hàng đợi của pipeline', pipeline=pipeline, queue=queue)
+
+
+def track_queue(pipeline, queue, q):
+    """
+    Xuất độ sâu của một queue.Queue qua gauge pipeline_queue_depth. Chỉ giữ weakref tới
+    hàng đợi: khi hàng đợi bị thu hồi gauge trả về 0; lượt chạy sau đăng ký lại thì thay thế.
+    """
+    q_ref = weakref.ref(q)
+
+    def depth():
+        current = q_ref()
+        return current.qsize() if current is not None else 0
+
+    queue_depth_gauge(pipeline, queue).set_function(depth)
+    return q
+
+
+def webdriver_opened(vendor, driver):
+    """Ghi nhận một WebDriver vừa mở (crawler_webdriver_active)"""
+    driver._metrics_vendor = vendor
+    get_metrics().gauge('crawler_webdriver_active', 'Số WebDriver đang mở', vendor=vendor).inc()
+    return driver
+
+
+def webdriver_closed(driver):
+    """Ghi nhận WebDriver đã đóng; gọi nhiều lần cho cùng driver chỉ tính một lần"""
+    vendor = getattr(driver, '_metrics_vendor', None)
+    if vendor is None:
+        return
+    driver._metrics_vendor = None
+    get_metrics().gauge('crawler_webdriver_active', 'Số WebDriver đang mở', vendor=vendor).dec()
+
+
+def webdriver_slots_gauge(vendor):
+    """Gauge số slot WebDriver tối đa của crawler có giới hạn (HopLong)"""
+    return get_metrics().gauge('crawler_webdriver_slots', 'Số WebDriver tối đa được mở cùng lúc', vendor=vendor)
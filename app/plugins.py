@@ -0,0 +1,147 @@
+import logging
+import threading
+import importlib
+
+logger = logging.getLogger(__name__)
+
+
+# ======= IMPORT TRÌ HOÃN =======
+
+class LazyImport:
+    """
+    Đại diện cho một module (hoặc một thuộc tính của module) chỉ được import ở lần dùng đầu tiên.
+
+    Dùng cho các module nặng (pandas, openpyxl, selenium, các crawler...) để worker khởi động
+    nhanh: truy cập thuộc tính hoặc gọi đối tượng sẽ import thật rồi chuyển tiếp.
+
+        pd = LazyImport('pandas')
+        get_column_letter = LazyImport('openpyxl.utils:get_column_letter')
+    """
+
+    def __init__(self, target):
+        """
+        Args:
+            target: 'module' hoặc 'module:thuộc_tính'
+        """
+        module_name, _, attr = target.partition(':')
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_module_name', module_name)
+        object.__setattr__(self, '_attr', attr or None)
+        object.__setattr__(self, '_lock', threading.Lock())
+        object.__setattr__(self, '_value', None)
+        object.__setattr__(self, '_loaded', False)
+
+    def _load(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                value = importlib.import_module(self._module_name)
+                if self._attr:
+                    value = getattr(value, self._attr)
+                object.__setattr__(self, '_value', value)
+                object.__setattr__(self, '_loaded', True)
+                logger.debug(f"📦 Đã import {self._target}")
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'đã import' if self._loaded else 'chưa import'
+        return f"<LazyImport {self._target} ({state})>"
+
+
+def lazy_import(target):
+    """
+    Import trì hoãn một module hoặc thuộc tính của module
+
+    Args:
+        target: 'module' hoặc 'module:thuộc_tính'
+
+    Returns:
+        LazyImport: Đối tượng import thật ở lần truy cập đầu tiên
+    """
+    return LazyImport(target)
+
+
+# ======= DANH SÁCH CRAWLER =======
+# Tên -> 'module:Lớp'; module của crawler (selenium, google.generativeai...) chỉ được
+# import khi crawler đó được dùng lần đầu
+
+_crawlers = {
+    'baa': 'app.baa_crawler:BaaProductCrawler',
+    'baa_qlight': 'app.crawlerBAA_Qlight:BAAQlightCrawler',
+    'autonics': 'app.crawlerAutonics:AutonicsCrawler',
+    'omron': 'app.crawlerOmron:OmronCrawler',
+    'keyence': 'app.crawlerKeyence:KeyenceCrawler',
+    'hoplong': 'app.crawlerHopLong:HopLongCrawler',
+}
+_crawlers_lock = threading.Lock()
+
+
+def register_crawler(name, target):
+    """
+    Đăng ký (hoặc thay thế) một crawler
+
+    Args:
+        name: Tên crawler, ví dụ 'autonics'
+        target: Lớp crawler hoặc chuỗi 'module:Lớp' để import trì hoãn
+    """
+    if isinstance(target, str) and ':' not in target:
+        raise ValueError(f"Crawler '{name}' cần dạng 'module:Lớp', nhận được '{target}'")
+    with _crawlers_lock:
+        _crawlers[name] = target
+
+
+def available_crawlers():
+    """
+    Returns:
+        list: Tên các crawler đã đăng ký
+    """
+    with _crawlers_lock:
+        return sorted(_crawlers)
+
+
+def get_crawler_class(name):
+    """
+    Lấy lớp crawler theo tên, import module của crawler ở lần gọi đầu tiên
+
+    Args:
+        name: Tên crawler đã đăng ký
+
+    Returns:
+        type: Lớp crawler
+    """
+    with _crawlers_lock:
+        target = _crawlers.get(name)
+        if target is None:
+            raise ValueError(f"Không có crawler '{name}' (có: {', '.join(sorted(_crawlers))})")
+    if isinstance(target, str):
+        # Import ngoài khóa: module crawler có thể tự gọi register_crawler khi được import
+        module_name, _, class_name = target.partition(':')
+        target = getattr(importlib.import_module(module_name), class_name)
+        with _crawlers_lock:
+            _crawlers[name] = target
+        logger.info(f"🔌 Đã nạp crawler '{name}' từ {module_name}")
+    return target
+
+
+def create_crawler(name, *args, **kwargs):
+    """
+    Tạo crawler theo tên
+
+    Args:
+        name: Tên crawler đã đăng ký
+        *args, **kwargs: Tham số khởi tạo của lớp crawler
+
+    Returns:
+        Đối tượng crawler
+    """
+    return get_crawler_class(name)(*args, **kwargs)
@@ -1,45 +1,333 @@
+import os
+import re
+import logging
+import traceback
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Các từ khóa cho mỗi loại sản phẩm (dùng chung cho /filter-product-types và ProductCategorizer)
+PRODUCT_TYPE_KEYWORDS = {
+    'tiem_can': ['tiệm cận', 'tiếp cận', 'proximity', 'PR', 'PS', 'PRL', 'PRCM', 'PR12', 'PR18', 'PR30'],
+    'soi_quang': ['sợi quang', 'fiber optic', 'BF', 'BFL', 'BFX', 'BFF', 'fiber sensor'],
+    'quang_dien': ['quang điện', 'photoelectric', 'BEN', 'BJ', 'BYD', 'BR', 'BRP', 'BH', 'BL', 'BX', 'BY', 'photo sensor'],
+    'vung_kv': ['vùng', 'khu vực', 'area', 'BA', 'BAR', 'area sensor'],
+    'ap_suat': ['áp suất', 'pressure', 'PSA', 'PSB', 'PS', 'pressure sensor'],
+    'luu_luong': ['lưu lượng', 'flow', 'FS', 'FSA', 'flow sensor'],
+    'xy_lanh': ['xy lanh', 'cylinder', 'CY', 'CP', 'cylinder sensor'],
+    'dien_dung': ['điện dung', 'capacitive', 'CR', 'CRL', 'capacitive sensor']
+}
+
+# Tên hiển thị cho mỗi loại sản phẩm
+PRODUCT_TYPE_DISPLAY_NAMES = {
+    'tiem_can': 'Tiệm cận',
+    'soi_quang': 'Sợi quang',
+    'quang_dien': 'Quang điện',
+    'vung_kv': 'Vùng (khu vực)',
+    'ap_suat': 'Áp suất',
+    'luu_luong': 'Lưu lượng',
+    'xy_lanh': 'Xy lanh',
+    'dien_dung': 'Điện dung'
+}
+
+UNCATEGORIZED = "uncategorized"
+
+# Các cột/khóa có thể chứa tên, mã và thông số sản phẩm
+NAME_FIELDS = ['Tên sản phẩm', 'Tên SP', 'Product Name', 'name', 'title']
+CODE_FIELDS = ['Mã sản phẩm', 'Mã SP', 'SKU', 'Product Code', 'code']
+SPEC_FIELDS = ['Thông số kỹ thuật', 'Tổng quan', 'Mô tả', 'Description', 'specs', 'description']
+
+
+class KeywordMatcher:
+    """
+    Bộ so khớp nhiều từ khóa cùng lúc, biên dịch một lần từ bảng từ khóa.
+
+    Toàn bộ từ khóa được gộp thành một biểu thức chính quy duy nhất dạng
+    lookahead ``(?=(kw1|kw2|...))`` sắp theo độ dài giảm dần, nên mỗi vị trí
+    trong chuỗi chỉ được thử một lần và trả về từ khóa dài nhất bắt đầu tại đó.
+    Mọi từ khóa ngắn hơn khớp cùng vị trí đều là tiền tố của từ khóa dài nhất,
+    vì vậy loại của chúng được gộp sẵn vào bảng tra - kết quả tương đương với
+    phép kiểm tra ``keyword in text`` cho từng từ khóa nhưng chỉ quét một lượt.
+    """
+
+    def __init__(self, keyword_table):
+        """
+        Args:
+            keyword_table (dict): Dict với key là loại sản phẩm và value là danh sách từ khóa
+        """
+        self.keyword_table = keyword_table
+        self.category_order = list(keyword_table.keys())
+
+        # Từ khóa (chữ thường) -> tập loại sản phẩm chứa từ khóa đó
+        keyword_categories = {}
+        for category, keywords in keyword_table.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    keyword_categories.setdefault(keyword, set()).add(category)
+
+        # Gộp loại của tất cả từ khóa là tiền tố của một từ khóa dài hơn
+        self._categories_by_keyword = {}
+        for keyword in keyword_categories:
+            categories = set()
+            for other, other_categories in keyword_categories.items():
+                if keyword.startswith(other):
+                    categories |= other_categories
+            self._categories_by_keyword[keyword] = frozenset(categories)
+
+        if keyword_categories:
+            alternation = '|'.join(re.escape(k) for k in sorted(keyword_categories, key=len, reverse=True))
+            self._pattern = re.compile(f'(?=({alternation}))')
+        else:
+            self._pattern = None
+
+    def match(self, text):
+        """
+        Tìm tất cả loại sản phẩm có từ khóa xuất hiện trong chuỗi
+
+        Args:
+            text (str): Chuỗi cần kiểm tra (không phân biệt hoa thường)
+
+        Returns:
+            frozenset: Tập các loại sản phẩm khớp
+        """
+        if not text or self._pattern is None:
+            return frozenset()
+
+        found = set()
+        lookup = self._categories_by_keyword
+        for keyword in set(self._pattern.findall(text.lower())):
+            found |= lookup[keyword]
+        return frozenset(found)
+
+    def first_match(self, text):
+        """
+        Trả về loại sản phẩm khớp đầu tiên theo thứ tự trong bảng từ khóa
+
+        Args:
+            text (str): Chuỗi cần kiểm tra
+
+        Returns:
+            str hoặc None: Loại sản phẩm, None nếu không khớp
+        """
+        found = self.match(text)
+        for category in self.category_order:
+            if category in found:
+                return category
+        return None
+
+    def match_series(self, texts):
+        """
+        Áp dụng bộ so khớp cho cả một Series văn bản
+
+        Args:
+            texts (pd.Series): Series chuỗi cần kiểm tra
+
+        Returns:
+            pd.Series: Series các frozenset loại sản phẩm, cùng index với đầu vào
+        """
+        return texts.fillna('').astype(str).str.lower().map(self.match)
+
+    def match_masks(self, texts, categories=None):
+        """
+        Tạo mặt nạ boolean cho từng loại sản phẩm trong một lượt quét
+
+        Args:
+            texts (pd.Series): Series chuỗi cần kiểm tra
+            categories (list, optional): Các loại cần tạo mặt nạ (mặc định: tất cả)
+
+        Returns:
+            dict: Dict với key là loại sản phẩm và value là pd.Series boolean
+        """
+        matches = self.match_series(texts)
+        categories = categories if categories is not None else self.category_order
+        return {category: matches.map(lambda found, c=category: c in found) for category in categories}
+
+
+_default_matcher = None
+
+
+def get_default_matcher():
+    """
+    Lấy bộ so khớp dùng chung cho bảng PRODUCT_TYPE_KEYWORDS (chỉ biên dịch một lần)
+    """
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = KeywordMatcher(PRODUCT_TYPE_KEYWORDS)
+    return _default_matcher
+
+
+def combine_text_columns(df, columns):
+    """
+    Ghép các cột văn bản của DataFrame thành một Series chuỗi để so khớp
+
+    Args:
+        df (pd.DataFrame): DataFrame nguồn
+        columns (list): Danh sách tên cột (bỏ qua None hoặc cột không tồn tại)
+
+    Returns:
+        pd.Series: Chuỗi đã ghép, cách nhau bởi dấu cách
+    """
+    combined = pd.Series('', index=df.index, dtype=object)
+    for col in columns:
+        if col is None or col not in df.columns:
+            continue
+        combined = combined + ' ' + df[col].fillna('').astype(str)
+    return combined
+
+
 class ProductCategorizer:
     """
     Lớp dùng để phân loại sản phẩm theo danh mục
     """
-    
-    def __init__(self):
+
+    def __init__(self, category_keywords=None):
         """
         Khởi tạo đối tượng phân loại sản phẩm
+
+        Args:
+            category_keywords (dict, optional): Bảng từ khóa theo danh mục (mặc định: PRODUCT_TYPE_KEYWORDS)
+        """
+        if category_keywords is None:
+            self.categories = PRODUCT_TYPE_KEYWORDS
+            self.matcher = get_default_matcher()
+        else:
+            self.categories = category_keywords
+            self.matcher = KeywordMatcher(category_keywords)
+
+    @staticmethod
+    def _find_field(keys, candidates):
+        """
+        Tìm key đầu tiên khớp với danh sách ứng viên (không phân biệt hoa thường)
+        """
+        lowered = {str(k).strip().lower(): k for k in keys}
+        for candidate in candidates:
+            if candidate.lower() in lowered:
+                return lowered[candidate.lower()]
+        return None
+
+    def _text_fields(self, keys):
         """
-        self.categories = {}
-    
+        Xác định các trường tên, mã và thông số sản phẩm
+        """
+        return [self._find_field(keys, NAME_FIELDS),
+                self._find_field(keys, CODE_FIELDS),
+                self._find_field(keys, SPEC_FIELDS)]
+
     def categorize(self, product_data):
         """
         Phân loại sản phẩm dựa trên dữ liệu
-        
+
         Args:
             product_data (dict): Dữ liệu sản phẩm cần phân loại
-            
+
         Returns:
             str: Danh mục của sản phẩm
         """
-        # Logic phân loại sản phẩm có thể được thêm vào đây
-        return "uncategorized"
-    
+        fields = [f for f in self._text_fields(product_data.keys()) if f is not None]
+        if not fields:
+            # Không nhận diện được cột, dùng toàn bộ giá trị
+            fields = list(product_data.keys())
+
+        text = ' '.join(str(product_data.get(f) or '') for f in fields)
+        return self.matcher.first_match(text) or UNCATEGORIZED
+
+    def categorize_dataframe(self, df):
+        """
+        Phân loại toàn bộ DataFrame trong một lượt quét
+
+        Args:
+            df (pd.DataFrame): Dữ liệu sản phẩm
+
+        Returns:
+            pd.Series: Danh mục của từng dòng, cùng index với df
+        """
+        if df.empty:
+            return pd.Series([], index=df.index, dtype=object)
+
+        fields = [f for f in self._text_fields(df.columns) if f is not None]
+        if not fields:
+            fields = list(df.columns)
+
+        combined = combine_text_columns(df, fields)
+        return combined.map(lambda text: self.matcher.first_match(text) or UNCATEGORIZED)
+
     def categorize_products(self, products_list):
         """
         Phân loại danh sách sản phẩm
-        
+
         Args:
-            products_list (list): Danh sách các sản phẩm cần phân loại
-            
+            products_list (list hoặc pd.DataFrame): Danh sách các sản phẩm cần phân loại
+
         Returns:
             dict: Dict với key là danh mục và value là danh sách sản phẩm thuộc danh mục đó
         """
+        if isinstance(products_list, pd.DataFrame):
+            df = products_list
+            return_frames = True
+        else:
+            df = pd.DataFrame(list(products_list))
+            return_frames = False
+
         categorized = {}
-        
-        for product in products_list:
-            category = self.categorize(product)
-            
-            if category not in categorized:
-                categorized[category] = []
-                
-            categorized[category].append(product)
-            
-        return categorized 
\ No newline at end of file
+        if df.empty:
+            return categorized
+
+        categories = self.categorize_dataframe(df)
+        for category, group in df.groupby(categories, sort=False):
+            categorized[category] = group if return_frames else group.to_dict('records')
+
+        return categorized
+
+    def categorize_and_export(self, input_path, output_dir):
+        """
+        Đọc file Excel/CSV, phân loại sản phẩm và xuất mỗi danh mục ra một sheet
+
+        Args:
+            input_path (str): Đường dẫn file dữ liệu sản phẩm
+            output_dir (str): Thư mục lưu file kết quả
+
+        Returns:
+            str hoặc dict: Đường dẫn file Excel kết quả, hoặc dict chứa 'error' nếu thất bại
+        """
+        try:
+            file_ext = os.path.splitext(input_path)[1].lower()
+            if file_ext == '.csv':
+                df = pd.read_csv(input_path)
+            else:
+                df = pd.read_excel(input_path)
+
+            if df.empty:
+                return {'error': 'File không chứa dữ liệu'}
+
+            df.columns = [str(col).strip() for col in df.columns]
+            categories = self.categorize_dataframe(df)
+
+            os.makedirs(output_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = os.path.join(output_dir, f"categorized_products_{timestamp}.xlsx")
+
+            summary_data = {'Danh mục': [], 'Số lượng': []}
+            with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+                for category in self.matcher.category_order + [UNCATEGORIZED]:
+                    group = df[categories == category]
+                    if group.empty:
+                        continue
+                    display_name = PRODUCT_TYPE_DISPLAY_NAMES.get(category, category)
+                    group.to_excel(writer, sheet_name=display_name[:31], index=False)
+                    summary_data['Danh mục'].append(display_name)
+                    summary_data['Số lượng'].append(len(group))
+
+                pd.DataFrame(summary_data).to_excel(writer, sheet_name='Tổng kết', index=False)
+                for sheet in writer.sheets.values():
+                    sheet.set_column('A:Z', 18)
+
+            logger.info(f"Đã phân loại {len(df)} sản phẩm vào {len(summary_data['Danh mục'])} danh mục: {output_path}")
+            return output_path
+
+        except Exception as e:
+            logger.error(f"Lỗi khi phân loại sản phẩm: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {'error': str(e)}
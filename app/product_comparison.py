@@ -1,23 +1,37 @@
 import pandas as pd
+import numpy as np
 import os
+import concurrent.futures
 from datetime import datetime
 import logging
 import traceback
 import tkinter as tk
 from tkinter import filedialog
 from typing import List, Dict, Union, Set, Tuple, Any, Optional
+from app.fuzzy_matcher import FuzzyCodeIndex, match_codes, METHOD_EXACT
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Excel giới hạn 1.048.576 dòng mỗi sheet
+EXCEL_MAX_ROWS = 1048576
+
 def compare_products_multi(base_file: str, comparison_files: List[str], 
                          output_path: str = None, 
                          comparison_column: str = None,
                          colorize: bool = True,
-                         export_summary: bool = False) -> str:
+                         export_summary: bool = False,
+                         export_matrix: bool = True,
+                         max_workers: Optional[int] = None,
+                         fuzzy_threshold: Optional[float] = None) -> str:
     """
     So sánh sản phẩm giữa file cơ sở và nhiều file khác, tạo báo cáo Excel với các sheet riêng biệt.
     
+    Mỗi file chỉ được đọc một lần (song song bằng process pool), mã sản phẩm của tất cả
+    file được mã hóa thành số nguyên một lần để dựng ma trận "mã nào có trong file nào"
+    trong một lượt vectorized. Các sheet được ghi tuần tự ở chế độ constant_memory của
+    xlsxwriter nên bộ nhớ không tăng theo số file.
+    
     Args:
         base_file: Đường dẫn đến file Excel cơ sở (File 1)
         comparison_files: Danh sách đường dẫn đến các file Excel cần so sánh (File 2, 3, ...)
@@ -25,6 +39,10 @@ def compare_products_multi(base_file: str, comparison_files: List[str],
         comparison_column: Tên cột dùng để so sánh (mặc định: tự động phát hiện)
         colorize: Có định dạng màu sắc cho kết quả hay không
         export_summary: Có xuất file tổng hợp mã trùng hay không
+        export_matrix: Có xuất ma trận mã x file hay không
+        max_workers: Số tiến trình đọc file song song (mặc định: tự động, 1 để tắt)
+        fuzzy_threshold: Ngưỡng điểm (0..1) để tìm mã gần đúng cho các mã không trùng
+            (mặc định: None - chỉ so khớp chính xác)
         
     Returns:
         Đường dẫn đến file kết quả
@@ -37,20 +55,34 @@ def compare_products_multi(base_file: str, comparison_files: List[str],
             output_dir = os.path.dirname(base_file)
             output_path = os.path.join(output_dir, "Ket_qua_so_sanh.xlsx")
         
-        # Giới hạn số file so sánh tối đa 10 file
-        if len(comparison_files) > 10:
-            logger.warning(f"Vượt quá số lượng file cho phép (10). Chỉ sử dụng 10 file đầu tiên.")
-            comparison_files = comparison_files[:10]
-            
-        # Đọc file cơ sở
-        base_df, base_code_col = read_product_file(base_file, comparison_column)
-        base_product_codes = set(base_df[base_code_col].astype(str))
-        logger.info(f"Đã đọc file cơ sở với {len(base_product_codes)} mã sản phẩm")
+        # Đọc tất cả các file một lần (file cơ sở ở vị trí 0)
+        all_files = [base_file] + list(comparison_files)
+        loaded = load_product_files(all_files, comparison_column, max_workers=max_workers)
+        
+        base_df, base_code_col = loaded[0]
+        if base_df is None:
+            raise Exception(f"Không thể đọc file cơ sở: {base_file}")
+        
+        # Dựng ma trận thành viên: membership[i, j] = mã i có trong file j
+        code_ids, unique_codes, membership = build_membership_matrix(
+            [df[col] if df is not None else pd.Series([], dtype=str) for df, col in loaded]
+        )
+        base_in_comp = membership[:, 1:].any(axis=1) if len(comparison_files) else np.zeros(len(unique_codes), dtype=bool)
+        base_code_count = int(membership[:, 0].sum())
+        logger.info(f"Đã đọc file cơ sở với {base_code_count} mã sản phẩm, tổng {len(unique_codes)} mã khác nhau trên {len(all_files)} file")
+        
+        # Khởi tạo Excel writer ở chế độ ghi tuần tự (constant_memory)
+        with pd.ExcelWriter(output_path, engine='xlsxwriter',
+                            engine_kwargs={'options': {'constant_memory': True, 'strings_to_urls': False}}) as writer:
+            workbook = writer.book
+            formats = {
+                'title': workbook.add_format({'bold': True, 'bg_color': '#DDDDDD'}) if colorize else None,
+                'header': workbook.add_format({'bold': True}),
+                'match': workbook.add_format({'bg_color': '#E6FFEC'}) if colorize else None,
+                'non_match': workbook.add_format({'bg_color': '#FFECEC'}) if colorize else None,
+            }
             
-        # Khởi tạo Excel writer
-        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
             # Chuẩn bị cấu trúc cho dữ liệu tổng hợp
-            all_matches = set()
             summary_data = {
                 'File so sánh': [],
                 'Tổng số mã trong File cơ sở': [],
@@ -58,85 +90,73 @@ def compare_products_multi(base_file: str, comparison_files: List[str],
                 'Số mã trùng': [],
                 'Số mã không trùng': []
             }
+            if fuzzy_threshold is not None:
+                summary_data['Số mã khớp gần đúng'] = []
+                # Chỉ mục gần đúng trên các mã của file cơ sở, dựng một lần cho mọi file so sánh
+                base_index = FuzzyCodeIndex(unique_codes[membership[:, 0]])
+            used_sheet_names = {'Tổng quan', 'Tổng hợp mã trùng', 'Ma trận mã'}
+            file_labels = []
             
             # Xử lý từng file so sánh
-            for comp_file in comparison_files:
+            for file_idx, comp_file in enumerate(comparison_files, start=1):
+                file_name = os.path.splitext(os.path.basename(comp_file))[0]
+                file_labels.append(file_name)
+                comp_df, comp_code_col = loaded[file_idx]
+                if comp_df is None:
+                    logger.error(f"Bỏ qua file không đọc được: {comp_file}")
+                    continue
+                
                 try:
-                    logger.info(f"Đang xử lý file so sánh: {os.path.basename(comp_file)}")
-                    
-                    # Đọc file so sánh
-                    comp_df, comp_code_col = read_product_file(comp_file, comparison_column)
-                    comp_product_codes = set(comp_df[comp_code_col].astype(str))
-                    
-                    # Xác định các mã trùng và không trùng
-                    matching_codes = base_product_codes.intersection(comp_product_codes)
-                    non_matching_codes = comp_product_codes - base_product_codes
-                    
-                    # Thêm vào tập hợp mã trùng để làm báo cáo tổng hợp
-                    all_matches.update(matching_codes)
-                    
-                    # Tạo tên sheet từ tên file
-                    file_name = os.path.splitext(os.path.basename(comp_file))[0]
-                    sheet_name = clean_sheet_name(file_name)
+                    # Tra cứu vectorized: dòng nào của file so sánh có mã trong file cơ sở
+                    in_base = membership[code_ids[file_idx], 0]
+                    comp_codes_in_file = membership[:, file_idx]
+                    comp_code_count = int(comp_codes_in_file.sum())
+                    matching_count = int((comp_codes_in_file & membership[:, 0]).sum())
                     
                     # Cập nhật dữ liệu tổng quan
                     summary_data['File so sánh'].append(file_name)
-                    summary_data['Tổng số mã trong File cơ sở'].append(len(base_product_codes))
-                    summary_data['Tổng số mã trong File so sánh'].append(len(comp_product_codes))
-                    summary_data['Số mã trùng'].append(len(matching_codes))
-                    summary_data['Số mã không trùng'].append(len(non_matching_codes))
+                    summary_data['Tổng số mã trong File cơ sở'].append(base_code_count)
+                    summary_data['Tổng số mã trong File so sánh'].append(comp_code_count)
+                    summary_data['Số mã trùng'].append(matching_count)
+                    summary_data['Số mã không trùng'].append(comp_code_count - matching_count)
                     
-                    # Tạo DataFrame cho mã trùng và không trùng
-                    matching_df = comp_df[comp_df[comp_code_col].isin(matching_codes)].copy()
-                    non_matching_df = comp_df[comp_df[comp_code_col].isin(non_matching_codes)].copy()
+                    # Tạo DataFrame cho mã trùng và không trùng, sắp xếp theo cột mã sản phẩm
+                    matching_df = comp_df[in_base].sort_values(by=comp_code_col)
+                    non_matching_df = comp_df[~in_base].sort_values(by=comp_code_col)
                     
-                    # Tạo sheet cho file so sánh hiện tại
-                    # Sắp xếp dữ liệu theo cột mã sản phẩm
-                    matching_df = matching_df.sort_values(by=comp_code_col)
-                    non_matching_df = non_matching_df.sort_values(by=comp_code_col)
+                    # Tìm mã gần đúng trong file cơ sở cho các mã không trùng
+                    if fuzzy_threshold is not None:
+                        matching_df = matching_df.assign(**{
+                            'Mã khớp': matching_df[comp_code_col], 'Điểm khớp': 1.0, 'Phương thức khớp': METHOD_EXACT
+                        })
+                        fuzzy_df = match_codes(non_matching_df[comp_code_col].unique(), None,
+                                               threshold=fuzzy_threshold, index=base_index)
+                        fuzzy_df = fuzzy_df.set_index('Mã nguồn')
+                        non_matching_df = non_matching_df.join(fuzzy_df, on=comp_code_col)
+                        summary_data['Số mã khớp gần đúng'].append(int((fuzzy_df['Mã khớp'] != '').sum()))
                     
-                    # Ghi dữ liệu vào sheet
-                    row_pos = 0
+                    sheet_name = unique_sheet_name(file_name, used_sheet_names)
+                    worksheet = workbook.add_worksheet(sheet_name)
+                    set_column_widths(worksheet, non_matching_df if fuzzy_threshold is not None else comp_df)
                     
-                    # Tiêu đề cho bảng mã trùng
-                    worksheet = writer.sheets[sheet_name] if sheet_name in writer.sheets else writer.book.add_worksheet(sheet_name)
-                    
-                    # Tiêu đề cho bảng mã trùng
-                    worksheet.write(row_pos, 0, "DANH SÁCH MÃ TRÙNG")
+                    row_pos = 0
+                    worksheet.write(row_pos, 0, "DANH SÁCH MÃ TRÙNG", formats['title'])
                     row_pos += 1
-                    
-                    # Ghi dữ liệu mã trùng
                     if not matching_df.empty:
-                        matching_df.to_excel(writer, sheet_name=sheet_name, startrow=row_pos, index=False)
-                        row_pos += len(matching_df) + 2  # +2 cho header và khoảng trống
+                        row_pos = write_dataframe_rows(worksheet, matching_df, row_pos, formats['header'], formats['match'])
+                        row_pos += 1  # khoảng trống
                     else:
                         worksheet.write(row_pos, 0, "Không có mã trùng")
                         row_pos += 2
                     
-                    # Tiêu đề cho bảng mã không trùng
-                    worksheet.write(row_pos, 0, "DANH SÁCH MÃ KHÔNG TRÙNG")
+                    worksheet.write(row_pos, 0, "DANH SÁCH MÃ KHÔNG TRÙNG", formats['title'])
                     row_pos += 1
-                    
-                    # Ghi dữ liệu mã không trùng
                     if not non_matching_df.empty:
-                        non_matching_df.to_excel(writer, sheet_name=sheet_name, startrow=row_pos, index=False)
+                        write_dataframe_rows(worksheet, non_matching_df, row_pos, formats['header'], formats['non_match'])
                     else:
                         worksheet.write(row_pos, 0, "Không có mã không trùng")
                     
-                    # Định dạng màu sắc nếu được yêu cầu
-                    if colorize:
-                        format_sheet_colors(writer, worksheet, matching_df, non_matching_df, row_pos)
-                    
-                    # Tự động điều chỉnh chiều rộng cột
-                    for idx, col in enumerate(comp_df.columns):
-                        # +2 cho khoảng trống đệm
-                        max_len = max(
-                            comp_df[col].astype(str).str.len().max() if len(comp_df) > 0 else 0,
-                            len(str(col))
-                        ) + 2
-                        worksheet.set_column(idx, idx, max_len)
-                    
-                    logger.info(f"Đã tạo sheet {sheet_name} với {len(matching_df)} mã trùng và {len(non_matching_df)} mã không trùng")
+                    logger.info(f"Đã tạo sheet {sheet_name} với {len(matching_df)} dòng trùng và {len(non_matching_df)} dòng không trùng")
                     
                 except Exception as e:
                     logger.error(f"Lỗi khi xử lý file {comp_file}: {str(e)}")
@@ -144,32 +164,23 @@ def compare_products_multi(base_file: str, comparison_files: List[str],
             
             # Tạo sheet tổng quan
             summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='Tổng quan', index=False)
-            
-            # Định dạng sheet tổng quan
-            worksheet = writer.sheets['Tổng quan']
-            for idx, col in enumerate(summary_df.columns):
-                max_width = max(
-                    summary_df[col].astype(str).str.len().max(),
-                    len(col)
-                ) + 2
-                worksheet.set_column(idx, idx, max_width)
+            worksheet = workbook.add_worksheet('Tổng quan')
+            set_column_widths(worksheet, summary_df)
+            write_dataframe_rows(worksheet, summary_df, 0, formats['header'])
             
             # Tạo sheet tổng hợp mã trùng nếu được yêu cầu
-            if export_summary and all_matches:
-                # Tạo DataFrame chỉ với các mã trùng từ file cơ sở
-                summary_matches_df = base_df[base_df[base_code_col].isin(all_matches)].copy()
-                summary_matches_df = summary_matches_df.sort_values(by=base_code_col)
-                summary_matches_df.to_excel(writer, sheet_name='Tổng hợp mã trùng', index=False)
-                
-                # Định dạng sheet
-                worksheet = writer.sheets['Tổng hợp mã trùng']
-                for idx, col in enumerate(summary_matches_df.columns):
-                    max_width = max(
-                        summary_matches_df[col].astype(str).str.len().max() if len(summary_matches_df) > 0 else 0,
-                        len(col)
-                    ) + 2
-                    worksheet.set_column(idx, idx, max_width)
+            if export_summary and base_in_comp.any():
+                # Chỉ lấy các dòng của file cơ sở có mã xuất hiện trong ít nhất một file so sánh
+                summary_matches_df = base_df[base_in_comp[code_ids[0]]].sort_values(by=base_code_col)
+                worksheet = workbook.add_worksheet('Tổng hợp mã trùng')
+                set_column_widths(worksheet, summary_matches_df)
+                write_dataframe_rows(worksheet, summary_matches_df, 0, formats['header'])
+            
+            # Xuất ma trận mã x file
+            if export_matrix and comparison_files:
+                base_label = os.path.splitext(os.path.basename(base_file))[0]
+                export_membership_matrix(workbook, output_path, unique_codes, membership,
+                                         [base_label] + file_labels, formats['header'])
                 
         logger.info(f"Đã tạo báo cáo so sánh thành công: {output_path}")
         return output_path
@@ -179,6 +190,145 @@ def compare_products_multi(base_file: str, comparison_files: List[str],
         logger.error(traceback.format_exc())
         raise Exception(f"Lỗi khi so sánh sản phẩm: {str(e)}")
 
+def _read_product_file_safe(args: Tuple[str, Optional[str]]) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Đọc một file sản phẩm, trả về (None, None) nếu lỗi (dùng được trong process pool).
+    """
+    file_path, comparison_column = args
+    try:
+        return read_product_file(file_path, comparison_column)
+    except Exception as e:
+        logger.error(f"Lỗi khi đọc file {file_path}: {str(e)}")
+        return None, None
+
+def load_product_files(file_paths: List[str], comparison_column: str = None,
+                       max_workers: Optional[int] = None) -> List[Tuple[Optional[pd.DataFrame], Optional[str]]]:
+    """
+    Đọc nhiều file sản phẩm, mỗi file một lần, song song bằng process pool.
+    
+    Args:
+        file_paths: Danh sách đường dẫn file
+        comparison_column: Tên cột dùng để so sánh (tùy chọn)
+        max_workers: Số tiến trình tối đa (mặc định: min(số CPU, số file), 1 để đọc tuần tự)
+        
+    Returns:
+        Danh sách (DataFrame, tên cột mã) theo đúng thứ tự file_paths; (None, None) nếu file lỗi
+    """
+    tasks = [(path, comparison_column) for path in file_paths]
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(tasks))
+    
+    if max_workers > 1 and len(tasks) > 1:
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(_read_product_file_safe, tasks))
+        except Exception as e:
+            # Process pool có thể không khả dụng (môi trường hạn chế, eventlet...), đọc tuần tự
+            logger.warning(f"Không thể đọc file song song ({str(e)}), chuyển sang đọc tuần tự")
+    
+    return [_read_product_file_safe(task) for task in tasks]
+
+def build_membership_matrix(code_series: List[pd.Series]) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray]:
+    """
+    Dựng ma trận thành viên mã sản phẩm x file trong một lượt.
+    
+    Args:
+        code_series: Danh sách Series mã sản phẩm (đã chuẩn hóa), mỗi phần tử ứng với một file
+        
+    Returns:
+        Tuple gồm:
+            - danh sách mảng id mã cho từng dòng của từng file
+            - mảng các mã duy nhất (id -> mã)
+            - ma trận bool kích thước (số mã duy nhất, số file)
+    """
+    lengths = [len(s) for s in code_series]
+    if sum(lengths):
+        all_codes = np.concatenate([s.astype(str).to_numpy() for s in code_series])
+    else:
+        all_codes = np.array([], dtype=object)
+    ids, unique_codes = pd.factorize(all_codes)
+    
+    file_index = np.repeat(np.arange(len(code_series)), lengths)
+    membership = np.zeros((len(unique_codes), len(code_series)), dtype=bool)
+    membership[ids, file_index] = True
+    
+    code_ids = np.split(ids, np.cumsum(lengths)[:-1]) if code_series else []
+    return code_ids, np.asarray(unique_codes), membership
+
+def unique_sheet_name(name: str, used_names: Set[str]) -> str:
+    """
+    Tạo tên sheet hợp lệ và không trùng với các sheet đã có.
+    
+    Args:
+        name: Tên gốc
+        used_names: Tập các tên sheet đã dùng (sẽ được cập nhật)
+        
+    Returns:
+        Tên sheet duy nhất (tối đa 31 ký tự)
+    """
+    base_name = clean_sheet_name(name) or 'Sheet'
+    candidate = base_name
+    counter = 2
+    while candidate.lower() in {n.lower() for n in used_names}:
+        suffix = f"_{counter}"
+        candidate = base_name[:31 - len(suffix)] + suffix
+        counter += 1
+    used_names.add(candidate)
+    return candidate
+
+def set_column_widths(worksheet, df: pd.DataFrame, max_width: int = 60):
+    """
+    Đặt chiều rộng cột theo nội dung dài nhất (tính vectorized, trước khi ghi dữ liệu).
+    """
+    for idx, col in enumerate(df.columns):
+        content_len = df[col].astype(str).str.len().max() if len(df) > 0 else 0
+        width = max(int(content_len) if pd.notna(content_len) else 0, len(str(col))) + 2
+        worksheet.set_column(idx, idx, min(width, max_width))
+
+def write_dataframe_rows(worksheet, df: pd.DataFrame, start_row: int, header_format=None, row_format=None) -> int:
+    """
+    Ghi DataFrame (kèm header) theo từng dòng, tương thích chế độ constant_memory.
+    
+    Args:
+        worksheet: Worksheet xlsxwriter
+        df: Dữ liệu cần ghi
+        start_row: Dòng bắt đầu (header)
+        header_format: Định dạng cho header
+        row_format: Định dạng áp dụng cho mỗi dòng dữ liệu
+        
+    Returns:
+        Vị trí dòng kế tiếp sau dữ liệu
+    """
+    worksheet.write_row(start_row, 0, [str(c) for c in df.columns], header_format)
+    row = start_row + 1
+    # NaN không ghi được vào Excel, thay bằng chuỗi rỗng
+    values = df.astype(object).where(df.notna(), '')
+    for record in values.itertuples(index=False, name=None):
+        worksheet.write_row(row, 0, record, row_format)
+        row += 1
+    return row
+
+def export_membership_matrix(workbook, output_path: str, unique_codes: np.ndarray,
+                             membership: np.ndarray, file_labels: List[str], header_format=None):
+    """
+    Xuất ma trận mã x file. Ghi vào sheet 'Ma trận mã' nếu vừa giới hạn dòng của Excel,
+    nếu không thì ghi ra file CSV cạnh file kết quả.
+    """
+    matrix_df = pd.DataFrame(np.where(membership, 'x', ''), columns=file_labels)
+    matrix_df.insert(0, 'Mã sản phẩm', unique_codes)
+    matrix_df['Số file'] = membership.sum(axis=1)
+    matrix_df = matrix_df.sort_values(by=['Số file', 'Mã sản phẩm'], ascending=[False, True])
+    
+    if len(matrix_df) + 1 <= EXCEL_MAX_ROWS:
+        worksheet = workbook.add_worksheet('Ma trận mã')
+        worksheet.set_column(0, 0, 25)
+        worksheet.set_column(1, len(file_labels) + 1, 12)
+        write_dataframe_rows(worksheet, matrix_df, 0, header_format)
+    else:
+        csv_path = os.path.splitext(output_path)[0] + '_ma_tran.csv'
+        matrix_df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        logger.info(f"Ma trận mã có {len(matrix_df)} dòng, vượt giới hạn Excel - đã lưu ra {csv_path}")
+
 def read_product_file(file_path: str, comparison_column: str = None) -> Tuple[pd.DataFrame, str]:
     """
     Đọc file Excel/CSV chứa dữ liệu sản phẩm và trả về DataFrame và tên cột mã sản phẩm.
@@ -302,17 +452,14 @@ def select_files_gui() -> Tuple[str, List[str], str, str]:
         
         # Chọn các file so sánh (File 2, 3, ...)
         comparison_files = filedialog.askopenfilenames(
-            title="Chọn các file để so sánh (tối đa 10 file)",
+            title="Chọn các file để so sánh",
             filetypes=[("Excel files", "*.xlsx *.xls"), ("CSV files", "*.csv"), ("All files", "*.*")]
         )
         
         if not comparison_files:
             return None, None, None, None
         
-        # Giới hạn số file so sánh
         comparison_files = list(comparison_files)
-        if len(comparison_files) > 10:
-            comparison_files = comparison_files[:10]
         
         # Tạo cửa sổ nhập cột so sánh
         comp_column_window = tk.Toplevel(root)
@@ -395,8 +542,8 @@ def main():
                 print(f"File không tồn tại: {base_file}")
                 return
             
-            print("Nhập đường dẫn đến các file so sánh (tối đa 10 file, nhập 'done' để kết thúc):")
-            while len(comparison_files) < 10:
+            print("Nhập đường dẫn đến các file so sánh (nhập 'done' để kết thúc):")
+            while True:
                 file_path = input(f"File so sánh {len(comparison_files) + 1} (hoặc 'done'): ")
                 if file_path.lower() == 'done':
                     break
@@ -455,7 +602,7 @@ def compare_product_codes(file1_path, file2_paths, output_dir=None, categorize_r
         output_dir (str, optional): Thư mục để lưu báo cáo Excel
         categorize_results (bool, optional): Có phân loại kết quả theo danh mục hay không
         *args: Các tham số bổ sung
-        **kwargs: Các tham số bổ sung dạng key-value
+        **kwargs: Các tham số bổ sung dạng key-value (fuzzy_threshold: ngưỡng khớp gần đúng)
         
     Returns:
         str hoặc dict: Đường dẫn đến file báo cáo Excel nếu thành công, dictionary với thông tin lỗi nếu thất bại
@@ -478,7 +625,8 @@ def compare_product_codes(file1_path, file2_paths, output_dir=None, categorize_r
             output_path=output_path,
             comparison_column=column_name,  # Sử dụng cột B
             colorize=True,
-            export_summary=True
+            export_summary=True,
+            fuzzy_threshold=kwargs.get('fuzzy_threshold')
         )
         
         return result
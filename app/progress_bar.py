@@ -5,6 +5,10 @@ from datetime import datetime, timedelta
 from functools import wraps
 from typing import Optional, Callable, Any, Dict, List
 import os
+from app.progress_reporter import ProgressReporter
+
+# Số lần in tiến trình tối đa mỗi giây cho mỗi thanh tiến trình
+TERMINAL_MAX_HZ = 2
 
 # ANSI color codes
 class Colors:
@@ -59,6 +63,8 @@ class TerminalProgressBar:
         self.children: List['TerminalProgressBar'] = []
         self.completed = False
         self.result_summary = {}
+        # Gộp cập nhật: in ngay nếu đã hết khoảng chờ, nếu không in trạng thái mới nhất khi hết khoảng chờ
+        self._reporter = ProgressReporter(self._render_progress, max_hz=TERMINAL_MAX_HZ, room=name)
         
         # Thống kê global
         with self._lock:
@@ -93,12 +99,17 @@ class TerminalProgressBar:
         self.current_step = min(step, self.total_steps)
         self.message = message
         self.details = details
-        current_time = time.time()
         
-        # Chỉ in nếu đã qua ít nhất 0.5 giây hoặc force_print
-        if force_print or (current_time - self.last_update_time) >= 0.5:
-            self._print_progress()
-            self.last_update_time = current_time
+        # Tối đa TERMINAL_MAX_HZ lần/giây, trạng thái cuối không bị bỏ mất; force_print in ngay
+        percent = (self.current_step / self.total_steps) * 100 if self.total_steps else 100
+        self._reporter.update(percent, message, details, force=force_print)
+    
+    def _render_progress(self, event, data):
+        """In trạng thái hiện tại khi reporter phát (ngay hoặc khi hết khoảng chờ)"""
+        if self.completed:
+            return
+        self._print_progress()
+        self.last_update_time = time.time()
     
     def _print_progress(self):
         """In thanh tiến trình hiện tại"""
@@ -160,6 +171,7 @@ class TerminalProgressBar:
                  message: str = "", 
                  summary: Dict[str, Any] = None):
         """Hoàn thành tiến trình"""
+        self._reporter.cancel()
         self.current_step = self.total_steps
         self.status = status
         self.message = message or f"Hoàn thành {self.name}"
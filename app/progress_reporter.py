@@ -0,0 +1,473 @@
+import os
+import re
+import time
+import heapq
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVENT = 'progress_update'
+
+# Số lần phát tiến trình tối đa mỗi giây cho mỗi job (CRAWLER_PROGRESS_HZ để đổi)
+ENV_MAX_HZ = 'CRAWLER_PROGRESS_HZ'
+DEFAULT_MAX_HZ = 4.0
+
+# Client gửi kèm mã job (form/query/JSON hoặc header) để sự kiện chỉ phát vào room của job đó
+JOB_ID_FIELD = 'job_id'
+JOB_ID_HEADER = 'X-Job-Id'
+_JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_\-]{1,64}$')
+JOB_ROOM_PREFIX = 'job:'
+
+# Số sự kiện gần nhất giữ lại để phát lại cho client kết nối lại (CRAWLER_PROGRESS_REPLAY để đổi)
+ENV_REPLAY_SIZE = 'CRAWLER_PROGRESS_REPLAY'
+DEFAULT_REPLAY_SIZE = 50
+
+# Số job gần nhất giữ reporter (kể cả job đã xong) để client kết nối lại vẫn nhận được kết quả
+MAX_RECENT_JOBS = 64
+
+# Các giai đoạn chuẩn của một lần cào; mỗi giai đoạn báo tiến trình riêng trong trường 'stages'
+STAGE_LISTING = 'listing'
+STAGE_DETAIL = 'detail'
+STAGE_IMAGES = 'images'
+STAGE_EXPORT = 'export'
+STAGES = (STAGE_LISTING, STAGE_DETAIL, STAGE_IMAGES, STAGE_EXPORT)
+
+
+def default_max_hz():
+    """Tần suất phát tối đa mặc định (lần/giây), đọc từ CRAWLER_PROGRESS_HZ"""
+    try:
+        return float(os.environ.get(ENV_MAX_HZ, DEFAULT_MAX_HZ))
+    except ValueError:
+        return DEFAULT_MAX_HZ
+
+
+def default_replay_size():
+    """Số sự kiện giữ lại để phát lại mỗi job, đọc từ CRAWLER_PROGRESS_REPLAY"""
+    try:
+        return max(0, int(os.environ.get(ENV_REPLAY_SIZE, DEFAULT_REPLAY_SIZE)))
+    except ValueError:
+        return DEFAULT_REPLAY_SIZE
+
+
+def job_room(job_id):
+    """Tên room Socket.IO của job"""
+    return f'{JOB_ROOM_PREFIX}{job_id}'
+
+
+def valid_job_id(job_id):
+    """Mã job hợp lệ (chữ, số, '-', '_', tối đa 64 ký tự)"""
+    return isinstance(job_id, str) and bool(_JOB_ID_PATTERN.match(job_id))
+
+
+class _Flusher:
+    """
+    Một luồng nền dùng chung phát nốt trạng thái mới nhất của các reporter
+    đang bị giới hạn tần suất, đúng lúc hết khoảng chờ của từng reporter.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, reporter, due):
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._seq), reporter))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='progress-flusher', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                due, _, reporter = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+            try:
+                reporter._flush_scheduled()
+            except Exception as e:
+                logger.debug(f"Lỗi khi phát tiến trình trễ: {e}")
+
+
+_flusher = _Flusher()
+
+
+class ProgressReporter:
+    """
+    Gộp các cập nhật tiến trình của một job và phát tối đa ``max_hz`` lần mỗi giây.
+
+    Cập nhật đầu tiên sau mỗi khoảng chờ được phát ngay; các cập nhật đến trong
+    khoảng chờ chỉ giữ lại trạng thái mới nhất và được phát khi hết khoảng chờ.
+    Mốc 100%, tiến trình lùi (lỗi/bắt đầu lại) và ``force=True`` luôn phát ngay.
+    Các sự kiện khác (crawler_completed, crawler_error...) không bị gộp, nhưng
+    trạng thái tiến trình đang chờ được phát trước để giữ đúng thứ tự.
+
+    Với job có mã (``job_id``), mỗi sự kiện được gắn ``job_id`` và số thứ tự ``seq``
+    tăng dần, và ``replay_size`` sự kiện gần nhất được giữ lại để phát lại cho client
+    kết nối lại. Cập nhật có trường ``stage`` (listing, detail, images, export...) được
+    gộp theo từng giai đoạn: mỗi lần phát kèm ``stages`` là trạng thái mới nhất của mọi
+    giai đoạn, nên các giai đoạn chạy song song không che mất nhau khi bị gộp.
+    """
+
+    def __init__(self, send, max_hz=None, room=None, job_id=None, replay_size=0):
+        """
+        Args:
+            send: Hàm send(event, data) thực sự phát sự kiện
+            max_hz: Số lần phát tối đa mỗi giây (mặc định CRAWLER_PROGRESS_HZ, <= 0 để không giới hạn)
+            room: Room Socket.IO của job (chỉ để tham chiếu/log)
+            job_id: Mã job gắn vào mỗi sự kiện (None: không gắn mã/seq)
+            replay_size: Số sự kiện gần nhất giữ lại để phát lại
+        """
+        max_hz = default_max_hz() if max_hz is None else max_hz
+        self.interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self.room = room
+        self.job_id = job_id
+        self._send = send
+        # Phát trong khóa để các sự kiện của cùng một job giữ đúng thứ tự
+        self._lock = threading.RLock()
+        self._pending = None
+        self._scheduled = False
+        self._last_emit = None
+        self._last_percent = None
+        self._seq = 0
+        self._history = deque(maxlen=replay_size) if replay_size else None
+        self._stages = {}
+        self.stats = {'updates': 0, 'emitted': 0}
+
+    def update(self, percent, message='', detail='', force=False, stage=None, stage_percent=None, **extra):
+        """
+        Cập nhật tiến trình
+
+        Args:
+            percent: Phần trăm hoàn thành (0-100)
+            message: Thông báo chính
+            detail: Thông tin chi tiết
+            force: Phát ngay, bỏ qua giới hạn tần suất
+            stage: Giai đoạn của cập nhật (STAGE_LISTING, STAGE_DETAIL...)
+            stage_percent: Phần trăm hoàn thành của riêng giai đoạn đó
+            **extra: Các trường bổ sung gửi kèm
+        """
+        data = {'percent': percent, 'message': message, 'detail': detail}
+        if stage:
+            data['stage'] = stage
+            data['stage_percent'] = stage_percent
+        data.update(extra)
+        self.publish(data, force=force)
+
+    def publish(self, data, force=False):
+        """
+        Cập nhật tiến trình từ dict dữ liệu sẵn có (cùng định dạng sự kiện progress_update)
+
+        Args:
+            data: Dữ liệu tiến trình ({'percent', 'message', 'detail', ...})
+            force: Phát ngay, bỏ qua giới hạn tần suất
+        """
+        with self._lock:
+            self.stats['updates'] += 1
+            if data.get('stage'):
+                self._stages[data['stage']] = {
+                    'percent': data.get('stage_percent'),
+                    'message': data.get('message', ''),
+                }
+            now = time.monotonic()
+            if force or self._is_milestone(data) or self._last_emit is None \
+                    or now - self._last_emit >= self.interval:
+                self._pending = None
+                self._deliver(PROGRESS_EVENT, data, now)
+                return
+            self._pending = data
+            if not self._scheduled:
+                self._scheduled = True
+                _flusher.schedule(self, self._last_emit + self.interval)
+
+    def emit(self, event, data=None, **kwargs):
+        """
+        Phát sự kiện vào room của job, tương thích với socketio.emit(event, data).
+        Sự kiện progress_update được gộp như update(), các sự kiện khác phát ngay.
+        """
+        if event == PROGRESS_EVENT:
+            self.publish(data or {})
+            return
+        with self._lock:
+            self._flush_locked()
+            self._deliver(event, data, time.monotonic())
+
+    def flush(self):
+        """Phát ngay trạng thái tiến trình đang chờ (nếu có)"""
+        with self._lock:
+            self._flush_locked()
+
+    def cancel(self):
+        """Bỏ trạng thái tiến trình đang chờ chưa phát"""
+        with self._lock:
+            self._pending = None
+
+    def replay(self, send, after_seq=0, before=None):
+        """
+        Phát lại các sự kiện đã lưu có seq > after_seq
+
+        Args:
+            send: Hàm send(event, data) tới client cần phát lại
+            after_seq: seq lớn nhất client đã nhận
+            before: Hàm gọi trước khi phát lại (ví dụ join_room); chạy cùng khóa phát
+                nên sự kiện mới không lọt vào giữa hoặc bị mất
+
+        Returns:
+            int: Số sự kiện đã phát lại
+        """
+        with self._lock:
+            if before:
+                before()
+            events = [(event, payload) for seq, event, payload in (self._history or ()) if seq > after_seq]
+            for event, payload in events:
+                send(event, payload)
+            return len(events)
+
+    @property
+    def coalesced(self):
+        """Số cập nhật đã được gộp (không phải phát riêng)"""
+        return self.stats['updates'] - self.stats['emitted']
+
+    def _is_milestone(self, data):
+        percent = data.get('percent')
+        if not isinstance(percent, (int, float)):
+            return False
+        return percent >= 100 or (self._last_percent is not None and percent < self._last_percent)
+
+    def _flush_scheduled(self):
+        with self._lock:
+            self._scheduled = False
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending is not None:
+            data, self._pending = self._pending, None
+            self._deliver(PROGRESS_EVENT, data, time.monotonic())
+
+    def _deliver(self, event, data, now):
+        if event == PROGRESS_EVENT:
+            self._last_emit = now
+            percent = data.get('percent')
+            if isinstance(percent, (int, float)):
+                self._last_percent = percent
+            self.stats['emitted'] += 1
+            if self._stages:
+                data = dict(data, stages={name: dict(state) for name, state in self._stages.items()})
+        if self.job_id is not None:
+            self._seq += 1
+            data = dict(data or {}, job_id=self.job_id, seq=self._seq)
+            if self._history is not None:
+                self._history.append((self._seq, event, data))
+        try:
+            self._send(event, data)
+        except Exception as e:
+            logger.debug(f"Lỗi khi phát sự kiện {event} (room={self.room}): {e}")
+
+
+def socket_reporter(socketio, job_id=None, max_hz=None, replay_size=None):
+    """
+    Tạo reporter phát qua Socket.IO vào room của job (None: phát cho mọi client như trước)
+
+    Args:
+        socketio: Đối tượng SocketIO
+        job_id: Mã job
+        max_hz: Số lần phát tối đa mỗi giây
+        replay_size: Số sự kiện giữ lại để phát lại (mặc định CRAWLER_PROGRESS_REPLAY)
+
+    Returns:
+        ProgressReporter: Reporter của job
+    """
+    room = job_room(job_id) if job_id is not None else None
+    if job_id is None:
+        replay_size = 0
+    elif replay_size is None:
+        replay_size = default_replay_size()
+
+    def send(event, data):
+        socketio.emit(event, data, to=room)
+    return ProgressReporter(send, max_hz=max_hz, room=room, job_id=job_id, replay_size=replay_size)
+
+
+# ======= REPORTER THEO JOB =======
+
+# Mọi nơi phát tiến trình cho cùng một job dùng chung một reporter để việc gộp có hiệu lực;
+# giữ MAX_RECENT_JOBS job gần nhất để client kết nối lại sau khi job xong vẫn được phát lại
+_job_reporters = OrderedDict()
+_broadcast_reporter = None
+_default_lock = threading.Lock()
+
+
+def get_job_reporter(job_id=None):
+    """
+    Reporter dùng chung của job (tạo khi cần)
+
+    Args:
+        job_id: Mã job/room; None để phát cho mọi client
+
+    Returns:
+        ProgressReporter: Reporter của job
+    """
+    global _broadcast_reporter
+    from app import socketio
+
+    with _default_lock:
+        if job_id is None:
+            if _broadcast_reporter is None:
+                _broadcast_reporter = socket_reporter(socketio)
+            return _broadcast_reporter
+        reporter = _job_reporters.get(job_id)
+        if reporter is None:
+            reporter = socket_reporter(socketio, job_id=job_id)
+            _job_reporters[job_id] = reporter
+            while len(_job_reporters) > MAX_RECENT_JOBS:
+                _job_reporters.popitem(last=False)
+        else:
+            _job_reporters.move_to_end(job_id)
+        return reporter
+
+
+def job_id_from_request(req):
+    """
+    Lấy mã job client gửi kèm request (form, query, JSON hoặc header X-Job-Id)
+
+    Args:
+        req: Đối tượng request của Flask
+
+    Returns:
+        str: Mã job hợp lệ, None nếu không có
+    """
+    job_id = req.values.get(JOB_ID_FIELD) or req.headers.get(JOB_ID_HEADER)
+    if not job_id and req.is_json:
+        payload = req.get_json(silent=True)
+        if isinstance(payload, dict):
+            job_id = payload.get(JOB_ID_FIELD)
+    return job_id if valid_job_id(job_id) else None
+
+
+def register_socket_handlers(socketio):
+    """
+    Đăng ký sự kiện Socket.IO cho kênh tiến trình theo job:
+
+    - ``join_job`` {job_id, after_seq}: vào room của job và nhận lại các sự kiện có
+      seq > after_seq (client gửi lại khi kết nối lại để không mất sự kiện)
+    - ``leave_job`` {job_id}: rời room của job
+
+    Args:
+        socketio: Đối tượng SocketIO
+    """
+    from flask_socketio import emit, join_room, leave_room
+
+    def on_join_job(data):
+        data = data if isinstance(data, dict) else {}
+        job_id = data.get(JOB_ID_FIELD)
+        if not valid_job_id(job_id):
+            return {'success': False, 'message': 'job_id không hợp lệ'}
+        try:
+            after_seq = int(data.get('after_seq') or 0)
+        except (TypeError, ValueError):
+            after_seq = 0
+        reporter = get_job_reporter(job_id)
+        replayed = reporter.replay(emit, after_seq, before=lambda: join_room(job_room(job_id)))
+        if replayed:
+            logger.debug(f"🔁 Phát lại {replayed} sự kiện cho job {job_id}")
+        return {'success': True, 'replayed': replayed}
+
+    def on_leave_job(data):
+        data = data if isinstance(data, dict) else {}
+        job_id = data.get(JOB_ID_FIELD)
+        if valid_job_id(job_id):
+            leave_room(job_room(job_id))
+
+    socketio.on_event('join_job', on_join_job)
+    socketio.on_event('leave_job', on_leave_job)
+
+
+# ======= REPORTER HIỆN TẠI CỦA LUỒNG =======
+
+_local = threading.local()
+
+
+def current_reporter():
+    """Reporter đang gắn với luồng hiện tại (mặc định: phát cho mọi client)"""
+    reporter = getattr(_local, 'reporter', None)
+    return reporter if reporter is not None else get_job_reporter(None)
+
+
+def push_reporter(reporter):
+    """
+    Gắn reporter cho luồng hiện tại
+
+    Returns:
+        Reporter trước đó, truyền lại cho pop_reporter()
+    """
+    previous = getattr(_local, 'reporter', None)
+    _local.reporter = reporter
+    return previous
+
+
+def pop_reporter(previous):
+    """Phát nốt trạng thái đang chờ và khôi phục reporter trước đó của luồng"""
+    reporter = getattr(_local, 'reporter', None)
+    _local.reporter = previous
+    if reporter is not None:
+        reporter.flush()
+
+
+def bind_current(func):
+    """
+    Bọc hàm chạy ở luồng khác (Thread, executor) để dùng reporter của luồng gọi
+
+    Args:
+        func: Hàm cần bọc
+
+    Returns:
+        Hàm đã bọc
+    """
+    reporter = current_reporter()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = push_reporter(reporter)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            pop_reporter(previous)
+    return wrapper
+
+
+def report_progress(data, force=False, stage=None, stage_percent=None):
+    """
+    Cập nhật tiến trình của job hiện tại (thay cho socketio.emit('progress_update', data))
+
+    Args:
+        data: Dữ liệu tiến trình ({'percent', 'message', 'detail', ...})
+        force: Phát ngay, bỏ qua giới hạn tần suất
+        stage: Giai đoạn của cập nhật (STAGE_LISTING, STAGE_DETAIL...)
+        stage_percent: Phần trăm hoàn thành của riêng giai đoạn đó
+    """
+    if stage:
+        data = dict(data, stage=stage, stage_percent=stage_percent)
+    current_reporter().publish(data, force=force)
+
+
+def report_event(event, data):
+    """
+    Phát sự kiện không phải tiến trình (crawler_completed, crawler_error...) vào room
+    của job hiện tại, sau khi phát nốt tiến trình đang chờ
+
+    Args:
+        event: Tên sự kiện
+        data: Dữ liệu sự kiện
+    """
+    current_reporter().emit(event, data)
@@ -8,23 +8,63 @@ import subprocess
 import sys
 import shutil
 import time
+import queue
+import tempfile
+import threading
+import concurrent.futures
+from concurrent.futures import Future
+
+from app.image_normalize import prepare_image
+from app.metrics import track_queue
+
+logger = logging.getLogger(__name__)
+
+# Số ảnh tối đa mỗi lần gọi Real-ESRGAN ở chế độ thư mục (mô hình chỉ nạp một lần cho cả lô)
+REALESRGAN_BATCH_SIZE = 64
+# Dưới ngưỡng này resize CPU ngay trong tiến trình hiện tại (không đáng khởi động process pool)
+MIN_PARALLEL_RESIZE = 4
+# Ảnh đầu ra nhỏ hơn ngưỡng này coi như Real-ESRGAN xử lý lỗi
+MIN_OUTPUT_BYTES = 1024
+
+
+def _cpu_upscale_task(task):
+    """
+    Xử lý một ảnh bằng phương pháp CPU (chạy trong process pool)
+
+    Args:
+        task: (ảnh đầu vào, ảnh đầu ra, scale, target_size)
+
+    Returns:
+        str: Đường dẫn ảnh đã xử lý
+    """
+    input_path, output_path, scale, target_size = task
+    resizer = ImageResizer(use_realesrgan=False)
+    if target_size:
+        return resizer._resize_to_target_size(input_path, output_path, target_size)
+    return resizer._enhanced_resize(input_path, output_path, scale)
+
 
 class ImageResizer:
     """
     Class xử lý việc tăng kích thước ảnh sử dụng các phương pháp nâng cao chất lượng ảnh.
     """
     
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
+    def __init__(self, use_realesrgan=True):
+        """
+        Args:
+            use_realesrgan: False để chỉ dùng phương pháp CPU (không tìm Real-ESRGAN)
+        """
+        self.logger = logger
         self.logger.setLevel(logging.INFO)
-        # Thiết lập logger
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        # Thiết lập logger (chỉ một lần, tránh log lặp khi tạo nhiều ImageResizer)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            self.logger.addHandler(handler)
         
         # Kiểm tra xem Real-ESRGAN executable có tồn tại không
-        self.realesrgan_available = self._check_realesrgan_available()
+        self.realesrgan_available = self._check_realesrgan_available() if use_realesrgan else False
     
     def _check_realesrgan_available(self):
         """Kiểm tra xem Real-ESRGAN executable có khả dụng không"""
@@ -63,22 +103,7 @@ class ImageResizer:
         if not os.path.exists(input_path):
             raise FileNotFoundError(f"Không tìm thấy ảnh: {input_path}")
         
-        # Nếu không có đường dẫn đầu ra, tạo một với định dạng .webp
-        if output_path is None:
-            input_filename = os.path.basename(input_path)
-            input_name = os.path.splitext(input_filename)[0]
-            if target_size:
-                output_path = os.path.join(os.path.dirname(input_path), f"{input_name}_enhanced_{target_size[0]}x{target_size[1]}.webp")
-            else:
-                output_path = os.path.join(os.path.dirname(input_path), f"{input_name}_upscaled_{scale}x.webp")
-        
-        # Kiểm tra và đổi định dạng đầu ra thành .webp nếu cần
-        output_ext = os.path.splitext(output_path)[1].lower()
-        if output_ext != '.webp':
-            output_path = os.path.splitext(output_path)[0] + '.webp'
-        
-        # Đường dẫn đầu ra tuyệt đối
-        output_path = os.path.abspath(output_path)
+        output_path = self._resolve_output_path(input_path, output_path, scale, target_size)
         
         self.logger.info(f"Đang xử lý ảnh: {input_path}")
         
@@ -121,6 +146,219 @@ class ImageResizer:
             self.logger.info(f"Tỷ lệ phóng to: {scale}x")
             return self._enhanced_resize(input_path, output_path, scale)
     
+    @staticmethod
+    def _resolve_output_path(input_path, output_path, scale, target_size):
+        """Đường dẫn đầu ra tuyệt đối, luôn có đuôi .webp"""
+        # Nếu không có đường dẫn đầu ra, tạo một với định dạng .webp
+        if output_path is None:
+            input_filename = os.path.basename(input_path)
+            input_name = os.path.splitext(input_filename)[0]
+            if target_size:
+                output_path = os.path.join(os.path.dirname(input_path), f"{input_name}_enhanced_{target_size[0]}x{target_size[1]}.webp")
+            else:
+                output_path = os.path.join(os.path.dirname(input_path), f"{input_name}_upscaled_{scale}x.webp")
+        
+        # Kiểm tra và đổi định dạng đầu ra thành .webp nếu cần
+        output_ext = os.path.splitext(output_path)[1].lower()
+        if output_ext != '.webp':
+            output_path = os.path.splitext(output_path)[0] + '.webp'
+        
+        # Đường dẫn đầu ra tuyệt đối
+        return os.path.abspath(output_path)
+    
+    def upscale_batch(self, input_paths, output_paths=None, scale=2, target_size=(600, 600),
+                      on_result=None, max_workers=None):
+        """
+        Xử lý nhiều ảnh trong một lượt.
+        
+        Với Real-ESRGAN, ảnh được gom thành lô tối đa REALESRGAN_BATCH_SIZE ảnh và
+        chạy executable một lần ở chế độ thư mục (-i thư_mục -o thư_mục), nên mô hình
+        chỉ nạp một lần cho cả lô thay vì mỗi ảnh một lần. Bước resize về kích thước
+        đích và phương pháp CPU thay thế chạy song song bằng process pool.
+        
+        Args:
+            input_paths: Danh sách đường dẫn ảnh đầu vào
+            output_paths: Danh sách đường dẫn đầu ra tương ứng (None = tự tạo tên file)
+            scale: Tỷ lệ phóng to - chỉ được sử dụng khi target_size là None
+            target_size: Kích thước đích (width, height)
+            on_result: Hàm gọi khi xong từng ảnh: on_result(input_path, output_path, error)
+            max_workers: Số tiến trình resize tối đa (mặc định: số CPU, 1 để chạy tuần tự)
+            
+        Returns:
+            dict: {ảnh đầu vào: ảnh đầu ra, None nếu lỗi}
+        """
+        input_paths = list(input_paths)
+        if output_paths is None:
+            output_paths = [None] * len(input_paths)
+        results = {}
+        
+        def finish(input_path, output_path, error=None):
+            results[input_path] = None if error else output_path
+            if error:
+                self.logger.error(f"❌ Lỗi khi xử lý ảnh {input_path}: {error}")
+            if on_result:
+                try:
+                    on_result(input_path, None if error else output_path, error)
+                except Exception as e:
+                    self.logger.warning(f"Lỗi trong callback kết quả upscale: {str(e)}")
+        
+        jobs = []
+        for input_path, output_path in zip(input_paths, output_paths):
+            if not os.path.exists(input_path):
+                finish(input_path, None, FileNotFoundError(f"Không tìm thấy ảnh: {input_path}"))
+                continue
+            jobs.append((input_path, self._resolve_output_path(input_path, output_path, scale, target_size)))
+        if not jobs:
+            return results
+        
+        self.logger.info(f"🖼️ Bắt đầu xử lý lô {len(jobs)} ảnh")
+        start_time = time.time()
+        
+        if self.realesrgan_available and target_size:
+            for offset in range(0, len(jobs), REALESRGAN_BATCH_SIZE):
+                chunk = jobs[offset:offset + REALESRGAN_BATCH_SIZE]
+                work_dir = tempfile.mkdtemp(prefix='temp_realesrgan_batch_')
+                try:
+                    upscaled = {}
+                    try:
+                        upscaled = self._upscale_dir_with_realesrgan([path for path, _ in chunk], work_dir)
+                    except Exception as e:
+                        self.logger.error(f"Lỗi khi sử dụng Real-ESRGAN cho lô {len(chunk)} ảnh: {str(e)}")
+                        self.logger.info("Chuyển sang phương pháp thay thế...")
+                    
+                    # Ảnh Real-ESRGAN xử lý được resize từ bản đã upscale, ảnh lỗi resize từ ảnh gốc
+                    tasks = [(upscaled.get(input_path, input_path), output_path, scale, target_size)
+                             for input_path, output_path in chunk]
+                    sources = {task[1]: input_path for task, (input_path, _) in zip(tasks, chunk)}
+                    
+                    def finish_chunk(task, output_path, error):
+                        input_path = sources[task[1]]
+                        if not error and task[0] != input_path and os.path.getsize(output_path) < MIN_OUTPUT_BYTES:
+                            # Ảnh đầu ra bất thường, xử lý lại từ ảnh gốc bằng phương pháp thay thế
+                            self.logger.warning(f"Ảnh đầu ra quá nhỏ, xử lý lại {input_path} bằng phương pháp thay thế")
+                            try:
+                                output_path = _cpu_upscale_task((input_path, task[1], scale, target_size))
+                            except Exception as e:
+                                error = e
+                        finish(input_path, output_path, error)
+                    
+                    self._run_cpu_tasks(tasks, finish_chunk, max_workers)
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            tasks = [(input_path, output_path, scale, target_size) for input_path, output_path in jobs]
+            self._run_cpu_tasks(tasks, lambda task, output_path, error: finish(task[0], output_path, error), max_workers)
+        
+        succeeded = sum(1 for path in results.values() if path)
+        self.logger.info(f"✅ Đã xử lý {succeeded}/{len(input_paths)} ảnh trong {time.time() - start_time:.1f}s")
+        return results
+    
+    def _run_cpu_tasks(self, tasks, on_done, max_workers=None):
+        """
+        Chạy các tác vụ resize CPU, song song bằng process pool khi đủ nhiều ảnh
+        
+        Args:
+            tasks: Danh sách (ảnh đầu vào, ảnh đầu ra, scale, target_size)
+            on_done: Hàm gọi khi xong từng tác vụ: on_done(task, output_path, error)
+            max_workers: Số tiến trình tối đa
+        """
+        if max_workers is None:
+            max_workers = min(os.cpu_count() or 1, len(tasks))
+        
+        remaining = list(tasks)
+        if max_workers > 1 and len(tasks) >= MIN_PARALLEL_RESIZE:
+            try:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {executor.submit(_cpu_upscale_task, task): task for task in tasks}
+                    for future in concurrent.futures.as_completed(futures):
+                        task = futures[future]
+                        try:
+                            output_path = future.result()
+                        except concurrent.futures.process.BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            on_done(task, None, e)
+                        else:
+                            on_done(task, output_path, None)
+                        remaining.remove(task)
+            except Exception as e:
+                # Process pool có thể không khả dụng (môi trường hạn chế, eventlet...), xử lý tuần tự
+                self.logger.warning(f"Không thể resize song song ({str(e)}), chuyển sang tuần tự")
+        
+        for task in remaining:
+            try:
+                output_path = _cpu_upscale_task(task)
+            except Exception as e:
+                on_done(task, None, e)
+            else:
+                on_done(task, output_path, None)
+    
+    def _upscale_dir_with_realesrgan(self, input_paths, work_dir, scale=4, model="realesrgan-x4plus"):
+        """
+        Upscale nhiều ảnh với một lần chạy Real-ESRGAN ở chế độ thư mục
+        
+        Args:
+            input_paths: Danh sách đường dẫn ảnh đầu vào
+            work_dir: Thư mục làm việc tạm (chứa ảnh PNG trung gian)
+            scale: Tỷ lệ phóng to (2, 3, 4)
+            model: Mô hình Real-ESRGAN sử dụng
+            
+        Returns:
+            dict: {ảnh đầu vào: ảnh PNG đã upscale} cho các ảnh xử lý thành công
+        """
+        if not self.realesrgan_available:
+            raise FileNotFoundError("Real-ESRGAN executable không khả dụng")
+        
+        input_dir = os.path.join(work_dir, 'input')
+        output_dir = os.path.join(work_dir, 'output')
+        os.makedirs(input_dir, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Chuẩn hóa tất cả ảnh sang PNG RGB với tên theo thứ tự (tránh trùng tên giữa các ảnh)
+        staged = {}
+        has_small_image = False
+        for index, input_path in enumerate(input_paths):
+            name = f"{index:05d}.png"
+            try:
+                with Image.open(input_path) as img:
+                    if img.width < 300 or img.height < 300:
+                        has_small_image = True
+                    if img.mode != 'RGB':
+                        img = img.convert('RGB')
+                    img.save(os.path.join(input_dir, name), format='PNG')
+                staged[name] = input_path
+            except Exception as e:
+                self.logger.error(f"Không thể chuẩn bị ảnh {input_path} cho Real-ESRGAN: {str(e)}")
+        if not staged:
+            return {}
+        
+        cmd = [
+            self.realesrgan_path,
+            "-i", input_dir,
+            "-o", output_dir,
+            "-s", str(scale),
+            "-n", model,
+            "-f", "png"
+        ]
+        if has_small_image:
+            cmd.extend(["-j", "3"])  # Tăng chất lượng xử lý
+        
+        self.logger.info(f"Thực hiện lệnh cho {len(staged)} ảnh: {' '.join(cmd)}")
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            self.logger.error(f"Lỗi khi chạy Real-ESRGAN: {result.stderr}")
+            raise RuntimeError(f"Real-ESRGAN thất bại với mã lỗi {result.returncode}: {result.stderr}")
+        
+        upscaled = {}
+        for name, input_path in staged.items():
+            output_path = os.path.join(output_dir, name)
+            if os.path.exists(output_path):
+                upscaled[input_path] = output_path
+            else:
+                self.logger.warning(f"Không tìm thấy ảnh đầu ra từ Real-ESRGAN cho {input_path}")
+        self.logger.info(f"Real-ESRGAN đã upscale {len(upscaled)}/{len(staged)} ảnh trong một lần chạy")
+        return upscaled
+    
     def _upscale_with_realesrgan(self, input_path, output_path, scale=4, model="realesrgan-x4plus"):
         """
         Sử dụng Real-ESRGAN executable để nâng cao chất lượng ảnh
@@ -246,12 +484,11 @@ class ImageResizer:
             # Đọc ảnh với PIL để hỗ trợ đa dạng định dạng (kể cả WebP)
             img_pil = Image.open(input_path)
             
-            # Đảm bảo ảnh ở chế độ RGB
-            if img_pil.mode != 'RGB':
-                img_pil = img_pil.convert('RGB')
-            
-            # Lấy kích thước gốc
+            # Lấy kích thước gốc (từ header, trước khi giải mã)
             orig_width, orig_height = img_pil.size
+            
+            # Giải mã thu nhỏ (draft/reduce) trong ngân sách bộ nhớ chung, đảm bảo ảnh ở chế độ RGB
+            img_pil = prepare_image(img_pil, target_size, mode='RGB')
             self.logger.info(f"Kích thước gốc: {orig_width}x{orig_height}")
             
             # Tính toán tỷ lệ khung hình
@@ -371,6 +608,141 @@ class ImageResizer:
             self.logger.error(f"Lỗi khi nâng cao chất lượng ảnh: {e}")
             raise
 
+class UpscaleQueue:
+    """
+    Hàng đợi upscale dùng chung: gom các yêu cầu gửi đến trong khoảng ``max_wait``
+    giây (kể cả từ nhiều request khác nhau) thành lô và xử lý bằng
+    ImageResizer.upscale_batch trên một luồng nền, nên Real-ESRGAN chỉ khởi động
+    một lần cho mỗi lô thay vì mỗi ảnh.
+    """
+    
+    def __init__(self, resizer=None, batch_size=REALESRGAN_BATCH_SIZE, max_wait=0.5, max_workers=None):
+        """
+        Args:
+            resizer (ImageResizer, optional): Bộ xử lý ảnh (mặc định tạo mới)
+            batch_size: Số ảnh tối đa mỗi lô
+            max_wait: Thời gian chờ gom thêm ảnh trước khi xử lý lô (giây)
+            max_workers: Số tiến trình resize CPU tối đa
+        """
+        self.resizer = resizer or ImageResizer()
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_workers = max_workers
+        self._pending = track_queue('upscale', 'pending', queue.Queue())
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+    
+    def submit(self, input_path, output_path=None, scale=2, target_size=(600, 600), on_result=None):
+        """
+        Đưa một ảnh vào hàng đợi
+        
+        Args:
+            input_path: Đường dẫn ảnh đầu vào
+            output_path: Đường dẫn ảnh đầu ra (None = tự tạo tên file)
+            scale: Tỷ lệ phóng to - chỉ được sử dụng khi target_size là None
+            target_size: Kích thước đích (width, height)
+            on_result: Hàm gọi ngay khi ảnh xử lý xong: on_result(input_path, output_path, error)
+            
+        Returns:
+            Future: Kết quả là đường dẫn ảnh đầu ra (ném lỗi nếu xử lý thất bại)
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('UpscaleQueue đã đóng')
+            self._pending.put((input_path, output_path, scale, tuple(target_size) if target_size else None,
+                               on_result, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._worker_loop, name='upscale-worker', daemon=True)
+                self._worker.start()
+        return future
+    
+    def close(self):
+        """Xử lý nốt các ảnh đang chờ rồi dừng luồng nền"""
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._pending.put(None)
+            worker.join()
+    
+    def _worker_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            
+            # Mỗi nhóm tham số (scale, target_size) là một lô riêng
+            groups = {}
+            for entry in batch:
+                groups.setdefault((entry[2], entry[3]), []).append(entry)
+            for (scale, target_size), entries in groups.items():
+                self._run_batch(entries, scale, target_size)
+            if stop:
+                return
+    
+    def _run_batch(self, entries, scale, target_size):
+        waiting = {}
+        for entry in entries:
+            waiting.setdefault(entry[0], []).append(entry)
+        
+        def on_result(input_path, output_path, error):
+            for _, _, _, _, callback, future in waiting.get(input_path, []):
+                if future.done():
+                    continue
+                if callback:
+                    try:
+                        callback(input_path, output_path, error)
+                    except Exception as e:
+                        logger.warning(f"Lỗi trong callback kết quả upscale: {str(e)}")
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(output_path)
+        
+        # Ảnh trùng đường dẫn đầu vào trong cùng lô chỉ xử lý một lần
+        first = [group[0] for group in waiting.values()]
+        try:
+            self.resizer.upscale_batch([entry[0] for entry in first], [entry[1] for entry in first],
+                                       scale=scale, target_size=target_size,
+                                       on_result=on_result, max_workers=self.max_workers)
+        except Exception as e:
+            logger.error(f"❌ Lỗi khi xử lý lô upscale {len(first)} ảnh: {str(e)}")
+        # Ảnh chưa có kết quả (lô lỗi giữa chừng) được báo lỗi để không treo người chờ
+        for group in waiting.values():
+            for entry in group:
+                if not entry[5].done():
+                    entry[5].set_exception(RuntimeError(f"Không xử lý được ảnh: {entry[0]}"))
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_upscale_queue():
+    """Hàng đợi upscale dùng chung của tiến trình (tạo khi cần)"""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = UpscaleQueue()
+        return _default_queue
+
+
 # Hàm tiện ích để sử dụng nhanh chóng
 def upscale_image(input_path, output_path=None, scale=2, target_size=(600, 600)):
     """
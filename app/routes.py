@@ -1,21 +1,18 @@
 import os
 import logging
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify, session, g
 from werkzeug.utils import secure_filename
 import tempfile
 import traceback
 
 # Set up logger
 logger = logging.getLogger(__name__)
-from app.crawler import extract_category_links, scrape_product_info, is_product_url, get_product_info, download_autonics_images, download_autonics_jpg_images, download_product_documents, extract_product_urls, is_category_url, download_baa_product_images, download_baa_product_images_fixed, extract_product_price, debug_extract_products_from_url
-import pandas as pd
-from openpyxl.utils import get_column_letter
 from datetime import datetime
 from flask import current_app
 from app import utils, socketio
 
 import time
-import openpyxl
+import threading
 import re
 import zipfile
 import shutil
@@ -28,19 +25,40 @@ from app.progress_bar import (
 )
 from urllib.parse import urlparse
 import concurrent.futures
-from app.baa_crawler import BaaProductCrawler
-from app.product_categorizer import ProductCategorizer
-from app.resize import ImageResizer
-from app.webp_converter import WebPConverter
-from app.crawlerAutonics import AutonicsCrawler
-from app.crawlerOmron import OmronCrawler
-from app.crawlerKeyence import KeyenceCrawler
-from app.crawlerHopLong import HopLongCrawler
-from app.crawlerBAA_Qlight import (
-    BAAQlightCrawler,
-    crawl_baa_qlight,
-    get_all_series_list,
-    crawl_specific_series,
+from app.plugins import lazy_import, create_crawler
+
+# Module nặng (pandas, openpyxl, PIL, selenium, các crawler...) chỉ được import ở lần dùng
+# đầu tiên để worker chỉ phục vụ trang chủ khởi động nhanh và nhẹ
+pd = lazy_import('pandas')
+openpyxl = lazy_import('openpyxl')
+get_column_letter = lazy_import('openpyxl.utils:get_column_letter')
+product_categorizer = lazy_import('app.product_categorizer')
+fuzzy_matcher = lazy_import('app.fuzzy_matcher')
+WebPConverter = lazy_import('app.webp_converter:WebPConverter')
+
+extract_category_links = lazy_import('app.crawler:extract_category_links')
+scrape_product_info = lazy_import('app.crawler:scrape_product_info')
+is_product_url = lazy_import('app.crawler:is_product_url')
+get_product_info = lazy_import('app.crawler:get_product_info')
+download_autonics_images = lazy_import('app.crawler:download_autonics_images')
+download_autonics_jpg_images = lazy_import('app.crawler:download_autonics_jpg_images')
+download_product_documents = lazy_import('app.crawler:download_product_documents')
+extract_product_urls = lazy_import('app.crawler:extract_product_urls')
+is_category_url = lazy_import('app.crawler:is_category_url')
+download_baa_product_images_fixed = lazy_import('app.crawler:download_baa_product_images_fixed')
+extract_product_price = lazy_import('app.crawler:extract_product_price')
+
+crawl_baa_qlight = lazy_import('app.crawlerBAA_Qlight:crawl_baa_qlight')
+get_all_series_list = lazy_import('app.crawlerBAA_Qlight:get_all_series_list')
+crawl_series_list = lazy_import('app.crawlerBAA_Qlight:crawl_series_list')
+from app.progress_reporter import (
+    report_progress,
+    current_reporter,
+    bind_current,
+    get_job_reporter,
+    job_id_from_request,
+    push_reporter,
+    pop_reporter,
 )
 
 # from app.misumicrawler import MisumiCrawler  # File đã bị xóa
@@ -53,6 +71,16 @@ ALLOWED_EXTENSIONS_EXCEL = {'xlsx', 'xls'}
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+@main_bp.before_request
+def bind_job_reporter():
+    """Tiến trình của request chỉ phát vào room của job client gửi kèm (job_id), gộp và giới hạn tần suất"""
+    g.previous_reporter = push_reporter(get_job_reporter(job_id_from_request(request)))
+
+@main_bp.teardown_request
+def unbind_job_reporter(exc=None):
+    if 'previous_reporter' in g:
+        pop_reporter(g.pop('previous_reporter'))
+
 @main_bp.route('/')
 def index():
     return render_template('index.html')
@@ -98,7 +126,7 @@ def extract_links(progress: TerminalProgressBar):
         invalid_urls = []
         
         # Gửi thông báo bắt đầu (kết hợp với socketio)
-        socketio.emit('progress_update', {'percent': 20, 'message': 'Đang kiểm tra URL...'})
+        report_progress({'percent': 20, 'message': 'Đang kiểm tra URL...'})
         
         # Kiểm tra các URL với progress bar con
         url_check_progress = create_child_progress(progress, "Kiểm tra URLs", len(urls))
@@ -127,7 +155,7 @@ def extract_links(progress: TerminalProgressBar):
         progress.update(40, f"Tìm thấy {len(valid_urls)} URL danh mục hợp lệ", f"Bỏ qua {len(invalid_urls)} URL không hợp lệ")
             
         # Gửi thông báo cập nhật
-        socketio.emit('progress_update', {'percent': 40, 'message': f'Đã tìm thấy {len(valid_urls)} URL danh mục hợp lệ'})
+        report_progress({'percent': 40, 'message': f'Đã tìm thấy {len(valid_urls)} URL danh mục hợp lệ'})
         
         # Trích xuất liên kết sản phẩm từ các URL danh mục
         progress.update(50, "Đang trích xuất liên kết sản phẩm từ các danh mục")
@@ -147,7 +175,7 @@ def extract_links(progress: TerminalProgressBar):
         progress.update(80, f"Đã trích xuất {len(product_links)} liên kết sản phẩm", "Đang tạo file kết quả")
             
         # Gửi thông báo hoàn thành trích xuất liên kết
-        socketio.emit('progress_update', {'percent': 80, 'message': f'Đã trích xuất xong {len(product_links)} liên kết sản phẩm'})
+        report_progress({'percent': 80, 'message': f'Đã trích xuất xong {len(product_links)} liên kết sản phẩm'})
         
         # Tạo file kết quả
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -172,7 +200,7 @@ def extract_links(progress: TerminalProgressBar):
         flash(success_message, 'success')
         
         # Gửi thông báo hoàn thành
-        socketio.emit('progress_update', {'percent': 100, 'message': 'Hoàn thành!'})
+        report_progress({'percent': 100, 'message': 'Hoàn thành!'})
         
         # Hoàn thành progress với thống kê chi tiết
         progress.complete("success", "Trích xuất liên kết hoàn tất", {
@@ -432,7 +460,7 @@ def convert_to_webp():
         print(f"Đã tạo thư mục lưu ảnh webp: {webp_folder}")
         
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 5, 
             'message': f'Bắt đầu chuyển đổi {len(files)} ảnh sang định dạng WebP THỰC SỰ',
             'detail': 'Đang kiểm tra và xử lý từng file...'
@@ -467,7 +495,7 @@ def convert_to_webp():
                 webp_path = os.path.join(webp_folder, webp_filename)
                 
                 # Cập nhật tiến trình
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress,
                     'message': f'Đang xử lý ảnh {i+1}/{len(temp_files)}: {original_filename}',
                     'detail': 'Chuyển đổi sang WebP với kiểm tra nghiêm ngặt...'
@@ -530,7 +558,7 @@ def convert_to_webp():
             pass
         
         # Gửi thông báo hoàn thành
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 90, 
             'message': f'Đã chuyển đổi thành công {len(converted_files)}/{len(files)} ảnh. Đang tạo file ZIP...',
             'detail': f'Tổng dung lượng giảm: {round((1 - total_output_size / total_input_size) * 100, 2)}%' if total_input_size > 0 else ''
@@ -561,7 +589,7 @@ def convert_to_webp():
             print(f"Đã tạo file ZIP thành công: {zip_path}")
             
             # Cập nhật hoàn thành
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 100, 
                 'message': f'Đã chuyển đổi và nén {len(converted_files)} ảnh WebP THỰC SỰ thành công!',
                 'detail': 'Tất cả file đã được kiểm tra và xác nhận là WebP chuẩn.'
@@ -592,7 +620,7 @@ def convert_to_webp():
         error_msg = f"Lỗi khi xử lý: {str(e)}"
         print(error_msg)
         print(traceback.format_exc())
-        socketio.emit('progress_update', {'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
+        report_progress({'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
         return render_template('index.html', error=error_msg)
 
 @main_bp.route('/download-images', methods=['POST'])
@@ -641,7 +669,7 @@ def download_images(progress: TerminalProgressBar):
         print(f"Đã tạo thư mục lưu ảnh: {images_folder}")
         
         # Gửi thông báo bắt đầu (kết hợp với socketio)
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 20, 
             'message': f'Chuẩn bị tải {len(product_codes)} hình ảnh sản phẩm Autonics'
         })
@@ -720,7 +748,7 @@ def download_images(progress: TerminalProgressBar):
         print(error_msg)
         print(traceback.format_exc())
         progress.error(f'Lỗi: {error_msg}', traceback.format_exc())
-        socketio.emit('progress_update', {'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
+        report_progress({'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
         return render_template('index.html', error=error_msg)
 
 @main_bp.route('/download-jpg-images', methods=['POST'])
@@ -758,7 +786,7 @@ def download_jpg_images():
         print(f"Đã tạo thư mục lưu ảnh JPG: {images_folder}")
         
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 5, 
             'message': f'Chuẩn bị tải {len(product_codes)} hình ảnh JPG chất lượng cao'
         })
@@ -804,7 +832,7 @@ def download_jpg_images():
         error_msg = f"Lỗi khi xử lý: {str(e)}"
         print(error_msg)
         print(traceback.format_exc())
-        socketio.emit('progress_update', {'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
+        report_progress({'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
         return render_template('index.html', error=error_msg)
 
 @main_bp.route('/download-documents', methods=['POST'])
@@ -842,7 +870,7 @@ def download_documents():
         print(f"Đã tạo thư mục lưu tài liệu PDF: {documents_folder}")
         
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 5, 
             'message': f'Chuẩn bị tải tài liệu PDF cho {len(product_urls)} sản phẩm'
         })
@@ -893,7 +921,7 @@ def download_documents():
         error_msg = f"Lỗi khi xử lý: {str(e)}"
         print(error_msg)
         print(traceback.format_exc())
-        socketio.emit('progress_update', {'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
+        report_progress({'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
         return render_template('index.html', error=error_msg)
 
 @main_bp.route('/compare-categories', methods=['POST'])
@@ -913,7 +941,7 @@ def compare_categories():
             return render_template('index.html', error="Chỉ chấp nhận file .txt cho danh sách URL")
         
         # Thông báo tiến trình
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 5, 
             'message': 'Đang đọc file URLs...'
         })
@@ -940,7 +968,7 @@ def compare_categories():
             return render_template('index.html', error="Không tìm thấy URL hợp lệ trong file thứ hai")
         
         # Thông báo trước khi bắt đầu thu thập
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 10, 
             'message': f'Đã tìm thấy {len(urls_1)} URL từ file BAA.vn. Đang xử lý...'
         })
@@ -961,7 +989,7 @@ def compare_categories():
         # Thu thập thêm từ các URL danh mục
         for i, category_url in enumerate(category_urls_1):
             progress = 10 + int((i / len(category_urls_1)) * 30)
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': progress, 
                 'message': f'Đang xử lý URL danh mục BAA.vn ({i+1}/{len(category_urls_1)}): {category_url}'
             })
@@ -975,7 +1003,7 @@ def compare_categories():
         if not product_urls_1:
             return render_template('index.html', error="Không tìm thấy sản phẩm nào từ URLs BAA.vn")
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 40, 
             'message': f'Đã tìm thấy {len(product_urls_1)} sản phẩm từ BAA.vn. Đang xử lý HaiphongTech...'
         })
@@ -993,7 +1021,7 @@ def compare_categories():
         # Thu thập thêm từ các URL danh mục
         for i, category_url in enumerate(category_urls_2):
             progress = 40 + int((i / len(category_urls_2)) * 30)
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': progress, 
                 'message': f'Đang xử lý URL danh mục HaiphongTech ({i+1}/{len(category_urls_2)}): {category_url}'
             })
@@ -1007,7 +1035,7 @@ def compare_categories():
         if not product_urls_2:
             return render_template('index.html', error="Không tìm thấy sản phẩm nào từ URLs HaiphongTech")
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 70, 
             'message': f'Đã tìm thấy {len(product_urls_2)} sản phẩm từ HaiphongTech. Đang trích xuất và chuẩn hóa mã sản phẩm...'
         })
@@ -1020,7 +1048,7 @@ def compare_categories():
         for i, url in enumerate(product_urls_1):
             if i % 10 == 0:
                 progress = 70 + int((i / len(product_urls_1)) * 5)
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress, 
                     'message': f'Đang trích xuất mã sản phẩm từ BAA.vn ({i}/{len(product_urls_1)})...'
                 })
@@ -1042,7 +1070,7 @@ def compare_categories():
         for i, url in enumerate(product_urls_2):
             if i % 10 == 0:
                 progress = 75 + int((i / len(product_urls_2)) * 5)
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress, 
                     'message': f'Đang trích xuất mã sản phẩm từ HaiphongTech ({i}/{len(product_urls_2)})...'
                 })
@@ -1056,13 +1084,13 @@ def compare_categories():
                 original_codes_by_std_2[original_code] = original_code
                 print(f"Sản phẩm HaiphongTech: {original_code} - {url}")
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 80, 
             'message': f'Đã tìm thấy {len(product_codes_1)} mã sản phẩm từ BAA.vn và {len(product_codes_2)} mã sản phẩm từ HaiphongTech. Đang so sánh...'
         })
         
         # So sánh các mã sản phẩm (đã được chuẩn hóa)
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 80, 
             'message': f'Đã tìm thấy {len(product_codes_1)} mã sản phẩm từ BAA.vn và {len(product_codes_2)} mã sản phẩm từ HaiphongTech. Đang so sánh...'
         })
@@ -1084,11 +1112,22 @@ def compare_categories():
         unique_codes_hpt = list(set(product_codes_2) - set(product_codes_1))
         unique_codes_hpt.sort()
         
+        # 4. Khớp gần đúng giữa các mã chỉ có trên một website (khác hậu tố, dấu phân cách, tiền tố hãng)
+        fuzzy_matches_baa = {}
+        fuzzy_matches_hpt = {}
+        if unique_codes_baa and unique_codes_hpt:
+            hpt_index = fuzzy_matcher.FuzzyCodeIndex(unique_codes_hpt)
+            for code in unique_codes_baa:
+                matched_code, score, method = hpt_index.lookup(code)
+                if matched_code:
+                    fuzzy_matches_baa[code] = (matched_code, score, method)
+                    fuzzy_matches_hpt.setdefault(matched_code, (code, score, method))
+        
         # Tạo danh sách URLs tương ứng
         unique_urls_baa = [product_urls_by_code_1.get(code, '') for code in unique_codes_baa]
         unique_urls_hpt = [product_urls_by_code_2.get(code, '') for code in unique_codes_hpt]
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 85, 
             'message': f'Phân tích hoàn tất. Tìm thấy {len(all_product_codes)} mã sản phẩm khác nhau. Đang tạo báo cáo...'
         })
@@ -1114,11 +1153,22 @@ def compare_categories():
             else:
                 status = "Chỉ HaiphongTech"
             
+            # Thông tin khớp: chính xác cho mã chung, gần đúng cho mã chỉ có trên một website
+            if status == "Chung":
+                matched_code, score, method = code, 1.0, fuzzy_matcher.METHOD_EXACT
+            else:
+                matched_code, score, method = fuzzy_matches_baa.get(code) or fuzzy_matches_hpt.get(code) or ('', None, '')
+                if matched_code:
+                    status += " (có mã gần đúng)"
+            
             comparison_data.append({
                 'Mã sản phẩm': code,
                 'URL BAA.vn': url_baa,
                 'URL HaiphongTech': url_hpt,
-                'Trạng thái': status
+                'Trạng thái': status,
+                'Mã khớp': matched_code,
+                'Điểm khớp': score,
+                'Phương thức khớp': method
             })
         
         # Tạo output directory
@@ -1154,7 +1204,7 @@ def compare_categories():
             zipf.write(unique_baa_txt_path, os.path.basename(unique_baa_txt_path))
             zipf.write(unique_hpt_txt_path, os.path.basename(unique_hpt_txt_path))
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 100, 
             'message': 'So sánh danh mục sản phẩm hoàn tất!'
         })
@@ -1167,7 +1217,7 @@ def compare_categories():
         error_msg = f"Lỗi: {str(e)}"
         print(error_msg)
         print(traceback.format_exc())
-        socketio.emit('progress_update', {'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
+        report_progress({'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
         return render_template('index.html', error=error_msg)
 
 @main_bp.route('/compare-product-codes', methods=['POST'])
@@ -1208,8 +1258,17 @@ def compare_product_codes():
         # Kiểm tra tùy chọn phân loại danh mục
         categorize_results = 'categorize_results' in request.form
         
+        # Tùy chọn so khớp mã gần đúng (ngưỡng điểm 0..1)
+        fuzzy_threshold = None
+        if 'fuzzy_match' in request.form:
+            try:
+                fuzzy_threshold = float(request.form.get('fuzzy_threshold') or 0.85)
+            except ValueError:
+                fuzzy_threshold = 0.85
+            fuzzy_threshold = min(max(fuzzy_threshold, 0.5), 1.0)
+        
         # Thông báo tiến trình
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 10, 
             'message': f'Đang đọc dữ liệu từ {1 + len(excel_files_2)} file Excel...'
         })
@@ -1227,7 +1286,7 @@ def compare_product_codes():
             excel_file.save(file2_path)
             file2_paths.append(file2_path)
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 30, 
             'message': f'Đang so sánh mã sản phẩm giữa file HPT và {len(file2_paths)} file khác...'
         })
@@ -1238,10 +1297,11 @@ def compare_product_codes():
         os.makedirs(output_dir, exist_ok=True)
         
         # Truyền danh sách file2_paths vào hàm so sánh
-        report_path = compare_product_codes(file1_path, file2_paths, output_dir, categorize_results)
+        report_path = compare_product_codes(file1_path, file2_paths, output_dir, categorize_results,
+                                            fuzzy_threshold=fuzzy_threshold)
         
         if report_path and isinstance(report_path, str) and os.path.exists(report_path):
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 100, 
                 'message': 'Đã hoàn tất so sánh mã sản phẩm!'
             })
@@ -1253,6 +1313,8 @@ def compare_product_codes():
             success_message = f"Đã so sánh xong mã sản phẩm từ file HPT với {len(file2_paths)} file khác!"
             if categorize_results:
                 success_message += " Kết quả đã được phân loại theo danh mục sản phẩm."
+            if fuzzy_threshold is not None:
+                success_message += f" Đã tìm mã gần đúng với ngưỡng {fuzzy_threshold:.2f}."
             
             return render_template('index.html', 
                                  success_message=success_message,
@@ -1266,7 +1328,7 @@ def compare_product_codes():
     except Exception as e:
         print(f"Lỗi: {str(e)}")
         print(traceback.format_exc())
-        socketio.emit('progress_update', {'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
+        report_progress({'percent': 0, 'message': f'Đã xảy ra lỗi: {str(e)}'})
         return render_template('index.html', error=f"Lỗi khi so sánh mã sản phẩm: {str(e)}")
 
 # Hàm trích xuất mã sản phẩm từ URL hoặc nội dung trang
@@ -1385,7 +1447,7 @@ def download_baa_images():
             return redirect(url_for('main.index'))
             
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 0, 
             'message': f'Bắt đầu xử lý {len(product_urls)} URL sản phẩm...'
         })
@@ -1417,7 +1479,7 @@ def download_baa_images():
             flash(success_message, 'success')
             
             # Gửi thông báo hoàn thành
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 100,
                 'message': 'Hoàn thành!'
             })
@@ -1518,7 +1580,7 @@ def filter_products(progress: TerminalProgressBar):
             return redirect(url_for('main.index', _anchor='filter-products-tab'))
         
         # Thông báo tiến trình (kết hợp với socketio)
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 20, 
             'message': f'Đang xử lý {len(product_codes)} mã sản phẩm cần lọc...'
         })
@@ -1573,7 +1635,7 @@ def filter_products(progress: TerminalProgressBar):
                 "Cột": len(df.columns)
             })
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 50, 
                 'message': f'Đã đọc file Excel với {len(df)} dòng. Đang lọc dữ liệu...'
             })
@@ -1640,7 +1702,7 @@ def filter_products(progress: TerminalProgressBar):
             matched_codes = df[rows_to_remove].iloc[:, product_code_column].tolist()
             print(f"DEBUG: Một số mã sản phẩm đã tìm thấy (tối đa 5): {matched_codes[:5]}")
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 80, 
             'message': f'Đã tìm thấy {removed_count} mã sản phẩm cần xóa. Đang tạo báo cáo...'
         })
@@ -1715,7 +1777,7 @@ def filter_products(progress: TerminalProgressBar):
             for sheet in writer.sheets.values():
                 sheet.set_column('A:Z', 18)
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 100, 
             'message': 'Hoàn thành lọc dữ liệu!'
         })
@@ -1771,7 +1833,7 @@ def extract_prices():
             return redirect(url_for('main.index'))
             
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 0, 
             'message': f'Bắt đầu trích xuất giá cho {len(product_urls)} URL sản phẩm...'
         })
@@ -1781,7 +1843,7 @@ def extract_prices():
         required_fields = ['STT', 'Mã sản phẩm', 'Tên sản phẩm', 'Giá', 'URL']
         
         for index, url in enumerate(product_urls, 1):
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': int((index / len(product_urls)) * 70), 
                 'message': f'Đang trích xuất giá từ URL {index}/{len(product_urls)}...'
             })
@@ -1809,7 +1871,7 @@ def extract_prices():
         output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
         
         # Lưu kết quả vào file Excel
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 80, 
             'message': 'Đang tạo file Excel...'
         })
@@ -1842,7 +1904,7 @@ def extract_prices():
             for col_num, value in enumerate(df.columns.values):
                 worksheet.write(0, col_num, value, header_format)
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 100, 
             'message': 'Hoàn thành trích xuất giá sản phẩm!'
         })
@@ -1892,7 +1954,7 @@ def extract_only_prices():
             return redirect(url_for('main.index'))
             
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 0, 
             'message': f'Bắt đầu trích xuất giá cho {len(product_urls)} URL sản phẩm...'
         })
@@ -1901,7 +1963,7 @@ def extract_only_prices():
         product_data = []
         
         for index, url in enumerate(product_urls, 1):
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': int((index / len(product_urls)) * 70), 
                 'message': f'Đang trích xuất giá từ URL {index}/{len(product_urls)}...'
             })
@@ -1929,7 +1991,7 @@ def extract_only_prices():
         output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
         
         # Lưu kết quả vào file Excel
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 80, 
             'message': 'Đang tạo file Excel...'
         })
@@ -1961,7 +2023,7 @@ def extract_only_prices():
             for col_num, value in enumerate(df.columns.values):
                 worksheet.write(0, col_num, value, header_format)
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 100, 
             'message': 'Hoàn thành trích xuất giá sản phẩm!'
         })
@@ -2006,7 +2068,7 @@ def extract_category_links_separate():
         invalid_urls = []
         
         # Gửi thông báo bắt đầu
-        socketio.emit('progress_update', {'percent': 0, 'message': 'Đang kiểm tra URL danh mục...'})
+        report_progress({'percent': 0, 'message': 'Đang kiểm tra URL danh mục...'})
         
         # Kiểm tra các URL
         for url in urls:
@@ -2020,7 +2082,7 @@ def extract_category_links_separate():
             return redirect(url_for('main.index'))
             
         # Gửi thông báo cập nhật
-        socketio.emit('progress_update', {'percent': 5, 'message': f'Đã tìm thấy {len(valid_urls)} URL danh mục hợp lệ'})
+        report_progress({'percent': 5, 'message': f'Đã tìm thấy {len(valid_urls)} URL danh mục hợp lệ'})
         
         # Tạo thư mục chính để lưu kết quả
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -2037,7 +2099,7 @@ def extract_category_links_separate():
         for i, category_url in enumerate(valid_urls):
             try:
                 progress = 5 + int((i / len(valid_urls)) * 85)
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress, 
                     'message': f'Đang xử lý danh mục {i+1}/{len(valid_urls)}: {category_url}'
                 })
@@ -2101,7 +2163,7 @@ def extract_category_links_separate():
         # Tạo file ZIP từ thư mục
         if utils.create_zip_from_folder(result_dir, zip_path):
             # Gửi thông báo hoàn thành
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 100, 
                 'message': f'Đã hoàn thành thu thập {len(all_product_links)} liên kết sản phẩm từ {len(valid_urls)} danh mục!'
             })
@@ -2162,7 +2224,7 @@ def scrape_category_products():
                 os.makedirs(category_images_dir, exist_ok=True)
 
                 # Thu thập liên kết sản phẩm từ danh mục này
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': category_progress_base + 5, 
                     'message': f'Đang thu thập liên kết sản phẩm từ danh mục: {category_name}'
                 })
@@ -2187,7 +2249,7 @@ def scrape_category_products():
                         f.write(link + '\n')
 
                 # Thu thập thông tin từ các sản phẩm trong danh mục với đa luồng
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': category_progress_base + 10, 
                     'message': f'Đang thu thập thông tin {len(category_products)} sản phẩm từ danh mục: {category_name}'
                 })
@@ -2216,7 +2278,7 @@ def scrape_category_products():
                 for batch_idx, batch in enumerate(product_batches):
                     # Cập nhật tiến độ cho batch này
                     batch_progress = category_progress_base + 10 + int((batch_idx / len(product_batches)) * 25)
-                    socketio.emit('progress_update', {
+                    report_progress({
                         'percent': batch_progress, 
                         'message': f'Đang cào batch {batch_idx+1}/{len(product_batches)} ({len(batch)} sản phẩm) từ danh mục: {category_name}'
                     })
@@ -2261,7 +2323,7 @@ def scrape_category_products():
                     df_products.to_excel(excel_result, index=False, engine='openpyxl')
 
                 # Tải ảnh sản phẩm từ baa.vn
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': category_progress_base + 40, 
                     'message': f'Đang tải ảnh {len(category_products)} sản phẩm từ danh mục: {category_name}'
                 })
@@ -2297,7 +2359,7 @@ def scrape_category_products():
         # Sử dụng ThreadPoolExecutor để xử lý các danh mục đồng thời
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Tạo các futures cho từng URL danh mục
-            futures = [executor.submit(process_category, url, i) for i, url in enumerate(category_urls)]
+            futures = [executor.submit(bind_current(process_category), url, i) for i, url in enumerate(category_urls)]
 
             # Thu thập kết quả
             for future in concurrent.futures.as_completed(futures):
@@ -2432,7 +2494,7 @@ def download_category_baa_images():
             try:
                 # Cập nhật tiến trình
                 progress = int((index / len(valid_urls)) * 90)
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress,
                     'message': f'Đang xử lý danh mục {index+1}/{len(valid_urls)}: {category_url}'
                 })
@@ -2473,7 +2535,7 @@ def download_category_baa_images():
                 category_report_file = os.path.join(category_dir, 'bao_cao.xlsx')
                 create_image_report(results['report_data'], category_report_file)
                 
-                socketio.emit('progress_update', {
+                report_progress({
                     'percent': progress + 3,
                     'message': f'Đã tải {results["success"]}/{len(product_urls)} ảnh từ danh mục {category_name}'
                 })
@@ -2501,7 +2563,7 @@ def download_category_baa_images():
         # Xóa thư mục tạm sau khi nén
         # shutil.rmtree(output_dir)
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 100,
             'message': 'Hoàn tất tải ảnh từ các danh mục. Đang chuẩn bị tải xuống...'
         })
@@ -2665,9 +2727,9 @@ def crawl_baa(progress: TerminalProgressBar):
         # Tạo progress bar con cho crawler
         crawler_progress = create_child_progress(progress, "BAA Product Crawler", 70)
         
-        crawler = BaaProductCrawler(output_root=current_app.config['UPLOAD_FOLDER'], 
-                                   max_workers=max_workers, 
-                                   max_retries=max_retries)
+        crawler = create_crawler('baa', output_root=current_app.config['UPLOAD_FOLDER'], 
+                                 max_workers=max_workers, 
+                                 max_retries=max_retries)
         
         crawler_progress.update(5, "Crawler đã sẵn sàng", "Bắt đầu cào dữ liệu...")
         
@@ -2902,19 +2964,10 @@ def crawl_baa_qlight_series_web(progress: TerminalProgressBar):
         excel_files = []
         series_results = []
 
-        # Chạy lần lượt từng series (mỗi series có progress con)
-        for idx, ser in enumerate(selected_series, start=1):
-            series_name = ser.get('name') or f'Series_{idx}'
-            series_url = ser.get('url')
-            child = create_child_progress(progress, f"Series {idx}/{len(selected_series)}: {series_name}", 80)
-            child.update(5, f"Đang xử lý {series_name}")
-
-            # Thư mục riêng cho series
-            series_output = os.path.join(base_output, re.sub(r'[<>:"/\\|?*]+', '_', series_name))
-            os.makedirs(series_output, exist_ok=True)
-
-            result = crawl_specific_series(series_url=series_url, series_name=series_name, output_folder=series_output, max_workers=max_workers)
-
+        def on_series_done(result, done, total):
+            nonlocal total_products
+            series_name = result.get('series_name') or f'Series_{done}'
+            child = create_child_progress(progress, f"Series {done}/{total}: {series_name}", 80)
             if result.get('success'):
                 total_products += result.get('total_products', 0)
                 excel_files.extend(result.get('excel_files', []))
@@ -2923,7 +2976,11 @@ def crawl_baa_qlight_series_web(progress: TerminalProgressBar):
             else:
                 child.error(f"Lỗi series {series_name}: {result.get('error', 'Unknown error')}")
 
-            progress.update(10 + int(70 * idx / max(1, len(selected_series))), f"Đã xử lý {idx}/{len(selected_series)} series")
+            progress.update(10 + int(70 * done / max(1, total)), f"Đã xử lý {done}/{total} series")
+
+        # Mọi series chạy chung một pool (listing + sản phẩm); mỗi series có thư mục riêng
+        # và file Excel được ghi ngay khi series đó hoàn tất
+        crawl_series_list(selected_series, base_output, max_workers=max_workers, progress_callback=on_series_done)
 
         # Nén kết quả
         zip_progress = create_child_progress(progress, "Tạo file ZIP", 10)
@@ -3004,22 +3061,13 @@ def filter_product_types():
             return redirect(url_for('main.index', _anchor='filter-product-types-tab'))
         
         # Thông báo tiến trình
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 10, 
             'message': f'Đang xử lý file Excel và tìm kiếm {len(selected_types)} loại sản phẩm...'
         })
         
-        # Các từ khóa cho mỗi loại sản phẩm
-        product_type_keywords = {
-            'tiem_can': ['tiệm cận', 'tiếp cận', 'proximity', 'PR', 'PS', 'PRL', 'PRCM', 'PR12', 'PR18', 'PR30'],
-            'soi_quang': ['sợi quang', 'fiber optic', 'BF', 'BFL', 'BFX', 'BFF', 'fiber sensor'],
-            'quang_dien': ['quang điện', 'photoelectric', 'BEN', 'BJ', 'BYD', 'BR', 'BRP', 'BH', 'BL', 'BX', 'BY', 'photo sensor'],
-            'vung_kv': ['vùng', 'khu vực', 'area', 'BA', 'BAR', 'area sensor'],
-            'ap_suat': ['áp suất', 'pressure', 'PSA', 'PSB', 'PS', 'pressure sensor'],
-            'luu_luong': ['lưu lượng', 'flow', 'FS', 'FSA', 'flow sensor'],
-            'xy_lanh': ['xy lanh', 'cylinder', 'CY', 'CP', 'cylinder sensor'],
-            'dien_dung': ['điện dung', 'capacitive', 'CR', 'CRL', 'capacitive sensor']
-        }
+        # Bộ so khớp từ khóa được biên dịch một lần cho toàn bộ bảng PRODUCT_TYPE_KEYWORDS
+        matcher = product_categorizer.get_default_matcher()
         
         # Lưu file tạm thời
         temp_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp')
@@ -3057,7 +3105,7 @@ def filter_product_types():
             for col in df.select_dtypes(include=['object']).columns:
                 df[col] = df[col].astype(str)
             
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 30, 
                 'message': f'Đã đọc file Excel với {len(df)} dòng. Đang lọc dữ liệu...'
             })
@@ -3111,41 +3159,20 @@ def filter_product_types():
         
         print(f"DEBUG: Sử dụng cột tên: {product_name_col}, cột mã: {product_code_col}, cột mô tả: {product_desc_col}")
         
+        # Ghép tên, mã và mô tả thành một chuỗi cho mỗi dòng rồi quét tất cả từ khóa trong một lượt
+        text_columns = [df.columns[i] for i in (product_name_col, product_code_col, product_desc_col)
+                        if i is not None and i < len(df.columns)]
+        combined_text = product_categorizer.combine_text_columns(df, text_columns)
+        masks = matcher.match_masks(combined_text, [t for t in selected_types if t in matcher.keyword_table])
+        
         # Tạo các DataFrame cho từng loại sản phẩm
         filtered_dfs = {}
         for product_type in selected_types:
-            filtered_dfs[product_type] = pd.DataFrame(columns=df.columns)
-        
-        # Lọc sản phẩm dựa trên từ khóa
-        for index, row in df.iterrows():
-            try:
-                # Lấy giá trị của các cột, bảo vệ từ lỗi index ngoài phạm vi và xử lý NaN
-                product_name = str(row.iloc[product_name_col] if product_name_col < len(row) else "").lower()
-                product_code = str(row.iloc[product_code_col] if product_code_col < len(row) else "").lower()
-                product_desc = ""
-                if product_desc_col is not None and product_desc_col < len(row):
-                    product_desc = str(row.iloc[product_desc_col]).lower()
-                
-                combined_text = f"{product_name} {product_code} {product_desc}"
-                
-                # Debug thông tin của một số dòng mẫu
-                if index < 5 or index % 1000 == 0:
-                    print(f"DEBUG: Dòng {index} - Mã: {product_code}, Tên: {product_name[:50]}{'...' if len(product_name) > 50 else ''}")
-                
-                for product_type in selected_types:
-                    if product_type in product_type_keywords:
-                        for keyword in product_type_keywords[product_type]:
-                            if keyword.lower() in combined_text:
-                                # Sử dụng concat thay vì append (đã deprecated trong pandas mới)
-                                row_df = pd.DataFrame([row.values], columns=df.columns)
-                                filtered_dfs[product_type] = pd.concat([filtered_dfs[product_type], row_df], ignore_index=True)
-                                # In thông tin debug nếu tìm thấy kết quả
-                                if index < 5 or index % 1000 == 0:
-                                    print(f"DEBUG: Dòng {index} khớp với loại '{product_type}' (từ khóa: '{keyword}')")
-                                break
-            except Exception as e:
-                print(f"DEBUG: Lỗi khi xử lý dòng {index}: {str(e)}")
-                continue
+            if product_type in masks:
+                filtered_dfs[product_type] = df[masks[product_type]].reset_index(drop=True)
+            else:
+                filtered_dfs[product_type] = pd.DataFrame(columns=df.columns)
+            print(f"DEBUG: Loại '{product_type}' khớp {len(filtered_dfs[product_type])} dòng")
         
         # Kiểm tra xem có sản phẩm nào được lọc không
         total_filtered = sum(len(df_type) for df_type in filtered_dfs.values())
@@ -3155,7 +3182,7 @@ def filter_product_types():
             flash('Không tìm thấy sản phẩm nào thuộc các loại đã chọn!', 'warning')
             return redirect(url_for('main.index', _anchor='filter-product-types-tab'))
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 60, 
             'message': 'Đã lọc dữ liệu. Đang tạo báo cáo...'
         })
@@ -3183,19 +3210,7 @@ def filter_product_types():
                     # Xóa các hàng trùng lặp
                     filtered_dfs[product_type] = filtered_dfs[product_type].drop_duplicates()
                     
-                    # Tên hiển thị cho mỗi loại
-                    type_display_name = {
-                        'tiem_can': 'Tiệm cận',
-                        'soi_quang': 'Sợi quang',
-                        'quang_dien': 'Quang điện',
-                        'vung_kv': 'Vùng (khu vực)',
-                        'ap_suat': 'Áp suất',
-                        'luu_luong': 'Lưu lượng',
-                        'xy_lanh': 'Xy lanh',
-                        'dien_dung': 'Điện dung'
-                    }
-                    
-                    display_name = type_display_name.get(product_type, product_type)
+                    display_name = product_categorizer.PRODUCT_TYPE_DISPLAY_NAMES.get(product_type, product_type)
                     sheet_name = display_name[:31]  # Giới hạn độ dài sheet name
                     
                     # Thêm vào dữ liệu tổng hợp
@@ -3225,7 +3240,7 @@ def filter_product_types():
             for sheet in writer.sheets.values():
                 sheet.set_column('A:Z', 18)
         
-        socketio.emit('progress_update', {
+        report_progress({
             'percent': 100, 
             'message': 'Hoàn thành lọc dữ liệu!'
         })
@@ -3286,10 +3301,10 @@ def categorize_products():
         os.makedirs(output_dir, exist_ok=True)
         
         # Khởi tạo và chạy trình phân loại sản phẩm
-        socketio.emit('progress_update', {'percent': 10, 'message': 'Đang đọc dữ liệu sản phẩm...'})
-        categorizer = ProductCategorizer()
+        report_progress({'percent': 10, 'message': 'Đang đọc dữ liệu sản phẩm...'})
+        categorizer = product_categorizer.ProductCategorizer()
         
-        socketio.emit('progress_update', {'percent': 30, 'message': 'Đang phân loại sản phẩm theo danh mục...'})
+        report_progress({'percent': 30, 'message': 'Đang phân loại sản phẩm theo danh mục...'})
         result = categorizer.categorize_and_export(temp_file_path, output_dir)
         
         # Xóa file tạm
@@ -3303,7 +3318,7 @@ def categorize_products():
         output_filename = os.path.basename(result)
         download_url = url_for('main.download_file', filename=f"categorized/{output_filename}")
         
-        socketio.emit('progress_update', {'percent': 100, 'message': 'Hoàn thành phân loại sản phẩm!'})
+        report_progress({'percent': 100, 'message': 'Hoàn thành phân loại sản phẩm!'})
         
         success_message = f"Đã phân loại sản phẩm thành công theo danh mục và tạo file Excel {output_filename}"
         return render_template('index.html', success_message=success_message, download_url=download_url, active_tab="categorize-products-tab")
@@ -3317,128 +3332,134 @@ def categorize_products():
 @main_bp.route('/upscale-image', methods=['POST'])
 def upscale_image():
     """
-    Nâng cao chất lượng ảnh sử dụng Real-ESRGAN
+    Nâng cao chất lượng ảnh sử dụng Real-ESRGAN (một hoặc nhiều ảnh).
+    Các ảnh được đưa vào hàng đợi upscale dùng chung để xử lý theo lô,
+    tiến trình từng ảnh được gửi qua SocketIO ngay khi ảnh đó xong.
     """
     try:
-        if 'input_image' not in request.files:
-            flash('Không tìm thấy file ảnh!', 'error')
-            return redirect(url_for('main.index', active_tab='image-upscale-tab'))
-            
-        file = request.files['input_image']
-        
-        if file.filename == '':
+        files = [f for f in request.files.getlist('input_image') if f and f.filename]
+        if not files:
             flash('Không có file nào được chọn!', 'error')
             return redirect(url_for('main.index', active_tab='image-upscale-tab'))
             
-        if not file.filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+        invalid_files = [f.filename for f in files if not f.filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))]
+        if invalid_files:
             flash('Chỉ chấp nhận file ảnh định dạng JPG, JPEG, PNG hoặc WebP!', 'error')
             return redirect(url_for('main.index', active_tab='image-upscale-tab'))
         
         # Sử dụng kích thước cố định 600x600
         target_size = (600, 600)
         
-        # Lưu file tạm
-        temp_dir = tempfile.mkdtemp()
-        input_path = os.path.join(temp_dir, secure_filename(file.filename))
-        file.save(input_path)
+        output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'upscaled_images')
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Gửi thông báo tiến trình
-        socketio.emit('progress_update', {
+        # Lưu file tạm (thêm số thứ tự để các file trùng tên không ghi đè nhau)
+        temp_dir = tempfile.mkdtemp()
+        jobs = []
+        used_names = set()
+        for index, file in enumerate(files):
+            base_name = os.path.splitext(secure_filename(file.filename))[0] or f'image_{index + 1}'
+            if base_name in used_names:
+                base_name = f'{base_name}_{index + 1}'
+            used_names.add(base_name)
+            input_path = os.path.join(temp_dir, base_name + os.path.splitext(file.filename)[1].lower())
+            file.save(input_path)
+            output_filename = f"{base_name}_enhanced_{target_size[0]}x{target_size[1]}.webp"
+            jobs.append((file.filename, input_path, output_filename))
+        
+        total = len(jobs)
+        report_progress({
             'percent': 10, 
             'message': 'Đang chuẩn bị xử lý ảnh...',
-            'detail': f'Tệp: {file.filename}, Kích thước đích: {target_size[0]}x{target_size[1]} pixel'
+            'detail': f'{total} tệp, Kích thước đích: {target_size[0]}x{target_size[1]} pixel'
         })
         
-        # Thêm module resize
-        from app.resize import ImageResizer
-        
-        # Khởi tạo ImageResizer
-        resizer = ImageResizer()
+        from app.resize import get_upscale_queue
+        upscale_queue = get_upscale_queue()
         
-        # Kiểm tra xem Real-ESRGAN có khả dụng không
-        if resizer.realesrgan_available:
-            # Gửi thông báo tiến trình
-            socketio.emit('progress_update', {
+        if upscale_queue.resizer.realesrgan_available:
+            report_progress({
                 'percent': 20, 
                 'message': 'Đang nâng cao chất lượng ảnh bằng AI (Real-ESRGAN)...',
-                'detail': 'Quá trình này có thể mất vài phút tùy thuộc vào kích thước ảnh'
+                'detail': 'Các ảnh được xử lý theo lô, quá trình này có thể mất vài phút'
             })
         else:
-            # Gửi thông báo tiến trình
-            socketio.emit('progress_update', {
+            report_progress({
                 'percent': 20, 
                 'message': 'Đang nâng cao chất lượng ảnh...',
                 'detail': 'Sử dụng phương pháp thay thế vì Real-ESRGAN không khả dụng'
             })
         
-        # Tạo tên file đầu ra
-        output_filename = os.path.splitext(secure_filename(file.filename))[0] + f"_enhanced_600x600.webp"
-        output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'upscaled_images')
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, output_filename)
+        completed = {'count': 0}
+        completed_lock = threading.Lock()
+        # Callback chạy trên luồng của hàng đợi upscale, giữ reporter của request để phát đúng room
+        reporter = current_reporter()
+        
+        def make_callback(original_name, output_filename):
+            def on_result(input_path, output_path, error):
+                with completed_lock:
+                    completed['count'] += 1
+                    done = completed['count']
+                reporter.emit('upscale_result', {
+                    'filename': original_name,
+                    'output': output_filename if not error else None,
+                    'error': str(error) if error else None,
+                    'completed': done,
+                    'total': total
+                })
+                reporter.publish({
+                    'percent': 20 + int(done * 75 / total),
+                    'message': f'Đã xử lý {done}/{total} ảnh',
+                    'detail': f'{original_name}: ' + ('thành công' if not error else f'lỗi - {str(error)}')
+                })
+            return on_result
         
-        socketio.emit('progress_update', {
-            'percent': 30,
-            'message': 'Đang xử lý ảnh...',
-            'detail': 'Đang thực hiện nâng cao chất lượng ảnh với kích thước cố định 600x600'
-        })
+        futures = []
+        for original_name, input_path, output_filename in jobs:
+            output_path = os.path.join(output_dir, output_filename)
+            future = upscale_queue.submit(input_path, output_path, target_size=target_size,
+                                          on_result=make_callback(original_name, output_filename))
+            futures.append((original_name, output_filename, future))
         
-        # Thực hiện upscale ảnh với kích thước cố định
-        try:
-            # Thử với chất lượng cao nhất
-            result_path = resizer.upscale_image(input_path, output_path, target_size=target_size)
-            
-            socketio.emit('progress_update', {
-                'percent': 90,
-                'message': 'Đã xử lý ảnh thành công!',
-                'detail': 'Đang kiểm tra chất lượng ảnh đầu ra'
-            })
-            
-            # Kiểm tra kích thước file đầu ra để đảm bảo nó được tạo đúng cách
-            if not os.path.exists(result_path) or os.path.getsize(result_path) < 1024:
-                # Nếu file đầu ra quá nhỏ hoặc không tồn tại, thử lại với phương pháp thay thế
-                socketio.emit('progress_update', {
-                    'percent': 60,
-                    'message': 'Đang thử lại với phương pháp thay thế...',
-                    'detail': 'Phương pháp AI gặp vấn đề, đang sử dụng phương pháp truyền thống'
-                })
-                # Đảm bảo Real-ESRGAN không được sử dụng cho lần thử lại
-                resizer.realesrgan_available = False
-                result_path = resizer.upscale_image(input_path, output_path, target_size=target_size)
-        except Exception as upscale_error:
-            # Log lỗi
-            current_app.logger.error(f"Lỗi khi upscale ảnh: {str(upscale_error)}")
-            traceback.print_exc()
-            
-            # Thử lại với phương pháp thay thế nếu Real-ESRGAN thất bại
-            socketio.emit('progress_update', {
-                'percent': 40,
-                'message': 'Gặp lỗi khi xử lý bằng AI, đang thử phương pháp thay thế...',
-                'detail': f'Lỗi: {str(upscale_error)}'
-            })
-            
-            # Đảm bảo Real-ESRGAN không được sử dụng cho lần thử lại
-            resizer.realesrgan_available = False
-            result_path = resizer.upscale_image(input_path, output_path, target_size=target_size)
+        results = []
+        errors = []
+        for original_name, output_filename, future in futures:
+            try:
+                future.result()
+                results.append(output_filename)
+            except Exception as upscale_error:
+                current_app.logger.error(f"Lỗi khi upscale ảnh {original_name}: {str(upscale_error)}")
+                errors.append(original_name)
         
         # Xóa thư mục tạm
-        shutil.rmtree(temp_dir)
+        shutil.rmtree(temp_dir, ignore_errors=True)
         
-        # Tạo URL cho file kết quả
-        result_url = url_for('main.download_upscaled_image', filename=output_filename)
+        if not results:
+            raise RuntimeError('Không xử lý được ảnh nào')
         
-        # Gửi thông báo hoàn thành
-        socketio.emit('progress_update', {
+        # Một ảnh: tải trực tiếp, nhiều ảnh: đóng gói ZIP
+        if len(results) == 1:
+            download_filename = results[0]
+        else:
+            download_filename = f"upscaled_images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            with zipfile.ZipFile(os.path.join(output_dir, download_filename), 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for output_filename in results:
+                    zipf.write(os.path.join(output_dir, output_filename), output_filename)
+        result_url = url_for('main.download_upscaled_image', filename=download_filename)
+        
+        report_progress({
             'percent': 100,
             'message': 'Đã hoàn thành nâng cao chất lượng ảnh!',
-            'detail': f'Tệp kết quả: {output_filename} (kích thước 600x600)'
+            'detail': f'Tệp kết quả: {download_filename} (kích thước 600x600)'
         })
         
         # Kiểm tra xem đã dùng Real-ESRGAN hay chưa
-        if resizer.realesrgan_available:
-            success_message = f'Đã nâng cao chất lượng ảnh thành công với AI Real-ESRGAN (kích thước 600x600 pixel)!'
+        if upscale_queue.resizer.realesrgan_available:
+            success_message = f'Đã nâng cao chất lượng {len(results)} ảnh thành công với AI Real-ESRGAN (kích thước 600x600 pixel)!'
         else:
-            success_message = f'Đã nâng cao chất lượng ảnh thành công với kích thước 600x600 pixel!'
+            success_message = f'Đã nâng cao chất lượng {len(results)} ảnh thành công với kích thước 600x600 pixel!'
+        if errors:
+            success_message += f' Không xử lý được {len(errors)} ảnh: {", ".join(errors)}'
         
         # Trả về trang kết quả
         return render_template('index.html', 
@@ -3570,7 +3591,7 @@ def crawl_autonics():
             }), 400
         
         # Khởi tạo crawler với Socket.IO
-        crawler = AutonicsCrawler(socketio=socketio)
+        crawler = create_crawler('autonics', socketio=socketio)
         
         # Chạy crawler trong background thread
         def run_crawler():
@@ -3578,11 +3599,11 @@ def crawl_autonics():
                 result_dir = crawler.crawl_products(valid_urls)
                 
                 # Emit kết quả cuối cùng
-                socketio.emit('crawler_completed', {
+                crawler.progress.emit('crawler_completed', {
                     'success': True,
                     'message': 'Cào dữ liệu Autonics hoàn thành!',
                     'result_dir': result_dir,
-                    'stats': crawler.stats
+                    'stats': crawler.stats.snapshot()
                 })
                 
             except Exception as e:
@@ -3591,7 +3612,7 @@ def crawl_autonics():
                 logger.error(f"Lỗi crawler Autonics: {str(e)}")
                 logger.error(error_details)
                 
-                socketio.emit('crawler_error', {
+                crawler.progress.emit('crawler_error', {
                     'success': False,
                     'message': f'Lỗi khi cào dữ liệu: {str(e)}',
                     'error_details': error_details
@@ -3599,7 +3620,7 @@ def crawl_autonics():
         
         # Start crawler trong thread riêng
         import threading
-        crawler_thread = threading.Thread(target=run_crawler)
+        crawler_thread = threading.Thread(target=bind_current(run_crawler))
         crawler_thread.daemon = True
         crawler_thread.start()
         
@@ -3767,7 +3788,7 @@ def crawl_omron():
         
         # Khởi tạo crawler với Socket.IO và Gemini API
         gemini_api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        crawler = OmronCrawler(socketio=socketio, gemini_api_key=gemini_api_key)
+        crawler = create_crawler('omron', socketio=socketio, gemini_api_key=gemini_api_key)
         
         # Chạy crawler trong background thread
         def run_crawler():
@@ -3775,11 +3796,11 @@ def crawl_omron():
                 result_dir = crawler.crawl_products(valid_urls)
                 
                 # Emit kết quả cuối cùng
-                socketio.emit('crawler_completed', {
+                crawler.progress.emit('crawler_completed', {
                     'success': True,
                     'message': 'Cào dữ liệu Omron hoàn thành!',
                     'result_dir': result_dir,
-                    'stats': crawler.stats
+                    'stats': crawler.stats.snapshot()
                 })
                 
             except Exception as e:
@@ -3788,7 +3809,7 @@ def crawl_omron():
                 logger.error(f"Lỗi crawler Omron: {str(e)}")
                 logger.error(error_details)
                 
-                socketio.emit('crawler_error', {
+                crawler.progress.emit('crawler_error', {
                     'success': False,
                     'message': f'Lỗi khi cào dữ liệu: {str(e)}',
                     'error_details': error_details
@@ -3797,7 +3818,7 @@ def crawl_omron():
         
         # Start crawler trong thread riêng
         import threading
-        crawler_thread = threading.Thread(target=run_crawler)
+        crawler_thread = threading.Thread(target=bind_current(run_crawler))
         crawler_thread.daemon = True
         crawler_thread.start()
         
@@ -3965,7 +3986,7 @@ def crawl_keyence():
             }), 400
         
         # Khởi tạo crawler với Socket.IO (không cần Gemini API cho Keyence)
-        crawler = KeyenceCrawler(socketio=socketio)
+        crawler = create_crawler('keyence', socketio=socketio)
         
         # Chạy crawler trong background thread
         def run_crawler():
@@ -3973,23 +3994,23 @@ def crawl_keyence():
                 result_dir = crawler.crawl_products(valid_urls)
                 
                 # Emit kết quả cuối cùng
-                socketio.emit('crawler_completed', {
+                crawler.progress.emit('crawler_completed', {
                     'success': True,
                     'message': 'Cào dữ liệu Keyence hoàn thành!',
                     'result_dir': result_dir,
-                    'stats': crawler.stats
+                    'stats': crawler.stats.snapshot()
                 })
                 
             except Exception as e:
                 print(f"Lỗi trong quá trình cào dữ liệu Keyence: {str(e)}")
-                socketio.emit('crawler_error', {
+                crawler.progress.emit('crawler_error', {
                     'success': False,
                     'message': f'Lỗi: {str(e)}'
                 })
         
         # Chạy trong thread riêng
         import threading
-        thread = threading.Thread(target=run_crawler)
+        thread = threading.Thread(target=bind_current(run_crawler))
         thread.daemon = True
         thread.start()
         
@@ -4118,7 +4139,7 @@ def hoplong_crawler():
 @main_bp.route('/hoplong/categories')
 def hoplong_categories():
     try:
-        crawler = HopLongCrawler()
+        crawler = create_crawler('hoplong')
         cats = crawler.fetch_categories_via_selenium()
         return jsonify({'success': True, 'categories': cats})
     except Exception as e:
@@ -4130,7 +4151,7 @@ def hoplong_subcategories():
         category = request.args.get('category', '').strip()
         if not category:
             return jsonify({'success': False, 'message': 'Thiếu category'}), 400
-        crawler = HopLongCrawler()
+        crawler = create_crawler('hoplong')
         subcategories = crawler.fetch_subcategories_for_category(category)
         return jsonify({'success': True, 'subcategories': subcategories})
     except Exception as e:
@@ -4142,7 +4163,7 @@ def hoplong_brands():
         category = request.args.get('category', '').strip()
         if not category:
             return jsonify({'success': False, 'message': 'Thiếu category'}), 400
-        crawler = HopLongCrawler()
+        crawler = create_crawler('hoplong')
         brands = crawler.fetch_brands_for_category(category)
         return jsonify({'success': True, 'brands': brands})
     except Exception as e:
@@ -4156,6 +4177,7 @@ def crawl_hoplong():
         subcategories = data.get('subcategories') or []
         brands = data.get('brands') or []
         max_workers = int(data.get('max_workers') or 10)
+        selenium_slots = int(data.get('selenium_slots') or 2)
         
         # Hỗ trợ cả old format (chỉ category) và new format (với subcategories)
         if not category or not brands:
@@ -4164,24 +4186,26 @@ def crawl_hoplong():
         # Validation thêm
         if max_workers < 1 or max_workers > 32:
             return jsonify({'success': False, 'message': 'Số luồng phải từ 1-32'}), 400
+        if selenium_slots < 1 or selenium_slots > 8:
+            return jsonify({'success': False, 'message': 'Số trình duyệt đồng thời phải từ 1-8'}), 400
             
         # Nếu có subcategories, sử dụng subcategory đầu tiên làm target
         target_category = category
         if subcategories:
             target_category = subcategories[0]
             
-        logger.info(f"Bắt đầu crawl HopLong - Category: {target_category}, Brands: {len(brands)}, Workers: {max_workers}")
+        logger.info(f"Bắt đầu crawl HopLong - Category: {target_category}, Brands: {len(brands)}, Workers: {max_workers}, Selenium slots: {selenium_slots}")
 
-        crawler = HopLongCrawler(socketio_instance=socketio, max_workers=max_workers)
+        crawler = create_crawler('hoplong', socketio_instance=socketio, max_workers=max_workers, selenium_slots=selenium_slots)
 
         def run():
             try:
                 result_dir = crawler.crawl_category_by_brands(target_category, brands)
-                socketio.emit('crawler_completed', {
+                crawler.progress.emit('crawler_completed', {
                     'success': True,
                     'message': 'Cào dữ liệu HopLong hoàn thành!',
                     'result_dir': result_dir,
-                    'stats': crawler.stats
+                    'stats': crawler.stats.snapshot()
                 })
                 logger.info(f"HopLong crawler hoàn thành: {result_dir}")
                 
@@ -4191,14 +4215,14 @@ def crawl_hoplong():
                 logger.error(f"Lỗi crawler HopLong: {str(e)}")
                 logger.error(error_details)
                 
-                socketio.emit('crawler_error', {
+                crawler.progress.emit('crawler_error', {
                     'success': False,
                     'message': f'Lỗi khi cào dữ liệu: {str(e)}',
                     'error_details': error_details
                 })
 
         import threading
-        t = threading.Thread(target=run, daemon=True)
+        t = threading.Thread(target=bind_current(run), daemon=True)
         t.start()
         return jsonify({'success': True, 'message': 'Đã bắt đầu cào dữ liệu HopLong'})
         
@@ -0,0 +1,76 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Script chạy trong trình duyệt: gom dữ liệu của mọi thẻ khớp selector trong một lần gọi.
+# arguments: [selectors, label_selector, root_selector, first_match]
+_COLLECT_ANCHORS_JS = """
+const selectors = arguments[0] || [];
+const labelSelector = arguments[1];
+const rootSelector = arguments[2];
+const firstMatch = arguments[3];
+
+let root = document;
+if (rootSelector) {
+    try { root = document.querySelector(rootSelector); } catch (e) { root = null; }
+    if (!root) { return []; }
+}
+
+const seen = new Set();
+const out = [];
+for (let i = 0; i < selectors.length; i++) {
+    let nodes;
+    try { nodes = root.querySelectorAll(selectors[i]); } catch (e) { continue; }
+    const before = out.length;
+    for (const el of nodes) {
+        if (seen.has(el)) { continue; }
+        seen.add(el);
+        let label = '';
+        if (labelSelector) {
+            const labelEl = el.querySelector(labelSelector);
+            label = labelEl ? (labelEl.innerText || labelEl.textContent || '') : '';
+        }
+        const img = el.querySelector('img');
+        out.push({
+            href: el.href || el.getAttribute('href') || '',
+            title: el.getAttribute('title') || '',
+            text: (el.innerText || '').trim(),
+            label: label.trim(),
+            img_alt: img ? (img.getAttribute('alt') || '') : '',
+            selector: i
+        });
+    }
+    if (firstMatch && out.length > before) { break; }
+}
+return out;
+"""
+
+
+def collect_anchor_data(driver, selectors, label_selector=None, root_selector=None, first_match=False):
+    """
+    Lấy href/title/text của tất cả thẻ khớp các selector bằng một lần execute_script.
+
+    Thay cho vòng lặp find_elements + get_attribute/.text trên từng phần tử (mỗi
+    lệnh là một round-trip HTTP tới WebDriver), toàn bộ dữ liệu được gom trong
+    trình duyệt và trả về dưới dạng JSON chỉ trong một round-trip.
+
+    Args:
+        driver: Selenium WebDriver
+        selectors (list hoặc str): Các CSS selector, thử theo thứ tự; selector không hợp lệ bị bỏ qua
+        label_selector (str, optional): Selector con để lấy nhãn (ví dụ tên series trong card)
+        root_selector (str, optional): Chỉ tìm bên trong phần tử đầu tiên khớp selector này
+        first_match (bool): Dừng ở selector đầu tiên có kết quả
+
+    Returns:
+        list: Danh sách dict với các key 'href' (URL tuyệt đối), 'title', 'text',
+            'label', 'img_alt' và 'selector' (vị trí selector đã khớp); mỗi phần tử
+            chỉ xuất hiện một lần
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    anchors = driver.execute_script(
+        _COLLECT_ANCHORS_JS, list(selectors), label_selector, root_selector, bool(first_match)
+    ) or []
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"🔍 Thu thập {len(anchors)} phần tử từ {len(selectors)} selector trong một lần gọi")
+    return anchors
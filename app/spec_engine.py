@@ -0,0 +1,366 @@
+import logging
+from html import escape
+
+from lxml import etree
+from lxml import html as lxml_html
+
+logger = logging.getLogger(__name__)
+
+# Loại hàng trong bảng thông số
+ROW_DATA = 'data'
+ROW_FOOTNOTE = 'footnote'
+ROW_COPYRIGHT = 'copyright'
+
+GROUP_HEAD = 'thead'
+GROUP_BODY = 'tbody'
+
+COPYRIGHT_LABEL = 'Copyright'
+COPYRIGHT_VALUE = 'Haiphongtech.vn'
+
+# Thuộc tính duy nhất được giữ lại khi chuẩn hóa bảng HTML gốc
+KEEP_ATTRS = ('rowspan', 'colspan')
+DROP_TAGS = frozenset(('col', 'colgroup'))
+
+# Inline-style tối thiểu để bảng hiển thị giống website khi không có CSS gốc
+TABLE_STYLE = 'border-collapse:collapse;width:100%;'
+CELL_STYLE = 'border:1px solid #e5e5e5;padding:8px;vertical-align:top;'
+HEADER_STYLE = 'background:#f7f7f7;font-weight:600;'
+BOLD_STYLE = 'font-weight: bold;'
+
+# Bảng 2 cột chuẩn "Thông số / Giá trị" dùng chung cho mọi hãng
+PAIRS_TABLE_OPEN = ('<table id="specifications" border="1" cellpadding="8" cellspacing="0" '
+                    'style="border-collapse:collapse;width:100%;font-family:Arial;">')
+PAIRS_TABLE_HEAD = '<thead><tr style="background:#f2f2f2;"><th>Thông số</th><th>Giá trị</th></tr></thead>'
+
+# Từ khóa nhận diện ô chứa mã sản phẩm (BAA.vn viết hoa các ô này)
+CODE_CELL_KEYWORDS = ('mã', 'model', 'part no')
+
+
+def append_style(existing, addition):
+    """Nối thêm inline-style nếu chưa có (giữ nguyên định dạng cũ của các crawler)"""
+    if addition in existing:
+        return existing
+    return (existing + ';' + addition).strip(';')
+
+
+class SpecCell:
+    """
+    Một ô thông số trong biểu diễn trung gian.
+
+    ``text`` là nội dung thuần; ``html`` (tùy chọn) là nội dung HTML đã làm sạch
+    của ô gốc, được renderer dùng thay cho text để giữ <br>, <sup>...
+    """
+
+    __slots__ = ('text', 'html', 'rowspan', 'colspan', 'header', 'bold')
+
+    def __init__(self, text='', html=None, rowspan=None, colspan=None, header=False, bold=False):
+        self.text = text
+        self.html = html
+        self.rowspan = rowspan
+        self.colspan = colspan
+        self.header = header
+        self.bold = bold
+
+    def content_html(self):
+        return self.html if self.html is not None else escape(self.text or '', quote=False)
+
+
+class SpecRow:
+    """Một hàng của bảng thông số"""
+
+    __slots__ = ('cells', 'kind', 'group')
+
+    def __init__(self, cells, kind=ROW_DATA, group=GROUP_BODY):
+        self.cells = cells
+        self.kind = kind
+        self.group = group
+
+
+class SpecTable:
+    """
+    Biểu diễn trung gian của bảng thông số: danh sách hàng (key, value, rowspan/colspan)
+    độc lập với hãng. Adapter của từng hãng tạo SpecTable, renderer xuất HTML trong
+    một lượt duyệt.
+    """
+
+    __slots__ = ('rows', 'title')
+
+    def __init__(self, rows=None, title=None):
+        self.rows = rows if rows is not None else []
+        self.title = title
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add_pair(self, key, value, kind=ROW_DATA):
+        self.rows.append(SpecRow([SpecCell(key, bold=True), SpecCell(value)], kind=kind))
+        return self
+
+    def add_copyright(self):
+        """
+        Chèn hàng bản quyền ngay trước hàng footnotes đầu tiên, hoặc cuối bảng nếu không có
+        """
+        row = SpecRow([SpecCell(COPYRIGHT_LABEL, bold=True), SpecCell(COPYRIGHT_VALUE)], kind=ROW_COPYRIGHT)
+        for index, existing in enumerate(self.rows):
+            if existing.kind == ROW_FOOTNOTE:
+                self.rows.insert(index, row)
+                return self
+        self.rows.append(row)
+        return self
+
+    def pairs(self):
+        """Các cặp (key, value) của hàng dữ liệu có ít nhất hai ô"""
+        return [(row.cells[0].text, row.cells[1].text)
+                for row in self.rows if row.kind == ROW_DATA and len(row.cells) >= 2]
+
+
+# ======= PARSING =======
+
+def parse_html(page_html):
+    """
+    Parse trang HTML bằng lxml (str/bytes, mặc định UTF-8)
+    """
+    if isinstance(page_html, str):
+        page_html = page_html.encode('utf-8')
+    parser = lxml_html.HTMLParser(encoding='utf-8')
+    return lxml_html.fromstring(page_html, parser=parser)
+
+
+def has_class(name):
+    """Điều kiện XPath tương đương selector CSS ``.name``"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def element_text(element, separator=''):
+    """Text đã strip của phần tử (tương đương get_text(separator, strip=True) của BeautifulSoup)"""
+    if element is None:
+        return ''
+    return separator.join(_strings(element))
+
+
+# ======= ADAPTERS =======
+
+def _strings(element):
+    return [s.strip() for s in element.itertext() if s and s.strip()]
+
+
+def _classes(element):
+    return (element.get('class') or '').split()
+
+
+def _strip_attrs(element):
+    """Chỉ giữ rowspan/colspan trên toàn cây con, bỏ col/colgroup và comment"""
+    for child in list(element):
+        if not isinstance(child.tag, str) or child.tag in DROP_TAGS:
+            child.drop_tree()
+            continue
+        _strip_attrs(child)
+    for key in list(element.attrib):
+        if key not in KEEP_ATTRS:
+            del element.attrib[key]
+
+
+def _inner_html(element):
+    parts = [escape(element.text, quote=False)] if element.text else []
+    for child in element:
+        parts.append(lxml_html.tostring(child, encoding='unicode', with_tail=True))
+    return ''.join(parts)
+
+
+def table_from_pairs(pairs):
+    """
+    Tạo SpecTable từ danh sách/dict cặp (key, value)
+    """
+    items = pairs.items() if isinstance(pairs, dict) else pairs
+    table = SpecTable()
+    for key, value in items:
+        table.add_pair('' if key is None else str(key), '' if value is None else str(value))
+    return table
+
+
+def table_from_element(table_el, footnote_class='specTable-foot', title=None):
+    """
+    Tạo SpecTable từ phần tử <table> lxml, giữ rowspan/colspan và nội dung HTML đã làm sạch
+    của từng ô. Hàng có class ``footnote_class`` được đánh dấu là footnotes.
+    """
+    table = SpecTable(title=title)
+    for tr in table_el.iter('tr'):
+        # Bỏ qua hàng của bảng lồng trong ô (đã nằm trong HTML của ô cha)
+        if next(tr.iterancestors('table'), None) is not table_el:
+            continue
+        group = GROUP_HEAD if any(a.tag == 'thead' for a in tr.iterancestors()) else GROUP_BODY
+        kind = ROW_FOOTNOTE if footnote_class and footnote_class in _classes(tr) else ROW_DATA
+        cells = []
+        for cell in tr:
+            if cell.tag not in ('td', 'th'):
+                continue
+            rowspan, colspan = cell.get('rowspan'), cell.get('colspan')
+            _strip_attrs(cell)
+            cells.append(SpecCell(
+                ' '.join(_strings(cell)), html=_inner_html(cell),
+                rowspan=rowspan, colspan=colspan, header=cell.tag == 'th'
+            ))
+        table.rows.append(SpecRow(cells, kind=kind, group=group))
+    return table
+
+
+def pairs_from_list_items(container):
+    """
+    Trích xuất cặp (title, content) từ cấu trúc ul > li > span.title/span.content.
+    Nếu không có, thử các li dạng "Tiêu đề: nội dung".
+    """
+    pairs = []
+    if container is None:
+        return pairs
+
+    for ul in container.iter('ul'):
+        for li in ul:
+            if li.tag != 'li':
+                continue
+            title = content = ''
+            for span in li.iter('span'):
+                classes = _classes(span)
+                if not title and 'title' in classes:
+                    title = ''.join(_strings(span))
+                elif not content and 'content' in classes:
+                    content = ''.join(_strings(span))
+            if title or content:
+                pairs.append((title, content))
+
+    if not pairs:
+        for li in container.iter('li'):
+            text = ''.join(_strings(li))
+            if ':' in text:
+                title, content = (part.strip() for part in text.split(':', 1))
+                if title and content:
+                    pairs.append((title, content))
+    return pairs
+
+
+# ======= RENDERERS =======
+
+def render_pairs_table(table):
+    """
+    Xuất bảng 2 cột chuẩn "Thông số / Giá trị" trong một lượt duyệt
+
+    Args:
+        table (SpecTable): Bảng thông số (các hàng 2 ô)
+
+    Returns:
+        str: HTML bảng
+    """
+    out = [PAIRS_TABLE_OPEN, PAIRS_TABLE_HEAD, '<tbody>']
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            content = cell.content_html()
+            cells.append(f'<td><strong>{content}</strong></td>' if cell.bold else f'<td>{content}</td>')
+        out.append(f"<tr>{''.join(cells)}</tr>")
+    out.append('</tbody></table>')
+    return '\n'.join(out)
+
+
+def render_pairs(pairs, copyright=True):
+    """
+    Xuất thẳng bảng 2 cột chuẩn từ các cặp (key, value), không dựng SpecTable.
+    Cùng HTML với ``render_pairs_table(table_from_pairs(pairs).add_copyright())`` nhưng
+    nhanh hơn nhiều cho bảng đơn giản (Omron, HopLong dạng ul/li).
+
+    Args:
+        pairs: Danh sách/dict cặp (key, value)
+        copyright (bool): Thêm hàng Copyright ở cuối bảng
+
+    Returns:
+        str: HTML bảng
+    """
+    items = pairs.items() if isinstance(pairs, dict) else pairs
+    out = [PAIRS_TABLE_OPEN, PAIRS_TABLE_HEAD, '<tbody>']
+    for key, value in items:
+        key = '' if key is None else escape(str(key), quote=False)
+        value = '' if value is None else escape(str(value), quote=False)
+        out.append(f'<tr><td><strong>{key}</strong></td><td>{value}</td></tr>')
+    if copyright:
+        out.append(f'<tr><td><strong>{COPYRIGHT_LABEL}</strong></td><td>{COPYRIGHT_VALUE}</td></tr>')
+    out.append('</tbody></table>')
+    return '\n'.join(out)
+
+
+def render_element_table(table, styled=True):
+    """
+    Xuất SpecTable tạo từ bảng HTML gốc: chỉ còn rowspan/colspan, có tùy chọn inline-style,
+    bọc trong <section><h2>title</h2> nếu bảng có tiêu đề
+
+    Args:
+        table (SpecTable): Bảng thông số
+        styled (bool): Tiêm inline-style tối thiểu cho table/td/th
+
+    Returns:
+        str: HTML
+    """
+    out = []
+    if table.title is not None:
+        out.append(f'<section><h2>{escape(table.title, quote=False)}</h2>')
+    out.append(f'<table style="{TABLE_STYLE.strip(";")}">' if styled else '<table>')
+
+    current_group = None
+    for row in table.rows:
+        if row.group != current_group:
+            if current_group is not None:
+                out.append(f'</{current_group}>')
+            out.append(f'<{row.group}>')
+            current_group = row.group
+        out.append('<tr>')
+        for cell in row.cells:
+            tag = 'th' if cell.header else 'td'
+            attrs = ''
+            if cell.rowspan:
+                attrs += f' rowspan="{escape(cell.rowspan)}"'
+            if cell.colspan:
+                attrs += f' colspan="{escape(cell.colspan)}"'
+            style = BOLD_STYLE if cell.bold else ''
+            if styled:
+                style = append_style(style, CELL_STYLE)
+                if cell.header and row.group == GROUP_HEAD:
+                    style = append_style(style, HEADER_STYLE)
+            if style:
+                attrs += f' style="{style}"'
+            out.append(f'<{tag}{attrs}>{cell.content_html()}</{tag}>')
+        out.append('</tr>')
+    if current_group is not None:
+        out.append(f'</{current_group}>')
+
+    out.append('</table>')
+    if table.title is not None:
+        out.append('</section>')
+    return ''.join(out)
+
+
+def uppercase_code_cells(fragment_html, keywords=CODE_CELL_KEYWORDS):
+    """
+    Viết hoa toàn bộ nội dung các ô <td> chứa từ khóa mã sản phẩm ('mã', 'model', 'part no')
+
+    Args:
+        fragment_html (str): Đoạn HTML bảng thông số
+
+    Returns:
+        str: HTML đã chuẩn hóa (trả nguyên đầu vào nếu không parse được)
+    """
+    if not fragment_html:
+        return fragment_html
+    try:
+        container = lxml_html.fragment_fromstring(fragment_html, create_parent='div')
+    except (etree.ParserError, ValueError) as e:
+        logger.debug(f"Không parse được HTML thông số: {e}")
+        return fragment_html
+
+    changed = False
+    for td in list(container.iter('td')):
+        text = td.text_content()
+        if text and any(keyword in text.lower() for keyword in keywords):
+            for child in list(td):
+                td.remove(child)
+            td.text = text.upper()
+            changed = True
+    if not changed:
+        return fragment_html
+    return _inner_html(container)
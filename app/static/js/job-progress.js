@@ -0,0 +1,79 @@
+/**
+ * Kênh tiến trình theo job: mỗi lần chạy có một mã job riêng, server chỉ phát
+ * sự kiện của job vào room của nó. Khi socket kết nối lại, kênh tự vào lại room
+ * và nhận lại các sự kiện đã lỡ (theo số thứ tự seq).
+ */
+
+// Tạo mã job ngẫu nhiên (chỉ gồm chữ, số và '-')
+function newJobId() {
+  if (window.crypto && typeof window.crypto.randomUUID === "function") {
+    return window.crypto.randomUUID();
+  }
+  return (
+    Date.now().toString(36) +
+    "-" +
+    Math.random().toString(36).slice(2, 10) +
+    Math.random().toString(36).slice(2, 10)
+  );
+}
+
+// Bọc socket để nhận sự kiện theo job
+function createJobChannel(socket) {
+  const state = { jobId: null, lastSeq: 0 };
+
+  function join() {
+    if (state.jobId && socket.connected) {
+      socket.emit("join_job", { job_id: state.jobId, after_seq: state.lastSeq });
+    }
+  }
+
+  // Kết nối lần đầu và mỗi lần kết nối lại: vào lại room, nhận lại sự kiện đã lỡ
+  socket.on("connect", join);
+
+  return {
+    // Bắt đầu job mới, trả về mã job để gửi kèm request (job_id)
+    start() {
+      if (state.jobId) {
+        socket.emit("leave_job", { job_id: state.jobId });
+      }
+      state.jobId = newJobId();
+      state.lastSeq = 0;
+      join();
+      return state.jobId;
+    },
+
+    get jobId() {
+      return state.jobId;
+    },
+
+    // Đăng ký xử lý sự kiện; bỏ qua sự kiện của job khác và sự kiện đã nhận (trùng seq)
+    on(event, handler) {
+      socket.on(event, function (data) {
+        if (data && data.job_id) {
+          if (data.job_id !== state.jobId || data.seq <= state.lastSeq) return;
+          state.lastSeq = data.seq;
+        }
+        handler(data);
+      });
+    },
+  };
+}
+
+// Tóm tắt tiến trình từng giai đoạn (listing, detail, images, export) thành một dòng
+function formatJobStages(stages) {
+  if (!stages) return "";
+  const labels = {
+    listing: "Danh sách",
+    detail: "Chi tiết",
+    images: "Ảnh",
+    export: "Xuất file",
+  };
+  return Object.keys(stages)
+    .map(function (name) {
+      const stage = stages[name];
+      const percent =
+        stage.percent === null || stage.percent === undefined ? "…" : Math.round(stage.percent) + "%";
+      return (labels[name] || name) + ": " + percent;
+    })
+    .join(" • ");
+}
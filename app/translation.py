@@ -0,0 +1,440 @@
+import os
+import re
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.metrics import track_queue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_LANGUAGE = 'Vietnamese'
+
+# Prompt dịch theo lô: đầu vào/đầu ra là mảng JSON cùng độ dài, cùng thứ tự
+BATCH_PROMPT = """Dịch từng đoạn text kỹ thuật trong mảng JSON dưới đây sang {language}.
+Giữ nguyên:
+- Mã sản phẩm, model number
+- Đơn vị đo lường (mm, V, A, etc.)
+- Số liệu kỹ thuật
+- Tên thương hiệu
+
+Chỉ dịch:
+- Mô tả sản phẩm
+- Thuật ngữ kỹ thuật
+- Tính năng và đặc điểm
+
+Đầu vào gồm {count} phần tử:
+{payload}
+
+Trả về DUY NHẤT một mảng JSON gồm đúng {count} chuỗi đã dịch, cùng thứ tự với đầu vào, không thêm giải thích."""
+
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def translation_key(text, target_language):
+    """Khóa của bản dịch trong bộ nhớ dịch: hash của ngôn ngữ đích + text gốc"""
+    return hashlib.sha1(f'{target_language}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class TranslationMemory:
+    """
+    Bộ nhớ dịch lưu bền trong SQLite, khóa theo hash của text gốc.
+
+    Dùng chung giữa các luồng (một kết nối, có khóa) và giữa các lần chạy crawler.
+    """
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path: Đường dẫn file SQLite (tạo mới nếu chưa có)
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                'key TEXT PRIMARY KEY, source TEXT NOT NULL, target_language TEXT NOT NULL, '
+                'translated TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+
+    def get_many(self, keys):
+        """
+        Lấy các bản dịch đã lưu
+
+        Args:
+            keys: Danh sách khóa (translation_key)
+
+        Returns:
+            dict: {key: bản dịch} cho các khóa đã có
+        """
+        found = {}
+        keys = list(keys)
+        # Giới hạn số tham số của một câu lệnh SQLite
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT key, translated FROM translations WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def put_many(self, entries):
+        """
+        Lưu các bản dịch
+
+        Args:
+            entries: Danh sách tuple (key, source, target_language, translated)
+        """
+        if not entries:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO translations (key, source, target_language, translated, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(key, source, language, translated, now) for key, source, language, translated in entries]
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GeminiBackend:
+    """Backend dịch theo lô bằng Gemini, yêu cầu kết quả dạng mảng JSON"""
+
+    def __init__(self, model):
+        """
+        Args:
+            model: genai.GenerativeModel đã khởi tạo
+        """
+        self.model = model
+
+    def _generate(self, prompt):
+        try:
+            return self.model.generate_content(
+                prompt, generation_config={'response_mime_type': 'application/json'}
+            )
+        except TypeError:
+            # google-generativeai bản cũ chưa hỗ trợ response_mime_type
+            return self.model.generate_content(prompt)
+
+    def translate_batch(self, texts, target_language):
+        """
+        Dịch một lô text trong một request
+
+        Args:
+            texts: Danh sách text gốc
+            target_language: Ngôn ngữ đích
+
+        Returns:
+            list: Bản dịch cùng thứ tự với texts
+
+        Raises:
+            ValueError: Nếu kết quả không phải mảng JSON đúng độ dài
+        """
+        prompt = BATCH_PROMPT.format(
+            language='tiếng Việt' if target_language == DEFAULT_TARGET_LANGUAGE else target_language,
+            count=len(texts),
+            payload=json.dumps(texts, ensure_ascii=False)
+        )
+        response = self._generate(prompt)
+        raw = (response.text or '').strip() if response else ''
+        data = json.loads(_CODE_FENCE_RE.sub('', raw)) if raw else None
+        if isinstance(data, dict):
+            data = data.get('translations')
+        if not isinstance(data, list) or len(data) != len(texts):
+            raise ValueError(f"Gemini trả về {len(data) if isinstance(data, list) else 'dữ liệu'} "
+                             f"không khớp {len(texts)} đoạn cần dịch")
+        return [str(item).strip() if item is not None else '' for item in data]
+
+
+class StubBackend:
+    """
+    Backend dịch cục bộ (không gọi mạng) dùng khi thử nghiệm.
+
+    Trả về bản dịch từ ``mapping`` nếu có, nếu không thì ``prefix`` + text gốc,
+    và ghi lại các lô đã nhận trong ``calls``.
+    """
+
+    def __init__(self, mapping=None, prefix='[vi] ', delay=0.0):
+        self.mapping = dict(mapping or {})
+        self.prefix = prefix
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts, target_language):
+        with self._lock:
+            self.calls.append(list(texts))
+        if self.delay:
+            time.sleep(self.delay)
+        return [self.mapping.get(text, f'{self.prefix}{text}') for text in texts]
+
+
+class RateLimiter:
+    """Giãn cách tối thiểu giữa các request (requests_per_minute), an toàn đa luồng"""
+
+    def __init__(self, requests_per_minute=None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Translator:
+    """
+    Dịch text theo lô với bộ nhớ dịch và loại trùng.
+
+    Mỗi chuỗi chỉ được dịch một lần: tra cache trong tiến trình, rồi bộ nhớ dịch
+    SQLite; các chuỗi còn thiếu (kể cả từ nhiều luồng cùng lúc) được gom trong
+    khoảng ``max_wait`` giây thành một lô tối đa ``batch_size`` chuỗi và gửi một
+    request. Số lô chạy đồng thời và tần suất request bị giới hạn.
+    """
+
+    def __init__(self, backend, memory=None, target_language=DEFAULT_TARGET_LANGUAGE, batch_size=50,
+                 max_batch_chars=8000, max_wait=0.2, max_concurrency=2, requests_per_minute=60):
+        """
+        Args:
+            backend: Đối tượng có translate_batch(texts, target_language) -> list
+            memory (TranslationMemory, optional): Bộ nhớ dịch lưu bền
+            target_language: Ngôn ngữ đích mặc định
+            batch_size: Số chuỗi tối đa mỗi request
+            max_batch_chars: Tổng số ký tự tối đa mỗi request
+            max_wait: Thời gian chờ gom thêm chuỗi trước khi gửi lô (giây)
+            max_concurrency: Số request chạy đồng thời tối đa
+            requests_per_minute: Giới hạn tần suất request (None = không giới hạn)
+        """
+        self.backend = backend
+        self.memory = memory
+        self.target_language = target_language
+        self.batch_size = max(1, batch_size)
+        self.max_batch_chars = max_batch_chars
+        self.max_wait = max_wait
+        self._limiter = RateLimiter(requests_per_minute)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix='translate')
+
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._inflight = {}
+        self._pending = track_queue('translation', 'pending', queue.Queue())
+        self._dispatcher = None
+        self._closed = False
+
+        self.stats = {
+            'requested': 0,
+            'cache_hits': 0,
+            'memory_hits': 0,
+            'translated': 0,
+            'batches': 0,
+            'failed_batches': 0,
+        }
+
+    # ======= API =======
+
+    def translate(self, text, target_language=None):
+        """Dịch một chuỗi (dùng chung lô với các luồng khác)"""
+        return self.translate_many([text], target_language)[0]
+
+    def translate_many(self, texts, target_language=None):
+        """
+        Dịch danh sách text, giữ nguyên thứ tự; text rỗng được trả nguyên.
+        Nếu dịch lỗi, trả về text gốc (không lưu vào bộ nhớ dịch).
+
+        Args:
+            texts: Danh sách text gốc
+            target_language: Ngôn ngữ đích (mặc định theo Translator)
+
+        Returns:
+            list: Bản dịch cùng thứ tự
+        """
+        language = target_language or self.target_language
+        results = list(texts)
+        positions = {}
+        for index, text in enumerate(texts):
+            if text and text.strip():
+                positions.setdefault(text, []).append(index)
+        if not positions:
+            return results
+
+        keys = {text: translation_key(text, language) for text in positions}
+        resolved = {}
+        with self._lock:
+            self.stats['requested'] += len(positions)
+            for text, key in keys.items():
+                if key in self._cache:
+                    resolved[text] = self._cache[key]
+            self.stats['cache_hits'] += len(resolved)
+
+        missing = [text for text in keys if text not in resolved]
+        if missing and self.memory is not None:
+            stored = self.memory.get_many(keys[text] for text in missing)
+            if stored:
+                with self._lock:
+                    self._cache.update(stored)
+                    self.stats['memory_hits'] += len(stored)
+                for text in missing:
+                    if keys[text] in stored:
+                        resolved[text] = stored[keys[text]]
+                missing = [text for text in missing if text not in resolved]
+
+        futures = {}
+        if missing:
+            with self._lock:
+                for text in missing:
+                    key = keys[text]
+                    if key in self._cache:
+                        resolved[text] = self._cache[key]
+                        continue
+                    future = self._inflight.get(key)
+                    if future is None:
+                        future = Future()
+                        self._inflight[key] = future
+                        self._pending.put((key, text, language, future))
+                    futures[text] = future
+                if futures:
+                    self._ensure_dispatcher()
+            for text, future in futures.items():
+                resolved[text] = future.result()
+
+        for text, indexes in positions.items():
+            for index in indexes:
+                results[index] = resolved.get(text, text)
+        return results
+
+    def close(self):
+        """Dừng luồng gom lô và đóng bộ nhớ dịch"""
+        with self._lock:
+            self._closed = True
+            dispatcher = self._dispatcher
+        if dispatcher is not None:
+            self._pending.put(None)
+            dispatcher.join()
+        self._executor.shutdown(wait=True)
+        if self.memory is not None:
+            self.memory.close()
+
+    # ======= BATCHING =======
+
+    def _ensure_dispatcher(self):
+        if self._closed:
+            raise RuntimeError('Translator đã đóng')
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='translate-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        carry = None
+        while True:
+            item = carry if carry is not None else self._pending.get()
+            carry = None
+            if item is None:
+                return
+
+            batch = [item]
+            chars = len(item[1])
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                if chars + len(nxt[1]) > self.max_batch_chars:
+                    carry = nxt
+                    break
+                batch.append(nxt)
+                chars += len(nxt[1])
+
+            # Chờ slot trống; trong lúc chờ, các chuỗi mới dồn vào lô kế tiếp
+            self._slots.acquire()
+            self._executor.submit(self._run_batch, batch)
+            if stop:
+                if carry is not None:
+                    self._slots.acquire()
+                    self._executor.submit(self._run_batch, [carry])
+                return
+
+    def _run_batch(self, batch):
+        try:
+            by_language = {}
+            for item in batch:
+                by_language.setdefault(item[2], []).append(item)
+            for language, items in by_language.items():
+                self._translate_items(items, language)
+        finally:
+            self._slots.release()
+
+    def _translate_items(self, items, language):
+        texts = [text for _, text, _, _ in items]
+        try:
+            self._limiter.wait()
+            translated = self.backend.translate_batch(texts, language)
+            if len(translated) != len(texts):
+                raise ValueError(f'Số bản dịch ({len(translated)}) khác số đoạn ({len(texts)})')
+        except Exception as e:
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['failed_batches'] += 1
+            # Kết quả sai số lượng hoặc không đọc được: chia đôi lô và dịch lại từng nửa
+            # để một chuỗi lỗi không kéo cả lô về ngôn ngữ gốc; lỗi mạng thì không thử lại
+            if isinstance(e, ValueError) and len(items) > 1:
+                middle = len(items) // 2
+                logger.warning(f"⚠️ Lô {len(texts)} đoạn trả về không hợp lệ, chia đôi để dịch lại: {str(e)}")
+                self._translate_items(items[:middle], language)
+                self._translate_items(items[middle:], language)
+                return
+            logger.error(f"❌ Lỗi khi dịch lô {len(texts)} đoạn: {str(e)}")
+            with self._lock:
+                for key, _, _, _ in items:
+                    self._inflight.pop(key, None)
+            for _, text, _, future in items:
+                future.set_result(text)
+            return
+
+        entries = []
+        with self._lock:
+            self.stats['batches'] += 1
+            for (key, text, _, _), result in zip(items, translated):
+                if result:
+                    self._cache[key] = result
+                    entries.append((key, text, language, result))
+                self._inflight.pop(key, None)
+            self.stats['translated'] += len(entries)
+        if self.memory is not None:
+            try:
+                self.memory.put_many(entries)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Không lưu được bộ nhớ dịch: {str(e)}")
+        logger.debug(f"Đã dịch lô {len(texts)} đoạn ({language})")
+        for (_, text, _, future), result in zip(items, translated):
+            future.set_result(result or text)
@@ -0,0 +1,192 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlparse
+
+# Đường dẫn không bao giờ là trang sản phẩm (tin tức, danh mục, tìm kiếm...)
+EXCLUDED_PRODUCT_PATHS = ('/tin-tuc/', '/news/', '/thong-tin/', '/information/', '/category/', '/danh-muc/',
+                          '/page/', '/search/', '/tim-kiem/', '/about/', '/contact/', '/blog/', '/home/')
+PRODUCT_PATH_KEYWORDS = ('/san-pham/', '/product/')
+CATEGORY_PATH_KEYWORDS = ('/category/', '/danh-muc/', '/list/')
+PRODUCT_KEYWORDS = ('san-pham', 'product', 'item', 'detail')
+BAA_EXCLUDED_KEYWORDS = ('category', 'list', 'search', 'page', 'menu', 'navigation')
+
+# URL đèn tháp LED được xử lý như trang danh mục
+LED_TOWER_URL = "den-thap-led-sang-tinh-chop-nhay-d45mm-qlight-st45l-and-st45ml-series_4779"
+
+_VN_NAME_ID_RE = re.compile(r'/vn/[^/]+_\d+/?$', re.IGNORECASE)
+_VN_NAME_ID_CASE_RE = re.compile(r'/vn/[^/]+_\d+/?$')
+_NAME_DASH_ID_RE = re.compile(r'/[^/]+-[^/]+_\d+/?$', re.IGNORECASE)
+_TRAILING_ID_RE = re.compile(r'_\d+/?$')
+_BAA_LONG_NAME_RE = re.compile(r'/vn/[a-zA-Z0-9\-]{10,}_\d+/?$', re.IGNORECASE)
+_BAA_SERIES_RE = re.compile(r'/vn/[^/]*(series|model|type)[^/]*_\d+/?$', re.IGNORECASE)
+_CATEGORY_RE = re.compile(
+    r'/category/'                       # URL có /category/ (mọi kiểu viết hoa)
+    r'|/danh-muc/'                      # URL có /danh-muc/
+    r'|baa\.vn.*\/vn\/[^/]+\/.*-page-\d+'  # URL có phân trang
+    r'|haiphongtech.+\/danh-muc'        # URL haiphongtech với danh-muc
+    r'|/vn/.*_\d+/?$',                  # Pattern chung cho danh mục BAA.vn
+    re.IGNORECASE
+)
+
+PRODUCT = 'product'
+CATEGORY = 'category'
+
+
+class UrlClassifier:
+    """
+    Phân loại URL BAA.vn thành URL sản phẩm / danh mục.
+
+    Các biểu thức chính quy được biên dịch sẵn ở cấp module, kết quả mỗi URL được
+    ghi nhớ bằng LRU cache (trang danh sách lặp lại cùng một liên kết ở nhiều selector
+    và nhiều trang), và không có I/O nào trong đường đi nóng.
+    """
+
+    def __init__(self, cache_size=65536):
+        """
+        Args:
+            cache_size (int): Số URL tối đa được ghi nhớ cho mỗi loại kiểm tra
+        """
+        self.is_product_url = lru_cache(maxsize=cache_size)(self._is_product_url)
+        self.is_category_url = lru_cache(maxsize=cache_size)(self._is_category_url)
+        self.is_baa_product_url = lru_cache(maxsize=cache_size)(self._is_baa_product_url)
+
+    @staticmethod
+    def _is_product_url(url):
+        """Kiểm tra xem URL có phải là URL sản phẩm hợp lệ không"""
+        parsed_url = urlparse(url)
+        path = parsed_url.path.lower()
+
+        # Loại bỏ các URL không phải BAA.vn
+        if 'baa.vn' not in parsed_url.netloc.lower():
+            return False
+
+        # Loại bỏ các URL tin tức, thông tin, v.v. trước tiên
+        if any(excluded in path for excluded in EXCLUDED_PRODUCT_PATHS):
+            return False
+
+        # Pattern 1, 2: URL có chứa /san-pham/ hoặc /product/ và phần sau đủ dài
+        for keyword in PRODUCT_PATH_KEYWORDS:
+            if keyword in path:
+                product_part = path.split(keyword)[1].strip('/')
+                if len(product_part) > 3:
+                    return True
+
+        # Pattern 3: URL dạng /vn/ten-san-pham_id (không phải danh mục)
+        if _VN_NAME_ID_RE.search(url) and not any(k in path for k in CATEGORY_PATH_KEYWORDS):
+            return True
+
+        # Pattern 4: URL có chứa mã sản phẩm dạng chữ-số_id ở cuối
+        if _NAME_DASH_ID_RE.search(url):
+            return True
+
+        # Pattern 5: URL có chứa từ khóa sản phẩm và có ID số ở cuối
+        if any(keyword in path for keyword in PRODUCT_KEYWORDS) and _TRAILING_ID_RE.search(url):
+            return True
+
+        # Pattern 6: URL BAA.vn dạng /vn/ten-dai-co-dash_id/ hoặc có series/model/type
+        if _BAA_LONG_NAME_RE.search(url) or _BAA_SERIES_RE.search(url):
+            return True
+
+        return False
+
+    @staticmethod
+    def _is_category_url(url):
+        """Kiểm tra xem URL có phải là URL danh mục hay không"""
+        parsed_url = urlparse(url)
+        path = parsed_url.path.lower()
+
+        # Loại bỏ các URL không phải BAA.vn
+        if 'baa.vn' not in parsed_url.netloc.lower():
+            return False
+
+        # Nhận diện các URL dạng /vn/ten-danh-muc_xxxx/ (trường hợp đặc biệt)
+        if _VN_NAME_ID_RE.search(url):
+            return True
+
+        # URL đèn tháp LED
+        if LED_TOWER_URL in url:
+            return True
+
+        is_product_path = any(k in path for k in PRODUCT_PATH_KEYWORDS)
+        if _CATEGORY_RE.search(url) and not is_product_path:
+            return True
+
+        # URL có phân trang
+        if ('page=' in url or '/page/' in url) and not is_product_path:
+            return True
+
+        return False
+
+    @staticmethod
+    def _is_baa_product_url(url):
+        """Kiểm tra URL sản phẩm đặc biệt cho BAA.vn (dùng khi các selector không tìm thấy sản phẩm)"""
+        url_lower = url.lower()
+        if 'baa.vn' not in url_lower:
+            return False
+
+        # Pattern 1: /vn/san-pham/...
+        if '/san-pham/' in url:
+            return True
+
+        # Pattern 2: /vn/name_number (nhưng không phải Category)
+        if _VN_NAME_ID_CASE_RE.search(url) and '/Category/' not in url:
+            if not any(keyword in url_lower for keyword in BAA_EXCLUDED_KEYWORDS):
+                return True
+
+        return False
+
+    def classify(self, url):
+        """
+        Phân loại một URL
+
+        Returns:
+            str hoặc None: PRODUCT, CATEGORY hoặc None nếu không nhận diện được
+        """
+        if self.is_product_url(url):
+            return PRODUCT
+        if self.is_category_url(url):
+            return CATEGORY
+        return None
+
+    def classify_batch(self, urls):
+        """
+        Phân loại một loạt URL trong một lần gọi
+
+        Args:
+            urls (iterable): Danh sách URL
+
+        Returns:
+            dict: Dict URL -> PRODUCT / CATEGORY / None (mỗi URL chỉ xuất hiện một lần)
+        """
+        return {url: self.classify(url) for url in dict.fromkeys(urls)}
+
+    def filter_product_urls(self, urls, fallback_to_baa_pattern=False):
+        """
+        Lọc các URL sản phẩm duy nhất từ một loạt liên kết, giữ nguyên thứ tự
+
+        Args:
+            urls (iterable): Danh sách URL (có thể trùng lặp)
+            fallback_to_baa_pattern (bool): Nếu không có URL nào hợp lệ, thử pattern đặc biệt của BAA.vn
+
+        Returns:
+            list: Các URL sản phẩm không trùng lặp
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        product_urls = [url for url in unique_urls if self.is_product_url(url)]
+        if not product_urls and fallback_to_baa_pattern:
+            product_urls = [url for url in unique_urls if self.is_baa_product_url(url)]
+        return product_urls
+
+    def cache_info(self):
+        """
+        Thống kê cache của từng loại kiểm tra
+        """
+        return {
+            PRODUCT: self.is_product_url.cache_info(),
+            CATEGORY: self.is_category_url.cache_info(),
+            'baa_pattern': self.is_baa_product_url.cache_info(),
+        }
+
+
+# Bộ phân loại dùng chung cho toàn ứng dụng
+url_classifier = UrlClassifier()
@@ -1,10 +1,18 @@
 import re
-import pandas as pd
 import os
 from urllib.parse import urlparse
 import zipfile
 import traceback
 import unicodedata
+import logging
+from app.log_config import get_item_logger
+from app.plugins import lazy_import
+
+# pandas chỉ được import khi thật sự ghi Excel
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+item_logger = get_item_logger(__name__)
 
 def is_valid_url(url):
     """
@@ -40,42 +48,42 @@ def create_zip_from_folder(folder_path, zip_path):
         bool: True nếu thành công, False nếu thất bại
     """
     try:
-        print(f"Bắt đầu tạo file ZIP từ thư mục: {folder_path}")
-        print(f"File ZIP sẽ được lưu tại: {zip_path}")
+        logger.info(f"Bắt đầu tạo file ZIP từ thư mục: {folder_path}")
+        logger.info(f"File ZIP sẽ được lưu tại: {zip_path}")
         
         # Đảm bảo thư mục cha của file ZIP tồn tại
         zip_dir = os.path.dirname(zip_path)
         if not os.path.exists(zip_dir):
             os.makedirs(zip_dir)
-            print(f"Đã tạo thư mục: {zip_dir}")
+            logger.info(f"Đã tạo thư mục: {zip_dir}")
 
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             # Duyệt qua tất cả các file trong thư mục
             for root, dirs, files in os.walk(folder_path):
-                print(f"Đang quét thư mục: {root}")
-                print(f"Tìm thấy {len(files)} files")
+                logger.info(f"Đang quét thư mục: {root}")
+                logger.info(f"Tìm thấy {len(files)} files")
                 
                 for file in files:
                     # Tạo đường dẫn đầy đủ đến file
                     file_path = os.path.join(root, file)
                     # Tạo tên cho file trong ZIP (đường dẫn tương đối)
                     arcname = os.path.relpath(file_path, folder_path)
-                    print(f"Thêm file vào ZIP: {arcname}")
+                    item_logger.info("Thêm file vào ZIP: %s", arcname)
                     # Thêm file vào ZIP
                     zipf.write(file_path, arcname)
         
         # Kiểm tra file ZIP đã được tạo
         if os.path.exists(zip_path):
             zip_size = os.path.getsize(zip_path)
-            print(f"File ZIP đã được tạo thành công: {zip_path} (Kích thước: {zip_size} bytes)")
+            logger.info(f"File ZIP đã được tạo thành công: {zip_path} (Kích thước: {zip_size} bytes)")
             return True
         else:
-            print(f"Không tìm thấy file ZIP sau khi tạo: {zip_path}")
+            logger.warning(f"Không tìm thấy file ZIP sau khi tạo: {zip_path}")
             return False
             
     except Exception as e:
-        print(f"Lỗi khi tạo file ZIP: {str(e)}")
-        print(f"Chi tiết lỗi: {traceback.format_exc()}")
+        logger.error(f"Lỗi khi tạo file ZIP: {str(e)}")
+        logger.error(f"Chi tiết lỗi: {traceback.format_exc()}")
         return False 
 
 def slug(title: str, separator: str = '-', language: str = 'en', dictionary: dict = {'@': 'at'}) -> str:
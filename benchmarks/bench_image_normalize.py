@@ -0,0 +1,114 @@
+"""
+Benchmark chuẩn hóa ảnh dùng chung (app.image_normalize) so với cách làm cũ
+(giải mã toàn bộ -> convert RGBA -> LANCZOS) trên ảnh sản phẩm rất lớn.
+
+Chạy:
+    python benchmarks/bench_image_normalize.py --size 6000 --target 800 --repeat 3
+
+Mỗi trường hợp chạy trong một tiến trình riêng để đo peak RSS (MB tăng thêm so với
+lúc bắt đầu) và thời gian xử lý mỗi ảnh (ms).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import resource
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+
+# ======= DỮ LIỆU TỔNG HỢP =======
+
+def synthetic_images(folder, size):
+    """Ảnh JPEG (ảnh chụp sản phẩm) và PNG có nền trong suốt cùng kích thước size x size"""
+    jpeg_path = os.path.join(folder, f'product_{size}.jpg')
+    png_path = os.path.join(folder, f'product_{size}.png')
+
+    img = Image.linear_gradient('L').resize((size, size)).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((size // 8, size // 8, size * 7 // 8, size * 7 // 8), fill=(30, 90, 200))
+    img.save(jpeg_path, 'JPEG', quality=90)
+
+    rgba = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(rgba)
+    draw.rectangle((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(200, 40, 40, 255))
+    rgba.save(png_path, 'PNG', compress_level=1)
+    return {'JPEG': jpeg_path, 'PNG (alpha)': png_path}
+
+
+# ======= CÁCH LÀM CŨ =======
+
+def legacy_fit_on_white(image, target_size):
+    background = Image.new('RGB', target_size, (255, 255, 255))
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    img_ratio = min(target_size[0] / image.width, target_size[1] / image.height)
+    new_size = (int(image.width * img_ratio), int(image.height * img_ratio))
+    image = image.resize(new_size, Image.Resampling.LANCZOS)
+    x = (target_size[0] - new_size[0]) // 2
+    y = (target_size[1] - new_size[1]) // 2
+    background.paste(image, (x, y), image)
+    return background
+
+
+# ======= ĐO =======
+
+def _peak_rss_mb():
+    # Trên Linux ru_maxrss được giữ qua exec (tiến trình con kế thừa peak của cha), dùng VmHWM
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Linux trả về KB, macOS trả về byte
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(method, path, target, repeat):
+    from app.image_normalize import fit_on_white
+
+    func = legacy_fit_on_white if method == 'cũ' else fit_on_white
+    baseline = _peak_rss_mb()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Image.open(path) as img:
+            func(img, (target, target))
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), _peak_rss_mb() - baseline
+
+
+def measure(method, path, target, repeat):
+    # Tiến trình mới cho mỗi trường hợp để peak RSS không bị ảnh hưởng bởi lần đo trước
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(_run_case, (method, path, target, repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chuẩn hóa ảnh lớn')
+    parser.add_argument('--size', type=int, default=6000, help='Cạnh ảnh nguồn (pixel)')
+    parser.add_argument('--target', type=int, default=800, help='Cạnh ảnh đích (pixel)')
+    parser.add_argument('--repeat', type=int, default=3, help='Số lượt đo mỗi trường hợp')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        images = synthetic_images(folder, args.size)
+        print(f'Ảnh nguồn {args.size}x{args.size} -> {args.target}x{args.target}')
+        print(f'{"Trường hợp":14} {"cách":6} {"ms/ảnh":>10} {"peak MB":>10}')
+        for label, path in images.items():
+            for method in ('cũ', 'mới'):
+                ms, peak_mb = measure(method, path, args.target, args.repeat)
+                print(f'{label:14} {method:6} {ms:>10.1f} {peak_mb:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
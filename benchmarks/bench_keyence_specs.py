@@ -0,0 +1,283 @@
+"""
+Benchmark xử lý một trang sản phẩm Keyence (tên, mã, ảnh, thông số, footnotes, HTML bảng
+đã làm sạch) trên các trang đã lưu.
+
+Ghi lại trang sản phẩm (một lần, cần mạng):
+    python benchmarks/bench_keyence_specs.py --record https://www.keyence.com.vn/.../models/xxx/ --pages-dir keyence_pages
+
+Chạy benchmark:
+    python benchmarks/bench_keyence_specs.py --pages-dir keyence_pages --repeat 20
+
+Nếu không có trang nào đã lưu, script dùng một trang tổng hợp có cấu trúc giống Keyence.
+So sánh KeyenceCrawler.extract_product_details hiện tại (một lần parse lxml) với toàn bộ
+cách xử lý cũ của mỗi sản phẩm (được nhúng lại bên dưới): parse trang bằng BeautifulSoup,
+serialize section rồi parse lại, sao chép bảng qua str() và parse lại kết quả prettify().
+"""
+import os
+import sys
+import time
+import glob
+import argparse
+import logging
+import tempfile
+import statistics
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.crawlerKeyence import KeyenceCrawler  # noqa: E402
+
+BASE_URL = 'https://www.keyence.com.vn'
+PRODUCT_URL = f'{BASE_URL}/products/sensor/laser/lr-z/models/lr-zb250an/'
+
+
+PRODUCT_HEADER = (
+    '<nav><a class="prd-inlineLink" href="/"><span class="prd-inlineLink-label">Trang chủ</span></a>'
+    '<a class="prd-inlineLink prd-utility-focusRing" href="/products/sensor/laser/">'
+    '<span class="prd-inlineLink-label">Cảm biến laser</span></a></nav>'
+    '<span class="prd-utility-body-medium prd-utility-block">LR-ZB250AN</span>'
+    '<span class="prd-utility-heading-1 prd-utility-marginBottom-2 prd-utility-block">Cảm biến laser CMOS</span>'
+    '<img class="prd-modelIntroduction-image" src="/img/lr-zb250an.png">'
+)
+
+
+def synthetic_page(n_rows=120):
+    rows = []
+    for i in range(n_rows):
+        rows.append(
+            f'<tr><td class="specTable-clm-0" rowspan="2"><span>Thông số {i}</span></td>'
+            f'<td class="specTable-clm-1" style="color:#333">Phụ {i}</td>'
+            f'<td class="specTable-clm-4" attributeid="a{i}">Giá trị<br/>{i} <sup>*1</sup></td></tr>'
+        )
+    foots = ''.join(
+        f'<tr class="specTable-foot"><td attributeid="f{j}" colspan="5">*{j} Ghi chú {j}</td></tr>' for j in range(3)
+    )
+    return (
+        f'<html><head><meta charset="utf-8"></head><body>{PRODUCT_HEADER}'
+        '<section><h2>Thông số kỹ thuật</h2><div class="prd-specsTable"><div class="specTable-block">'
+        f'<table class="specTable"><colgroup><col><col></colgroup><tbody>{"".join(rows)}{foots}</tbody></table>'
+        '</div></div></section></body></html>'
+    )
+
+
+# ======= CÁCH LÀM CŨ (MỖI SẢN PHẨM) =======
+
+def _legacy_inject_styles(section):
+    table = section.find('table')
+    if not table:
+        return
+    add = 'border-collapse:collapse;width:100%;'
+    if add not in table.get('style', ''):
+        table['style'] = (table.get('style', '') + ';' + add).strip(';')
+    for cell in table.find_all(['td', 'th']):
+        add = 'border:1px solid #e5e5e5;padding:8px;vertical-align:top;'
+        if add not in cell.get('style', ''):
+            cell['style'] = (cell.get('style', '') + ';' + add).strip(';')
+    thead = table.find('thead')
+    if thead:
+        for th in thead.find_all('th'):
+            add = 'background:#f7f7f7;font-weight:600;'
+            if add not in th.get('style', ''):
+                th['style'] = (th.get('style', '') + ';' + add).strip(';')
+
+
+def _legacy_original_specs_html(soup):
+    specs_div = soup.find('div', class_='prd-specsTable')
+    if not specs_div:
+        return ''
+    section = specs_div.find_parent('section') or specs_div
+    h2 = section.find('h2')
+    if h2 and 'thông số' not in h2.get_text(strip=True).lower():
+        return ''
+    _legacy_inject_styles(section)
+    return str(section)
+
+
+def _legacy_clean_specs(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    h2 = soup.find('h2', string=lambda s: s and 'Thông số kỹ thuật' in s)
+    table = h2.find_next('table') if h2 else None
+    if not (h2 and table):
+        return ''
+    foot_index = None
+    for idx, row in enumerate(table.find_all('tr')):
+        if 'specTable-foot' in (row.get('class', []) or []):
+            foot_index = idx
+            break
+    for col in table.find_all(['col', 'colgroup']):
+        col.decompose()
+    for tag in [table] + table.find_all(True):
+        tag.attrs = {k: tag.attrs[k] for k in ('rowspan', 'colspan') if k in tag.attrs}
+
+    out = BeautifulSoup(features='html.parser')
+    sec = out.new_tag('section')
+    h2_min = out.new_tag('h2')
+    h2_min.string = h2.get_text(strip=True)
+    sec.append(h2_min)
+    table_copy_soup = BeautifulSoup(str(table), 'html.parser')
+    table_copy = table_copy_soup.find('table')
+    tbody = table_copy.find('tbody') or table_copy
+    tr_c = table_copy_soup.new_tag('tr')
+    td_label = table_copy_soup.new_tag('td')
+    td_label['style'] = 'font-weight: bold;'
+    td_label.string = 'Copyright'
+    td_value = table_copy_soup.new_tag('td')
+    td_value.string = 'Haiphongtech.vn'
+    tr_c.append(td_label)
+    tr_c.append(td_value)
+    rows_copy = table_copy.find_all('tr')
+    if foot_index is not None and foot_index < len(rows_copy):
+        rows_copy[foot_index].insert_before(tr_c)
+    else:
+        tbody.append(tr_c)
+    sec.append(table_copy)
+    out.append(sec)
+
+    styled_soup = BeautifulSoup(out.prettify(), 'html.parser')
+    _legacy_inject_styles(styled_soup.find('section') or styled_soup)
+    return str(styled_soup)
+
+
+def _legacy_text_of(el):
+    return ' ; '.join(s.strip() for s in el.stripped_strings)
+
+
+def _legacy_specs(soup):
+    items = []
+    for tr in soup.select('div.specTable-block table tr'):
+        key_main = tr.select_one('td.specTable-clm-0')
+        key_sub = tr.select_one('td.specTable-clm-1')
+        val_td = (tr.select_one('td.specTable-clm-4') or tr.select_one('td.specTable-clm-2')
+                  or tr.select_one('td.specTable-clm-1'))
+        if not key_main or not val_td:
+            continue
+        key = _legacy_text_of(key_main)
+        if key_sub and key_sub.get_text(strip=True):
+            key = f"{key} — {_legacy_text_of(key_sub)}"
+        value = _legacy_text_of(val_td)
+        if value in ('―', '—', '-'):
+            value = ''
+        if key and key != value:
+            items.append({'key': key, 'value': value, 'attributeid': val_td.get('attributeid', '')})
+    return items
+
+
+def _legacy_footnotes(soup):
+    footnotes = {}
+    for row in soup.select('div.specTable-block table tr.specTable-foot'):
+        cells = row.find_all('td')
+        if cells:
+            footnotes[cells[0].get('attributeid', 'footnotes')] = _legacy_text_of(cells[0])
+    return footnotes
+
+
+def legacy_product(html):
+    """Xử lý một trang sản phẩm như extract_product_details trước khi có app.keyence_specs"""
+    soup = BeautifulSoup(html, 'html.parser')
+    code = soup.find('span', class_='prd-utility-body-medium prd-utility-block')
+    category = ''
+    link = soup.find('a', class_='prd-inlineLink prd-utility-focusRing')
+    label = link.find('span', class_='prd-inlineLink-label') if link else None
+    if label:
+        category = label.get_text(strip=True)
+    if not category:
+        for link in soup.find_all('a', class_='prd-inlineLink'):
+            label = link.find('span', class_='prd-inlineLink-label')
+            if label and label.get_text(strip=True).lower() not in ('trang chủ', 'home'):
+                category = label.get_text(strip=True)
+                break
+    description = (soup.find('span', class_='prd-utility-heading-1 prd-utility-marginBottom-2 prd-utility-block')
+                   or soup.find('span', class_='prd-utility-heading-1'))
+    img = soup.find('img', class_='prd-modelIntroduction-image')
+
+    original = _legacy_original_specs_html(soup)
+    cleaned = _legacy_clean_specs(original) if original else ''
+    return {
+        'product_code': code.get_text(strip=True) if code else '',
+        'category': category,
+        'description': description.get_text(strip=True) if description else '',
+        'image_url': urljoin(BASE_URL, img['src']) if img and img.get('src') else '',
+        'specs_html_original': cleaned or original,
+        'specifications': _legacy_specs(soup),
+        'footnotes': _legacy_footnotes(soup),
+    }
+
+
+def current_extractor():
+    """extract_product_details hiện tại với HTML lấy từ bộ nhớ (không gọi mạng, không in tiến trình)"""
+    crawler = KeyenceCrawler(output_root=tempfile.mkdtemp())
+    crawler.emit_progress = lambda *args, **kwargs: None
+    page = {}
+    crawler.get_html_content = lambda url, timeout=30: page['html']
+
+    def extract(html):
+        page['html'] = html
+        return crawler.extract_product_details(PRODUCT_URL)
+    return extract
+
+
+def record_pages(urls, pages_dir):
+    import requests
+
+    os.makedirs(pages_dir, exist_ok=True)
+    session = requests.Session()
+    session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    for url in urls:
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        name = url.rstrip('/').split('/')[-1] or 'page'
+        path = os.path.join(pages_dir, f'{name}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f'Đã lưu {url} -> {path}')
+
+
+def time_call(func, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark xử lý thông số Keyence')
+    parser.add_argument('--pages-dir', default='keyence_pages', help='Thư mục chứa các trang .html đã lưu')
+    parser.add_argument('--record', nargs='*', default=None, help='URL trang sản phẩm cần lưu trước khi chạy')
+    parser.add_argument('--repeat', type=int, default=10, help='Số lần lặp cho mỗi trang')
+    args = parser.parse_args()
+
+    if args.record:
+        record_pages(args.record, args.pages_dir)
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(args.pages_dir, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        print(f'Không có trang nào trong {args.pages_dir}, dùng trang tổng hợp')
+        pages = {'synthetic.html': synthetic_page()}
+
+    logging.disable(logging.INFO)
+    extract = current_extractor()
+    total_new = total_old = 0.0
+    print(f'{"Trang":40} {"Số hàng":>8} {"mới (ms)":>10} {"cũ (ms)":>10} {"nhanh hơn":>10}')
+    for name, html in pages.items():
+        result = extract(html)
+        legacy = legacy_product(html)
+        if len(result['specifications']) != len(legacy['specifications']) or result['footnotes'] != legacy['footnotes']:
+            print(f'⚠️ {name}: kết quả thông số khác cách làm cũ')
+        new_ms = time_call(extract, html, args.repeat)
+        old_ms = time_call(legacy_product, html, args.repeat)
+        total_new += new_ms
+        total_old += old_ms
+        print(f'{name[:40]:40} {len(result["specifications"]):>8} {new_ms:>10.2f} {old_ms:>10.2f} {old_ms / new_ms:>9.1f}x')
+
+    print(f'\nTrung bình mỗi sản phẩm: mới {total_new / len(pages):.2f} ms, cũ {total_old / len(pages):.2f} ms '
+          f'({total_old / total_new:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark bộ dựng bảng thông số dùng chung (app.spec_engine) so với cách làm cũ của từng hãng.
+
+Chạy:
+    python benchmarks/bench_spec_engine.py --products 200 --specs 40 --repeat 5
+
+Cách làm cũ (BeautifulSoup + nối chuỗi riêng từng crawler) được nhúng lại bên dưới
+để so sánh CPU trên mỗi sản phẩm với cùng dữ liệu tổng hợp.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.spec_engine import (  # noqa: E402
+    parse_html, pairs_from_list_items, table_from_element,
+    render_pairs, render_element_table, uppercase_code_cells
+)
+
+
+# ======= DỮ LIỆU TỔNG HỢP =======
+
+def synthetic_specs(n_specs):
+    return {f'Thông số {i}': f'Giá trị <{i}> & đơn vị' for i in range(n_specs)}
+
+
+def synthetic_hoplong_page(n_specs, with_table):
+    items = ''.join(
+        f'<li><span class="title">Thông số {i}</span><span class="content">Giá trị {i}</span></li>'
+        for i in range(n_specs)
+    )
+    table = ''
+    if with_table:
+        rows = ''.join(
+            f'<tr><td style="width:30%" rowspan="1">Thông số {i}</td><td class="v">Giá trị<br>{i}</td></tr>'
+            for i in range(n_specs)
+        )
+        table = f'<table class="tbl" border="1"><colgroup><col><col></colgroup><tbody>{rows}</tbody></table>'
+    return (
+        '<html><body><h1 class="content-title">Cảm biến</h1>'
+        '<p class="content-meta__sku">Mã sản phẩm: E2B-M12</p><a class="content-meta__brand">Omron</a>'
+        f'<div class="content-tab__detail" id="technical"><ul>{items}</ul>{table}</div></body></html>'
+    )
+
+
+def synthetic_baa_fragment(n_specs):
+    rows = ''.join(
+        f'<tr><td>{"Mã hàng" if i % 5 == 0 else "Thông số"} {i}</td><td>abc-{i}</td></tr>' for i in range(n_specs)
+    )
+    return f'<table><tbody>{rows}</tbody></table>'
+
+
+# ======= CÁCH LÀM CŨ =======
+
+def legacy_omron(code, name, specs):
+    html = ('<table id="specifications" border="1" cellpadding="8" cellspacing="0" '
+            'style="border-collapse: collapse; font-family: Arial; width: 100%;">\n<thead>\n'
+            '<tr style="background-color: #f2f2f2;">\n<th>Thông số</th>\n<th>Giá trị</th>\n</tr>\n</thead>\n<tbody>\n'
+            '<tr>\n<td style="font-weight: bold;">Mã sản phẩm</td>\n<td>{}</td>\n</tr>\n'
+            '<tr>\n<td style="font-weight: bold;">Tên sản phẩm</td>\n<td>{}</td>\n</tr>').format(code, name)
+    for key, value in specs.items():
+        html += f'\n<tr>\n<td style="font-weight: bold;">{key}</td>\n<td>{value}</td>\n</tr>'
+    html += ('\n<tr>\n<td style="font-weight: bold;">Copyright</td>\n<td>Haiphongtech.vn</td>\n</tr>\n'
+             '</tbody>\n</table>')
+    return html
+
+
+def legacy_hoplong(page):
+    soup = BeautifulSoup(page, 'html.parser')
+    soup.select_one('h1.content-title').get_text(strip=True)
+    soup.select_one('p.content-meta__sku').get_text(strip=True)
+    soup.select_one('a.content-meta__brand').get_text(strip=True)
+    tech_div = soup.select_one('div.content-tab__detail#technical')
+    pairs = []
+    for ul in tech_div.find_all('ul'):
+        for li in ul.find_all('li', recursive=False):
+            title_span = li.find('span', class_='title')
+            content_span = li.find('span', class_='content')
+            title = title_span.get_text(strip=True) if title_span else ''
+            content = content_span.get_text(strip=True) if content_span else ''
+            if title or content:
+                pairs.append((title, content))
+    table = tech_div.find('table')
+    if table:
+        for col in table.find_all(['col', 'colgroup']):
+            col.decompose()
+        tbody = table.find('tbody') or table
+        tr = soup.new_tag('tr')
+        td1 = soup.new_tag('td')
+        td1['style'] = 'font-weight: bold;'
+        td1.string = 'Copyright'
+        td2 = soup.new_tag('td')
+        td2.string = 'Haiphongtech.vn'
+        tr.append(td1)
+        tr.append(td2)
+        tbody.append(tr)
+        return str(table)
+    rows = ['<table id="specifications">', '<tbody>']
+    for k, v in pairs:
+        rows.append(f'<tr><td><strong>{k}</strong></td><td>{v}</td></tr>')
+    rows.append('<tr><td style="font-weight: bold;">Copyright</td><td>Haiphongtech.vn</td></tr>')
+    rows.append('</tbody></table>')
+    return '\n'.join(rows)
+
+
+def legacy_baa(spec_html):
+    soup = BeautifulSoup(spec_html, 'html.parser')
+    for td in soup.find_all('td'):
+        if td.text and any(keyword in td.text.lower() for keyword in ['mã', 'model', 'part no']):
+            td.string = td.text.upper()
+    return str(soup)
+
+
+# ======= CÁCH LÀM MỚI =======
+
+def engine_omron(code, name, specs):
+    pairs = [('Mã sản phẩm', code), ('Tên sản phẩm', name)]
+    pairs.extend(specs.items())
+    return render_pairs(pairs)
+
+
+def engine_hoplong(page):
+    root = parse_html(page)
+    root.xpath("//h1[@class='content-title']")
+    root.xpath("//p[@class='content-meta__sku']")
+    root.xpath("//a[@class='content-meta__brand']")
+    tech_div = root.xpath("//div[@id='technical']")[0]
+    pairs = pairs_from_list_items(tech_div)
+    table = next(tech_div.iter('table'), None)
+    if table is not None:
+        return render_element_table(table_from_element(table, footnote_class=None).add_copyright(), styled=False)
+    return render_pairs(pairs)
+
+
+# ======= ĐO =======
+
+def per_product_ms(func, args, products, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(products):
+            func(*args)
+        samples.append((time.process_time() - start) * 1000 / products)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bảng thông số dùng chung')
+    parser.add_argument('--products', type=int, default=200, help='Số sản phẩm mỗi lượt đo')
+    parser.add_argument('--specs', type=int, default=40, help='Số thông số mỗi sản phẩm')
+    parser.add_argument('--repeat', type=int, default=5, help='Số lượt đo')
+    args = parser.parse_args()
+
+    specs = synthetic_specs(args.specs)
+    cases = [
+        ('Omron (bảng 2 cột)', legacy_omron, engine_omron, ('E2B-M12', 'Cảm biến', specs)),
+        ('HopLong (ul/li)', legacy_hoplong, engine_hoplong, (synthetic_hoplong_page(args.specs, False),)),
+        ('HopLong (table gốc)', legacy_hoplong, engine_hoplong, (synthetic_hoplong_page(args.specs, True),)),
+        ('BAA (viết hoa mã)', legacy_baa, uppercase_code_cells, (synthetic_baa_fragment(args.specs),)),
+    ]
+
+    print(f'{"Trường hợp":24} {"cũ (ms/sp)":>12} {"mới (ms/sp)":>12} {"nhanh hơn":>10}')
+    for label, legacy, engine, case_args in cases:
+        old_ms = per_product_ms(legacy, case_args, args.products, args.repeat)
+        new_ms = per_product_ms(engine, case_args, args.products, args.repeat)
+        speedup = old_ms / new_ms if new_ms else float('inf')
+        print(f'{label:24} {old_ms:>12.3f} {new_ms:>12.3f} {speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
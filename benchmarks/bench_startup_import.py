@@ -0,0 +1,100 @@
+"""
+Benchmark thời gian khởi động ứng dụng (create_app) với import trì hoãn (app.plugins)
+so với khi mọi crawler và thư viện nặng được import ngay lúc khởi động như trước.
+
+Chạy:
+    python benchmarks/bench_startup_import.py --repeat 5 --top 15
+
+Mỗi lượt chạy trong một tiến trình Python mới với `-X importtime`; in thời gian khởi động,
+peak RSS, số module đã nạp và các module gốc tốn thời gian import nhất (tổng cộng dồn).
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mã chạy trong tiến trình con; 'eager' nạp thêm mọi crawler như routes.py cũ
+_CHILD = """
+import sys, time, json
+started = time.perf_counter()
+from app import create_app
+create_app()
+if {eager}:
+    import pandas, openpyxl, PIL.Image
+    from app.plugins import available_crawlers, get_crawler_class
+    for name in available_crawlers():
+        try:
+            get_crawler_class(name)
+        except ImportError:
+            pass
+elapsed = time.perf_counter() - started
+peak = 0.0
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                peak = int(line.split()[1]) / 1024
+except OSError:
+    pass
+print(json.dumps({{'ms': elapsed * 1000, 'rss_mb': peak, 'modules': len(sys.modules)}}))
+"""
+
+CASES = (('trì hoãn', False), ('nạp hết', True))
+
+
+def parse_importtime(stderr):
+    """
+    Đọc kết quả `-X importtime`
+
+    Returns:
+        dict: Tên module gốc -> thời gian cộng dồn (µs)
+    """
+    roots = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Module gốc không thụt lề: thời gian cộng dồn đã gồm các module con
+        if not name.startswith('  '):
+            roots[name.strip()] = int(cumulative)
+    return roots
+
+
+def run_once(eager):
+    env = dict(os.environ, CRAWLER_LOG_LEVEL='WARNING')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD.format(eager=eager)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thời gian khởi động ứng dụng')
+    parser.add_argument('--repeat', type=int, default=5, help='Số lượt đo mỗi trường hợp')
+    parser.add_argument('--top', type=int, default=15, help='Số module import chậm nhất cần in')
+    args = parser.parse_args()
+
+    summaries = {}
+    print(f'{"Trường hợp":10} {"ms":>10} {"peak MB":>10} {"module":>8}')
+    for label, eager in CASES:
+        runs = [run_once(eager) for _ in range(args.repeat)]
+        ms = statistics.median(r['ms'] for r, _ in runs)
+        rss = statistics.median(r['rss_mb'] for r, _ in runs)
+        modules = runs[-1][0]['modules']
+        summaries[label] = runs[-1][1]
+        print(f'{label:10} {ms:>10.1f} {rss:>10.1f} {modules:>8}')
+
+    for label, roots in summaries.items():
+        print(f'\nImport chậm nhất ({label}, ms cộng dồn):')
+        for name, micros in sorted(roots.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f'  {micros / 1000:>9.1f}  {name}')
+
+
+if __name__ == '__main__':
+    main()